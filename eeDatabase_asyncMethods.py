@@ -0,0 +1,113 @@
+import asyncio
+import concurrent.futures
+import ee
+import eeDatabase_coreMethods as eedb_cor
+
+
+class EEBackend:
+    """
+    Blocking Earth Engine calls wrapped by AsyncEEClient
+    """
+    def get_collection_dates(self, in_ic_paths, start_date, end_date):
+        return(eedb_cor.get_collection_dates(in_ic_paths = in_ic_paths, start_date = start_date, end_date = end_date))
+
+    def get_stored_dates(self, out_path):
+        return(eedb_cor.get_stored_dates(out_path).distinct().getInfo())
+
+    def asset_exists(self, path):
+        return(ee.data.getInfo(path) is not None)
+
+    def list_collection(self, path):
+        asset_ids = []
+        params = {'parent': path}
+        while True:
+            response = ee.data.listAssets(params)
+            asset_ids.extend(asset.get('id') for asset in response.get('assets', []))
+            if not response.get('nextPageToken'):
+                return(asset_ids)
+            params['pageToken'] = response.get('nextPageToken')
+
+    def get_task_status(self, task_id):
+        return(ee.data.getTaskStatus(task_id)[0])
+
+
+class AsyncEEClient:
+    """
+    Awaitable versions of the remote calls made while orchestrating the database. Calls run in a
+    thread pool and a semaphore bounds how many are in flight, so gathering many of them takes
+    about as long as the slowest call instead of the sum of all calls.
+    """
+    def __init__(self, backend = None, max_concurrency = 16):
+        '''
+        :param backend: e.g. EEBackend() or eeDatabase_fakeBackend.FakeEEServer() for tests
+        :param max_concurrency: e.g. maximum number of requests in flight at once
+        '''
+        self.backend = backend or EEBackend()
+        self.max_concurrency = max_concurrency
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers = max_concurrency)
+
+    async def _call(self, fn, *args):
+        async with self.semaphore:
+            return(await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args))
+
+    async def get_collection_dates(self, in_ic_paths, start_date, end_date):
+        return(await self._call(self.backend.get_collection_dates, in_ic_paths, start_date, end_date))
+
+    async def get_stored_dates(self, out_path):
+        return(await self._call(self.backend.get_stored_dates, out_path))
+
+    async def asset_exists(self, path):
+        return(await self._call(self.backend.asset_exists, path))
+
+    async def list_collection(self, path):
+        return(await self._call(self.backend.list_collection, path))
+
+    async def get_task_status(self, task_id):
+        return(await self._call(self.backend.get_task_status, task_id))
+
+    async def wait_for_task(self, task_id, poll_interval = 30):
+        # Sleeping does not hold the semaphore, so many tasks can be polled at once
+        while True:
+            status = await self.get_task_status(task_id)
+            if status.get('state') in ['COMPLETED', 'FAILED', 'CANCELLED']:
+                return(status)
+            await asyncio.sleep(poll_interval)
+
+    async def wait_for_tasks(self, task_ids, poll_interval = 30):
+        return(await asyncio.gather(*[self.wait_for_task(task_id, poll_interval) for task_id in task_ids]))
+
+    def close(self):
+        self.executor.shutdown(wait = False)
+
+
+async def get_missing_dates(client, jobs, start_date, end_date):
+    """
+    :param client: e.g. AsyncEEClient()
+    :param jobs: e.g. list of (in_ic_paths, out_path) pairs
+    :param start_date: e.g. datetime.datetime(2008, 1, 1)
+    :param end_date: e.g. datetime.datetime(2025, 1, 1)
+    :return: Dictionary of {out_path: sorted dates missing from the collection}, or None if the collection does not exist
+    """
+    # Datasets shared by several collections only need their dates discovered once
+    in_ic_keys = sorted({tuple(in_ic_paths) for in_ic_paths, _ in jobs})
+    out_paths = [out_path for _, out_path in jobs]
+
+    # Issue every date discovery and asset check at once
+    all_dates, exists = await asyncio.gather(
+        asyncio.gather(*[client.get_collection_dates(list(key), start_date, end_date) for key in in_ic_keys]),
+        asyncio.gather(*[client.asset_exists(out_path) for out_path in out_paths]))
+    all_dates = dict(zip(in_ic_keys, all_dates))
+
+    # Then read stored dates for the collections that exist
+    existing = [out_path for out_path, e in zip(out_paths, exists) if e]
+    stored_dates = dict(zip(existing, await asyncio.gather(*[client.get_stored_dates(out_path) for out_path in existing])))
+
+    missing = {}
+    for in_ic_paths, out_path in jobs:
+        if out_path in stored_dates:
+            missing[out_path] = sorted(set(all_dates[tuple(in_ic_paths)]) - set(stored_dates[out_path]))
+        else:
+            missing[out_path] = None
+
+    return(missing)
@@ -0,0 +1,198 @@
+import argparse
+import contextlib
+import csv
+import datetime
+import io
+import json
+import sys
+import time
+import numpy as np
+import eeDatabase_fakeEE as fake_ee
+fake_ee.install()
+import eeDatabase_coreMethods as eedb_cor
+import eeDatabase_collectionInfo as eedb_colinfo
+import eeDatabase_pathNames as eedb_path
+
+# Synthetic land unit registered in land_unit_dict while benchmarking, masked datasets apply the mask to it
+synthetic_fc_path = 'synthetic/land_units'
+synthetic_land_unit = {'land_unit_long': 'Synthetic_Land_Units',
+                       'land_unit_short': 'Synthetic',
+                       'in_fc_id': 'unit_id',
+                       'tile_scale': 1,
+                       'fc_mask': True}
+synthetic_root = 'synthetic/blm-database'
+coverage_path = 'synthetic/coverage'
+layout_path = 'synthetic/layout'
+
+
+def make_benchmark_catalog(n_features, seed = 0):
+    """
+    :param n_features: e.g. 1000, 10000 or 100000
+    :param seed: e.g. seed of the random pixel values and feature sizes
+    :return: Fake catalog with the synthetic land units, every source collection, the land unit mask, a coverage index
+             with every tenth feature outside the footprint, a layout and database collections holding only their ID image
+    """
+    in_fc_id = synthetic_land_unit.get('in_fc_id')
+    catalog = fake_ee.make_synthetic_catalog(n_features = n_features, in_fc_path = synthetic_fc_path, in_fc_id = in_fc_id, seed = seed)
+    features = catalog.get(synthetic_fc_path).features
+
+    # Mask sharing the grid of the source collections with about a tenth of the pixels excluded
+    grid = catalog.get('GRIDMET/DROUGHT').images[0].grid
+    mask_seed = np.random.default_rng(seed).integers(2 ** 32)
+    catalog[eedb_colinfo.mask_path] = fake_ee.ImageValue(
+        lambda: {'b1': np.ma.masked_array((np.random.default_rng(mask_seed).uniform(size = (grid.height, grid.width)) > 0.1).astype(int))}, grid)
+
+    catalog[coverage_path] = fake_ee.FCValue([fake_ee.FeatureValue(f.geom, {in_fc_id: f.props.get(in_fc_id), 'eq_index': i, 'covered': int(i % 10 != 0)})
+                                              for i, f in enumerate(features)])
+    catalog[layout_path] = fake_ee.FCValue([fake_ee.FeatureValue(None, {'fc_id': f.props.get(in_fc_id), 'slot': i, 'retired': 0, 'fingerprint': 0})
+                                            for i, f in enumerate(features)])
+
+    # Database collections holding the ID image, stamped with the class schema of categorical datasets as initialize_collection()
+    # does, year images in 'annual' storage are read back when dates are added
+    for in_ic_name, in_ic_info in eedb_colinfo.in_ic_dict.items():
+        id_properties = {'system:index': '0_id'}
+        if in_ic_info.get('var_type') == 'Categorical':
+            id_properties['class_schema'] = eedb_cor.get_class_schema(in_ic_name)
+        for var_name in in_ic_info.get('var_names'):
+            catalog[eedb_path.get_out_path(synthetic_land_unit.get('land_unit_short'), in_ic_name, var_name, root = synthetic_root)] = \
+                fake_ee.ICValue([fake_ee.ImageValue({}, None, id_properties)])
+
+    return(catalog)
+
+
+def preprocess_only(in_ic_paths, dates, out_path, properties):
+    return([eedb_cor.preprocess_image(in_ic_paths = in_ic_paths, date = date, properties = eedb_cor.get_date_properties(properties, date))
+            for date in dates])
+
+
+def export_default(in_ic_paths, dates, out_path, properties):
+    return([eedb_cor.run_image_export(in_ic_paths = in_ic_paths, date = date, out_path = out_path, properties = eedb_cor.get_date_properties(properties, date))
+            for date in dates])
+
+
+def export_coverage(in_ic_paths, dates, out_path, properties):
+    return(export_default(in_ic_paths, dates, out_path, dict(properties, coverage_path = coverage_path)))
+
+
+def export_layout(in_ic_paths, dates, out_path, properties):
+    return(export_default(in_ic_paths, dates, out_path, dict(properties, layout_path = layout_path)))
+
+
+def export_table(in_ic_paths, dates, out_path, properties):
+    return(export_default(in_ic_paths, dates, f'{out_path}-table', dict(properties, sink = 'table')))
+
+
+def export_context(in_ic_paths, dates, out_path, properties):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return(eedb_cor.run_image_exports(in_ic_paths = in_ic_paths, dates = dates, out_path = out_path, properties = properties))
+
+
+def export_annual(in_ic_paths, dates, out_path, properties):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return(eedb_cor.run_image_exports(in_ic_paths = in_ic_paths, dates = dates, out_path = out_path, properties = dict(properties, storage = 'annual')))
+
+
+# Graphs benchmarked for each dataset, the preprocessed image alone and each way run_image_export() builds an export
+export_paths = {'preprocess': preprocess_only,
+                'default': export_default,
+                'coverage': export_coverage,
+                'layout': export_layout,
+                'table': export_table,
+                'context': export_context,
+                'annual': export_annual}
+
+
+def benchmark_dataset(in_ic_name, path_name, n_dates = 1, execute = True):
+    """
+    :param in_ic_name: e.g. 'GridMET_Drought'
+    :param path_name: e.g. a key of export_paths
+    :param n_dates: e.g. number of dates exported, round trips of the 'context' path are shared across them
+    :param execute: e.g. False to only build and serialize the graphs
+    :return: Dictionary of graph node count, depth and serialized bytes for the first date, client round trips to build
+             and submit every date, and the seconds spent building and executing locally
+    """
+    in_ic_paths = eedb_colinfo.in_ic_dict.get(in_ic_name).get('in_ic_paths')
+    var_name = eedb_colinfo.in_ic_dict.get(in_ic_name).get('var_names')[0]
+    in_ic_res = eedb_cor.get_in_ic_res(in_ic_name).getInfo()
+    properties = eedb_cor.get_run_properties(synthetic_fc_path, in_ic_name, var_name, in_ic_res)
+    out_path = eedb_path.get_out_path(properties.get('land_unit_short'), in_ic_name, var_name, root = synthetic_root)
+    dates = eedb_cor.get_collection_dates(in_ic_paths = in_ic_paths, start_date = datetime.datetime(2022, 1, 1), end_date = datetime.datetime(2022, 2, 1))[:n_dates]
+
+    fake_ee.session.reset_counters()
+    start = time.perf_counter()
+    outputs = export_paths.get(path_name)(in_ic_paths, dates, out_path, properties)
+    build_s = time.perf_counter() - start
+    round_trips = fake_ee.session.round_trips
+
+    # Export tasks hold the graph they submit, the preprocessed images are graphs themselves
+    graphs = [output.value if isinstance(output, fake_ee.FakeExportTask) else output for output in outputs]
+    result = dict({'in_ic_name': in_ic_name, 'path': path_name, 'n_dates': len(dates), 'round_trips': round_trips, 'build_s': round(build_s, 4)},
+                  **fake_ee.graph_stats(graphs[0]))
+
+    if execute:
+        start = time.perf_counter()
+        for graph in graphs:
+            fake_ee.evaluate(graph)
+        result['execute_s'] = round(time.perf_counter() - start, 4)
+
+    return(result)
+
+
+def run_benchmarks(sizes = [1000, 10000, 100000], in_ic_names = None, path_names = None, n_dates = 1, execute = True, seed = 0):
+    """
+    :param sizes: e.g. numbers of synthetic features to benchmark
+    :param in_ic_names: e.g. ['GridMET', 'USDM'], defaults to every dataset in in_ic_dict
+    :param path_names: e.g. ['default', 'context'], defaults to every entry of export_paths
+    :param n_dates: e.g. number of dates exported per dataset and path
+    :param execute: e.g. False to only build and serialize the graphs
+    :param seed: e.g. seed of the synthetic catalog
+    :return: List of result dictionaries from .benchmark_dataset() with the number of features added
+    """
+    eedb_colinfo.land_unit_dict[synthetic_fc_path] = synthetic_land_unit
+    results = []
+    for n_features in sizes:
+        fake_ee.session.catalog = make_benchmark_catalog(n_features, seed = seed)
+        for in_ic_name in in_ic_names or list(eedb_colinfo.in_ic_dict.keys()):
+            for path_name in path_names or list(export_paths.keys()):
+                try:
+                    result = benchmark_dataset(in_ic_name, path_name, n_dates = n_dates, execute = execute)
+                except Exception as e:
+                    result = {'in_ic_name': in_ic_name, 'path': path_name, 'error': repr(e)}
+                result['n_features'] = n_features
+                print(json.dumps(result))
+                results.append(result)
+
+    return(results)
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'Benchmark database graphs offline against the fake Earth Engine backend on synthetic feature collections.')
+    parser.add_argument('--sizes', type = int, nargs = '+', default = [1000, 10000, 100000], help = 'numbers of synthetic features')
+    parser.add_argument('--datasets', nargs = '+', default = None, help = 'datasets to benchmark, defaults to all of in_ic_dict')
+    parser.add_argument('--paths', nargs = '+', default = None, choices = list(export_paths.keys()), help = 'graphs to benchmark, defaults to all')
+    parser.add_argument('--dates', type = int, default = 1, help = 'dates exported per dataset and path')
+    parser.add_argument('--no-execute', action = 'store_true', help = 'only build and serialize graphs')
+    parser.add_argument('--output', default = 'benchmark_results.csv', help = 'path of the CSV or JSON results to write')
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(sizes = args.sizes, in_ic_names = args.datasets, path_names = args.paths, n_dates = args.dates, execute = not args.no_execute)
+
+    if args.output.endswith('.json'):
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent = 2)
+    else:
+        fieldnames = ['n_features', 'in_ic_name', 'path', 'n_dates', 'nodes', 'depth', 'bytes', 'round_trips', 'build_s', 'execute_s', 'error']
+        with open(args.output, 'w', newline = '') as f:
+            writer = csv.DictWriter(f, fieldnames = fieldnames)
+            writer.writeheader()
+            writer.writerows(results)
+
+    # Errors are recorded per row, so a regression would otherwise pass unnoticed
+    errors = [result for result in results if result.get('error') is not None]
+    if len(errors) > 0:
+        print(f"{len(errors)} of {len(results)} benchmarks failed", file = sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+import datetime
+import ee
+import eeDatabase_coreMethods as eedb_cor
+
+
+def get_changed_dates(in_ic_paths, out_path, in_fc_path = None, start_date = None, end_date = None, include_unfingerprinted = False, storage = 'date'):
+    """
+    :param in_ic_paths: e.g. ['projects/rap-data-365417/assets/npp-partitioned-16day-v3']
+    :param out_path: e.g. path of the database Image Collection
+    :param in_fc_path: e.g. path to input feature collection, used to limit Landsat scenes to the land units
+    :param start_date: e.g. datetime.datetime(2022, 1, 1), or None to check every date
+    :param end_date: e.g. datetime.datetime(2023, 1, 1), or None to check every date
+    :param include_unfingerprinted: e.g. True to also return images exported before fingerprints were recorded
+    :param storage: e.g. 'date' for one image per date or 'annual' for one image per year
+    :return: Client-side sorted list of system:time_start dates whose source images changed since export
+    """
+    if storage == 'annual':
+        return(get_changed_dates_annual(in_ic_paths, out_path, in_fc_path, start_date, end_date, include_unfingerprinted))
+
+    # Drop the ID image, which has no date
+    out_ic = ee.ImageCollection(out_path).filter(ee.Filter.notNull(['system:time_start']))
+    if start_date is not None and end_date is not None:
+        out_ic = out_ic.filterDate(start_date, end_date)
+
+    # Compare the fingerprint stored at export time against the current catalog for each date
+    def compare_fingerprint(img):
+        date = img.get('system:time_start')
+        stored = img.get('source_fingerprint')
+        current = eedb_cor.get_source_fingerprint(in_ic_paths = in_ic_paths, date = date, in_fc_path = in_fc_path)
+        changed = ee.Algorithms.If(ee.Algorithms.IsEqual(stored, None),
+                                   1 if include_unfingerprinted else 0,
+                                   ee.String(current).compareTo(ee.String(stored)).neq(0))
+        return(ee.Feature(None, {'date': date, 'changed': changed}))
+
+    changed_fc = ee.FeatureCollection(out_ic.map(compare_fingerprint)).filter(ee.Filter.eq('changed', 1))
+
+    return(sorted(set(changed_fc.aggregate_array('date').getInfo())))
+
+
+def get_changed_dates_annual(in_ic_paths, out_path, in_fc_path = None, start_date = None, end_date = None, include_unfingerprinted = False):
+    """
+    :return: Client-side sorted list of dates whose source images changed since export, as .get_changed_dates() for
+             collections in 'annual' storage, where each year image holds the fingerprints of its dates in date order
+    """
+    year_ic = ee.ImageCollection(out_path).filter(ee.Filter.notNull(['dates']))
+    info = ee.Dictionary({'dates': year_ic.aggregate_array('dates').flatten(),
+                          'fingerprints': year_ic.aggregate_array('source_fingerprints').flatten()}).getInfo()
+    stored = dict(zip(info.get('dates'), info.get('fingerprints')))
+    if start_date is not None and end_date is not None:
+        start_millis = start_date.replace(tzinfo = datetime.timezone.utc).timestamp() * 1000
+        end_millis = end_date.replace(tzinfo = datetime.timezone.utc).timestamp() * 1000
+        stored = {date: fingerprint for date, fingerprint in stored.items() if start_millis <= date < end_millis}
+
+    # Read the current fingerprint of every date in one request and compare them here
+    dates = sorted(stored)
+    current = ee.List([eedb_cor.get_source_fingerprint(in_ic_paths = in_ic_paths, date = date, in_fc_path = in_fc_path) for date in dates]).getInfo()
+
+    return([date for date, fingerprint in zip(dates, current)
+            if (include_unfingerprinted if stored.get(date) is None else fingerprint != stored.get(date))])
+
+
+def rerun_changed_dates(in_ic_paths, out_path, properties, start_date = None, end_date = None, include_unfingerprinted = False):
+    '''
+    :param in_ic_paths: e.g. ['projects/rap-data-365417/assets/npp-partitioned-16day-v3']
+    :param out_path: e.g. path of the database Image Collection
+    :param properties: e.g. output of eeDatabase_coreMethods.get_run_properties()
+    :param start_date: e.g. datetime.datetime(2022, 1, 1), or None to check every date
+    :param end_date: e.g. datetime.datetime(2023, 1, 1), or None to check every date
+    :param include_unfingerprinted: e.g. True to also re-export images exported before fingerprints were recorded
+    :return: List of started export tasks, one per changed date, or one per year with changed dates in 'annual' storage,
+             raises ValueError when the collection holds another class schema than the dataset
+    '''
+    # Rewritten dates would carry class bands of the current bin schema into a collection of another
+    if properties.get('sink', 'image') == 'image':
+        eedb_cor.check_class_schema(out_path, properties, eedb_cor.get_stored_class_schema(out_path).getInfo() if 'class_schema' in properties else None)
+
+    changed_dates = get_changed_dates(in_ic_paths = in_ic_paths, out_path = out_path, in_fc_path = properties.get('in_fc_path'),
+                                      start_date = start_date, end_date = end_date, include_unfingerprinted = include_unfingerprinted,
+                                      storage = properties.get('storage', 'date'))
+    print("These dates have changed source images and will be re-exported ", changed_dates)
+
+    # Changed dates of a year are rewritten together so their exports do not replace each other
+    if properties.get('storage', 'date') == 'annual':
+        return(eedb_cor.run_image_exports(in_ic_paths = in_ic_paths, dates = changed_dates, out_path = out_path, properties = properties, overwrite = True))
+
+    tasks = []
+    for date in changed_dates:
+        print("Running ", datetime.datetime.fromtimestamp(date/1000.0))
+
+        # Set ID and date, matching the ID of the image being replaced
+        date_properties = eedb_cor.get_date_properties(properties, date)
+
+        tasks.append(eedb_cor.run_image_export(in_ic_paths = in_ic_paths, date = date, out_path = out_path, properties = date_properties, overwrite = True))
+
+    return(tasks)
@@ -0,0 +1,191 @@
+import argparse
+import datetime
+import os
+import ee
+import eeDatabase_coreMethods as eedb_cor
+import eeDatabase_collectionInfo as eedb_colinfo
+import eeDatabase_runJobs as eedb_run
+import eeDatabase_pathNames as eedb_path
+
+# Quantiles stored for each window, percentile ranks interpolate between them
+clim_quantiles = [5, 10, 25, 50, 75, 90, 95]
+
+def get_clim_path(out_path):
+    """
+    :param out_path: e.g. path of the database Image Collection
+    :return: Path of the Image Collection holding one climatology image per window
+    """
+    return(f'{out_path}-climatology')
+
+
+def get_window_days(in_ic_name):
+    """
+    :param in_ic_name: e.g. 'MOD11_LST'
+    :return: Days of year grouped into one climatology window, the 'cadence_days' of the dataset, e.g. 8
+    """
+    return(eedb_colinfo.in_ic_dict.get(in_ic_name).get('cadence_days'))
+
+
+def get_window_id(date, n_days):
+    """
+    :param date: e.g. millis since epoch of a database image
+    :param n_days: e.g. 16, days of year per window
+    :return: Window ID of the date, e.g. 'w000' for the first window of the year
+    """
+    day_of_year = datetime.datetime.fromtimestamp(date/1000.0).timetuple().tm_yday
+    return(f'w{(day_of_year - 1) // n_days:03d}')
+
+
+def get_clim_reducer(quantiles = clim_quantiles):
+    """
+    :param quantiles: e.g. [5, 25, 50, 75, 95]
+    :return: Earth Engine Reducer producing the mean, standard deviation, quantiles and count of every band
+    """
+    return(ee.Reducer.mean()\
+           .combine(reducer2 = ee.Reducer.stdDev(), sharedInputs = True)\
+           .combine(reducer2 = ee.Reducer.percentile(quantiles), sharedInputs = True)\
+           .combine(reducer2 = ee.Reducer.count(), sharedInputs = True))
+
+
+def get_clim_status(out_path):
+    """
+    :param out_path: e.g. path of the database Image Collection
+    :return: Dictionary with the stored 'dates' of the collection and the 'windows' already built, as {window_id: {'n_dates', 'last_date', 'window_days'}}
+    """
+    clim_path = get_clim_path(out_path)
+    queries = {'dates': eedb_cor.get_stored_dates(out_path).distinct()}
+    clim_exists = ee.data.getInfo(clim_path) is not None
+    if clim_exists:
+        clim_ic = ee.ImageCollection(clim_path)
+        queries.update({prop: clim_ic.aggregate_array(prop) for prop in ['system:index', 'n_dates', 'last_date', 'window_days']})
+
+    info = eedb_cor.get_info_batch(queries)
+    windows = {}
+    if clim_exists:
+        windows = {window_id: {'n_dates': n_dates, 'last_date': last_date, 'window_days': n_days}
+                   for window_id, n_dates, last_date, n_days in zip(info.get('system:index'), info.get('n_dates'), info.get('last_date'), info.get('window_days'))}
+
+    return({'dates': info.get('dates'), 'windows': windows})
+
+
+def get_stale_windows(dates, windows, n_days):
+    """
+    :param dates: e.g. stored dates of the database Image Collection
+    :param windows: e.g. 'windows' of .get_clim_status()
+    :param n_days: e.g. 16, days of year per window
+    :return: Dictionary of {window_id: dates in the window} for windows that are missing, built from fewer or older dates
+             or built with another window length
+    """
+    window_dates = {}
+    for date in dates:
+        window_dates.setdefault(get_window_id(date, n_days), []).append(date)
+
+    return({window_id: sorted(dates) for window_id, dates in window_dates.items()
+            if windows.get(window_id) != {'n_dates': len(dates), 'last_date': max(dates), 'window_days': n_days}})
+
+
+def build_window_img(out_path, window_id, dates, n_days, in_ic_name, quantiles = clim_quantiles, storage = 'date'):
+    """
+    :param out_path: e.g. path of the database Image Collection
+    :param window_id: e.g. 'w000'
+    :param dates: e.g. every stored date in the window
+    :param n_days: e.g. 16, days of year per window
+    :param in_ic_name: e.g. 'GridMET_Drought', selects the statistic bands of year images
+    :param quantiles: e.g. [5, 25, 50, 75, 95]
+    :param storage: e.g. 'date' for one image per date or 'annual' for one image per year
+    :return: Earth Engine Image with {band}_mean, {band}_stdDev, {band}_p{q} and {band}_count for every statistic stored
+             per feature, at the same equator pixels as the database images
+    """
+    window_ic = eedb_cor.get_stored_collection(out_path, dates, in_ic_name, storage = storage)
+
+    return(window_ic.reduce(get_clim_reducer(quantiles))\
+           .set({'window': window_id, 'window_days': n_days, 'n_dates': len(dates), 'last_date': max(dates), 'quantiles': quantiles}))
+
+
+def update_climatology(out_path, in_ic_name, quantiles = clim_quantiles, dry_run = False, storage = 'date'):
+    '''
+    :param out_path: e.g. path of the database Image Collection
+    :param in_ic_name: e.g. 'GridMET_Drought', selects the window length
+    :param quantiles: e.g. [5, 25, 50, 75, 95]
+    :param dry_run: e.g. True to report the stale windows without exporting
+    :param storage: e.g. 'date' for one image per date or 'annual' for one image per year
+    :return: Dictionary of {window_id: started export task, or None when dry_run}. Only windows that gained dates since they
+             were built are exported, so appending one date rebuilds one window.
+    '''
+    n_days = get_window_days(in_ic_name)
+    status = get_clim_status(out_path)
+    stale = get_stale_windows(status.get('dates'), status.get('windows'), n_days)
+    if dry_run or len(stale) == 0:
+        return({window_id: None for window_id in stale})
+
+    clim_path = get_clim_path(out_path)
+    if len(status.get('windows')) == 0:
+        os.system(f"earthengine create collection {clim_path}")
+
+    # Windows cover the same equator pixels as the ID image of the collection
+    out_region = ee.Image(f'{out_path}/0_id').geometry()
+
+    tasks = {}
+    for window_id, dates in stale.items():
+        tasks[window_id] = ee.batch.Export.image.toAsset(
+            image = build_window_img(out_path, window_id, dates, n_days, in_ic_name, quantiles, storage),
+            description = f"climatology - {out_path.split('/')[-1]} - {window_id}",
+            assetId = f'{clim_path}/{window_id}',
+            region = out_region,
+            scale = 22.264,
+            maxPixels = 1e13,
+            overwrite = True)
+        tasks[window_id].start()
+
+    return(tasks)
+
+
+def get_anomaly_img(out_path, in_ic_name, date, band = 'mean', quantiles = clim_quantiles, storage = 'date'):
+    """
+    :param out_path: e.g. path of the database Image Collection
+    :param in_ic_name: e.g. 'GridMET_Drought', selects the window length
+    :param date: e.g. millis since epoch of a stored date
+    :param band: e.g. 'mean' or 'p50' for continuous variables, or a class band for categorical ones
+    :param quantiles: e.g. quantiles the climatology was built with
+    :param storage: e.g. 'date' for one image per date or 'annual' for one image per year
+    :return: Earth Engine Image at the equator pixels with 'anomaly' (standard deviations from the window mean) and
+             'percentile_rank' (linear between the stored quantiles, clamped to the outer ones), one pixel lookup per feature
+    """
+    window_id = get_window_id(date, get_window_days(in_ic_name))
+    clim_i = ee.Image(f'{get_clim_path(out_path)}/{window_id}')
+    value_i = eedb_cor.get_stored_img(out_path, date, in_ic_name, storage = storage).select(band)
+
+    anomaly_i = value_i.subtract(clim_i.select(f'{band}_mean')).divide(clim_i.select(f'{band}_stdDev')).rename('anomaly')
+
+    # Start below the lowest quantile, then fill each interval between stored quantiles
+    rank_i = value_i.multiply(0).add(quantiles[0])
+    rank_i = rank_i.where(value_i.gte(clim_i.select(f'{band}_p{quantiles[-1]}')), quantiles[-1])
+    for q_lo, q_hi in zip(quantiles[:-1], quantiles[1:]):
+        v_lo = clim_i.select(f'{band}_p{q_lo}')
+        v_hi = clim_i.select(f'{band}_p{q_hi}')
+        frac_i = value_i.subtract(v_lo).divide(v_hi.subtract(v_lo).max(1e-9))
+        rank_i = rank_i.where(value_i.gte(v_lo).And(value_i.lt(v_hi)), frac_i.multiply(q_hi - q_lo).add(q_lo))
+
+    return(anomaly_i.addBands(rank_i.rename('percentile_rank')).set('system:time_start', date).set('window', window_id))
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'Build or update per-feature climatology windows for database Image Collections.')
+    parser.add_argument('--land-units', nargs = '+', default = 'all', help = 'land units to update, defaults to all')
+    parser.add_argument('--datasets', nargs = '+', default = 'all', help = 'datasets to update, defaults to all')
+    parser.add_argument('--storage', default = 'date', choices = ['date', 'annual'], help = 'storage of the database Image Collections')
+    parser.add_argument('--dry-run', action = 'store_true', help = 'report stale windows without exporting')
+    parser.add_argument('--project', default = 'dri-apps', help = 'Earth Engine cloud project')
+    args = parser.parse_args(argv)
+
+    ee.Initialize(project = args.project)
+    for in_fc_path, in_ic_name, var_name, sink_settings in eedb_run.expand_jobs({'storage': args.storage, 'jobs': [{'land_units': args.land_units, 'datasets': args.datasets}]}):
+        out_path = eedb_path.get_out_path(eedb_colinfo.land_unit_dict.get(in_fc_path).get('land_unit_short'), in_ic_name, var_name)
+        if ee.data.getInfo(out_path) is None:
+            continue
+        tasks = update_climatology(out_path, in_ic_name, dry_run = args.dry_run, storage = sink_settings.get('storage', 'date'))
+        print(f"{out_path}: {len(tasks)} windows {'stale' if args.dry_run else 'exported'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,58 +1,85 @@
-# Define input Image Collection variables using dataset dictionary
+# Define input Image Collection variables using dataset dictionary, 'cadence_days' is the number of days between the dates
+# exported for the dataset (366 for annual datasets)
 in_ic_dict = {'GridMET_Drought': {'in_ic_paths': ['GRIDMET/DROUGHT'],
                                   'var_names': ['Long_Term_Drought_Blend', 'Short_Term_Drought_Blend'],
                                   'var_type': 'Categorical',
-                                  'ic_mask': False},
+                                  'ic_mask': False,
+                                  'coverage_index': True,
+                                  'cadence_days': 5},
             'GridMET_Drought_Cont': {'in_ic_paths': ['GRIDMET/DROUGHT'],
                                   'var_names': ['Long_Term_Drought_Blend', 'Short_Term_Drought_Blend'],
                                   'var_type': 'Continuous',
-                                  'ic_mask': False},
+                                  'ic_mask': False,
+                                  'coverage_index': True,
+                                  'cadence_days': 5},
             'GridMET': {'in_ic_paths': ['IDAHO_EPSCOR/GRIDMET'],
                         'var_names': ['precip', 'tmmn', 'tmmx', 'eto', 'vpd', 'windspeed', 'srad'],
                         'var_type': 'Continuous',
-                        'ic_mask': False},
+                        'ic_mask': False,
+                        'coverage_index': True,
+                        'cadence_days': 5},
             'RAP_Cover': {'in_ic_paths': ['projects/rap-data-365417/assets/vegetation-cover-v3'],
                           'var_names': ['AFG', 'BGR', 'LTR', 'PFG', 'SHR', 'TRE'],
                           'var_type': 'Continuous',
-                          'ic_mask': True},
+                          'ic_mask': True,
+                          'coverage_index': True,
+                          'cadence_days': 366},
             'RAP_Production': {'in_ic_paths': ['projects/rap-data-365417/assets/npp-partitioned-v3'],
                                'var_names': ['afgAGB', 'pfgAGB', 'shrAGB', 'herbaceousAGB'],
                                'var_type': 'Continuous',
-                               'ic_mask': True},
+                               'ic_mask': True,
+                               'coverage_index': True,
+                               'cadence_days': 366},
             'RAP_16dProduction': {'in_ic_paths': ['projects/rap-data-365417/assets/npp-partitioned-16day-v3'],
                                   'var_names': ['afgAGB', 'pfgAGB', 'shrAGB', 'herbaceousAGB'],
                                   'var_type': 'Continuous',
-                                  'ic_mask': True},
+                                  'ic_mask': True,
+                                  'coverage_index': True,
+                                  'cadence_days': 16},
             'USDM': {'in_ic_paths': ['projects/climate-engine/usdm/weekly'],
                      'var_names': ['drought'],
                      'var_type': 'Categorical',
-                     'ic_mask': False},
+                     'ic_mask': False,
+                     'coverage_index': True,
+                     'cadence_days': 7},
             'MOD11_LST': {'in_ic_paths': ['MODIS/061/MOD11A2'],
                           'var_names': ['LST_Day_1km'],
                           'var_type': 'Continuous',
-                          'ic_mask': True},
+                          'ic_mask': True,
+                          'coverage_index': False,
+                          'cadence_days': 8},
             'Landsat': {'in_ic_paths': ['LANDSAT/LT05/C02/T1_L2', 'LANDSAT/LE07/C02/T1_L2', 'LANDSAT/LC08/C02/T1_L2', 'LANDSAT/LC09/C02/T1_L2'],
                         'var_names': ['NDVI'],
                         'var_type': 'Continuous',
-                        'ic_mask': True},
+                        'ic_mask': True,
+                        'coverage_index': False,
+                        'cadence_days': 16},
             'MOD16_ET': {'in_ic_paths': ['MODIS/006/MOD16A2'],
                          'var_names': ['ET', 'PET'],
                          'var_type': 'Continuous',
-                         'ic_mask': True},
+                         'ic_mask': True,
+                         'coverage_index': False,
+                         'cadence_days': 8},
             'MTBS': {'in_ic_paths': ['projects/climate-engine-pro/assets/mtbs_mosaics_annual'],
                      'var_names': ['Severity'],
                      'var_type': 'Categorical',
-                     'ic_mask': True},
+                     'ic_mask': True,
+                     'coverage_index': False,
+                     'cadence_days': 366},
             'VegDRI': {'in_ic_paths': ['projects/climate-engine-pro/assets/ce-veg-dri'],
                      'var_names': ['vegdri'],
                      'var_type': 'Categorical',
-                     'ic_mask': False},
+                     'ic_mask': False,
+                     'coverage_index': False,
+                     'cadence_days': 7},
             'VegDRI_Cont': {'in_ic_paths': ['projects/climate-engine-pro/assets/ce-veg-dri'],
                      'var_names': ['vegdri'],
                      'var_type': 'Continuous',
-                     'ic_mask': False}}
+                     'ic_mask': False,
+                     'coverage_index': False,
+                     'cadence_days': 7}}
 
-# Define properties for variables in dictionary
+# Define properties for variables in dictionary, 'range' bounds variables with known limits for approximate percentiles
 var_dict = {'Long_Term_Drought_Blend': {'units': 'drought'},
             'Short_Term_Drought_Blend': {'units': 'drought'},
             'precip': {'units': 'mm'},
@@ -62,20 +89,103 @@ var_dict = {'Long_Term_Drought_Blend': {'units': 'drought'},
             'vpd': {'units': 'kPa'},
             'windspeed': {'units': 'm/s'},
             'srad': {'units': 'W/m^2'},
-            'AFG': {'units': '% cover'},
-            'BGR': {'units': '% cover'},
-            'LTR': {'units': '% cover'},
-            'PFG': {'units': '% cover'},
-            'SHR': {'units': '% cover'},
-            'TRE': {'units': '% cover'},
+            'AFG': {'units': '% cover', 'range': [0, 100]},
+            'BGR': {'units': '% cover', 'range': [0, 100]},
+            'LTR': {'units': '% cover', 'range': [0, 100]},
+            'PFG': {'units': '% cover', 'range': [0, 100]},
+            'SHR': {'units': '% cover', 'range': [0, 100]},
+            'TRE': {'units': '% cover', 'range': [0, 100]},
             'afgAGB': {'units': 'lbs/acre'},
             'pfgAGB': {'units': 'lbs/acre'},
             'shrAGB': {'units': 'lbs/acre'},
             'herbaceousAGB': {'units': 'lbs/acre'},
             'drought': {'units': 'drought'},
             'LST_Day_1km': {'units': 'degrees C'},
-            'NDVI': {'units': 'unitless'},
+            'NDVI': {'units': 'unitless', 'range': [-1, 1]},
             'ET': {'units': 'mm'},
             'PET': {'units': 'mm'},
             'Severity': {'units': 'fire severity'},
-            'vegdri': {'units': 'drought'}}
\ No newline at end of file
+            'vegdri': {'units': 'drought'}}
+
+# Define land unit variables using input Feature Collection dictionary
+# For BLM, we apply the ownership mask to field offices, district offices, and state offices, but not to allotments
+land_unit_dict = {'projects/dri-apps/assets/blm-admin/blm-natl-grazing-allotment-polygons': {'land_unit_long': 'BLM_Natl_Grazing_Allotment_Polygons',
+                                                                                            'land_unit_short': 'BLM_Allotments',
+                                                                                            'in_fc_id': 'ALLOT_ID',
+                                                                                            'tile_scale': 1,
+                                                                                            'fc_mask': False},
+                  'projects/dri-apps/assets/blm-admin/blm-natl-admu-fieldoffice-polygons': {'land_unit_long': 'BLM_Natl_FieldOffice_Polygons',
+                                                                                           'land_unit_short': 'BLM_FieldOffices',
+                                                                                           'in_fc_id': 'FO_ID',
+                                                                                           'tile_scale': 1,
+                                                                                           'fc_mask': True},
+                  'projects/dri-apps/assets/blm-admin/blm-natl-admu-districtoffice-polygons': {'land_unit_long': 'BLM_Natl_DistrictOffice_Polygons',
+                                                                                              'land_unit_short': 'BLM_DistrictOffices',
+                                                                                              'in_fc_id': 'DO_ID',
+                                                                                              'tile_scale': 1,
+                                                                                              'fc_mask': True},
+                  'projects/dri-apps/assets/blm-admin/blm-natl-admu-stateoffice-polygons': {'land_unit_long': 'BLM_Natl_StateOffice_Polygons',
+                                                                                           'land_unit_short': 'BLM_StateOffices',
+                                                                                           'in_fc_id': 'SO_ID',
+                                                                                           'tile_scale': 1,
+                                                                                           'fc_mask': True}}
+
+# Define histogram bins of categorical datasets, pixel values become classes c0, c1, ... by counting the 'breaks' each value
+# reaches or by subtracting the value of the first class ('min') when values are already classes
+# GridMET drought blends:
+# <-4.0 (D4) = c0
+# -4.0--3.0 (D3) = c1
+# -3.0--2.0 (D2) = c2
+# -2.0--1.0 (D1) = c3
+# -1.0-2.0 (Neutral) = c4
+# 2.0-3.0 (W0) = c5
+# 3.0-4.0 (W1) = c6
+# >4.0 (W4) = c7
+# VegDRI:
+# <-2.0 (D4) = c0
+# -2.0--1.5 (D3) = c1
+# -1.5--1.2 (D2) = c2
+# -1.2--0.7 (D1) = c3
+# -0.7--0.5 (D0) = c4
+# -0.5-0.5 (Neutral) = c5
+# 0.5-0.7 (W0) = c6
+# 0.7-1.2 (W1) = c7
+# 1.2-1.5 (W2) = c8
+# 1.5-2.0 (W3) = c9
+# >2.0 (W4) = c10
+# USDM:
+# -1 Neutral or Wet = c0
+# 0 Abnormal Dry (D0) = c1
+# 1 Moderate Drought (D1) = c2
+# 2 Severe Drought (D2) = c3
+# 3 Extreme Drought (D3) = c4
+# 4 Exceptional Drought (D4) = c5
+# MTBS:
+# 0 Background = c0
+# 1 Unburned to low severity = c1
+# 2 Low severity = c2
+# 3 Moderate severity = c3
+# 4 High severity = c4
+# 5 Increased greenness = c5
+# 6 Non-mapping area = c6
+# The 'schema' of a dataset is stamped on its categorical collections as 'class_schema' and must be raised whenever its classes
+# change, collections written before it was stamped hold schema 1 (11 GridMET drought, 8 VegDRI and USDM D0-D4 classes)
+bin_dict = {'GridMET_Drought': {'breaks': [-4.0, -3.0, -2.0, -1.0, 2.0, 3.0, 4.0], 'schema': 2},
+            'VegDRI': {'breaks': [-2.0, -1.5, -1.2, -0.7, -0.5, 0.5, 0.7, 1.2, 1.5, 2.0], 'schema': 2},
+            'USDM': {'min': -1, 'n_classes': 6, 'schema': 2},
+            'MTBS': {'min': 0, 'n_classes': 7, 'schema': 1}}
+
+# Define binary ownership mask applied to land units with fc_mask
+mask_path = 'projects/dri-apps/assets/blm-admin/blm-natl-admu-sma-binary'
+
+# Define folder holding the fraction of each dataset pixel covered by the ownership mask, one image per dataset resolution
+mask_frac_root = 'projects/dri-apps/assets/blm-admin/blm-natl-admu-sma-fraction'
+
+# Define minimum mask fraction for a dataset pixel to be kept, or 'None' to weight pixels by their fraction
+mask_frac_threshold = 'None'
+
+# Define folder holding the database Image Collections
+database_root = 'projects/climate-engine-pro/assets/blm-database'
+
+# Define suffixes of the staging, climatology and layout assets stored beside each database Image Collection
+derived_suffixes = ['-shards', '-shared', '-climatology', '-layout']
\ No newline at end of file
@@ -1,76 +1,329 @@
 import ee
 import os
+import datetime
+import concurrent.futures
 import eeDatabase_collectionMethods as eedb_col
+import eeDatabase_collectionInfo as eedb_colinfo
+import eeDatabase_pathNames as eedb_path
+import eeDatabase_statNames as eedb_stat
 
-def get_collection_dates(in_ic_paths, start_date, end_date):
+# Buckets spanning the range of a variable in 'histogram' percentile mode, and the factor applied to the resolution in 'scale' mode
+percentile_bins = 1000
+percentile_scale_factor = 4
+
+
+def get_in_ic_res(in_ic_name):
+    """
+    :param in_ic_name: e.g. 'GridMET_Drought'
+    :return: Earth Engine Number of the rounded nominal resolution of the dataset in meters
+    """
+    in_ic_paths = eedb_colinfo.in_ic_dict.get(in_ic_name).get('in_ic_paths')
+    return(ee.Number(ee.ImageCollection(in_ic_paths[0]).first().projection().nominalScale()).round())
+
+
+def get_run_properties(in_fc_path, in_ic_name, var_name, in_ic_res):
+    """
+    :param in_fc_path: e.g. path to input feature collection, a key of land_unit_dict
+    :param in_ic_name: e.g. 'GridMET_Drought'
+    :param var_name: e.g. 'Long_Term_Drought_Blend'
+    :param in_ic_res: e.g. client-side value of .get_in_ic_res()
+    :return: Dictionary of properties shared by every image in the database Image Collection
+    """
+    land_unit = eedb_colinfo.land_unit_dict.get(in_fc_path)
+    in_ic = eedb_colinfo.in_ic_dict.get(in_ic_name)
+
+    properties = {'land_unit_long': land_unit.get('land_unit_long'), 'land_unit_short': land_unit.get('land_unit_short'), 'in_fc_path': in_fc_path,
+                  'in_fc_id': land_unit.get('in_fc_id'), 'in_ic_path': in_ic.get('in_ic_paths')[0], 'in_ic_name': in_ic_name, 'in_ic_res': in_ic_res,
+                  'var_type': in_ic.get('var_type'), 'var_name': var_name, 'var_units': eedb_colinfo.var_dict.get(var_name).get('units'),
+                  'tile_scale': land_unit.get('tile_scale')}
+
+    # Apply mask for remote sensing datasets on larger boundaries
+    if land_unit.get('fc_mask') == True and in_ic.get('ic_mask') == True:
+        properties['mask_path'] = eedb_colinfo.mask_path
+    else:
+        properties['mask_path'] = 'None'
+
+    # Class bands of categorical datasets follow the bin schema, so appends can be checked against the stored version
+    if in_ic.get('var_type') == 'Categorical':
+        properties['class_schema'] = get_class_schema(in_ic_name)
+
+    return(properties)
+
+
+def get_date_properties(properties, date):
+    """
+    :param properties: e.g. output of .get_run_properties()
+    :param date: e.g. millis since epoch for initial image that output represents
+    :return: Copy of properties with the image ID and date set for the date
+    """
+    date_properties = dict(properties)
+    date_properties['system:index'] = get_date_id(date)
+    date_properties['system:time_start'] = date
+
+    return(date_properties)
+
+
+def get_date_id(date):
+    """
+    :param date: e.g. millis since epoch for initial image that output represents
+    :return: ID of the output for the date, e.g. '20220101'
+    """
+    # Parse date for ID
+    return(datetime.datetime.fromtimestamp(date/1000.0).strftime('%Y%m%d'))
+
+
+def get_year_id(date):
+    """
+    :param date: e.g. millis since epoch for initial image that output represents
+    :return: ID of the year image holding the date in 'annual' storage, e.g. '2022'
+    """
+    return(datetime.datetime.fromtimestamp(date/1000.0).strftime('%Y'))
+
+
+def get_year_properties(properties, dates):
+    """
+    :param properties: e.g. output of .get_run_properties() or .get_date_properties()
+    :param dates: e.g. every date the year image holds, all in the same year
+    :return: Copy of properties with the year ID, January 1 as the date and the sorted 'dates' index set
+    """
+    year_id = get_year_id(dates[0])
+    year_properties = dict(properties)
+    year_properties['system:index'] = year_id
+    year_properties['system:time_start'] = int(datetime.datetime(int(year_id), 1, 1, tzinfo = datetime.timezone.utc).timestamp() * 1000)
+    year_properties['dates'] = sorted(dates)
+
+    return(year_properties)
+
+
+def group_dates_by_year(dates):
+    """
+    :param dates: e.g. list of millis since epoch, such as the dates missing from the collection
+    :return: Dictionary of {year_id: sorted dates in the year}
+    """
+    years = {}
+    for date in sorted(dates):
+        years.setdefault(get_year_id(date), []).append(date)
+
+    return(years)
+
+
+def get_stored_ids(out_path, properties):
+    """
+    :param out_path: e.g. path of the database Image Collection, table folder, or the name used for the local directory
+    :param properties: e.g. output of .get_run_properties()
+    :return: Client-side list of output IDs (e.g. '20220101') already written by the selected sink, or None if the output does not exist
+    """
+    sink = properties.get('sink', 'image')
+
+    if sink == 'local':
+        out_dir = eedb_path.get_local_dir(out_path, properties)
+        if not os.path.isdir(out_dir):
+            return(None)
+        return([os.path.splitext(f)[0] for f in os.listdir(out_dir)])
+
+    if ee.data.getInfo(out_path) is None:
+        return(None)
+
+    if sink == 'table':
+        return([asset_id.split('/')[-1] for asset_id in list_assets(out_path)])
+
+    # Year images list their dates in the 'dates' index instead of holding one image per ID
+    if properties.get('storage', 'date') == 'annual':
+        return([get_date_id(date) for date in get_stored_dates(out_path).getInfo()])
+
+    return(ee.ImageCollection(out_path).aggregate_array('system:index').getInfo())
+
+
+def list_assets(parent):
+    """
+    :param parent: e.g. folder or Image Collection path
+    :return: Dictionary of {asset path: asset type} for every asset directly under the parent, empty if the parent does not exist
+    """
+    assets = {}
+    params = {'parent': parent}
+    while True:
+        try:
+            response = ee.data.listAssets(params)
+        except ee.EEException:
+            return(assets)
+        assets.update({asset.get('id'): asset.get('type') for asset in response.get('assets', [])})
+        if not response.get('nextPageToken'):
+            return(assets)
+        params['pageToken'] = response.get('nextPageToken')
+
+
+def list_active_tasks():
+    """
+    :return: Set of the descriptions of export tasks that are waiting or running, see .get_export_description()
+    """
+    return(set(task.get('description') for task in ee.data.getTaskList() if task.get('state') in ['READY', 'RUNNING']))
+
+
+def get_info_batch(queries, batch_size = 100, max_workers = 8):
+    """
+    :param queries: e.g. {('in_ic_res', 'GridMET'): get_in_ic_res('GridMET'), out_path: ee.ImageCollection(out_path).aggregate_array('system:time_start')}
+    :param batch_size: e.g. number of queries resolved in one request
+    :param max_workers: e.g. number of batches requested concurrently
+    :return: Dictionary of {key: client-side result} with the same keys as queries
+    """
+    # Combine many small queries into one list per request, results come back in the same order
+    keys = list(queries.keys())
+    def read_batch(batch):
+        return(ee.List([queries.get(key) for key in batch]).getInfo())
+
+    batches = [keys[i:i + batch_size] for i in range(0, len(keys), batch_size)]
+    results = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers = max(min(max_workers, len(batches)), 1)) as executor:
+        for batch, values in zip(batches, executor.map(read_batch, batches)):
+            results.update(zip(batch, values))
+
+    return(results)
+
+
+def get_date_collection(in_ic_paths, start_date, end_date):
     """
     :param in_ic_paths: e.g. ['GRIDMET/DROUGHT'] or ['projects/rangeland-analysis-platform/vegetation-cover-v3']
     :param start_date: e.g. datetime.datetime(2022, 1, 1)
     :param end_date: e.g. datetime.datetime(2022, 5, 1)
-    :return: Client-side list of system:time_start dates (milliseconds since epoch)
+    :return: Earth Engine Image Collection whose system:time_start values are the dates to export
     """
     if in_ic_paths == ['GRIDMET/DROUGHT']:
         
-        # Read-in gridmet drought image collection, filter dates, and return client-side list of dates
+        # Read-in gridmet drought image collection, filter dates, and return collection
         in_ic = ee.ImageCollection(in_ic_paths[0]).filterDate(start_date, end_date)
-        return(in_ic.aggregate_array('system:time_start').getInfo())
+        return(in_ic)
         
     elif in_ic_paths == ['IDAHO_EPSCOR/GRIDMET']:
         
-        # Read-in gridmet drought image collection (temporal cadence of gridmet is matched to gridmet drought), filter dates, and return client-side list of dates
+        # Read-in gridmet drought image collection (temporal cadence of gridmet is matched to gridmet drought), filter dates, and return collection
         in_ic = ee.ImageCollection('GRIDMET/DROUGHT').filterDate(start_date, end_date)
-        return(in_ic.aggregate_array('system:time_start').getInfo())
+        return(in_ic)
     
     elif in_ic_paths == ['projects/rap-data-365417/assets/vegetation-cover-v3'] or in_ic_paths == ['projects/rap-data-365417/assets/npp-partitioned-v3'] or in_ic_paths == ['projects/rap-data-365417/assets/npp-partitioned-16day-v3']:
         
         if in_ic_paths == ['projects/rap-data-365417/assets/vegetation-cover-v3'] or in_ic_paths == ['projects/rap-data-365417/assets/npp-partitioned-v3']:
             
-            # Read-in RAP Cover or Production image collection, filter dates, and return client-side list of dates
+            # Read-in RAP Cover or Production image collection, filter dates, and return collection
             in_ic = ee.ImageCollection(in_ic_paths[0]).filterDate(start_date, end_date)
-            return(in_ic.aggregate_array('system:time_start').getInfo())
+            return(in_ic)
         
         elif in_ic_paths == ['projects/rap-data-365417/assets/npp-partitioned-16day-v3']:
 
-            # Read in RAP 16-day Production image collection, filter dates, and return client-side list of dates
+            # Read in RAP 16-day Production image collection, filter dates, and return collection
             in_ic = ee.ImageCollection(in_ic_paths[0]).merge(ee.ImageCollection('projects/rap-data-365417/assets/npp-partitioned-16day-v3-provisional')).filterDate(start_date, end_date)
-            return(in_ic.aggregate_array('system:time_start').getInfo())
+            return(in_ic)
 
     elif in_ic_paths == ['projects/climate-engine/usdm/weekly']:
             
-        # Read-in USDM image collection, filter dates, and return client-side list of dates
+        # Read-in USDM image collection, filter dates, and return collection
         in_ic = ee.ImageCollection(in_ic_paths[0]).filterDate(start_date, end_date).filter(ee.Filter.eq('region', 'conus'))
-        return(in_ic.aggregate_array('system:time_start').getInfo())
+        return(in_ic)
     
     elif in_ic_paths == ['MODIS/061/MOD11A2']:
         
-        # Read-in MODIS LST image collection, filter dates, and return client-side list of dates
+        # Read-in MODIS LST image collection, filter dates, and return collection
         in_ic = ee.ImageCollection(in_ic_paths[0]).filterDate(start_date, end_date)
-        return(in_ic.aggregate_array('system:time_start').getInfo())
+        return(in_ic)
     
     elif in_ic_paths == ['LANDSAT/LT05/C02/T1_L2', 'LANDSAT/LE07/C02/T1_L2', 'LANDSAT/LC08/C02/T1_L2', 'LANDSAT/LC09/C02/T1_L2']:
         
-        # Read-in RAP 16-day Production image collection (to match temporal cadence to), filter dates, and return client-side list of dates
+        # Read-in RAP 16-day Production image collection (to match temporal cadence to), filter dates, and return collection
         # Get RAP dates to match temporal cadence to
         in_ic = ee.ImageCollection("projects/rap-data-365417/assets/npp-partitioned-16day-v3").merge(ee.ImageCollection('projects/rap-data-365417/assets/npp-partitioned-16day-v3-provisional')).filterDate(start_date, end_date)
-        return(in_ic.aggregate_array('system:time_start').getInfo())   
+        return(in_ic)
         
     elif in_ic_paths == ['MODIS/006/MOD16A2']:
     
-        # Read-in MODIS ET image collection, filter dates, and return client-side list of dates
+        # Read-in MODIS ET image collection, filter dates, and return collection
         in_ic = ee.ImageCollection(in_ic_paths[0]).filterDate(start_date, end_date)
-        return(in_ic.aggregate_array('system:time_start').getInfo())
+        return(in_ic)
     
     elif in_ic_paths == ['projects/climate-engine-pro/assets/mtbs_mosaics_annual']:
 
-        # Read-in MTBS image collection, filter dates, and return client-side list of dates
+        # Read-in MTBS image collection, filter dates, and return collection
         in_ic = ee.ImageCollection(in_ic_paths[0]).filterDate(start_date, end_date)
-        return(in_ic.aggregate_array('system:time_start').getInfo())
+        return(in_ic)
     
     elif in_ic_paths == ['projects/climate-engine-pro/assets/ce-veg-dri']:
 
-        # Read-in VegDRI image collection, filter dates, and return client-side list of dates
+        # Read-in VegDRI image collection, filter dates, and return collection
         in_ic = ee.ImageCollection(in_ic_paths[0]).filterDate(start_date, end_date)
-        return(in_ic.aggregate_array('system:time_start').getInfo())
+        return(in_ic)
+
+
+def get_collection_dates(in_ic_paths, start_date, end_date):
+    """
+    :param in_ic_paths: e.g. ['GRIDMET/DROUGHT'] or ['projects/rangeland-analysis-platform/vegetation-cover-v3']
+    :param start_date: e.g. datetime.datetime(2022, 1, 1)
+    :param end_date: e.g. datetime.datetime(2022, 5, 1)
+    :return: Client-side list of system:time_start dates (milliseconds since epoch)
+    """
+    return(get_date_collection(in_ic_paths = in_ic_paths, start_date = start_date, end_date = end_date).aggregate_array('system:time_start').getInfo())
+
+
+def get_source_collection(in_ic_paths, date, in_fc_path = None):
+    """
+    :param in_ic_paths: e.g. ['GRIDMET/DROUGHT'] or ['projects/rangeland-analysis-platform/vegetation-cover-v3']
+    :param date: e.g. system:time_start in milliseconds since Unix epoch, client-side or server-side
+    :param in_fc_path: e.g. path to input feature collection, used to limit Landsat scenes to the land units
+    :return: Earth Engine Image Collection of the source images that go into the output image for the date
+    """
+    date = ee.Date(date)
+    rap_16day_path = 'projects/rap-data-365417/assets/npp-partitioned-16day-v3'
+    mat_ic = ee.ImageCollection('projects/rap-data-365417/assets/gridmet-MAT').filterDate(date.format('YYYY'))
+
+    if in_ic_paths == ['IDAHO_EPSCOR/GRIDMET']:
+
+        # GridMET is aggregated over the five days before each GridMET drought date
+        return(ee.ImageCollection(in_ic_paths[0]).filterDate(date.advance(-5, 'day'), date)\
+               .merge(ee.ImageCollection('GRIDMET/DROUGHT').filter(ee.Filter.eq('system:time_start', date.millis()))))
+
+    elif in_ic_paths == ['projects/rap-data-365417/assets/npp-partitioned-v3']:
+
+        # Annual production also depends on the mean annual temperature used for partitioning
+        return(ee.ImageCollection(in_ic_paths[0]).filter(ee.Filter.eq('system:time_start', date.millis())).merge(mat_ic))
+
+    elif in_ic_paths == [rap_16day_path]:
+
+        # 16-day production merges provisional images that are later replaced by final ones
+        return(ee.ImageCollection(in_ic_paths[0]).merge(ee.ImageCollection(f'{rap_16day_path}-provisional'))\
+               .filter(ee.Filter.eq('system:time_start', date.millis())).merge(mat_ic))
+
+    elif in_ic_paths == ['projects/climate-engine/usdm/weekly']:
+
+        return(ee.ImageCollection(in_ic_paths[0]).filter(ee.Filter.eq('system:time_start', date.millis())).filter(ee.Filter.eq('region', 'conus')))
+
+    elif in_ic_paths == ['LANDSAT/LT05/C02/T1_L2', 'LANDSAT/LE07/C02/T1_L2', 'LANDSAT/LC08/C02/T1_L2', 'LANDSAT/LC09/C02/T1_L2']:
+
+        # Landsat composites use every scene over the land units in the 16 days after the RAP date
+        collection = ee.ImageCollection(rap_16day_path).merge(ee.ImageCollection(f'{rap_16day_path}-provisional'))\
+            .filter(ee.Filter.eq('system:time_start', date.millis()))
+        for in_ic_path in in_ic_paths:
+            ls_ic = ee.ImageCollection(in_ic_path).filterDate(date, date.advance(16, 'day'))
+            if in_fc_path is not None:
+                ls_ic = ls_ic.filterBounds(ee.FeatureCollection(in_fc_path).geometry(1000).bounds(1000))
+            collection = collection.merge(ls_ic)
+        return(collection)
+
+    else:
+
+        # Remaining datasets have one source image per output date
+        return(ee.ImageCollection(in_ic_paths[0]).filter(ee.Filter.eq('system:time_start', date.millis())))
+
+
+def get_source_fingerprint(in_ic_paths, date, in_fc_path = None):
+    """
+    :param in_ic_paths: e.g. ['GRIDMET/DROUGHT'] or ['projects/rangeland-analysis-platform/vegetation-cover-v3']
+    :param date: e.g. system:time_start in milliseconds since Unix epoch, client-side or server-side
+    :param in_fc_path: e.g. path to input feature collection, used to limit Landsat scenes to the land units
+    :return: Earth Engine String of the source image count and latest source version, e.g. '2:1712345678901234'
+    """
+    # system:version is the ingestion time in microseconds, so any added, removed or replaced
+    # source image changes either the count or the latest version
+    source_ic = get_source_collection(in_ic_paths = in_ic_paths, date = date, in_fc_path = in_fc_path)
+    latest_version = ee.Algorithms.If(source_ic.size().gt(0), ee.Number(source_ic.aggregate_max('system:version')).toInt64().format(), 'none')
+
+    return(ee.String(source_ic.size().format()).cat(':').cat(latest_version))
 
 
 def generate_id_img(in_fc_path, in_fc_id):
@@ -122,33 +375,70 @@ def generate_id_img(in_fc_path, in_fc_id):
     return(ee.List([id_i, out_fc]))
 
 
-def img_to_pts_continuous(in_i, in_fc, tile_scale):
+def add_equator_index(in_fc, index_property = 'eq_index'):
     """
-    :param in_i: e.g. Image for single date
     :param in_fc: e.g. ee.FeatureCollection(in_fc_path)
-    :return: Earth Engine image of pixels at the equator with bands for percentiles and mean
+    :param index_property: e.g. name of property to store the equator position in
+    :return: Earth Engine Feature Collection with the list position of each feature stored as a property
     """
-    # Cast input image to ee.Image
-    img = ee.Image(in_i)
-    
-    # Get resolution of the image
-    res = img.select(0).projection().nominalScale()
+    # Convert feature collection to list
+    in_fc_list = in_fc.toList(in_fc.size())
 
-    # Conditionally convert polygon to point if smaller than area of pixel
-    def smallpolygons_to_points(f):
-        
+    # Function to set the list position of each feature, matching the order used by generate_id_img()
+    def set_index(i):
+        i = ee.Number(i)
+        return(ee.Feature(in_fc_list.get(i)).set(index_property, i))
+
+    return(ee.FeatureCollection(ee.List.sequence(0, in_fc_list.size().subtract(1), 1).map(set_index)))
+
+
+def join_layout_index(in_fc, in_fc_id, layout_fc, index_property = 'eq_index'):
+    """
+    :param in_fc: e.g. ee.FeatureCollection(in_fc_path)
+    :param in_fc_id: e.g. field from input feature collection to use as ID
+    :param layout_fc: e.g. ee.FeatureCollection(layout_path) written by eeDatabase_layoutMethods.export_layout()
+    :param index_property: e.g. name of property to store the equator position in
+    :return: Earth Engine Feature Collection with the layout slot of each active feature stored as a property
+    """
+    # Match features to their slot by ID, features without an active slot are dropped
+    join = ee.Join.saveFirst(matchKey = 'layout')
+    join_filter = ee.Filter.equals(leftField = in_fc_id, rightField = 'fc_id')
+    joined_fc = join.apply(in_fc, layout_fc.filter(ee.Filter.eq('retired', 0)), join_filter)
+
+    # Function to copy the slot onto the feature
+    def set_slot(f):
         f = ee.Feature(f)
-        f = ee.Feature(ee.Algorithms.If(f.area(100).gte(res.pow(2).multiply(2)), f, f.centroid()))
-        return(f)
-    
-    in_fc = in_fc.map(smallpolygons_to_points)
-    
-    # Run reduce regions for allotments and select only the columns with reducers
-    img_rr = img.reduceRegions(collection = in_fc, reducer = ee.Reducer.percentile([5, 25, 50, 75, 95])\
-                                .combine(reducer2 = ee.Reducer.mean(), sharedInputs = True),\
-                                scale = res,\
-                                tileScale = tile_scale).select(['mean', 'p.*'])
-    
+        return(f.set(index_property, ee.Feature(f.get('layout')).get('slot')))
+
+    return(ee.FeatureCollection(joined_fc).map(set_slot))
+
+
+def index_properties(index_property):
+    """
+    :param index_property: e.g. 'eq_index' or None
+    :return: List of properties to carry through reduceRegions alongside the statistics
+    """
+    if index_property is None:
+        return([])
+    return([index_property])
+
+
+def rr_to_equator(img_rr, index_property = None):
+    """
+    :param img_rr: e.g. Feature Collection returned from reduceRegions with statistics as properties
+    :param index_property: e.g. 'eq_index' to place features at fixed equator positions, or None to use list order
+    :return: Earth Engine Feature Collection of points at the equator with properties for statistics
+    """
+    if index_property is not None:
+
+        # Function to create point next to equator at the stored position of the feature
+        def pts_to_equator_idx(f):
+            f = ee.Feature(f)
+            geom = ee.Geometry.Point([ee.Number(f.get(index_property)).multiply(0.0002), 0.0002])
+            return(ee.Feature(geom, f.toDictionary().remove([index_property])))
+
+        return(img_rr.map(pts_to_equator_idx))
+
     # Get list of RR features
     img_rr_list = img_rr.toList(img_rr.size())
     
@@ -176,6 +466,170 @@ def img_to_pts_continuous(in_i, in_fc, tile_scale):
     return(equator_fc)
 
 
+def equator_region(n_features):
+    """
+    :param n_features: e.g. number of positions in the equator layout, client-side or ee.Number
+    :return: Earth Engine Geometry covering every equator position, for exporting merged images
+    """
+    # Client-side counts give constant coordinates instead of a server-side expression
+    if isinstance(n_features, int):
+        x_max = max(n_features - 1, 1) * 0.0002
+    else:
+        x_max = ee.Number(n_features).subtract(1).max(1).multiply(0.0002)
+    return(ee.Geometry.LineString([[0, 0.0002], [x_max, 0.0002]]).buffer(20))
+
+
+def small_polygons_to_points(in_fc, res):
+    """
+    :param in_fc: e.g. ee.FeatureCollection(in_fc_path)
+    :param res: e.g. nominal resolution of the image being reduced in meters, client-side or ee.Number
+    :return: Earth Engine Feature Collection with polygons smaller than two pixels replaced by their centroids
+    """
+    res = ee.Number(res)
+
+    # Conditionally convert polygon to point if smaller than area of pixel
+    def smallpolygons_to_points(f):
+        
+        f = ee.Feature(f)
+        f = ee.Feature(ee.Algorithms.If(f.area(100).gte(res.pow(2).multiply(2)), f, f.centroid()))
+        return(f)
+    
+    return(in_fc.map(smallpolygons_to_points))
+
+
+def get_percentile_settings(properties):
+    """
+    :param properties: e.g. output of .get_run_properties() with 'percentile_mode' set to 'exact', 'histogram', 'scale' or
+                       'approx' (a histogram when the variable has a 'range' in var_dict, otherwise a coarser scale), and
+                       optionally 'percentile_bins' or 'percentile_scale_factor'
+    :return: Dictionary of properties recording how approximate percentiles are computed, with 'percentile_error' the
+             largest error in variable units of a histogram mode percentile whose value lies inside 'percentile_range'
+             (values outside it are counted in the first or last bucket, so the error of percentiles there is not bounded,
+             nor is that of the coarser scale), or an empty dictionary for exact percentiles and categorical variables
+    """
+    mode = properties.get('percentile_mode', 'exact')
+    if properties.get('var_type') != 'Continuous' or mode == 'exact':
+        return({})
+
+    value_range = eedb_colinfo.var_dict.get(properties.get('var_name')).get('range')
+    if mode == 'approx':
+        mode = 'histogram' if value_range is not None else 'scale'
+
+    if mode == 'histogram':
+        if value_range is None:
+            raise ValueError(f"{properties.get('var_name')} has no 'range' in var_dict for histogram percentiles")
+        bins = properties.get('percentile_bins', percentile_bins)
+        return({'percentile_mode': 'histogram', 'percentile_bins': bins, 'percentile_range': value_range,
+                'percentile_error': (value_range[1] - value_range[0]) / bins})
+
+    # Coarser scales read pixel means from the pyramid, so percentiles describe those means rather than native pixels
+    return({'percentile_mode': 'scale', 'percentile_scale_factor': properties.get('percentile_scale_factor', percentile_scale_factor)})
+
+
+def get_continuous_input(img, percentile_settings = {}):
+    """
+    :param img: e.g. Image for single date
+    :param percentile_settings: e.g. output of .get_percentile_settings()
+    :return: Earth Engine Image read by .get_continuous_reducer(), with the fixed-width bucket of each pixel over the variable
+             range added in 'histogram' mode, where values outside the range fall in the first or last bucket
+    """
+    if percentile_settings.get('percentile_mode') != 'histogram':
+        return(img)
+
+    value_range = percentile_settings.get('percentile_range')
+    bins = percentile_settings.get('percentile_bins')
+    bucket_i = img.select(0).subtract(value_range[0]).divide((value_range[1] - value_range[0]) / bins).floor().clamp(0, bins - 1)
+    return(img.select([0], ['value']).addBands(bucket_i.toInt().rename('bucket')))
+
+
+def get_continuous_reducer(percentile_settings = {}):
+    """
+    :param percentile_settings: e.g. output of .get_percentile_settings()
+    :return: Earth Engine Reducer of the mean and stored percentiles of .get_continuous_input(), where 'histogram' mode counts
+             pixels per bucket with a fixedHistogram instead, see .buckets_to_percentiles()
+    """
+    if percentile_settings.get('percentile_mode') == 'histogram':
+        bins = percentile_settings.get('percentile_bins')
+        return(ee.Reducer.mean().combine(reducer2 = ee.Reducer.fixedHistogram(0, bins, bins), outputPrefix = 'bucket_', sharedInputs = False))
+
+    return(ee.Reducer.percentile(eedb_stat.stat_percentiles).combine(reducer2 = ee.Reducer.mean(), sharedInputs = True))
+
+
+def buckets_to_percentiles(img_rr, percentile_settings = {}):
+    """
+    :param img_rr: e.g. Feature Collection returned from reduceRegions with .get_continuous_reducer()
+    :param percentile_settings: e.g. output of .get_percentile_settings()
+    :return: Earth Engine Feature Collection with the percentiles set at the middle of the bucket holding them in 'histogram'
+             mode, so each is within one bucket width of the value at its rank when that value lies inside the range, and
+             at the middle of the first or last bucket when it lies outside, null for features without pixels
+    """
+    if percentile_settings.get('percentile_mode') != 'histogram':
+        return(img_rr)
+
+    value_range = percentile_settings.get('percentile_range')
+    bins = percentile_settings.get('percentile_bins')
+    width = (value_range[1] - value_range[0]) / bins
+    def set_percentiles(f):
+        f = ee.Feature(f)
+        cum_counts = ee.Array(ee.Algorithms.If(f.get('bucket_histogram'), f.get('bucket_histogram'), [[0, 0]])).slice(1, 1).project([0]).accum(0)
+        total = ee.Number(cum_counts.get([bins - 1]))
+
+        # The pixel at the nearest rank of a percentile is in the first bucket whose cumulative count passes the rank
+        def get_percentile(p):
+            rank = total.subtract(1).multiply(p / 100).round()
+            bucket = ee.Number(cum_counts.lte(rank).reduce(ee.Reducer.sum(), [0]).get([0]))
+            return(ee.Algorithms.If(total.gt(0), bucket.add(0.5).multiply(width).add(value_range[0]), None))
+        return(f.set(ee.Dictionary.fromLists([f'p{p}' for p in eedb_stat.stat_percentiles], [get_percentile(p) for p in eedb_stat.stat_percentiles])))
+
+    return(img_rr.map(set_percentiles))
+
+
+def reduce_continuous(in_i, in_fc, tile_scale, keep_properties = [], res = None, percentile_settings = {}):
+    """
+    :param in_i: e.g. Image for single date
+    :param in_fc: e.g. ee.FeatureCollection(in_fc_path)
+    :param keep_properties: e.g. ['eq_index'] or ['ALLOT_ID'], properties of in_fc to keep alongside the statistics
+    :param res: e.g. resolution resolved once per run, in which case in_fc must already have passed through .small_polygons_to_points()
+    :param percentile_settings: e.g. output of .get_percentile_settings(), empty for exact percentiles
+    :return: Earth Engine Feature Collection of land units with properties for percentiles and mean
+    """
+    # Cast input image to ee.Image
+    img = ee.Image(in_i)
+    
+    if res is None:
+
+        # Get resolution of the image
+        res = img.select(0).projection().nominalScale()
+
+        in_fc = small_polygons_to_points(in_fc = in_fc, res = res)
+
+    # Reduce at a multiple of the resolution, where polygons smaller than two of the coarser pixels become centroids
+    if percentile_settings.get('percentile_mode') == 'scale':
+        res = ee.Number(res).multiply(percentile_settings.get('percentile_scale_factor'))
+        in_fc = small_polygons_to_points(in_fc = in_fc, res = res)
+    
+    # Run reduce regions for allotments and select only the columns with reducers
+    img_rr = get_continuous_input(img, percentile_settings).reduceRegions(collection = in_fc, reducer = get_continuous_reducer(percentile_settings),\
+                                scale = res,\
+                                tileScale = tile_scale)
+    
+    return(buckets_to_percentiles(img_rr, percentile_settings).select(['mean', 'p.*'] + keep_properties))
+
+
+def img_to_pts_continuous(in_i, in_fc, tile_scale, index_property = None, percentile_settings = {}):
+    """
+    :param in_i: e.g. Image for single date
+    :param in_fc: e.g. ee.FeatureCollection(in_fc_path)
+    :param index_property: e.g. 'eq_index' to place features at fixed equator positions, or None to use list order
+    :param percentile_settings: e.g. output of .get_percentile_settings(), empty for exact percentiles
+    :return: Earth Engine Feature Collection of points at the equator with properties for percentiles and mean
+    """
+    img_rr = reduce_continuous(in_i = in_i, in_fc = in_fc, tile_scale = tile_scale, keep_properties = index_properties(index_property),
+                               percentile_settings = percentile_settings)
+
+    return(rr_to_equator(img_rr = img_rr, index_property = index_property))
+
+
 def pts_to_img_continuous(in_fc):
     """
     :param in_fc: e.g. Output of .img_to_pts_continuous()
@@ -200,128 +654,156 @@ def pts_to_img_continuous(in_fc):
     return(img_mb)
 
 
-def img_to_pts_categorical(in_i, in_fc, in_ic_name, tile_scale):
+def get_class_schema(in_ic_name):
+    """
+    :param in_ic_name: e.g. 'USDM', a key of bin_dict
+    :return: Version of the bin schema of the dataset, stamped on its collections as 'class_schema'
+    """
+    return(eedb_colinfo.bin_dict.get(in_ic_name).get('schema', 1))
+
+
+def get_stored_class_schema(out_path):
+    """
+    :param out_path: e.g. path of an existing database Image Collection of a categorical dataset
+    :return: Earth Engine value of the 'class_schema' stamped on the ID image, null for collections written before it was stamped
+    """
+    return(ee.Image(f'{out_path}/0_id').get('class_schema'))
+
+
+def check_class_schema(out_path, properties, stored_schema):
+    """
+    :param out_path: e.g. path of an existing database Image Collection
+    :param properties: e.g. output of .get_run_properties()
+    :param stored_schema: e.g. client-side value of .get_stored_class_schema(), None for collections holding schema 1
+    :return: None, raises ValueError when images of the current bin schema would be appended to a collection of another
+    """
+    if 'class_schema' not in properties:
+        return(None)
+    stored_schema = 1 if stored_schema is None else stored_schema
+    if stored_schema != properties.get('class_schema'):
+        raise ValueError(f"{out_path} holds class schema {stored_schema} but {properties.get('in_ic_name')} is at schema "
+                         f"{properties.get('class_schema')}, delete the collection and rerun to rebuild it before appending")
+    return(None)
+
+
+def classify_categorical(in_i, in_ic_name):
     """
     :param in_i: e.g. Image for single date
-    :param in_fc: e.g. ee.FeatureCollection(in_fc_path)
-    :return: Earth Engine Feature Collection of points at the equator with properties for histogram bins
+    :param in_ic_name: e.g. 'GridMET_Drought', a key of bin_dict
+    :return: Earth Engine integer Image of class indices 0, 1, ... following the bin schema of the dataset
     """
-    # Cast input image to ee.Image
     img = ee.Image(in_i)
+    bins = eedb_colinfo.bin_dict.get(in_ic_name)
+
+    # There are no reducers that allow histogram bins with variable widths, so values are put into classes first by
+    # counting the breaks they reach, e.g. drought blends between -1.0 and 2.0 reach four breaks and are class 4
+    if 'breaks' in bins:
+        classes_i = img.gte(bins.get('breaks')[0])
+        for value in bins.get('breaks')[1:]:
+            classes_i = classes_i.add(img.gte(value))
+        return(classes_i.toInt())
 
-    # Need to further pre-process drought blends to be able to extract bins consistent with drought.gov
-    # There are no reducers that allow histogram bins with variable widths, so we have to put bins into categories to start
-    # Reclassify drought blends using schema below
-    if in_ic_name == "GridMET_Drought":
-        img = img.where(img.lt(-4.0), 0)\
-            .where(img.lt(-3.0).And(img.gte(-4.0)), 1)\
-            .where(img.lt(-2.0).And(img.gte(-3.0)), 2)\
-            .where(img.lt(-1.0).And(img.gte(-2.0)), 3)\
-            .where(img.lt(2.0).And(img.gte(-1.0)), 4)\
-            .where(img.lt(3.0).And(img.gte(-2.0)), 5)\
-            .where(img.lt(4.0).And(img.gte(3.0)), 6)\
-            .where(img.gte(4.0), 7).toInt()
-        classes = ['c0', 'c1', 'c2', 'c3', 'c4', 'c5', 'c6', 'c7']
-
-    # Reclassify VegDRI using schema below
-    elif in_ic_name == "VegDRI":
-        img = img.where(img.lt(-2.0), 0)\
-            .where(img.lt(-1.5).And(img.gte(-2.0)), 1)\
-            .where(img.lt(-1.2).And(img.gte(-1.5)), 2)\
-            .where(img.lt(-0.7).And(img.gte(-1.2)), 3)\
-            .where(img.lt(-0.5).And(img.gte(-0.7)), 4)\
-            .where(img.lt(0.5).And(img.gte(-0.5)), 5)\
-            .where(img.lt(0.7).And(img.gte(0.5)), 6)\
-            .where(img.lt(1.2).And(img.gte(0.7)), 7)\
-            .where(img.lt(1.5).And(img.gte(1.2)), 8)\
-            .where(img.lt(2.0).And(img.gte(1.5)), 9)\
-            .where(img.gte(2.0), 10).toInt()
-        classes = ['c0', 'c1', 'c2', 'c3', 'c4', 'c5', 'c6', 'c7', 'c8', 'c9', 'c10']
-
-    # Maintain original values for USDM
-    elif in_ic_name == "USDM":
-        img = img
-        classes = ['c0', 'c1', 'c2', 'c3', 'c4', 'c5']
-
-    # Maintain original values for MTBS
-    elif in_ic_name == "MTBS":
-        img = img
-        classes = ['c0', 'c1', 'c2', 'c3', 'c4', 'c5', 'c6']
+    # Values that are already classes only need shifting so the first class is 0
+    return(img.subtract(bins.get('min')).toInt())
+
+
+def reduce_categorical(in_i, in_fc, in_ic_name, tile_scale, keep_properties = [], res = None):
+    """
+    :param in_i: e.g. Image for single date
+    :param in_fc: e.g. ee.FeatureCollection(in_fc_path)
+    :param keep_properties: e.g. ['eq_index'] or ['ALLOT_ID'], properties of in_fc to keep alongside the statistics
+    :param res: e.g. resolution resolved once per run, or None to read it from the image
+    :return: Earth Engine Feature Collection of land units with a property per histogram class, 0 for empty classes
+    """
+    classes = eedb_stat.get_class_names(in_ic_name)
+    img = classify_categorical(in_i, in_ic_name)
 
     # Get resolution of the image
-    res = img.select(0).projection().nominalScale()
-    
-    # Run reduce regions for allotments and select only the columns with reducers
-    img_rr = img.reduceRegions(collection = in_fc, reducer = ee.Reducer.frequencyHistogram(),\
+    if res is None:
+        res = img.select(0).projection().nominalScale()
+
+    # Count pixels in unit-width bins, one per class, so every feature gets the same classes in the same order
+    img_rr = img.reduceRegions(collection = in_fc, reducer = ee.Reducer.fixedHistogram(0, len(classes), len(classes)),\
                                 scale = res,\
-                                tileScale = tile_scale).select(['histogram'])
-    
-    # Function to process histogram and key names to set as properties
-    def process_histogram(f):
-        # Cast function to feature
+                                tileScale = tile_scale).select(['histogram'] + keep_properties)
+
+    return(histogram_to_classes(img_rr = img_rr, classes = classes, keep_properties = keep_properties))
+
+
+def histogram_to_classes(img_rr, classes, keep_properties = []):
+    """
+    :param img_rr: e.g. Feature Collection returned from reduceRegions with a fixedHistogram 'histogram' property
+    :param classes: e.g. output of eeDatabase_statNames.get_class_names()
+    :param keep_properties: e.g. ['eq_index'] or ['mean', 'p5', ...], properties to keep alongside the classes
+    :return: Earth Engine Feature Collection with a property per histogram class, 0 for empty classes
+    """
+    # Set the count column of each histogram as class properties, features without pixels have no histogram
+    zeros = ee.List.repeat(0, len(classes))
+    def set_class_counts(f):
         f = ee.Feature(f)
-        
-        # Get histogram
-        histogram = ee.Dictionary(f.get('histogram'))
-        
-        # Function to rename histogram keys 
-        def rename_histogram_keys(key):
-            key = ee.String(key).slice(0,2)
-            return(ee.String('c').cat(key))
-        
-        # Rename histogram
-        histogram = histogram.rename(histogram.keys(), histogram.keys().map(rename_histogram_keys))
-        
-        return(f.set(histogram))
-    
-    # Clean up histogram and set as properties
-    img_rr = img_rr.map(process_histogram).select(['c.*'])
+        counts = ee.Algorithms.If(f.get('histogram'), ee.Array(f.get('histogram')).slice(1, 1).project([0]).toList(), zeros)
+        return(f.set(ee.Dictionary.fromLists(classes, counts)).select(classes + keep_properties))
+
+    return(img_rr.map(set_class_counts))
+
 
-    # Add values of 0 for any histogram classes without values
-    def add_missing_props(f):
+def reduce_shared(in_i, in_fc, in_ic_name, tile_scale, keep_properties = [], res = None, percentile_settings = {}):
+    """
+    :param in_i: e.g. Image for single date
+    :param in_fc: e.g. ee.FeatureCollection(in_fc_path), with polygons kept as polygons
+    :param in_ic_name: e.g. 'GridMET_Drought', the categorical variant whose bin schema sets the classes
+    :param keep_properties: e.g. ['eq_index'] or ['ALLOT_ID'], properties of in_fc to keep alongside the statistics
+    :param res: e.g. resolution resolved once per run, or None to read it from the image
+    :param percentile_settings: e.g. output of .get_percentile_settings() for the continuous variant, in 'exact' or 'histogram' mode
+    :return: Earth Engine Feature Collection of land units with the percentiles and mean of .reduce_continuous() and the
+             class counts of .reduce_categorical() for the same features, from one reduceRegions over the polygons
+    """
+    classes = eedb_stat.get_class_names(in_ic_name)
+    img = ee.Image(in_i)
+
+    if res is None:
+        res = img.select(0).projection().nominalScale()
+
+    # Raw values feed the percentiles and mean while the classes feed the histogram, so each pixel is read once for both
+    shared_i = get_continuous_input(img.select([0], ['value']), percentile_settings).addBands(classify_categorical(img, in_ic_name).select([0], ['class']))
+    reducer = get_continuous_reducer(percentile_settings)\
+        .combine(reducer2 = ee.Reducer.fixedHistogram(0, len(classes), len(classes)), sharedInputs = False)
+
+    img_rr = shared_i.reduceRegions(collection = in_fc, reducer = reducer,\
+                                     scale = res,\
+                                     tileScale = tile_scale)
+    img_rr = buckets_to_percentiles(img_rr, percentile_settings).select(['mean', 'p.*', 'histogram'] + keep_properties)
+
+    # Polygons smaller than two pixels take their continuous statistics at the centroid, as .reduce_continuous() does,
+    # while their classes still count the pixels inside the polygon
+    res = ee.Number(res)
+    def small_polygons_to_centroids(f):
         f = ee.Feature(f)
-        
-        # Get properties from reduceRegions call
-        f_props = f.propertyNames().remove("system:index")
-        
-        # Iterate over properties in reduceRegions call to identify missing properties
-        def get_missing_props(prop, classes):
-            classes_remove = ee.List(classes).remove(prop)
-            return(classes_remove)
-        
-        missing_props = ee.List(f_props.iterate(get_missing_props, classes))
-        
-        # Construct dictionary of missing_props: 0 to add as properties to each feature
-        missing_props_dict = ee.Dictionary.fromLists(missing_props, ee.List.repeat(0, missing_props.length()))
-        
-        return(f.set(missing_props_dict))
-    img_rr = img_rr.map(add_missing_props)
+        return(ee.Algorithms.If(f.area(100).gte(res.pow(2).multiply(2)), None, f.centroid()))
 
-    # Get list of RR features
-    img_rr_list = img_rr.toList(img_rr.size())
-    
-    # Get size of RR features
-    img_rr_size = img_rr_list.size()
-    
-    # Function to create feature collection next to equator after reduction
-    def pts_to_equator_rr(i):
-        
-        # Cast number to EE number
-        i = ee.Number(i)
-        
-        # Get properties
-        properties = ee.Feature(img_rr_list.get(i)).toDictionary()
-        
-        # Create geometry at equator
-        geom = ee.Geometry.Point([i.multiply(0.0002),0.0002])
-        
-        # Return object with properties
-        return(ee.Feature(geom).set(properties))
+    small_rr = reduce_continuous(in_i = img, in_fc = in_fc.map(small_polygons_to_centroids, True), tile_scale = tile_scale, res = res,
+                                 percentile_settings = percentile_settings)
+    img_rr = ee.Join.saveFirst(matchKey = 'small_stats', outer = True)\
+        .apply(primary = img_rr, secondary = small_rr, condition = ee.Filter.equals(leftField = 'system:index', rightField = 'system:index'))
 
-    # Create equator feature collection
-    equator_fc = ee.FeatureCollection(ee.List.sequence(0, img_rr_size.subtract(1), 1).map(pts_to_equator_rr))
-    
-    return(equator_fc)
+    def set_small_stats(f):
+        f = ee.Feature(f)
+        small_f = ee.Feature(f.get('small_stats'))
+        return(ee.Algorithms.If(f.get('small_stats'), f.select(['histogram'] + keep_properties).set(small_f.toDictionary()), f))
+
+    return(histogram_to_classes(img_rr = ee.FeatureCollection(img_rr.map(set_small_stats)), classes = classes, keep_properties = ['mean', 'p.*'] + keep_properties))
+
+
+def img_to_pts_categorical(in_i, in_fc, in_ic_name, tile_scale, index_property = None):
+    """
+    :param in_i: e.g. Image for single date
+    :param in_fc: e.g. ee.FeatureCollection(in_fc_path)
+    :param index_property: e.g. 'eq_index' to place features at fixed equator positions, or None to use list order
+    :return: Earth Engine Feature Collection of points at the equator with properties for histogram bins
+    """
+    img_rr = reduce_categorical(in_i = in_i, in_fc = in_fc, in_ic_name = in_ic_name, tile_scale = tile_scale, keep_properties = index_properties(index_property))
+
+    return(rr_to_equator(img_rr = img_rr, index_property = index_property))
 
 
 def pts_to_img_categorical(in_fc, in_ic_name):
@@ -330,61 +812,21 @@ def pts_to_img_categorical(in_fc, in_ic_name):
     :param in_ic_name: e.g. input image collection name for applying logic
     :return: Earth Engine image of pixels at the equator with bands for histogram bins
     '''
+    # Classes of the dataset from its bin schema
+    return(pts_to_img_bands(in_fc = in_fc, band_names = eedb_stat.get_class_names(in_ic_name)))
+
+
+def pts_to_img_bands(in_fc, band_names):
+    '''
+    :param in_fc: e.g. output of img_to_pts_categorical
+    :param band_names: e.g. ['c0', 'c1', ...], properties rasterized as bands in this order
+    :return: Earth Engine image of pixels at the equator with a band per property
+    '''
     # Cast to FeatureCollections
     fc = ee.FeatureCollection(in_fc)
 
-    # Define classes for reclassification of properties
-    # Reclassify drought blends using schema below
-    # <-2.0 (D4) = c0
-    # -2.0--1.5 (D3) = c1
-    # -1.5--1.2 (D2) = c2
-    # -1.2--0.7 (D1) = c3
-    # -0.7--0.5 (D0) = c4
-    # -0.5-0.5 (Neutral) = c5
-    # 0.5-0.7 (W0) = c6
-    # 0.7-1.2 (W1) = c7
-    # 1.2-1.5 (W2) = c8
-    # 1.5-2.0 (W3) = c9
-    # >2.0 (W4) = c10
-    if in_ic_name == "GridMET_Drought":
-        classes = ['c0', 'c1', 'c2', 'c3', 'c4', 'c5', 'c6', 'c7', 'c8', 'c9', 'c10']
-
-    # Reclassify VegDRI using schema below
-    # VegDRI classes described below
-    # <-4.0 (D4) = c0
-    # -4.0--3.0 (D3) = c1
-    # -3.0--2.0 (D2) = c2
-    # -2.0-1.0 (D1) = c3
-    # -1.0-2.0 (Neutral) = c4
-    # 2.0-3.0 (W0) = c5
-    # 3.0-4.0 (W1) = c6
-    # >4.0 (W4) = c7
-    elif in_ic_name == "VegDRI":
-        classes = ['c0', 'c1', 'c2', 'c3', 'c4', 'c5', 'c6', 'c7']
-
-    # USDM classes described below
-    # -1 Neutral or Wet = c0
-    # 0 Abnormal Dry (D0) = c1
-    # 1 Moderate Drought (D1) = c2
-    # 2 Severe Drought (D2) = c3
-    # 3 Extreme Drought (D3) = c4
-    # 4 Exceptional Drought (D4) = c5
-    elif in_ic_name == "USDM":
-        classes = ['c0', 'c1', 'c2', 'c3', 'c4', 'c5']
-
-    # MTBS classes described below
-    # 0 Background = c0
-    # 1 Unburned to low severity = c1
-    # 2 Low severity = c2
-    # 3 Moderate severity = c3
-    # 4 High severity = c4
-    # 5 Increased greenness = c5
-    # 6 Non-mapping area = c6
-    elif in_ic_name == "MTBS":
-        classes = ['c0', 'c1', 'c2', 'c3', 'c4', 'c5', 'c6']
-        
     # Get list of properties to iterate over for creating multiband image for each date
-    props = ee.List(classes)
+    props = ee.List(band_names)
     
     # Function to generate image from stats stored in Feature Collection property
     def generate_stat_image(prop):
@@ -398,38 +840,235 @@ def pts_to_img_categorical(in_fc, in_ic_name):
     return(img_mb)
 
 
-def export_img(out_i, out_region, out_path, properties):
+def export_table_asset(out_table, out_path, properties, overwrite = False):
     '''
-    :param out_i: e.g. Image to export returned from .pts_to_img*()
-    :param out_region: e.g. Feature Collection at equator returned from .img_to_pts*()
-    :param out_path: e.g. path for exported GEE asset
+    :param out_table: e.g. Feature Collection returned from .reduce_table()
+    :param out_path: e.g. path of the folder holding one table asset per date
     :param properties: e.g. {'land-unit': land_unit, 'in-fc-path': in_fc_path, "in-fc-id": in_fc_id, "in-ic-paths": in_ic_path, "var-type": var_type, "var-name": var_name}
-    :return: Earth Engine image of pixels at the equator with bands for histogram bins
+    :param overwrite: e.g. True to replace an existing table for the date
+    :return: Earth Engine export task that was started
+    '''
+    out_id = properties.get('system:index')
+
+    # Queue and start export task
+    task = ee.batch.Export.table.toAsset(
+        collection = out_table.set(properties),
+        description = f"append table - {out_path.split('/')[-1]} - {out_id}",
+        assetId = f'{out_path}/{out_id}',
+        overwrite = overwrite)
+    task.start()
+
+    return(task)
+
+
+def export_table_local(out_table, out_path, properties, overwrite = False):
     '''
+    :param out_table: e.g. Feature Collection returned from .reduce_table()
+    :param out_path: e.g. path of the database Image Collection, whose name is used for the local directory
+    :param properties: e.g. {'land-unit': land_unit, ..., 'local_dir': 'blm-database', 'local_format': 'parquet'}
+    :param overwrite: e.g. True to replace an existing file for the date
+    :return: Path of the written Parquet or CSV file
+    '''
+    out_dir = eedb_path.get_local_dir(out_path, properties)
+    local_format = properties.get('local_format', 'csv')
+    out_file = os.path.join(out_dir, f"{properties.get('system:index')}.{local_format}")
+    if os.path.exists(out_file) and not overwrite:
+        print(f"{out_file} already exists, skipping")
+        return(out_file)
+
+    # Compute the table synchronously, this pages through large collections
+    df = ee.data.computeFeatures({'expression': out_table, 'fileFormat': 'PANDAS_DATAFRAME'})
+    df['system:time_start'] = properties.get('system:time_start')
+
+    # Write to a temporary file first so readers never see a partial table
+    os.makedirs(out_dir, exist_ok = True)
+    tmp_file = f'{out_file}.tmp'
+    if local_format == 'parquet':
+        df.to_parquet(tmp_file, index = False)
+    else:
+        df.to_csv(tmp_file, index = False)
+    os.replace(tmp_file, out_file)
+
+    return(out_file)
 
-    # Define variables for export task
+
+def get_export_description(properties):
+    """
+    :param properties: e.g. output of .get_date_properties()
+    :return: Description of the task exporting the image, e.g. 'append - blmallotments gridmetdrought longtermdroughtblend - 20220101'
+    """
     var_name_exp = properties.get('var_name').replace('_', '').lower()
     in_ic_name_exp = properties.get('in_ic_name').replace('_', '').lower()
     land_unit_exp = properties.get('land_unit_short').replace('_', '').lower()
-    out_id = properties.get('system:index')
+
+    return(f"append - {land_unit_exp} {in_ic_name_exp} {var_name_exp} - {properties.get('system:index')}")
+
+
+def export_img(out_i, out_region, out_path, properties, overwrite = False, out_table = None):
+    '''
+    :param out_i: e.g. Image to export returned from .pts_to_img*()
+    :param out_region: e.g. Feature Collection at equator returned from .img_to_pts*()
+    :param out_path: e.g. path for exported GEE asset
+    :param properties: e.g. {'land-unit': land_unit, 'in-fc-path': in_fc_path, "in-fc-id": in_fc_id, "in-ic-paths": in_ic_path, "var-type": var_type, "var-name": var_name}
+    :param overwrite: e.g. True to replace an existing image for the date
+    :param out_table: e.g. Feature Collection returned from .reduce_table(), used by the 'table' and 'local' sinks
+    :return: Earth Engine export task that was started, or the path of the written file for the 'local' sink
+    '''
+    # Record how approximate percentiles were computed, and the error bound used, alongside the statistics
+    properties = dict(properties, **get_percentile_settings(properties))
+
+    # Write the reduced table instead of the equator image when a table sink is selected
+    sink = properties.get('sink', 'image')
+    if sink != 'image':
+        return(table_sinks.get(sink)(out_table = out_table, out_path = out_path, properties = properties, overwrite = overwrite))
+
+    # Dates in 'annual' storage are written into the image of their year, which is rewritten with every date added
+    if properties.get('storage', 'date') == 'annual':
+        if properties.get('dates') is None:
+            return(export_annual_img(date_imgs = {properties.get('system:time_start'): out_i}, out_region = out_region, out_path = out_path, properties = properties))
+        overwrite = True
 
     # Queue and start export task
+    out_id = properties.get('system:index')
     task = ee.batch.Export.image.toAsset(
         image = out_i.set(properties),
-        description = f'append - {land_unit_exp} {in_ic_name_exp} {var_name_exp} - {out_id}',
+        description = get_export_description(properties),
         assetId = f'{out_path}/{out_id}',
         region = out_region,
         scale = 22.264,
-        maxPixels = 1e13)
+        maxPixels = 1e13,
+        overwrite = overwrite)
     task.start()
 
+    return(task)
+
+
+# Sinks that write the reduced feature table for each date instead of an equator image
+table_sinks = {'table': export_table_asset,
+               'local': export_table_local}
+
+
+def get_stored_dates(out_path):
+    """
+    :param out_path: e.g. path of the database Image Collection
+    :return: Earth Engine List of the dates stored in the collection, read from system:time_start of per-date images and
+             from the 'dates' index of year images, so either storage is checked with one query. Repeated dates are kept.
+    """
+    out_ic = ee.ImageCollection(out_path)
+    annual = ee.Filter.notNull(['dates'])
+
+    return(out_ic.filter(annual.Not()).aggregate_array('system:time_start')\
+           .cat(out_ic.filter(annual).aggregate_array('dates').flatten()))
+
+
+def get_year_dates(out_path, year_id):
+    """
+    :param out_path: e.g. path of the database Image Collection
+    :param year_id: e.g. '2022'
+    :return: Client-side list of the dates already in the year image, empty if the year has not been written
+    """
+    year_ic = ee.ImageCollection(out_path).filter(ee.Filter.eq('system:index', year_id))
+    return(year_ic.aggregate_array('dates').flatten().getInfo())
+
+
+def get_stored_img(out_path, date, in_ic_name, storage = 'date'):
+    """
+    :param out_path: e.g. path of the database Image Collection
+    :param date: e.g. millis since epoch of a stored date
+    :param in_ic_name: e.g. 'GridMET_Drought', selects the statistic bands
+    :param storage: e.g. 'date' for one image per date or 'annual' for one image per year
+    :return: Earth Engine Image of the statistics stored for the date with their plain band names (e.g. 'mean', 'p50', 'c0')
+    """
+    if storage != 'annual':
+        return(ee.Image(ee.ImageCollection(out_path).filter(ee.Filter.eq('system:time_start', date)).first()))
+
+    # Select the bands of the date from its year image, dropping the date suffix, with the fingerprint of the date
+    names = eedb_stat.get_stat_names(in_ic_name)
+    date_id = get_date_id(date)
+    year_i = ee.Image(f'{out_path}/{get_year_id(date)}')
+    fingerprint = ee.List(year_i.get('source_fingerprints')).get(ee.List(year_i.get('dates')).indexOf(date))
+    return(year_i.select([f'{name}_{date_id}' for name in names], names)\
+           .set({'system:index': date_id, 'system:time_start': date, 'source_fingerprint': fingerprint}))
+
+
+def get_stored_collection(out_path, dates, in_ic_name, storage = 'date'):
+    """
+    :param out_path: e.g. path of the database Image Collection
+    :param dates: e.g. list of stored dates
+    :param in_ic_name: e.g. 'GridMET_Drought', selects the statistic bands
+    :param storage: e.g. 'date' for one image per date or 'annual' for one image per year
+    :return: Earth Engine Image Collection with one image per date and plain band names, as per-date storage holds them
+    """
+    if storage != 'annual':
+        return(ee.ImageCollection(out_path).filter(ee.Filter.inList('system:time_start', dates)))
+
+    return(ee.ImageCollection([get_stored_img(out_path, date, in_ic_name, storage) for date in dates]))
+
+
+def build_annual_img(date_imgs, out_path, in_ic_name, stored_dates = []):
+    """
+    :param date_imgs: e.g. {date: equator Image of the date with source_fingerprint set}, all in the same year
+    :param out_path: e.g. path of the database Image Collection
+    :param in_ic_name: e.g. 'GridMET_Drought', selects the statistic bands
+    :param stored_dates: e.g. dates already in the year image, which are kept unless replaced by date_imgs
+    :return: Earth Engine Image with date-suffixed bands (e.g. 'mean_20220101') for every date in date order, and the
+             'source_fingerprints' of the dates in the same order
+    """
+    names = eedb_stat.get_stat_names(in_ic_name)
+    dates = sorted(set(stored_dates) | set(date_imgs))
+    stored_i = ee.Image(f'{out_path}/{get_year_id(dates[0])}') if len(stored_dates) > 0 else None
+
+    # Stack the dates side by side, new dates from their equator image and kept dates from the stored year image
+    date_bands = []
+    fingerprints = []
+    band_names = []
+    for date in dates:
+        date_id = get_date_id(date)
+        suffixed = [f'{name}_{date_id}' for name in names]
+        if date in date_imgs:
+            date_i = ee.Image(date_imgs.get(date))
+            date_bands.append(date_i.select(names, suffixed))
+            fingerprints.append(date_i.get('source_fingerprint'))
+        else:
+            date_bands.append(stored_i.select(suffixed))
+            fingerprints.append(ee.List(stored_i.get('source_fingerprints')).get(ee.List(stored_i.get('dates')).indexOf(date)))
+        band_names.extend(suffixed)
+
+    return(ee.ImageCollection(date_bands).toBands().rename(band_names).set('source_fingerprints', ee.List(fingerprints)))
+
+
+def export_annual_img(date_imgs, out_region, out_path, properties, stored_dates = None):
+    '''
+    :param date_imgs: e.g. {date: equator Image of the date with source_fingerprint set}, all in the same year
+    :param out_region: e.g. Feature Collection at equator returned from .img_to_pts*()
+    :param out_path: e.g. path of the database Image Collection
+    :param properties: e.g. output of .get_date_properties() with 'storage' set to 'annual'
+    :param stored_dates: e.g. dates already in the year image, or None to read them
+    :return: Earth Engine image asset export task that was started, replacing the year image with the dates added
+    '''
+    if stored_dates is None:
+        stored_dates = get_year_dates(out_path, get_year_id(min(date_imgs)))
+
+    out_i = build_annual_img(date_imgs = date_imgs, out_path = out_path, in_ic_name = properties.get('in_ic_name'), stored_dates = stored_dates)
+    year_properties = get_year_properties(properties, sorted(set(stored_dates) | set(date_imgs)))
+
+    return(export_img(out_i = out_i, out_region = out_region, out_path = out_path, properties = year_properties))
+
 
 def initialize_collection(out_path, properties):
     '''
     :param out_path: e.g. path for exported GEE asset 
     :param properties: e.g. {'land-unit': land_unit, 'in-fc-path': in_fc_path, "in-fc-id": in_fc_id, "in-ic-paths": in_ic_path, "var-type": var_type, "var-name": var_name}
-    :output: Earth Engine image asset export task
+    :return: Earth Engine image asset export task that was started, or None for table sinks, which need no ID image
     '''
+    # Table sinks store IDs in each row, so only the destination needs creating
+    if properties.get('sink', 'image') == 'table':
+        os.system(f"earthengine create folder {out_path}")
+        return(None)
+    elif properties.get('sink', 'image') == 'local':
+        os.makedirs(eedb_path.get_local_dir(out_path, properties), exist_ok = True)
+        return(None)
+
     # Apply ID image function to input feature collection
     out_list = generate_id_img(in_fc_path = properties.get('in_fc_path'), in_fc_id = properties.get('in_fc_id'))
     out_i = ee.Image(out_list.get(0))
@@ -453,13 +1092,17 @@ def initialize_collection(out_path, properties):
         maxPixels = 1e13)
     task.start()
 
+    return(task)
+
 
-def run_image_export(in_ic_paths, date, out_path, properties):
+def preprocess_image(in_ic_paths, date, properties, in_fc = None, mask_i = None):
     '''
+    :param in_ic_paths: e.g. ['GRIDMET/DROUGHT']
     :param date: e.g. millis since epoch for initial image that output represents
-    :param out_path: e.g. path for exported GEE asset 
     :param properties: e.g. {'land-unit': land_unit, 'in-fc-path': in_fc_path, "in-fc-id": in_fc_id, "in-ic-paths": in_ic_path, "var-type": var_type, "var-name": var_name}
-    :output: Earth Engine image asset export task
+    :param in_fc: e.g. input Feature Collection resolved once per run, or None to read it from properties
+    :param mask_i: e.g. mask Image resolved once per run, or None to read it from properties
+    :return: Earth Engine image for a single date with the land unit mask applied
     '''
 
     # ----- Preprocess input Image Collection based on path for each date -----
@@ -492,7 +1135,8 @@ def run_image_export(in_ic_paths, date, out_path, properties):
     elif in_ic_paths == ['LANDSAT/LT05/C02/T1_L2', 'LANDSAT/LE07/C02/T1_L2', 'LANDSAT/LC08/C02/T1_L2', 'LANDSAT/LC09/C02/T1_L2']:
         
         # Cast in_fc_path to feature collection
-        in_fc = ee.FeatureCollection(in_ic_paths = properties.get('in_fc_path'))
+        if in_fc is None:
+            in_fc = ee.FeatureCollection(properties.get('in_fc_path'))
 
         # Run function to pre-process the Landsat SR NDVI data
         in_i = eedb_col.preprocess_lsndvi(in_ic_paths = in_ic_paths, var_name = properties.get('var_name'), date = date, in_fc = in_fc)
@@ -512,24 +1156,54 @@ def run_image_export(in_ic_paths, date, out_path, properties):
         # Run function to pre-process the MTBS data
         in_i = eedb_col.preprocess_vegdri(in_ic_paths = in_ic_paths, var_name = properties.get('var_name'), date = date)
 
+    # Conditionally apply mask to images, a mask resolved for the run is used as is
+    if mask_i is None:
+        mask_i = get_mask_img(properties)
+    if mask_i is not None:
+        in_i = in_i.updateMask(mask_i)
+
+    return(in_i)
+
 
-    # ---------------------------- Apply functions to output image ---------------------------------
+def get_mask_frac_path(in_ic_res, root = eedb_colinfo.mask_frac_root):
+    """
+    :param in_ic_res: e.g. client-side value of .get_in_ic_res()
+    :param root: e.g. folder holding the mask fraction images
+    :return: Path of the image storing the fraction of each pixel covered by the ownership mask at the dataset resolution
+    """
+    return(f'{root}/sma-fraction-{int(round(in_ic_res))}m')
+
+
+def get_mask_img(properties):
+    """
+    :param properties: e.g. output of .get_run_properties()
+    :return: Earth Engine mask Image for the run, or None if the land unit is not masked. With a mask fraction on the
+             dataset grid, pixels are either weighted by the fraction covered or kept where it reaches mask_threshold.
+    """
+    if properties.get('mask_frac_path', 'None') != 'None':
+        mask_frac_i = ee.Image(properties.get('mask_frac_path'))
+        if properties.get('mask_threshold', 'None') != 'None':
+            return(mask_frac_i.gte(properties.get('mask_threshold')))
+        return(mask_frac_i)
 
-    # Conditionally apply mask to images
     if properties.get('mask_path') == 'None':
-        # Do not apply mask
-        in_i = in_i
-    else:
-        # Apply mask
-        in_i = in_i.updateMask(ee.Image(properties.get('mask_path')))
+        return(None)
+    return(ee.Image(properties.get('mask_path')))
 
-    # Cast in_fc_path to feature collection
-    in_fc = ee.FeatureCollection(properties.get('in_fc_path'))
 
+def reduce_image(in_i, in_fc, properties, index_property = None):
+    '''
+    :param in_i: e.g. Image returned from .preprocess_image()
+    :param in_fc: e.g. ee.FeatureCollection(in_fc_path)
+    :param properties: e.g. {'land-unit': land_unit, 'in-fc-path': in_fc_path, "in-fc-id": in_fc_id, "in-ic-paths": in_ic_path, "var-type": var_type, "var-name": var_name}
+    :param index_property: e.g. 'eq_index' to place features at fixed equator positions, or None to use list order
+    :return: List of the output image and the Feature Collection of points at the equator
+    '''
     if properties.get('var_type') == 'Continuous':
 
         # Run function to get time-series statistics for input feature collection
-        out_fc = img_to_pts_continuous(in_i = in_i, in_fc = in_fc, tile_scale = properties.get('tile_scale'))
+        out_fc = img_to_pts_continuous(in_i = in_i, in_fc = in_fc, tile_scale = properties.get('tile_scale'), index_property = index_property,
+                                       percentile_settings = get_percentile_settings(properties))
 
         # Convert centroid time-series to image collection time-series
         out_i = pts_to_img_continuous(in_fc = out_fc)
@@ -537,13 +1211,282 @@ def run_image_export(in_ic_paths, date, out_path, properties):
     elif properties.get('var_type') == 'Categorical':
 
         # Run function to get time-series statistics for input feature collection for continuous variables
-        out_fc = img_to_pts_categorical(in_i = in_i, in_fc = in_fc, in_ic_name = properties.get('in_ic_name'), tile_scale = properties.get('tile_scale'))
+        out_fc = img_to_pts_categorical(in_i = in_i, in_fc = in_fc, in_ic_name = properties.get('in_ic_name'), tile_scale = properties.get('tile_scale'), index_property = index_property)
 
         # Convert centroid time-series to image collection time-series
         out_i = pts_to_img_categorical(in_fc = out_fc, in_ic_name = properties.get('in_ic_name'))
 
-    # Create out region for export
-    out_region = out_fc.geometry().buffer(20)
+    return([out_i, out_fc])
+
+
+def reduce_table(in_i, in_fc, properties):
+    '''
+    :param in_i: e.g. Image returned from .preprocess_image()
+    :param in_fc: e.g. ee.FeatureCollection(in_fc_path)
+    :param properties: e.g. {'land-unit': land_unit, 'in-fc-path': in_fc_path, "in-fc-id": in_fc_id, "in-ic-paths": in_ic_path, "var-type": var_type, "var-name": var_name}
+    :return: Earth Engine Feature Collection without geometries, with the land unit ID and statistics as properties
+    '''
+    keep_properties = [properties.get('in_fc_id')]
+
+    if properties.get('var_type') == 'Continuous':
+        out_table = reduce_continuous(in_i = in_i, in_fc = in_fc, tile_scale = properties.get('tile_scale'), keep_properties = keep_properties,
+                                      percentile_settings = get_percentile_settings(properties))
+
+    elif properties.get('var_type') == 'Categorical':
+        out_table = reduce_categorical(in_i = in_i, in_fc = in_fc, in_ic_name = properties.get('in_ic_name'), tile_scale = properties.get('tile_scale'), keep_properties = keep_properties)
+
+    # Drop geometries, tabular consumers only need the ID and statistics
+    return(out_table.select(['.*'], None, False))
+
+
+def check_index_paths(properties):
+    """
+    :param properties: e.g. output of .get_run_properties()
+    :return: None, raises ValueError when a coverage index and a layout are both set for an equator image, since the
+             coverage index places features at their list position and the layout at their stable slot
+    """
+    if properties.get('coverage_path', 'None') != 'None' and properties.get('layout_path', 'None') != 'None' and properties.get('sink', 'image') == 'image':
+        raise ValueError(f"coverage_path {properties.get('coverage_path')} and layout_path {properties.get('layout_path')} cannot be combined")
+
+
+def run_image_export(in_ic_paths, date, out_path, properties, overwrite = False):
+    '''
+    :param date: e.g. millis since epoch for initial image that output represents
+    :param out_path: e.g. path for exported GEE asset 
+    :param properties: e.g. {'land-unit': land_unit, 'in-fc-path': in_fc_path, "in-fc-id": in_fc_id, "in-ic-paths": in_ic_path, "var-type": var_type, "var-name": var_name}
+    :param overwrite: e.g. True to replace an existing image for the date
+    :return: Earth Engine image asset export task that was started
+    '''
+    check_index_paths(properties)
+
+    # Preprocess input Image Collection based on path for the date and apply mask
+    in_i = preprocess_image(in_ic_paths = in_ic_paths, date = date, properties = properties)
+
+    if properties.get('sink', 'image') != 'image':
+
+        # Table sinks write the reduced features directly, skipping rasterization at the equator
+        if properties.get('coverage_path', 'None') != 'None':
+            in_fc = ee.FeatureCollection(properties.get('coverage_path')).filter(ee.Filter.eq('covered', 1))
+        else:
+            in_fc = ee.FeatureCollection(properties.get('in_fc_path'))
+        out_table = reduce_table(in_i = in_i, in_fc = in_fc, properties = properties)\
+            .set('source_fingerprint', get_source_fingerprint(in_ic_paths = in_ic_paths, date = date, in_fc_path = properties.get('in_fc_path')))
+
+        return(export_img(out_i = None, out_region = None, out_path = out_path, properties = properties, overwrite = overwrite, out_table = out_table))
+
+    if properties.get('coverage_path', 'None') != 'None':
+
+        # Reduce only the features that intersect the dataset footprint, at their equator positions
+        coverage_fc = ee.FeatureCollection(properties.get('coverage_path'))
+        in_fc = coverage_fc.filter(ee.Filter.eq('covered', 1))
+        out_i, out_fc = reduce_image(in_i = in_i, in_fc = in_fc, properties = properties, index_property = 'eq_index')
+
+        # Export over every equator position so features outside the footprint are written as masked no-data pixels
+        out_region = equator_region(coverage_fc.size())
+
+    elif properties.get('layout_path', 'None') != 'None':
+
+        # Place features at their stable slots from the collection layout, retired slots are left as no-data
+        layout_fc = ee.FeatureCollection(properties.get('layout_path'))
+        in_fc = join_layout_index(in_fc = ee.FeatureCollection(properties.get('in_fc_path')), in_fc_id = properties.get('in_fc_id'), layout_fc = layout_fc)
+        out_i, out_fc = reduce_image(in_i = in_i, in_fc = in_fc, properties = properties, index_property = 'eq_index')
+
+        # Export over every slot in the layout
+        out_region = equator_region(layout_fc.size())
+
+    else:
+
+        # Cast in_fc_path to feature collection
+        in_fc = ee.FeatureCollection(properties.get('in_fc_path'))
+
+        # Run zonal statistics and convert to image
+        out_i, out_fc = reduce_image(in_i = in_i, in_fc = in_fc, properties = properties)
+
+        # Create out region for export
+        out_region = out_fc.geometry().buffer(20)
+
+    # Record the source images that went into the output so changed inputs can be detected later
+    out_i = out_i.set('source_fingerprint', get_source_fingerprint(in_ic_paths = in_ic_paths, date = date, in_fc_path = properties.get('in_fc_path')))
 
     # Export the image
-    export_img(out_i = out_i, out_region = out_region, out_path = out_path, properties = properties)
\ No newline at end of file
+    return(export_img(out_i = out_i, out_region = out_region, out_path = out_path, properties = properties, overwrite = overwrite))
+
+
+class RunContext:
+    """
+    Objects that are the same for every date exported into one database Image Collection, resolved once per run:
+    the input Feature Collection, mask, features placed at their equator positions with small polygons already
+    converted to centroids, the image resolution from the batched in_ic_res property and a constant export region.
+    Each date then only adds its source image, reduction and fingerprint to the graph. run_image_export() has the same
+    signature as the module-level function, so it can be passed as the submit function of
+    eeDatabase_taskMethods.run_image_export_adaptive().
+    """
+    def __init__(self, in_ic_paths, out_path, properties, region_size = None):
+        '''
+        :param in_ic_paths: e.g. ['GRIDMET/DROUGHT']
+        :param out_path: e.g. path of the database Image Collection
+        :param properties: e.g. output of .get_run_properties()
+        :param region_size: e.g. number of features in the collection setting the export region when already known, or None to read it
+        '''
+        check_index_paths(properties)
+        self.in_ic_paths = in_ic_paths
+        self.out_path = out_path
+        self.sink = properties.get('sink', 'image')
+        self.in_fc = ee.FeatureCollection(properties.get('in_fc_path'))
+        self.mask_i = get_mask_img(properties)
+
+        # Resolution read with the run properties, so building a date's graph needs no request and no shared state changes
+        self.res = properties.get('in_ic_res')
+        if self.res is None:
+            self.res = get_in_ic_res(properties.get('in_ic_name')).getInfo()
+
+        # Features to reduce and, for equator images, where each is placed
+        self.index_property = None
+        region_fc = self.in_fc
+        if properties.get('coverage_path', 'None') != 'None':
+            region_fc = ee.FeatureCollection(properties.get('coverage_path'))
+            self.reduce_fc = region_fc.filter(ee.Filter.eq('covered', 1))
+            self.index_property = 'eq_index'
+        elif properties.get('layout_path', 'None') != 'None' and self.sink == 'image':
+            region_fc = ee.FeatureCollection(properties.get('layout_path'))
+            self.reduce_fc = join_layout_index(in_fc = self.in_fc, in_fc_id = properties.get('in_fc_id'), layout_fc = region_fc)
+            self.index_property = 'eq_index'
+        else:
+            self.reduce_fc = self.in_fc
+
+        # Table sinks keep the land unit ID instead of an equator position
+        if self.sink == 'image':
+            self.keep_properties = index_properties(self.index_property)
+            self.out_region = equator_region(region_size if region_size is not None else region_fc.size().getInfo())
+        else:
+            self.keep_properties = [properties.get('in_fc_id')]
+            self.out_region = None
+
+        # Small polygons are reduced at their centroids for continuous variables
+        self.small_fc = small_polygons_to_points(in_fc = self.reduce_fc, res = self.res)
+
+    def reduce(self, in_i, properties):
+        '''
+        :param in_i: e.g. Image returned from .preprocess_image()
+        :param properties: e.g. output of .get_date_properties(), tile_scale is read per date so retries can raise it
+        :return: Earth Engine Feature Collection of land units with statistics as properties
+        '''
+        if properties.get('var_type') == 'Continuous':
+            return(reduce_continuous(in_i = in_i, in_fc = self.small_fc, tile_scale = properties.get('tile_scale'),
+                                     keep_properties = self.keep_properties, res = self.res, percentile_settings = get_percentile_settings(properties)))
+
+        elif properties.get('var_type') == 'Categorical':
+            return(reduce_categorical(in_i = in_i, in_fc = self.reduce_fc, in_ic_name = properties.get('in_ic_name'), tile_scale = properties.get('tile_scale'),
+                                      keep_properties = self.keep_properties, res = self.res))
+
+    def reduce_date(self, date, properties):
+        '''
+        :param date: e.g. millis since epoch for initial image that output represents
+        :param properties: e.g. output of .get_date_properties()
+        :return: List of the Feature Collection of land units with statistics and the source fingerprint of the date
+        '''
+        in_i = preprocess_image(in_ic_paths = self.in_ic_paths, date = date, properties = properties, in_fc = self.in_fc, mask_i = self.mask_i)
+
+        img_rr = self.reduce(in_i, properties)
+        fingerprint = get_source_fingerprint(in_ic_paths = self.in_ic_paths, date = date, in_fc_path = properties.get('in_fc_path'))
+
+        return([img_rr, fingerprint])
+
+    def build_img(self, date, properties):
+        '''
+        :param date: e.g. millis since epoch for initial image that output represents
+        :param properties: e.g. output of .get_date_properties()
+        :return: Earth Engine image of pixels at the equator for the date, with its source fingerprint set
+        '''
+        img_rr, fingerprint = self.reduce_date(date, properties)
+
+        # Rasterize at the equator
+        out_fc = rr_to_equator(img_rr = img_rr, index_property = self.index_property)
+        if properties.get('var_type') == 'Continuous':
+            out_i = pts_to_img_continuous(in_fc = out_fc)
+        elif properties.get('var_type') == 'Categorical':
+            out_i = pts_to_img_categorical(in_fc = out_fc, in_ic_name = properties.get('in_ic_name'))
+
+        return(out_i.set('source_fingerprint', fingerprint))
+
+    def build_shared_img(self, date, properties, percentile_settings = {}):
+        '''
+        :param date: e.g. millis since epoch for initial image that output represents
+        :param properties: e.g. output of .get_date_properties() for the categorical variant of a dataset
+        :param percentile_settings: e.g. output of .get_percentile_settings() for the continuous variant
+        :return: Earth Engine image of pixels at the equator with the statistic bands of the continuous variant and the
+                 class bands of the categorical variant from one reduction, with its source fingerprint set
+        '''
+        in_i = preprocess_image(in_ic_paths = self.in_ic_paths, date = date, properties = properties, in_fc = self.in_fc, mask_i = self.mask_i)
+
+        img_rr = reduce_shared(in_i = in_i, in_fc = self.reduce_fc, in_ic_name = properties.get('in_ic_name'), tile_scale = properties.get('tile_scale'),
+                               keep_properties = self.keep_properties, res = self.res, percentile_settings = percentile_settings)
+        out_fc = rr_to_equator(img_rr = img_rr, index_property = self.index_property)
+        band_names = ['mean'] + [f'p{q}' for q in eedb_stat.stat_percentiles] + eedb_stat.get_class_names(properties.get('in_ic_name'))
+
+        return(pts_to_img_bands(in_fc = out_fc, band_names = band_names)\
+               .set('source_fingerprint', get_source_fingerprint(in_ic_paths = self.in_ic_paths, date = date, in_fc_path = properties.get('in_fc_path'))))
+
+    def run_image_export(self, in_ic_paths, date, out_path, properties, overwrite = False):
+        '''
+        :param in_ic_paths: e.g. ['GRIDMET/DROUGHT'], must match the paths the context was built for
+        :param date: e.g. millis since epoch for initial image that output represents
+        :param out_path: e.g. path for exported GEE asset, must match the path the context was built for
+        :param properties: e.g. output of .get_date_properties()
+        :param overwrite: e.g. True to replace an existing image for the date
+        :return: Earth Engine image asset export task that was started, or the written file for the 'local' sink
+        '''
+        if self.sink != 'image':
+            img_rr, fingerprint = self.reduce_date(date, properties)
+            out_table = img_rr.select(['.*'], None, False).set('source_fingerprint', fingerprint)
+            return(export_img(out_i = None, out_region = None, out_path = self.out_path, properties = properties, overwrite = overwrite, out_table = out_table))
+
+        out_i = self.build_img(date, properties)
+
+        return(export_img(out_i = out_i, out_region = self.out_region, out_path = self.out_path, properties = properties, overwrite = overwrite))
+
+    def run_year_export(self, in_ic_paths, dates, out_path, properties, stored_dates = None):
+        '''
+        :param in_ic_paths: e.g. ['GRIDMET/DROUGHT'], must match the paths the context was built for
+        :param dates: e.g. dates of one year to add to its year image in 'annual' storage
+        :param out_path: e.g. path for exported GEE asset, must match the path the context was built for
+        :param properties: e.g. output of .get_run_properties() with 'storage' set to 'annual'
+        :param stored_dates: e.g. dates already in the year image, or None to read them
+        :return: Earth Engine image asset export task that was started, writing every date of the year at once
+        '''
+        date_imgs = {date: self.build_img(date, get_date_properties(properties, date)) for date in dates}
+
+        return(export_annual_img(date_imgs = date_imgs, out_region = self.out_region, out_path = self.out_path,
+                                 properties = get_date_properties(properties, min(dates)), stored_dates = stored_dates))
+
+
+def run_image_exports(in_ic_paths, dates, out_path, properties, overwrite = False):
+    '''
+    :param in_ic_paths: e.g. ['GRIDMET/DROUGHT']
+    :param dates: e.g. list of millis since epoch, such as the dates missing from the collection
+    :param out_path: e.g. path for exported GEE asset
+    :param properties: e.g. output of .get_run_properties()
+    :param overwrite: e.g. True to replace existing images for the dates
+    :return: List of started export tasks, one per date, or one per year in 'annual' storage
+    '''
+    # Class bands of earlier bin schemas cannot be mixed with the current ones
+    if properties.get('sink', 'image') == 'image':
+        check_class_schema(out_path, properties, get_stored_class_schema(out_path).getInfo() if 'class_schema' in properties else None)
+
+    context = RunContext(in_ic_paths = in_ic_paths, out_path = out_path, properties = properties)
+
+    # Dates of a year share one image, so they are added together
+    if properties.get('storage', 'date') == 'annual':
+        tasks = []
+        for year_id, year_dates in group_dates_by_year(dates).items():
+            print("Running ", year_id, f"({len(year_dates)} dates)")
+            tasks.append(context.run_year_export(in_ic_paths = in_ic_paths, dates = year_dates, out_path = out_path, properties = properties))
+        return(tasks)
+
+    tasks = []
+    for date in dates:
+        print("Running ", datetime.datetime.fromtimestamp(date/1000.0))
+        tasks.append(context.run_image_export(in_ic_paths = in_ic_paths, date = date, out_path = out_path,
+                                              properties = get_date_properties(properties, date), overwrite = overwrite))
+
+    return(tasks)
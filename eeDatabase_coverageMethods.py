@@ -0,0 +1,134 @@
+import argparse
+import os
+import ee
+import eeDatabase_coreMethods as eedb_cor
+import eeDatabase_collectionInfo as eedb_colinfo
+
+# Default folder for coverage index table assets
+coverage_root = 'projects/climate-engine-pro/assets/blm-database-coverage'
+
+
+def get_coverage_path(land_unit_short, in_ic_name, root = coverage_root):
+    """
+    :param land_unit_short: e.g. 'BLM_Allotments'
+    :param in_ic_name: e.g. 'USDM'
+    :param root: e.g. folder holding coverage index table assets
+    :return: Path of the coverage index table asset for the land unit and dataset
+    """
+    return(f"{root}/{land_unit_short.replace('_', '').lower()}-{in_ic_name.replace('_', '').lower()}")
+
+
+def get_footprint_img(in_ic_name):
+    """
+    :param in_ic_name: e.g. 'USDM'
+    :return: Earth Engine image that is 1 where the dataset has valid data and 0 elsewhere, including outside the image bounds
+    """
+    in_ic_paths = eedb_colinfo.in_ic_dict.get(in_ic_name).get('in_ic_paths')
+    in_ic = ee.ImageCollection(in_ic_paths[0])
+
+    # USDM stores CONUS, Alaska, Hawaii and Puerto Rico as separate images and only CONUS is exported
+    if in_ic_paths == ['projects/climate-engine/usdm/weekly']:
+        in_ic = in_ic.filter(ee.Filter.eq('region', 'conus'))
+
+    # Footprint of these datasets does not change through time, so the first image is representative
+    return(in_ic.first().select(0).mask().unmask(0, False))
+
+
+def build_coverage_index(in_fc_path, in_fc_id, in_ic_name, coverage_path, scale = 1000, tile_scale = 1):
+    '''
+    :param in_fc_path: e.g. path to input feature collection
+    :param in_fc_id: e.g. field from input feature collection to use as ID
+    :param in_ic_name: e.g. 'USDM'
+    :param coverage_path: e.g. output of .get_coverage_path()
+    :param scale: e.g. resolution in meters used to test for valid data, coarse scales use the mask pyramid
+    :param tile_scale: e.g. 1
+    :return: Started export task writing the coverage index table asset
+    '''
+    if not eedb_colinfo.in_ic_dict.get(in_ic_name).get('coverage_index'):
+        raise ValueError(f'{in_ic_name} does not have a fixed footprint, a coverage index would drop valid features')
+
+    # Keep the equator position from the full collection so covered features land in the same pixels
+    in_fc = eedb_cor.add_equator_index(ee.FeatureCollection(in_fc_path))
+
+    # Test each feature for any valid pixel in the dataset footprint, the footprint is 0 outside so every pixel counts
+    footprint_i = get_footprint_img(in_ic_name)
+    footprint_rr = footprint_i.reduceRegions(collection = in_fc, reducer = ee.Reducer.max(), scale = scale, tileScale = tile_scale)
+
+    # Features smaller than a pixel at the test scale hold no pixel center, so they are tested at their centroid instead
+    has_value = ee.Filter.notNull(['max'])
+    small_fc = footprint_rr.filter(has_value.Not())
+    small_rr = footprint_i.reduceRegions(collection = small_fc.map(lambda f: ee.Feature(f).centroid(1)), reducer = ee.Reducer.max(),
+                                         scale = scale, tileScale = tile_scale)
+
+    # The centroid result is joined back onto the polygon, so covered features are reduced over their full geometry
+    small_fc = ee.Join.saveFirst(matchKey = 'centroid', outer = True)\
+        .apply(primary = small_fc, secondary = small_rr, condition = ee.Filter.equals(leftField = 'eq_index', rightField = 'eq_index'))
+    small_fc = ee.FeatureCollection(small_fc).map(lambda f: ee.Feature(f).set('max', ee.Feature(ee.Feature(f).get('centroid')).get('max')))
+
+    # A centroid off the dataset grid has no value and is not covered
+    def set_covered(f):
+        f = ee.Feature(f)
+        covered = ee.Algorithms.If(ee.Algorithms.IsEqual(f.get('max'), None), 0, ee.Number(f.get('max')).gt(0))
+        return(f.select([in_fc_id, 'eq_index']).set('covered', covered))
+    coverage_fc = footprint_rr.filter(has_value).merge(small_fc).map(set_covered).set('in_fc_path', in_fc_path).set('in_ic_name', in_ic_name)
+
+    task = ee.batch.Export.table.toAsset(
+        collection = coverage_fc,
+        description = f"coverage - {coverage_path.split('/')[-1]}",
+        assetId = coverage_path)
+    task.start()
+
+    return(task)
+
+
+def get_coverage_counts(coverage_path):
+    """
+    :param coverage_path: e.g. output of .get_coverage_path()
+    :return: Client-side dictionary of {'covered': n, 'total': n}
+    """
+    coverage_fc = ee.FeatureCollection(coverage_path)
+    return(ee.Dictionary({'covered': coverage_fc.aggregate_sum('covered'), 'total': coverage_fc.size()}).getInfo())
+
+
+def build_coverage_indexes(land_units = None, in_ic_names = None, root = coverage_root, scale = 1000):
+    '''
+    :param land_units: e.g. ['BLM_Allotments'], land_unit_short values, defaults to every land unit
+    :param in_ic_names: e.g. ['USDM'], defaults to every dataset flagged with coverage_index
+    :param root: e.g. folder holding coverage index table assets
+    :param scale: e.g. resolution in meters used to test for valid data
+    :return: Dictionary of {coverage_path: started export task, or None when the index already exists}. eeDatabase_runJobs.py
+             reduces over an index once it exists, so an index is rebuilt by deleting it after its feature collection changes.
+    '''
+    if ee.data.getInfo(root) is None:
+        os.system(f"earthengine create folder {root}")
+    assets = eedb_cor.list_assets(root)
+
+    tasks = {}
+    for in_fc_path, land_unit in eedb_colinfo.land_unit_dict.items():
+        if land_units is not None and land_unit.get('land_unit_short') not in land_units:
+            continue
+        for in_ic_name, in_ic in eedb_colinfo.in_ic_dict.items():
+            if not in_ic.get('coverage_index') or (in_ic_names is not None and in_ic_name not in in_ic_names):
+                continue
+            coverage_path = get_coverage_path(land_unit.get('land_unit_short'), in_ic_name, root = root)
+            tasks[coverage_path] = None if coverage_path in assets else\
+                build_coverage_index(in_fc_path, land_unit.get('in_fc_id'), in_ic_name, coverage_path, scale = scale, tile_scale = land_unit.get('tile_scale', 1))
+
+    return(tasks)
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'Export coverage index tables marking the features inside the footprint of fixed-footprint datasets.')
+    parser.add_argument('--land-units', nargs = '+', default = None, help = 'land units to build indexes for, defaults to every land unit')
+    parser.add_argument('--datasets', nargs = '+', default = None, help = 'datasets to build indexes for, defaults to every dataset flagged with coverage_index')
+    parser.add_argument('--scale', type = float, default = 1000, help = 'resolution in meters used to test for valid data')
+    parser.add_argument('--project', default = 'dri-apps', help = 'Earth Engine cloud project')
+    args = parser.parse_args(argv)
+
+    ee.Initialize(project = args.project)
+    tasks = build_coverage_indexes(args.land_units, args.datasets, scale = args.scale)
+    print(f"Started {len([task for task in tasks.values() if task is not None])} coverage index exports")
+
+
+if __name__ == '__main__':
+    main()
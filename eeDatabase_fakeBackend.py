@@ -0,0 +1,119 @@
+import itertools
+import threading
+import time
+
+# Error message Earth Engine reports when a reduction runs out of memory
+memory_error_message = 'User memory limit exceeded.'
+
+
+class FakeTask:
+    """
+    Stand-in for ee.batch.Task that reports a scripted sequence of states
+    """
+    _ids = itertools.count()
+
+    def __init__(self, final_state, error_message = None, polls_until_done = 0):
+        self.id = f'FAKE{next(self._ids):06d}'
+        self.final_state = final_state
+        self.error_message = error_message
+        self.polls_until_done = polls_until_done
+
+    def start(self):
+        pass
+
+    def status(self):
+        if self.polls_until_done > 0:
+            self.polls_until_done -= 1
+            return({'id': self.id, 'state': 'RUNNING'})
+        status = {'id': self.id, 'state': self.final_state}
+        if self.error_message is not None:
+            status['error_message'] = self.error_message
+        return(status)
+
+
+class FakeTaskBackend:
+    """
+    Fake export backend with the same call signature as eeDatabase_coreMethods.run_image_export().
+    Exports fail with a memory limit error until they are submitted at or above the tileScale
+    required for their (land_unit_short, in_ic_name), so retry logic can be exercised offline.
+    """
+    def __init__(self, required_tile_scales = None, default_tile_scale = 1, polls_until_done = 0):
+        '''
+        :param required_tile_scales: e.g. {('BLM_StateOffices', 'RAP_Cover'): 8}
+        :param default_tile_scale: e.g. tileScale required for combinations not listed above
+        :param polls_until_done: e.g. number of RUNNING states reported before the final state
+        '''
+        self.required_tile_scales = required_tile_scales or {}
+        self.default_tile_scale = default_tile_scale
+        self.polls_until_done = polls_until_done
+        self.submissions = []
+
+    def __call__(self, in_ic_paths, date, out_path, properties):
+        self.submissions.append({'in_ic_paths': in_ic_paths, 'date': date, 'out_path': out_path, 'properties': dict(properties)})
+
+        # Decide whether this submission runs out of memory
+        key = (properties.get('land_unit_short'), properties.get('in_ic_name'))
+        required = self.required_tile_scales.get(key, self.default_tile_scale)
+        if properties.get('tile_scale', 1) >= required:
+            task = FakeTask('COMPLETED', polls_until_done = self.polls_until_done)
+        else:
+            task = FakeTask('FAILED', error_message = memory_error_message, polls_until_done = self.polls_until_done)
+        task.start()
+        return(task)
+
+
+class FakeEEServer:
+    """
+    In-process stand-in for Earth Engine with the same blocking methods as eeDatabase_asyncMethods.EEBackend.
+    Every call sleeps for a fixed latency and the peak number of concurrent calls is recorded.
+    """
+    def __init__(self, latency = 0.05, collection_dates = None, stored_dates = None, assets = None, task_states = None):
+        '''
+        :param latency: e.g. seconds each simulated round trip takes
+        :param collection_dates: e.g. {('GRIDMET/DROUGHT',): [1199145600000, ...]}
+        :param stored_dates: e.g. {out_path: [1199145600000, ...]}
+        :param assets: e.g. {collection_path: [asset_id, ...]}
+        :param task_states: e.g. {task_id: ['RUNNING', 'COMPLETED']}, states are reported in order and the last repeats
+        '''
+        self.latency = latency
+        self.collection_dates = collection_dates or {}
+        self.stored_dates = stored_dates or {}
+        self.assets = assets or {}
+        self.task_states = task_states or {}
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def _round_trip(self):
+        with self.lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.latency)
+        with self.lock:
+            self.in_flight -= 1
+
+    def get_collection_dates(self, in_ic_paths, start_date, end_date):
+        self._round_trip()
+        start_ms = start_date.timestamp() * 1000
+        end_ms = end_date.timestamp() * 1000
+        return([d for d in self.collection_dates.get(tuple(in_ic_paths), []) if start_ms <= d < end_ms])
+
+    def get_stored_dates(self, out_path):
+        self._round_trip()
+        return(list(self.stored_dates.get(out_path, [])))
+
+    def asset_exists(self, path):
+        self._round_trip()
+        return(path in self.assets or path in self.stored_dates)
+
+    def list_collection(self, path):
+        self._round_trip()
+        return(list(self.assets.get(path, [])))
+
+    def get_task_status(self, task_id):
+        self._round_trip()
+        states = self.task_states.get(task_id, ['COMPLETED'])
+        state = states.pop(0) if len(states) > 1 else states[0]
+        return({'id': task_id, 'state': state})
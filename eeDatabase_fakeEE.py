@@ -0,0 +1,1965 @@
+"""
+Offline stand-in for the subset of the Earth Engine Python API used by eeDatabase_coreMethods and
+eeDatabase_collectionMethods. Every call records a node of the computation graph the same way the
+real client does, graphs are serialized in the value-deduplicated layout of the Cloud API, and
+getInfo() and export tasks execute the graph on small synthetic rasters and feature collections
+with NumPy. Round trips (getInfo, task starts and ee.data calls) are counted on the session.
+
+Use install() before importing the database modules, or after importing them, to replace ee:
+
+    import eeDatabase_fakeEE as fake_ee
+    fake_ee.install()
+    fake_ee.session.catalog.update(fake_ee.make_synthetic_catalog(n_features = 1000))
+"""
+import datetime
+import inspect
+import json
+import math
+import re
+import sys
+import numpy as np
+
+# Pixel size in degrees of the equator layout, matching exports at a scale of 22.264 m
+equator_dx = 0.0002
+
+# Meters per degree at the equator
+meters_per_degree = 111319.49
+
+
+class Session:
+    """
+    Catalog of fake assets and counters shared by every fake ee call
+    """
+    def __init__(self):
+        self.catalog = {}
+        self.reset_counters()
+
+    def reset_counters(self):
+        self.round_trips = 0
+        self.requests = []
+        self.tasks = []
+
+
+session = Session()
+
+
+class EEException(Exception):
+    pass
+
+
+# ----- Graph recording -----
+
+class Function:
+    """
+    Traced Python function passed to map() or iterate()
+    """
+    _depth = [0]
+
+    def __init__(self, fn):
+        n_args = len([p for p in inspect.signature(fn).parameters.values() if p.default is inspect.Parameter.empty])
+        self._depth[0] += 1
+        try:
+            self.params = [f'_MAPPING_VAR_{self._depth[0]}_{i}' for i in range(n_args)]
+            self.body = promote(fn(*[ComputedObject(var_name = name) for name in self.params]))
+        finally:
+            self._depth[0] -= 1
+
+
+def promote(value):
+    """
+    :param value: e.g. Python value passed to a fake ee call
+    :return: Value with Python functions traced and containers promoted element-wise
+    """
+    if isinstance(value, (ComputedObject, Function)) or value is None:
+        return(value)
+    if isinstance(value, (list, tuple)):
+        return([promote(v) for v in value])
+    if isinstance(value, dict):
+        return({k: promote(v) for k, v in value.items()})
+    if callable(value):
+        return(Function(value))
+    return(value)
+
+
+class _StaticCalls(type):
+    """
+    Metaclass turning unknown class attributes into recorded static calls, e.g. ee.Reducer.mean()
+    """
+    def __getattr__(cls, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        def static_call(*args, **kwargs):
+            obj = ComputedObject.__new__(ComputedObject if cls is Algorithms else cls)
+            ComputedObject.__init__(obj, f'{cls.__name__}.{name}', {'args': promote(list(args)), 'kwargs': promote(kwargs)})
+            return(obj)
+        return(static_call)
+
+
+class ComputedObject(metaclass = _StaticCalls):
+    """
+    Node of the computation graph. Unknown attributes become recorded method calls, so any method of
+    the real API can be chained; which ones can be executed is decided by the executor.
+    """
+    def __init__(self, func = None, args = None, var_name = None):
+        self.func = func
+        self.args = args or {}
+        self.var_name = var_name
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        def method_call(*args, **kwargs):
+            return(ComputedObject(func = f'{type(self).__name__}.{name}',
+                                  args = {'this': self, 'args': promote(list(args)), 'kwargs': promote(kwargs)}))
+        return(method_call)
+
+    def getInfo(self):
+        session.round_trips += 1
+        session.requests.append(serialize(self))
+        return(to_info(evaluate(self)))
+
+    def serialize(self):
+        return(serialize(self))
+
+
+def _cast(cls, value, constructor):
+    """
+    :return: Node of class cls, reusing the node of ComputedObjects as the real client does when casting
+    """
+    # Dates are always constructed, since the real client wraps numbers and strings in a Date call
+    obj = ComputedObject.__new__(cls)
+    if isinstance(value, ComputedObject) and (type(value) is cls or (type(value) is ComputedObject and cls is not Date)):
+        ComputedObject.__init__(obj, value.func, value.args, value.var_name)
+    else:
+        ComputedObject.__init__(obj, constructor, {'args': promote([value] if value is not None else [])})
+    return(obj)
+
+
+def _cast_args(cls, args, constructor):
+    if len(args) == 1:
+        return(_cast(cls, args[0], constructor))
+    obj = ComputedObject.__new__(cls)
+    ComputedObject.__init__(obj, constructor, {'args': promote(list(args))})
+    return(obj)
+
+
+class Image(ComputedObject):
+    def __new__(cls, *args):
+        return(_cast_args(cls, args, 'Image.new'))
+    def __init__(self, *args):
+        pass
+
+
+class ImageCollection(ComputedObject):
+    def __new__(cls, *args):
+        return(_cast_args(cls, args, 'ImageCollection.new'))
+    def __init__(self, *args):
+        pass
+
+
+class Feature(ComputedObject):
+    def __new__(cls, *args):
+        return(_cast_args(cls, args, 'Feature.new'))
+    def __init__(self, *args):
+        pass
+
+
+class FeatureCollection(ComputedObject):
+    def __new__(cls, *args):
+        return(_cast_args(cls, args, 'FeatureCollection.new'))
+    def __init__(self, *args):
+        pass
+
+
+class Number(ComputedObject):
+    def __new__(cls, *args):
+        return(_cast_args(cls, args, 'Number.new'))
+    def __init__(self, *args):
+        pass
+
+
+class String(ComputedObject):
+    def __new__(cls, *args):
+        return(_cast_args(cls, args, 'String.new'))
+    def __init__(self, *args):
+        pass
+
+
+class List(ComputedObject):
+    def __new__(cls, *args):
+        return(_cast_args(cls, args, 'List.new'))
+    def __init__(self, *args):
+        pass
+
+
+class Array(ComputedObject):
+    def __new__(cls, *args):
+        return(_cast_args(cls, args, 'Array.new'))
+    def __init__(self, *args):
+        pass
+
+
+class Dictionary(ComputedObject):
+    def __new__(cls, *args):
+        return(_cast_args(cls, args, 'Dictionary.new'))
+    def __init__(self, *args):
+        pass
+
+
+class Date(ComputedObject):
+    def __new__(cls, *args):
+        return(_cast_args(cls, args, 'Date.new'))
+    def __init__(self, *args):
+        pass
+
+
+class Geometry(ComputedObject):
+    def __new__(cls, *args):
+        return(_cast_args(cls, args, 'Geometry.new'))
+    def __init__(self, *args):
+        pass
+
+
+class Filter(ComputedObject):
+    pass
+
+
+class Reducer(ComputedObject):
+    pass
+
+
+class Join(ComputedObject):
+    pass
+
+
+class Algorithms(ComputedObject):
+    pass
+
+
+def Initialize(*args, **kwargs):
+    pass
+
+
+# ----- Serialization -----
+
+def serialize(obj):
+    """
+    :param obj: e.g. fake ee object
+    :return: Dictionary of {'result': key, 'values': {key: value node}} with structurally identical values stored once
+    """
+    values = {}
+    keys = {}
+    by_id = {}
+
+    def encode(value):
+        if id(value) in by_id:
+            return(by_id[id(value)])
+        if isinstance(value, ComputedObject) and value.var_name is not None:
+            node = {'argumentReference': value.var_name}
+        elif isinstance(value, ComputedObject):
+            arguments = {}
+            if 'this' in value.args:
+                arguments['this'] = encode(value.args['this'])
+            for i, arg in enumerate(value.args.get('args', [])):
+                arguments[f'arg{i}'] = encode(arg)
+            for k, arg in value.args.get('kwargs', {}).items():
+                arguments[k] = encode(arg)
+            node = {'functionInvocationValue': {'functionName': value.func, 'arguments': arguments}}
+        elif isinstance(value, Function):
+            node = {'functionDefinitionValue': {'argumentNames': value.params, 'body': encode(value.body)}}
+        elif isinstance(value, list) and not is_constant(value):
+            node = {'arrayValue': {'values': [encode(v) for v in value]}}
+        elif isinstance(value, dict) and not is_constant(value):
+            node = {'dictionaryValue': {'values': {k: encode(v) for k, v in value.items()}}}
+        else:
+            node = {'constantValue': value}
+
+        # Store structurally identical values once
+        key_json = json.dumps(node, sort_keys = True, default = str)
+        if key_json not in keys:
+            keys[key_json] = str(len(keys))
+            values[keys[key_json]] = node
+        ref = {'valueReference': keys[key_json]}
+        if isinstance(value, (ComputedObject, Function)):
+            by_id[id(value)] = ref
+        return(ref)
+
+    result = encode(obj)
+    return({'result': result.get('valueReference'), 'values': values})
+
+
+def is_constant(value):
+    if isinstance(value, (list, tuple)):
+        return(all(is_constant(v) for v in value))
+    if isinstance(value, dict):
+        return(all(is_constant(v) for v in value.values()))
+    return(not isinstance(value, (ComputedObject, Function)))
+
+
+def graph_stats(obj):
+    """
+    :param obj: e.g. fake ee object, or the output of .serialize()
+    :return: Dictionary of node count, depth and serialized size in bytes of the graph
+    """
+    graph = obj if isinstance(obj, dict) else serialize(obj)
+    values = graph.get('values')
+
+    # Depth of the longest chain of value references, computed iteratively for deep graphs
+    depths = {}
+    def refs(node):
+        found = []
+        def walk(x):
+            if isinstance(x, dict):
+                if 'valueReference' in x:
+                    found.append(x['valueReference'])
+                elif 'constantValue' not in x:
+                    for v in x.values():
+                        walk(v)
+            elif isinstance(x, list):
+                for v in x:
+                    walk(v)
+        walk(node)
+        return(found)
+    for key in sorted(values, key = int):
+        depths[key] = 1 + max([depths.get(ref, 0) for ref in refs(values[key])], default = 0)
+
+    return({'nodes': len(values), 'depth': depths.get(graph.get('result'), 0),
+            'bytes': len(json.dumps(graph, separators = (',', ':'), default = str))})
+
+
+# ----- Values used by the executor -----
+
+class Grid:
+    """
+    Regular lon/lat pixel grid, x0 and y0 are the upper left corner
+    """
+    def __init__(self, x0, y0, dx, width, height, scale):
+        self.x0, self.y0, self.dx, self.width, self.height, self.scale = x0, y0, dx, width, height, scale
+
+    def with_scale(self, scale):
+        return(Grid(self.x0, self.y0, self.dx, self.width, self.height, scale))
+
+
+class ImageValue:
+    """
+    Bands may be given as a function returning them, so synthetic images are only generated when used
+    """
+    def __init__(self, bands, grid, props = None):
+        self._bands = bands if callable(bands) else dict(bands)
+        self.grid = grid
+        self.props = dict(props or {})
+
+    @property
+    def bands(self):
+        if callable(self._bands):
+            self._bands = dict(self._bands())
+        return(self._bands)
+
+    def copy(self, bands = None, props = None, grid = None):
+        return(ImageValue(self._bands if bands is None else bands, grid or self.grid, self.props if props is None else props))
+
+
+class ICValue:
+    def __init__(self, images, props = None):
+        self.images = list(images)
+        self.props = dict(props or {})
+
+
+class GeomValue:
+    """
+    Geometry reduced to its type and bounding box, synthetic features are rectangles or points
+    """
+    def __init__(self, geom_type, bbox):
+        self.type = geom_type
+        self.bbox = tuple(float(b) for b in bbox)
+
+    def area(self):
+        if self.type not in ['Polygon', 'MultiPolygon']:
+            return(0.0)
+        xmin, ymin, xmax, ymax = self.bbox
+        return((xmax - xmin) * (ymax - ymin) * meters_per_degree ** 2 * math.cos(math.radians((ymin + ymax) / 2)))
+
+    def perimeter(self):
+        if self.type not in ['Polygon', 'MultiPolygon']:
+            return(0.0)
+        xmin, ymin, xmax, ymax = self.bbox
+        return(2 * ((xmax - xmin) * math.cos(math.radians((ymin + ymax) / 2)) + (ymax - ymin)) * meters_per_degree)
+
+    def centroid(self):
+        xmin, ymin, xmax, ymax = self.bbox
+        return(GeomValue('Point', ((xmin + xmax) / 2, (ymin + ymax) / 2) * 2))
+
+
+class FeatureValue:
+    def __init__(self, geom, props = None):
+        self.geom = geom
+        self.props = dict(props or {})
+
+
+class FCValue:
+    def __init__(self, features, props = None):
+        self.features = list(features)
+        self.props = dict(props or {})
+
+
+class DateValue:
+    def __init__(self, millis):
+        self.millis = int(millis)
+
+    def dt(self):
+        return(datetime.datetime(1970, 1, 1) + datetime.timedelta(milliseconds = self.millis))
+
+
+class FilterValue:
+    def __init__(self, predicate, fields = None):
+        self.predicate = predicate
+        self.fields = fields
+
+
+class ReducerValue:
+    def __init__(self, kind, outputs, fn, n_inputs = 1):
+        self.kind = kind
+        self.outputs = outputs
+        self.fn = fn
+        self.n_inputs = n_inputs
+
+
+class JoinValue:
+    def __init__(self, match_key, outer = False):
+        self.match_key = match_key
+        self.outer = outer
+
+
+class ProjectionValue:
+    def __init__(self, scale):
+        self.scale = scale
+
+
+# ----- Execution -----
+
+def free_vars(obj, memo):
+    if id(obj) in memo:
+        return(memo[id(obj)][1])
+    if isinstance(obj, ComputedObject):
+        if obj.var_name is not None:
+            result = frozenset([obj.var_name])
+        else:
+            result = frozenset().union(*[free_vars(v, memo) for v in obj.args.values()])
+    elif isinstance(obj, Function):
+        result = free_vars(obj.body, memo) - frozenset(obj.params)
+    elif isinstance(obj, (list, tuple)):
+        result = frozenset().union(*[free_vars(v, memo) for v in obj])
+    elif isinstance(obj, dict):
+        result = frozenset().union(*[free_vars(v, memo) for v in obj.values()])
+    else:
+        result = frozenset()
+    if isinstance(obj, (ComputedObject, Function, list, dict)):
+        memo[id(obj)] = (obj, result)
+    return(result)
+
+
+class Executor:
+    """
+    Evaluates graphs with NumPy. Values that do not depend on a mapped variable are computed once.
+    """
+    def __init__(self):
+        self.cache = {}
+        self.free = {}
+
+    def evaluate(self, obj, env = None):
+        env = env or {}
+        if isinstance(obj, ComputedObject):
+            if obj.var_name is not None:
+                return(env[obj.var_name])
+            constant = len(free_vars(obj, self.free)) == 0
+            if constant and id(obj) in self.cache:
+                return(self.cache[id(obj)][1])
+            value = self.invoke(obj, env)
+
+            # Casts such as ee.FeatureCollection(list) reuse the node, so convert the value to the cast type
+            if type(obj) in coercions:
+                value = coercions[type(obj)](value)
+            if constant:
+                self.cache[id(obj)] = (obj, value)
+            return(value)
+        if isinstance(obj, Function):
+            def call(*values):
+                return(self.evaluate(obj.body, dict(env, **dict(zip(obj.params, values)))))
+            return(call)
+        if isinstance(obj, (list, tuple)):
+            return([self.evaluate(v, env) for v in obj])
+        if isinstance(obj, dict):
+            return({k: self.evaluate(v, env) for k, v in obj.items()})
+        return(obj)
+
+    def invoke(self, node, env):
+        # Conditionals only evaluate the branch taken
+        if node.func == 'Algorithms.If':
+            args = list(node.args.get('args')) + [node.args.get('kwargs').get(k) for k in ['condition', 'trueCase', 'falseCase'] if k in node.args.get('kwargs')]
+            condition = self.evaluate(args[0], env)
+            return(self.evaluate(args[1] if truthy(condition) else args[2], env))
+
+        args = self.evaluate(node.args.get('args', []), env)
+        kwargs = self.evaluate(node.args.get('kwargs', {}), env)
+        kind, name = node.func.split('.', 1)
+
+        if 'this' in node.args:
+            this = self.evaluate(node.args['this'], env)
+            op = method_ops.get((value_kind(this), name)) or method_ops.get(('Any', name))
+            if op is None:
+                raise NotImplementedError(f'{value_kind(this)}.{name} is not supported by the fake backend')
+            return(op(this, *args, **kwargs))
+
+        op = static_ops.get(node.func)
+        if op is None:
+            raise NotImplementedError(f'{node.func} is not supported by the fake backend')
+        return(op(*args, **kwargs))
+
+
+def evaluate(obj):
+    """
+    :param obj: e.g. fake ee object
+    :return: Computed value, e.g. ImageValue, FCValue, number, string, list or dictionary
+    """
+    return(Executor().evaluate(obj))
+
+
+def truthy(value):
+    return(value is not None and value is not False and value != 0 and value != '' and value != [])
+
+
+def value_kind(value):
+    if isinstance(value, ImageValue): return('Image')
+    if isinstance(value, ICValue): return('ImageCollection')
+    if isinstance(value, FeatureValue): return('Feature')
+    if isinstance(value, FCValue): return('FeatureCollection')
+    if isinstance(value, GeomValue): return('Geometry')
+    if isinstance(value, DateValue): return('Date')
+    if isinstance(value, ReducerValue): return('Reducer')
+    if isinstance(value, JoinValue): return('Join')
+    if isinstance(value, ProjectionValue): return('Projection')
+    if isinstance(value, FilterValue): return('Filter')
+    if isinstance(value, bool) or isinstance(value, (int, float, np.integer, np.floating)): return('Number')
+    if isinstance(value, str): return('String')
+    if isinstance(value, np.ndarray): return('Array')
+    if isinstance(value, list): return('List')
+    if isinstance(value, dict): return('Dictionary')
+    return('Any')
+
+
+def to_info(value):
+    """
+    :return: JSON-like client-side representation of a computed value, as getInfo() returns
+    """
+    if isinstance(value, ImageValue):
+        return({'type': 'Image', 'bands': [{'id': b} for b in value.bands], 'properties': value.props})
+    if isinstance(value, ICValue):
+        return({'type': 'ImageCollection', 'features': [to_info(i) for i in value.images], 'properties': value.props})
+    if isinstance(value, FeatureValue):
+        return({'type': 'Feature', 'geometry': to_info(value.geom), 'properties': value.props})
+    if isinstance(value, FCValue):
+        return({'type': 'FeatureCollection', 'features': [to_info(f) for f in value.features], 'properties': value.props})
+    if isinstance(value, GeomValue):
+        return({'type': value.type, 'bbox': list(value.bbox)})
+    if isinstance(value, DateValue):
+        return({'type': 'Date', 'value': value.millis})
+    if isinstance(value, np.ndarray):
+        return(value.tolist())
+    if isinstance(value, list):
+        return([to_info(v) for v in value])
+    if isinstance(value, dict):
+        return({k: to_info(v) for k, v in value.items()})
+    if isinstance(value, np.generic):
+        return(value.item())
+    return(value)
+
+
+# ----- Operations -----
+
+method_ops = {}
+static_ops = {}
+
+
+def method(kind, *names):
+    def register(fn):
+        for name in names:
+            method_ops[(kind, name)] = fn
+        return(fn)
+    return(register)
+
+
+def static(*names):
+    def register(fn):
+        for name in names:
+            static_ops[name] = fn
+        return(fn)
+    return(register)
+
+
+def as_millis(value):
+    if isinstance(value, DateValue):
+        return(value.millis)
+    if isinstance(value, str):
+        return(parse_date(value).millis)
+    if isinstance(value, datetime.datetime):
+        return(int((value - datetime.datetime(1970, 1, 1)).total_seconds() * 1000))
+    return(int(value))
+
+
+def parse_date(value, fmt = None):
+    if fmt == 'YYYYD':
+        return(DateValue(as_millis(datetime.datetime(int(value[:4]), 1, 1) + datetime.timedelta(days = int(value[4:]) - 1))))
+    if re.fullmatch(r'\d{4}', value):
+        return(DateValue(as_millis(datetime.datetime(int(value), 1, 1))))
+    return(DateValue(as_millis(datetime.datetime.fromisoformat(value))))
+
+
+def format_date(date, fmt):
+    dt = date.dt()
+    tokens = {'YYYY': f'{dt.year:04d}', 'yyyy': f'{dt.year:04d}', 'MM': f'{dt.month:02d}', 'dd': f'{dt.day:02d}',
+              'DDD': f'{dt.timetuple().tm_yday:03d}', 'D': str(dt.timetuple().tm_yday)}
+    return(re.sub('YYYY|yyyy|MM|dd|DDD|D', lambda m: tokens[m.group(0)], fmt))
+
+
+# Constructors
+
+@static('Image.new')
+def image_new(value = None):
+    if isinstance(value, ImageValue):
+        return(value)
+    if isinstance(value, str):
+        return(load_asset(value))
+    if value is None:
+        return(None)
+    raise NotImplementedError('Constant images are not supported by the fake backend')
+
+
+@static('ImageCollection.new')
+def ic_new(value = None):
+    if isinstance(value, ICValue):
+        return(value)
+    if isinstance(value, str):
+        return(load_asset(value))
+    return(ICValue(value or []))
+
+
+@static('Feature.new')
+def feature_new(geom = None, props = None):
+    if isinstance(geom, FeatureValue):
+        return(geom)
+    if isinstance(geom, dict) and geom.get('type') == 'Feature':
+        return(FeatureValue(None, geom.get('properties')))
+    return(FeatureValue(geom, props))
+
+
+@static('FeatureCollection.new')
+def fc_new(value = None):
+    if isinstance(value, FCValue):
+        return(value)
+    if isinstance(value, str):
+        return(load_asset(value))
+    if isinstance(value, FeatureValue):
+        return(FCValue([value]))
+
+    # Image collections mapped to features are collections of those features
+    if isinstance(value, ICValue):
+        return(FCValue(value.images, value.props))
+    return(FCValue(value or []))
+
+
+@static('Number.new', 'String.new')
+def passthrough_new(value):
+    return(value)
+
+
+@static('List.new')
+def list_new(value):
+    return(list(value))
+
+
+@static('Dictionary.new')
+def dict_new(value = None):
+    return(dict(value or {}))
+
+
+@static('Date.new')
+def date_new(value):
+    return(DateValue(as_millis(value)))
+
+
+@static('Date.parse')
+def date_parse(fmt, value):
+    return(parse_date(value, fmt))
+
+
+@static('Number.parse')
+def number_parse(value):
+    number = float(value)
+    return(int(number) if number.is_integer() else number)
+
+
+@static('List.sequence')
+def list_sequence(start, end = None, step = 1, count = None):
+    if count is not None:
+        return([start + step * i for i in range(int(count))])
+    n = int(math.floor((end - start) / step)) + 1
+    return([start + step * i for i in range(max(n, 0))])
+
+
+@static('List.repeat')
+def list_repeat(value, count):
+    return([value] * int(count))
+
+
+@static('Dictionary.fromLists')
+def dict_from_lists(keys, values):
+    return(dict(zip(keys, values)))
+
+
+@static('Algorithms.IsEqual')
+def is_equal(a, b):
+    return(int(a == b))
+
+
+@static('Geometry.Point')
+def geometry_point(coords, proj = None):
+    return(GeomValue('Point', (coords[0], coords[1], coords[0], coords[1])))
+
+
+@static('Geometry.LineString')
+def geometry_linestring(coords, proj = None):
+    xs = [c[0] for c in coords]
+    ys = [c[1] for c in coords]
+    return(GeomValue('LineString', (min(xs), min(ys), max(xs), max(ys))))
+
+
+@static('Geometry.Rectangle')
+def geometry_rectangle(coords, proj = None):
+    return(GeomValue('Polygon', coords))
+
+
+# Filters
+
+@static('Filter.eq')
+def filter_eq(name, value):
+    return(FilterValue(lambda props: props.get(name) == value))
+
+
+@static('Filter.neq')
+def filter_neq(name, value):
+    return(FilterValue(lambda props: props.get(name) != value))
+
+
+@static('Filter.notNull')
+def filter_not_null(names):
+    return(FilterValue(lambda props: all(props.get(name) is not None for name in names)))
+
+
+@static('Filter.inList')
+def filter_in_list(name, values):
+    values = set(values)
+    return(FilterValue(lambda props: props.get(name) in values))
+
+
+@method('Filter', 'Not')
+def filter_not(flt):
+    return(FilterValue(lambda props: not flt.predicate(props)))
+
+
+@static('Filter.equals')
+def filter_equals(leftField = None, rightValue = None, rightField = None, leftValue = None):
+    return(FilterValue(None, fields = (leftField, rightField)))
+
+
+# Reducers
+
+def percentile_fn(percentiles):
+    def fn(values):
+        if len(values) == 0:
+            return({f'p{p}': None for p in percentiles})
+        q = np.percentile(values, percentiles, method = 'nearest')
+        return({f'p{p}': float(v) for p, v in zip(percentiles, q)})
+    return(fn)
+
+
+@static('Reducer.percentile')
+def reducer_percentile(percentiles, outputNames = None, maxBuckets = None, minBucketWidth = None, maxRaw = None):
+    fn = percentile_fn(percentiles)
+    if minBucketWidth is None:
+        return(ReducerValue('percentile', [f'p{p}' for p in percentiles], fn))
+
+    # Beyond maxRaw values percentiles come from buckets, approximated here by the bucket centers
+    def bucket_fn(values):
+        values = np.asarray(values)
+        if maxRaw is not None and len(values) <= maxRaw:
+            return(fn(values))
+        return(fn((np.floor(values / minBucketWidth) + 0.5) * minBucketWidth))
+    return(ReducerValue('percentile', [f'p{p}' for p in percentiles], bucket_fn))
+
+
+@static('Reducer.mean')
+def reducer_mean():
+    return(ReducerValue('mean', ['mean'], lambda v: {'mean': float(np.mean(v)) if len(v) else None}))
+
+
+@static('Reducer.sum')
+def reducer_sum():
+    return(ReducerValue('sum', ['sum'], lambda v: {'sum': float(np.sum(v))}))
+
+
+@static('Reducer.stdDev')
+def reducer_std_dev():
+    return(ReducerValue('stdDev', ['stdDev'], lambda v: {'stdDev': float(np.std(v)) if len(v) else None}))
+
+
+@static('Reducer.median')
+def reducer_median():
+    return(ReducerValue('median', ['median'], lambda v: {'median': float(np.median(v)) if len(v) else None}))
+
+
+@static('Reducer.max')
+def reducer_max():
+    return(ReducerValue('max', ['max'], lambda v: {'max': float(np.max(v)) if len(v) else None}))
+
+
+@static('Reducer.count')
+def reducer_count():
+    return(ReducerValue('count', ['count'], lambda v: {'count': len(v)}))
+
+
+def histogram_key(v):
+    return(str(int(v)) if float(v).is_integer() else repr(float(v)))
+
+
+@static('Reducer.frequencyHistogram')
+def reducer_frequency_histogram():
+    def fn(values):
+        keys, counts = np.unique(values, return_counts = True)
+        return({'histogram': {histogram_key(k): int(c) for k, c in zip(keys, counts)}})
+    return(ReducerValue('frequencyHistogram', ['histogram'], fn))
+
+
+@static('Reducer.fixedHistogram')
+def reducer_fixed_histogram(min, max, steps, cumulative = False):
+    def fn(values):
+        counts, edges = np.histogram(values, bins = int(steps), range = (min, max))
+        return({'histogram': np.stack([edges[:-1], counts]).T.tolist()})
+    return(ReducerValue('fixedHistogram', ['histogram'], fn))
+
+
+@method('Reducer', 'combine')
+def reducer_combine(reducer, reducer2, outputPrefix = '', sharedInputs = False):
+    outputs = reducer.outputs + [outputPrefix + o for o in reducer2.outputs]
+    if sharedInputs:
+        def fn(values):
+            return(dict(reducer.fn(values), **{outputPrefix + k: v for k, v in reducer2.fn(values).items()}))
+        return(ReducerValue('combined', outputs, fn, reducer.n_inputs))
+
+    # Without shared inputs the first reducer takes the first inputs and the second the rest, one band each
+    def take(r, values):
+        return(values[0] if r.n_inputs == 1 else values)
+    def fn(values):
+        first, second = values[:reducer.n_inputs], values[reducer.n_inputs:]
+        return(dict(reducer.fn(take(reducer, first)), **{outputPrefix + k: v for k, v in reducer2.fn(take(reducer2, second)).items()}))
+    return(ReducerValue('combined', outputs, fn, reducer.n_inputs + reducer2.n_inputs))
+
+
+# Joins
+
+@static('Join.saveFirst')
+def join_save_first(matchKey, ordering = None, ascending = True, measureKey = None, outer = False):
+    return(JoinValue(matchKey, outer))
+
+
+@method('Join', 'apply')
+def join_apply(join, primary, secondary, condition):
+    left_field, right_field = condition.fields
+    index = {}
+    for f in secondary.features:
+        index.setdefault(f.props.get(right_field), f)
+    features = [FeatureValue(f.geom, dict(f.props, **{join.match_key: index[f.props.get(left_field)]})) if f.props.get(left_field) in index else f
+                for f in primary.features if join.outer or f.props.get(left_field) in index]
+    return(FCValue(features))
+
+
+# Numbers
+
+number_binary = {'add': lambda a, b: a + b, 'subtract': lambda a, b: a - b, 'multiply': lambda a, b: a * b,
+                 'divide': lambda a, b: a / b if b != 0 else 0, 'pow': lambda a, b: a ** b,
+                 'max': max, 'min': min, 'gt': lambda a, b: int(a > b), 'gte': lambda a, b: int(a >= b),
+                 'lt': lambda a, b: int(a < b), 'lte': lambda a, b: int(a <= b), 'eq': lambda a, b: int(a == b),
+                 'neq': lambda a, b: int(a != b), 'And': lambda a, b: int(bool(a) and bool(b)), 'Or': lambda a, b: int(bool(a) or bool(b))}
+for _name, _fn in number_binary.items():
+    method_ops[('Number', _name)] = (lambda fn: lambda a, b: fn(a, b))(_fn)
+
+
+@method('Number', 'round')
+def number_round(a):
+    return(float(math.floor(a + 0.5)))
+
+
+@method('Number', 'toInt', 'toInt64', 'int', 'long')
+def number_to_int(a):
+    return(int(a))
+
+
+@method('Number', 'toFloat', 'float', 'double')
+def number_to_float(a):
+    return(float(a))
+
+
+@method('Number', 'format')
+def number_format(a, pattern = None):
+    if pattern is None:
+        return(str(int(a)) if float(a).is_integer() else repr(float(a)))
+    return(pattern % a)
+
+
+# Strings
+
+@method('String', 'cat')
+def string_cat(a, b):
+    return(a + str(b))
+
+
+@method('String', 'replace')
+def string_replace(a, regex, replacement, flags = ''):
+    return(re.sub(regex, replacement, a, count = 0 if 'g' in flags else 1))
+
+
+@method('String', 'slice')
+def string_slice(a, start, end = None):
+    return(a[start:end])
+
+
+@method('String', 'compareTo')
+def string_compare(a, b):
+    return((a > b) - (a < b))
+
+
+@method('String', 'length')
+def string_length(a):
+    return(len(a))
+
+
+# Lists
+
+@method('List', 'map')
+def list_map(values, fn, dropNulls = False):
+    out = [fn(v) for v in values]
+    return([v for v in out if v is not None] if dropNulls else out)
+
+
+@method('List', 'get')
+def list_get(values, index):
+    return(values[int(index)])
+
+
+@method('List', 'add')
+def list_add(values, value):
+    return(values + [value])
+
+
+@method('List', 'cat')
+def list_cat(values, other):
+    return(values + list(other))
+
+
+@method('List', 'flatten')
+def list_flatten(values):
+    return([v for value in values for v in (list_flatten(value) if isinstance(value, list) else [value])])
+
+
+@method('List', 'size', 'length')
+def list_size(values):
+    return(len(values))
+
+
+@method('List', 'remove')
+def list_remove(values, value):
+    out = list(values)
+    if value in out:
+        out.remove(value)
+    return(out)
+
+
+@method('List', 'indexOf')
+def list_index_of(values, value):
+    return(values.index(value) if value in values else -1)
+
+
+@method('List', 'contains')
+def list_contains(values, value):
+    return(int(value in values))
+
+
+@method('List', 'iterate')
+def list_iterate(values, fn, first):
+    accum = first
+    for v in values:
+        accum = fn(v, accum)
+    return(accum)
+
+
+@method('List', 'join')
+def list_join(values, separator = ', '):
+    return(separator.join(str(v) for v in values))
+
+
+@method('List', 'distinct')
+def list_distinct(values):
+    return(list(dict.fromkeys(values)))
+
+
+@method('List', 'slice')
+def list_slice(values, start, end = None, step = None):
+    return(values[start:end:step])
+
+
+# Dictionaries
+
+@static('Array.new')
+def array_new(values, pixelType = None):
+    return(np.asarray(values, dtype = float))
+
+
+@method('Array', 'slice')
+def array_slice(a, axis = 0, start = 0, end = None, step = 1):
+    index = [slice(None)] * a.ndim
+    index[axis] = slice(start, end, step)
+    return(a[tuple(index)])
+
+
+@method('Array', 'project')
+def array_project(a, axes):
+    return(a.reshape([a.shape[axis] for axis in axes]))
+
+
+@method('Array', 'accum')
+def array_accum(a, axis, reducer = None):
+    return(np.cumsum(a, axis = axis))
+
+
+@method('Array', 'lte')
+def array_lte(a, right):
+    return((a <= right).astype(float))
+
+
+@method('Array', 'reduce')
+def array_reduce(a, reducer, axes, fieldAxis = None):
+    if reducer.kind != 'sum':
+        raise NotImplementedError(f'Array.reduce with {reducer.kind} is not supported by the fake backend')
+    return(np.sum(a, axis = tuple(axes), keepdims = True).reshape([1 if axis in axes else n for axis, n in enumerate(a.shape)]))
+
+
+@method('Array', 'get')
+def array_get(a, position):
+    return(float(a[tuple(position)]))
+
+
+@method('Array', 'toList')
+def array_to_list(a):
+    return(a.tolist())
+
+
+@method('Dictionary', 'get')
+def dict_get(d, key, defaultValue = None):
+    return(d.get(key, defaultValue))
+
+
+@method('Dictionary', 'keys')
+def dict_keys(d):
+    return(sorted(d.keys()))
+
+
+@method('Dictionary', 'values')
+def dict_values(d, keys = None):
+    return([d[k] for k in (keys or sorted(d.keys()))])
+
+
+@method('Dictionary', 'rename')
+def dict_rename(d, from_keys, to_keys, overwrite = False):
+    out = dict(d)
+    for f, t in zip(from_keys, to_keys):
+        out[t] = out.pop(f)
+    return(out)
+
+
+@method('Dictionary', 'remove')
+def dict_remove(d, keys, ignoreMissing = False):
+    return({k: v for k, v in d.items() if k not in keys})
+
+
+@method('Dictionary', 'set')
+def dict_set(d, key, value):
+    return(dict(d, **{key: value}))
+
+
+@method('Dictionary', 'contains')
+def dict_contains(d, key):
+    return(int(key in d))
+
+
+@method('Dictionary', 'size')
+def dict_size(d):
+    return(len(d))
+
+
+# Dates
+
+@method('Date', 'advance')
+def date_advance(date, delta, unit, timeZone = None):
+    dt = date.dt()
+    if unit == 'year':
+        dt = dt.replace(year = dt.year + int(delta))
+    elif unit == 'month':
+        months = dt.year * 12 + dt.month - 1 + int(delta)
+        dt = dt.replace(year = months // 12, month = months % 12 + 1)
+    else:
+        dt = dt + datetime.timedelta(**{f'{unit}s': delta})
+    return(DateValue(as_millis(dt)))
+
+
+@method('Date', 'format')
+def date_format(date, fmt = None, timeZone = None):
+    return(format_date(date, fmt or 'YYYY-MM-dd'))
+
+
+@method('Date', 'millis')
+def date_millis(date):
+    return(date.millis)
+
+
+# Objects with properties
+
+@method('Any', 'get')
+def element_get(element, name, defaultValue = None):
+    return(element.props.get(name, defaultValue))
+
+
+@method('Any', 'set')
+def element_set(element, *args):
+    props = args[0] if len(args) == 1 else dict(zip(args[0::2], args[1::2]))
+    if isinstance(element, ImageValue):
+        return(element.copy(props = dict(element.props, **props)))
+    if isinstance(element, FeatureValue):
+        return(FeatureValue(element.geom, dict(element.props, **props)))
+    if isinstance(element, FCValue):
+        return(FCValue(element.features, dict(element.props, **props)))
+    return(ICValue(element.images, dict(element.props, **props)))
+
+
+@method('Any', 'copyProperties')
+def element_copy_properties(element, source = None, properties = None, exclude = None):
+    props = dict(source.props) if properties is None else {p: source.props.get(p) for p in properties if p in source.props}
+    return(element_set(element, props))
+
+
+@method('Any', 'propertyNames')
+def element_property_names(element):
+    return(['system:index'] + [p for p in element.props if p != 'system:index'])
+
+
+@method('Any', 'toDictionary')
+def element_to_dictionary(element, properties = None):
+    props = {k: v for k, v in element.props.items() if not k.startswith('system:')}
+    return(props if properties is None else {p: props[p] for p in properties if p in props})
+
+
+# Geometries and features
+
+@method('Feature', 'geometry')
+def feature_geometry(feature, maxError = None, proj = None, geodesics = None):
+    return(feature.geom)
+
+
+@method('Feature', 'area')
+def feature_area(feature, maxError = None, proj = None):
+    return(feature.geom.area())
+
+
+@method('Geometry', 'area')
+def geometry_area(geom, maxError = None, proj = None):
+    return(geom.area())
+
+
+@method('Geometry', 'perimeter')
+def geometry_perimeter(geom, maxError = None, proj = None):
+    return(geom.perimeter())
+
+
+@method('Feature', 'centroid')
+def feature_centroid(feature, maxError = None, proj = None):
+    return(FeatureValue(feature.geom.centroid(), feature.props))
+
+
+@method('Geometry', 'centroid')
+def geometry_centroid(geom, maxError = None, proj = None):
+    return(geom.centroid())
+
+
+@method('Feature', 'simplify')
+def feature_simplify(feature, maxError = None, proj = None):
+    return(feature)
+
+
+@method('Geometry', 'buffer')
+def geometry_buffer(geom, distance, maxError = None, proj = None):
+    d = distance / meters_per_degree
+    xmin, ymin, xmax, ymax = geom.bbox
+    return(GeomValue('Polygon', (xmin - d, ymin - d, xmax + d, ymax + d)))
+
+
+@method('Geometry', 'bounds', 'convexHull', 'simplify')
+def geometry_bounds(geom, maxError = None, proj = None):
+    return(GeomValue('Polygon', geom.bbox))
+
+
+@method('Geometry', 'coordinates')
+def geometry_coordinates(geom):
+    xmin, ymin, xmax, ymax = geom.bbox
+    if geom.type == 'Point':
+        return([xmin, ymin])
+    return([[[xmin, ymin], [xmax, ymin], [xmax, ymax], [xmin, ymax], [xmin, ymin]]])
+
+
+def select_names(names, selectors):
+    """
+    :return: Names fully matching any of the regular expression selectors, in the order of names
+    """
+    patterns = [re.compile(s) for s in selectors]
+    return([n for n in names if any(p.fullmatch(n) for p in patterns)])
+
+
+@method('Feature', 'select')
+def feature_select(feature, propertySelectors, newProperties = None, retainGeometry = True):
+    names = select_names([p for p in feature.props if not p.startswith('system:')], propertySelectors)
+    new_names = newProperties or names
+
+    # The feature ID is kept, as in Earth Engine where it is not a selectable property
+    props = {n: feature.props[o] for o, n in zip(names, new_names)}
+    if 'system:index' in feature.props:
+        props['system:index'] = feature.props.get('system:index')
+    return(FeatureValue(feature.geom if retainGeometry else None, props))
+
+
+# Feature collections
+
+def union_bbox(geoms):
+    boxes = np.array([g.bbox for g in geoms if g is not None])
+    if len(boxes) == 0:
+        return(GeomValue('MultiPolygon', (0, 0, 0, 0)))
+    return(GeomValue('MultiPolygon', (boxes[:, 0].min(), boxes[:, 1].min(), boxes[:, 2].max(), boxes[:, 3].max())))
+
+
+@method('FeatureCollection', 'map')
+def fc_map(fc, fn, dropNulls = False):
+    features = [(fn(f), f) for f in fc.features]
+    return(FCValue([keep_index(out, f) for out, f in features if out is not None or not dropNulls], fc.props))
+
+
+@method('FeatureCollection', 'filter')
+def fc_filter(fc, flt):
+    return(FCValue([f for f in fc.features if flt.predicate(f.props)], fc.props))
+
+
+@method('FeatureCollection', 'filterBounds')
+def fc_filter_bounds(fc, geom):
+    return(FCValue([f for f in fc.features if bbox_intersects(f.geom.bbox, geom.bbox)], fc.props))
+
+
+@method('FeatureCollection', 'select')
+def fc_select(fc, propertySelectors, newProperties = None, retainGeometry = True):
+    return(FCValue([feature_select(f, propertySelectors, newProperties, retainGeometry) for f in fc.features], fc.props))
+
+
+@method('FeatureCollection', 'merge')
+def fc_merge(fc, collection2):
+    def prefix(features, p):
+        return([element_set(f, {'system:index': f"{p}_{f.props.get('system:index')}"}) if 'system:index' in f.props else f for f in features])
+    return(FCValue(prefix(fc.features, 1) + prefix(collection2.features, 2), fc.props))
+
+
+@method('FeatureCollection', 'size')
+def fc_size(fc):
+    return(len(fc.features))
+
+
+@method('FeatureCollection', 'toList')
+def fc_to_list(fc, count, offset = 0):
+    return(fc.features[offset:offset + int(count)])
+
+
+@method('FeatureCollection', 'first')
+def fc_first(fc):
+    return(fc.features[0] if fc.features else None)
+
+
+@method('FeatureCollection', 'geometry')
+def fc_geometry(fc, maxError = None):
+    return(union_bbox([f.geom for f in fc.features]))
+
+
+@method('FeatureCollection', 'aggregate_array')
+def fc_aggregate_array(fc, prop):
+    return([f.props.get(prop) for f in fc.features if f.props.get(prop) is not None])
+
+
+@method('FeatureCollection', 'reduceToImage')
+def fc_reduce_to_image(fc, properties, reducer):
+    # Rasterize point features onto the equator layout
+    prop = properties[0]
+    cols, rows, values = [], [], []
+    for f in fc.features:
+        value = f.props.get(prop)
+        if value is None or f.geom is None:
+            continue
+        cols.append(int(round(f.geom.bbox[0] / equator_dx)))
+        values.append(value)
+    width = max(cols) + 1 if cols else 1
+    sums = np.zeros(width)
+    counts = np.zeros(width)
+    np.add.at(sums, cols, values)
+    np.add.at(counts, cols, 1)
+    data = np.ma.masked_array(np.divide(sums, np.maximum(counts, 1)), mask = counts == 0).reshape(1, width)
+    grid = Grid(-equator_dx / 2, equator_dx * 1.5, equator_dx, width, 1, 22.264)
+    return(ImageValue({reducer.outputs[0]: data}, grid))
+
+
+def bbox_intersects(a, b):
+    return(a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3])
+
+
+# Images
+
+def image_operand(img, other):
+    """
+    :return: List of arrays, one per band of img, to combine with the bands of img
+    """
+    n = len(img.bands)
+    if isinstance(other, ImageValue):
+        arrays = align(list(other.bands.values()), img)
+        return(arrays * n if len(arrays) == 1 else arrays)
+    if isinstance(other, list):
+        return(other)
+    return([other] * n)
+
+
+def align(arrays, img):
+    """
+    :return: Arrays padded with masked pixels to the shape of img, for equator images of different widths
+    """
+    shape = next(iter(img.bands.values())).shape if img.bands else None
+    out = []
+    for a in arrays:
+        if shape is not None and a.shape != shape:
+            padded = np.ma.masked_all(shape)
+            padded[:a.shape[0], :a.shape[1]] = a[:shape[0], :shape[1]]
+            a = padded
+        out.append(a)
+    return(out)
+
+
+def band_op(fn, dtype = None):
+    def op(img, other):
+        operands = image_operand(img, other)
+        bands = {}
+        for (name, a), b in zip(img.bands.items(), operands):
+            out = fn(a, b)
+            bands[name] = out.astype(dtype) if dtype is not None else out
+        return(img.copy(bands = bands))
+    return(op)
+
+
+image_binary = {'add': np.ma.add, 'subtract': np.ma.subtract, 'multiply': np.ma.multiply, 'divide': np.ma.divide,
+                'pow': np.ma.power, 'max': np.ma.maximum, 'min': np.ma.minimum}
+image_compare = {'lt': np.ma.less, 'lte': np.ma.less_equal, 'gt': np.ma.greater, 'gte': np.ma.greater_equal,
+                 'eq': np.ma.equal, 'neq': np.ma.not_equal, 'And': np.ma.logical_and, 'Or': np.ma.logical_or}
+for _name, _fn in image_binary.items():
+    method_ops[('Image', _name)] = band_op(_fn)
+for _name, _fn in image_compare.items():
+    method_ops[('Image', _name)] = band_op(_fn, dtype = np.int8)
+method_ops[('Image', 'rightShift')] = band_op(lambda a, b: np.ma.right_shift(a.astype(np.int64), int(b)))
+method_ops[('Image', 'bitwiseAnd')] = band_op(lambda a, b: np.ma.bitwise_and(a.astype(np.int64), int(b)))
+
+
+@method('Image', 'Not')
+def image_not(img):
+    return(img.copy(bands = {n: np.ma.logical_not(a).astype(np.int8) for n, a in img.bands.items()}))
+
+
+@method('Image', 'floor')
+def image_floor(img):
+    return(img.copy(bands = {n: np.ma.floor(a) for n, a in img.bands.items()}))
+
+
+@method('Image', 'clamp')
+def image_clamp(img, low, high):
+    return(img.copy(bands = {n: np.ma.clip(a, low, high) for n, a in img.bands.items()}))
+
+
+@method('Image', 'toInt', 'int', 'toInt32')
+def image_to_int(img):
+    return(img.copy(bands = {n: a.astype(np.int64) for n, a in img.bands.items()}))
+
+
+@method('Image', 'where')
+def image_where(img, test, value):
+    tests = image_operand(img, test)
+    values = image_operand(img, value)
+    bands = {}
+    for (name, a), t, v in zip(img.bands.items(), tests, values):
+        t = np.ma.filled(t, 0).astype(bool)
+        out = np.ma.array(a, dtype = float, copy = True)
+        out[t] = v[t] if isinstance(v, np.ndarray) else v
+        bands[name] = out
+    return(img.copy(bands = bands))
+
+
+@method('Image', 'updateMask')
+def image_update_mask(img, mask):
+    masks = image_operand(img, mask)
+    bands = {}
+    for (name, a), m in zip(img.bands.items(), masks):
+        m = np.ma.filled(m, 0) == 0
+        bands[name] = np.ma.masked_array(a, mask = np.ma.getmaskarray(a) | m)
+    return(img.copy(bands = bands))
+
+
+@method('Image', 'mask')
+def image_mask(img):
+    return(img.copy(bands = {n: np.ma.masked_array((~np.ma.getmaskarray(a)).astype(np.int8)) for n, a in img.bands.items()}))
+
+
+@method('Image', 'unmask')
+def image_unmask(img, value = 0, sameFootprint = True):
+    return(img.copy(bands = {n: np.ma.masked_array(np.ma.filled(a, value)) for n, a in img.bands.items()}))
+
+
+@method('Image', 'select')
+def image_select(img, *args, **kwargs):
+    selectors = kwargs.get('bandSelectors', args[0] if args else [])
+    new_names = kwargs.get('newNames', args[1] if len(args) > 1 else None)
+    if not isinstance(selectors, list):
+        selectors = [selectors]
+    names = list(img.bands)
+    selected = []
+    for s in selectors:
+        if isinstance(s, int):
+            selected.append(names[s])
+        else:
+            selected.extend(n for n in names if re.fullmatch(s, n) and n not in selected)
+    new_names = new_names or selected
+    return(img.copy(bands = {n: img.bands[o] for o, n in zip(selected, new_names)}))
+
+
+@method('Image', 'rename')
+def image_rename(img, *names):
+    names = names[0] if len(names) == 1 and isinstance(names[0], list) else list(names)
+    return(img.copy(bands = dict(zip(names, img.bands.values()))))
+
+
+@method('Image', 'addBands')
+def image_add_bands(img, srcImg, names = None, overwrite = False):
+    bands = dict(img.bands)
+    for name, a in srcImg.bands.items():
+
+        # Keep both bands when names collide so they can still be selected by position
+        if name in bands and not overwrite:
+            name = f'{name}_{len(bands)}'
+        bands[name] = align([a], img)[0] if img.bands else a
+    return(img.copy(bands = bands))
+
+
+@method('Image', 'geometry')
+def image_geometry(img, maxError = None, proj = None, geodesics = None):
+    # Footprint of the grid of the image
+    g = img.grid
+    return(GeomValue('Polygon', (g.x0, g.y0 - g.height * g.dx, g.x0 + g.width * g.dx, g.y0)))
+
+
+@method('Image', 'bandNames')
+def image_band_names(img):
+    return(list(img.bands))
+
+
+@method('Image', 'projection')
+def image_projection(img):
+    return(ProjectionValue(img.grid.scale))
+
+
+@method('Projection', 'nominalScale')
+def projection_nominal_scale(proj):
+    return(proj.scale)
+
+
+@method('Image', 'setDefaultProjection')
+def image_set_default_projection(img, crs, crsTransform = None, scale = None):
+    return(img.copy(grid = img.grid.with_scale(crs.scale if isinstance(crs, ProjectionValue) else scale)))
+
+
+@method('Image', 'normalizedDifference')
+def image_normalized_difference(img, bandNames):
+    a, b = img.bands[bandNames[0]], img.bands[bandNames[1]]
+    return(img.copy(bands = {'nd': (a - b) / (a + b)}))
+
+
+@method('Image', 'expression')
+def image_expression(img, expression, map = None):
+    namespace = {k: (next(iter(v.bands.values())) if isinstance(v, ImageValue) else v) for k, v in (map or {}).items()}
+    namespace['__b0'] = next(iter(img.bands.values()))
+    out = eval(expression.replace('b()', '__b0'), {'__builtins__': {}}, namespace)
+    return(img.copy(bands = {'constant': out}))
+
+
+@method('Image', 'reduce')
+def image_reduce(img, reducer):
+    stack = np.ma.stack(list(img.bands.values()))
+    return(img.copy(bands = {reducer.outputs[0]: reduce_stack(stack, reducer)}))
+
+
+def reduce_stack(stack, reducer):
+    if reducer.kind == 'sum':
+        return(stack.sum(axis = 0))
+    if reducer.kind == 'mean':
+        return(stack.mean(axis = 0))
+    if reducer.kind == 'median':
+        return(np.ma.median(stack, axis = 0))
+    raise NotImplementedError(f'{reducer.kind} is not supported per pixel by the fake backend')
+
+
+def feature_pixels(geom, grid):
+    """
+    :return: Flat indices of the pixels whose centers fall in the feature, or the pixel holding a point
+    """
+    xmin, ymin, xmax, ymax = geom.bbox
+    if geom.type == 'Point':
+        col = int((xmin - grid.x0) // grid.dx)
+        row = int((grid.y0 - ymin) // grid.dx)
+        if 0 <= col < grid.width and 0 <= row < grid.height:
+            return(np.array([row * grid.width + col]))
+        return(np.array([], dtype = int))
+    c0 = max(int(math.ceil((xmin - grid.x0) / grid.dx - 0.5)), 0)
+    c1 = min(int(math.floor((xmax - grid.x0) / grid.dx - 0.5)), grid.width - 1)
+    r0 = max(int(math.ceil((grid.y0 - ymax) / grid.dx - 0.5)), 0)
+    r1 = min(int(math.floor((grid.y0 - ymin) / grid.dx - 0.5)), grid.height - 1)
+    if c1 < c0 or r1 < r0:
+        return(np.array([], dtype = int))
+    rows, cols = np.meshgrid(np.arange(r0, r1 + 1), np.arange(c0, c1 + 1), indexing = 'ij')
+    return((rows * grid.width + cols).ravel())
+
+
+@method('Image', 'reduceRegions')
+def image_reduce_regions(img, collection, reducer, scale = None, crs = None, crsTransform = None, tileScale = 1):
+    # Reductions run on the native grid of the synthetic image, scale only affects the real service
+    bands = list(img.bands.items())
+    features = []
+    for f in collection.features:
+        idx = feature_pixels(f.geom, img.grid)
+        props = dict(f.props)
+
+        # Reducers with one input per band see the pixels where every band is valid
+        if reducer.n_inputs > 1:
+            stack = [np.ma.asarray(a).ravel()[idx] for name, a in bands]
+            valid = ~np.any([np.ma.getmaskarray(values) for values in stack], axis = 0)
+            props.update(reducer.fn([np.asarray(values)[valid] for values in stack]))
+            features.append(FeatureValue(f.geom, props))
+            continue
+        for name, a in bands:
+            values = a.ravel()[idx]
+            values = values.compressed() if np.ma.isMaskedArray(values) else values
+            stats = reducer.fn(values)
+            props.update(stats if len(bands) == 1 else {f'{name}_{k}': v for k, v in stats.items()})
+        features.append(FeatureValue(f.geom, props))
+    return(FCValue(features, collection.props))
+
+
+# Image collections
+
+@method('ImageCollection', 'filter')
+def ic_filter(ic, flt):
+    return(ICValue([i for i in ic.images if flt.predicate(i.props)], ic.props))
+
+
+@method('ImageCollection', 'filterDate')
+def ic_filter_date(ic, start, end = None):
+    start = as_millis(start)
+    end = as_millis(end) if end is not None else start + 1
+    return(ICValue([i for i in ic.images if i.props.get('system:time_start') is not None and start <= i.props.get('system:time_start') < end], ic.props))
+
+
+@method('ImageCollection', 'filterBounds')
+def ic_filter_bounds(ic, geom):
+    return(ic)
+
+
+@method('ImageCollection', 'select')
+def ic_select(ic, *args, **kwargs):
+    return(ICValue([image_select(i, *args, **kwargs) for i in ic.images], ic.props))
+
+
+@method('ImageCollection', 'map')
+def ic_map(ic, fn, dropNulls = False):
+    return(ICValue([keep_index(fn(i), i) for i in ic.images], ic.props))
+
+
+def keep_index(out, element):
+    '''
+    :return: Mapped element keeping the system:index of the input element, as map() does in Earth Engine
+    '''
+    if 'system:index' in out.props or 'system:index' not in element.props:
+        return(out)
+    return(element_set(out, {'system:index': element.props.get('system:index')}))
+
+
+@method('ImageCollection', 'merge')
+def ic_merge(ic, other):
+    def prefix(images, p):
+        return([i.copy(props = dict(i.props, **{'system:index': f"{p}_{i.props.get('system:index')}"})) for i in images])
+    return(ICValue(prefix(ic.images, 1) + prefix(other.images, 2)))
+
+
+@method('ImageCollection', 'toBands')
+def ic_to_bands(ic):
+    bands = {}
+    grid = None
+    for i in ic.images:
+        grid = grid or i.grid
+        for name, a in i.bands.items():
+            bands[f"{i.props.get('system:index')}_{name}"] = a
+    return(ImageValue(bands, grid or Grid(0, 0, 1, 1, 1, 1)))
+
+
+@method('ImageCollection', 'first')
+def ic_first(ic):
+    return(ic.images[0] if ic.images else None)
+
+
+@method('ImageCollection', 'size')
+def ic_size(ic):
+    return(len(ic.images))
+
+
+@method('ImageCollection', 'toList')
+def ic_to_list(ic, count, offset = 0):
+    return(ic.images[offset:offset + int(count)])
+
+
+@method('ImageCollection', 'aggregate_array')
+def ic_aggregate_array(ic, prop):
+    return([i.props.get(prop) for i in ic.images if i.props.get(prop) is not None])
+
+
+@method('ImageCollection', 'aggregate_max')
+def ic_aggregate_max(ic, prop):
+    values = ic_aggregate_array(ic, prop)
+    return(max(values) if values else None)
+
+
+@method('ImageCollection', 'reduce')
+def ic_reduce(ic, reducer):
+    names = list(ic.images[0].bands) if ic.images else []
+    if reducer.kind in ['sum', 'mean', 'median']:
+        bands = {f'{name}_{reducer.outputs[0]}': reduce_stack(np.ma.stack([i.bands[name] for i in ic.images]), reducer) for name in names}
+        return(ImageValue(bands, ic.images[0].grid if ic.images else Grid(0, 0, 1, 1, 1, 1)))
+
+    # Other reducers run on the valid values of each pixel in turn, with one band per band and reducer output
+    bands = {}
+    for name in names:
+        stack = np.ma.stack([np.ma.asarray(i.bands[name], dtype = np.float64) for i in ic.images])
+        outputs = {output: np.ma.masked_all(stack.shape[1:]) for output in reducer.outputs}
+        for index in np.ndindex(*stack.shape[1:]):
+            for output, value in reducer.fn(stack[(slice(None),) + index].compressed()).items():
+                if value is not None:
+                    outputs[output][index] = value
+        bands.update({f'{name}_{output}': a for output, a in outputs.items()})
+    return(ImageValue(bands, ic.images[0].grid))
+
+
+@method('ImageCollection', 'mosaic')
+def ic_mosaic(ic):
+    out = None
+
+    # Equator images of different widths, such as shards, are mosaicked over the widest of them
+    for i in sorted(ic.images, key = lambda i: -max([a.shape[1] for a in i.bands.values()] or [0]))[:1]:
+        out = i.copy(bands = {name: np.ma.masked_all(a.shape) for name, a in i.bands.items()}, props = {})
+    for i in ic.images:
+        bands = {}
+        for name, a in out.bands.items():
+            b = align([i.bands.get(name, np.ma.masked_all(a.shape))], out)[0]
+            bands[name] = np.ma.where(np.ma.getmaskarray(b), a, b)
+        out = out.copy(bands = bands)
+    return(out)
+
+
+# Conversions applied to the values of nodes cast to these types
+coercions = {ImageCollection: ic_new, FeatureCollection: fc_new, Feature: feature_new, Date: date_new, Array: array_new}
+
+
+# ----- Assets, exports and ee.data -----
+
+def load_asset(path):
+    if path not in session.catalog:
+
+        # Images written into a collection are addressed by the collection path and their ID
+        parent, asset_name = path.rsplit('/', 1) if '/' in path else (None, path)
+        if isinstance(session.catalog.get(parent), ICValue):
+            for image in session.catalog.get(parent).images:
+                if image.props.get('system:index') == asset_name:
+                    return(image)
+        raise KeyError(f'Asset {path} is not in the fake catalog')
+    asset = session.catalog[path]
+    if isinstance(asset, ICValue):
+        return(ICValue(asset.images, asset.props))
+    return(asset)
+
+
+class FakeExportTask:
+    """
+    Export task whose graph is recorded when started and executed locally on request
+    """
+    def __init__(self, kind, value, asset_id, region = None, description = None):
+        self.kind = kind
+        self.value = value
+        self.asset_id = asset_id
+        self.region = region
+        self.description = description
+        self.id = f'FAKEEE{len(session.tasks):06d}'
+        self.state = 'READY'
+
+    def start(self):
+        session.round_trips += 1
+        session.requests.append(serialize(self.value))
+        session.tasks.append(self)
+
+    def status(self):
+        return({'id': self.id, 'state': self.state, 'description': self.description})
+
+    def execute(self):
+        '''
+        :return: Computed image or feature collection, which is also stored in the fake catalog
+        '''
+        value = evaluate(self.value)
+        parent, asset_name = self.asset_id.rsplit('/', 1)
+        if isinstance(value, ImageValue):
+            value = value.copy(props = dict(value.props, **{'system:index': asset_name}))
+            collection = session.catalog.setdefault(parent, ICValue([]))
+            collection.images = [i for i in collection.images if i.props.get('system:index') != asset_name] + [value]
+        else:
+            session.catalog[self.asset_id] = value
+        self.state = 'COMPLETED'
+        return(value)
+
+
+def asset_type(asset):
+    if isinstance(asset, ICValue):
+        return('IMAGE_COLLECTION')
+    if isinstance(asset, ImageValue):
+        return('IMAGE')
+    return('TABLE')
+
+
+class _ExportImage:
+    @staticmethod
+    def toAsset(image, description = 'myExportImageTask', assetId = None, region = None, scale = None, maxPixels = None, overwrite = False, **kwargs):
+        return(FakeExportTask('image', image, assetId, region, description))
+
+
+class _ExportTable:
+    @staticmethod
+    def toAsset(collection, description = 'myExportTableTask', assetId = None, overwrite = False, **kwargs):
+        return(FakeExportTask('table', collection, assetId, None, description))
+
+
+class _Export:
+    image = _ExportImage
+    table = _ExportTable
+
+
+class batch:
+    Export = _Export
+
+
+class data:
+    @staticmethod
+    def getInfo(asset_id):
+        session.round_trips += 1
+        asset = session.catalog.get(asset_id)
+        if asset is None:
+            return(None)
+        return({'id': asset_id, 'type': asset_type(asset)})
+
+    @staticmethod
+    def listAssets(params):
+        session.round_trips += 1
+        if params.get('parent') not in session.catalog and not any(k.startswith(params.get('parent').rstrip('/') + '/') for k in session.catalog):
+            raise EEException(f"Asset '{params.get('parent')}' does not exist or doesn't allow this operation.")
+        parent = params.get('parent').rstrip('/') + '/'
+        assets = [{'id': k, 'type': asset_type(v)}
+                  for k, v in sorted(session.catalog.items()) if k.startswith(parent) and '/' not in k[len(parent):]]
+        return({'assets': assets})
+
+    @staticmethod
+    def deleteAsset(asset_id):
+        session.round_trips += 1
+        if asset_id in session.catalog:
+            del session.catalog[asset_id]
+            return(None)
+        parent, asset_name = asset_id.rsplit('/', 1)
+        collection = session.catalog.get(parent)
+        if not isinstance(collection, ICValue) or not any(i.props.get('system:index') == asset_name for i in collection.images):
+            raise EEException(f"Asset '{asset_id}' does not exist or doesn't allow this operation.")
+        collection.images = [i for i in collection.images if i.props.get('system:index') != asset_name]
+        return(None)
+
+    @staticmethod
+    def computeFeatures(params):
+        session.round_trips += 1
+        session.requests.append(serialize(params.get('expression')))
+        fc = evaluate(params.get('expression'))
+        rows = [dict(f.props) for f in fc.features]
+        if params.get('fileFormat') == 'PANDAS_DATAFRAME':
+            import pandas
+            return(pandas.DataFrame(rows))
+        return(rows)
+
+    @staticmethod
+    def computePixels(params):
+        # Equator images are one row, pixels of the requested grid are read by column from the image grid
+        session.round_trips += 1
+        session.requests.append(serialize(params.get('expression')))
+        img = evaluate(params.get('expression'))
+        transform = params.get('grid').get('affineTransform')
+        width = params.get('grid').get('dimensions').get('width')
+        col = int(round((transform.get('translateX') - img.grid.x0) / img.grid.dx))
+        pixels = np.zeros((1, width), dtype = [(name, np.float64) for name in img.bands])
+        for name, a in img.bands.items():
+            row = np.ma.filled(np.ma.asarray(a, dtype = np.float64)[0], 0)
+            cols = np.arange(col, col + width)
+            inside = (cols >= 0) & (cols < row.shape[0])
+            pixels[name][0, inside] = row[cols[inside]]
+        return(pixels)
+
+    @staticmethod
+    def getTaskList():
+        session.round_trips += 1
+        return([t.status() for t in reversed(session.tasks)])
+
+    @staticmethod
+    def getTaskStatus(task_ids):
+        session.round_trips += 1
+        if isinstance(task_ids, str):
+            task_ids = [task_ids]
+        tasks = {t.id: t for t in session.tasks}
+        return([tasks[task_id].status() if task_id in tasks else {'id': task_id, 'state': 'UNKNOWN'} for task_id in task_ids])
+
+
+def install():
+    """
+    :return: This module, registered as ee and set on any database modules already imported
+    """
+    module = sys.modules[__name__]
+    sys.modules['ee'] = module
+    for name, loaded in list(sys.modules.items()):
+        if name.startswith('eeDatabase_') and getattr(loaded, 'ee', None) is not None and loaded is not module:
+            loaded.ee = module
+    return(module)
+
+
+# ----- Synthetic catalog -----
+
+# Bands and properties of the synthetic stand-ins for each source collection
+synthetic_datasets = {
+    'GRIDMET/DROUGHT': {'bands': ['pdsi', 'z', 'spi30d', 'spi90d', 'spi180d', 'spi1y', 'spi2y', 'spi5y'], 'range': (-4, 4), 'scale': 4638.3, 'cadence': 'pentad'},
+    'IDAHO_EPSCOR/GRIDMET': {'bands': ['pr', 'tmmn', 'tmmx', 'eto', 'vpd', 'vs', 'srad'], 'range': (0, 300), 'scale': 4638.3, 'cadence': 'daily'},
+    'projects/rap-data-365417/assets/vegetation-cover-v3': {'bands': ['AFG', 'BGR', 'LTR', 'PFG', 'SHR', 'TRE'], 'range': (0, 100), 'scale': 30, 'cadence': 'annual'},
+    'projects/rap-data-365417/assets/npp-partitioned-v3': {'bands': ['afgNPP', 'pfgNPP', 'shrNPP'], 'range': (0, 5000), 'scale': 30, 'cadence': 'annual'},
+    'projects/rap-data-365417/assets/npp-partitioned-16day-v3': {'bands': ['afgNPP', 'pfgNPP', 'shrNPP'], 'range': (0, 500), 'scale': 30, 'cadence': '16day'},
+    'projects/rap-data-365417/assets/npp-partitioned-16day-v3-provisional': {'bands': ['afgNPP', 'pfgNPP', 'shrNPP'], 'range': (0, 500), 'scale': 30, 'cadence': 'none'},
+    'projects/rap-data-365417/assets/gridmet-MAT': {'bands': ['MAT'], 'range': (0, 20), 'scale': 4638.3, 'cadence': 'annual'},
+    'projects/climate-engine/usdm/weekly': {'bands': ['drought'], 'range': (-1, 4), 'scale': 500, 'cadence': 'pentad', 'integer': True, 'props': {'region': 'conus'}},
+    'MODIS/061/MOD11A2': {'bands': ['LST_Day_1km'], 'range': (13000, 16000), 'scale': 926.6, 'cadence': '16day'},
+    'LANDSAT/LT05/C02/T1_L2': {'bands': ['SR_B1', 'SR_B2', 'SR_B3', 'SR_B4', 'SR_B5', 'SR_B7', 'ST_B6'], 'range': (7000, 30000), 'scale': 30, 'cadence': '16day', 'qa': True},
+    'LANDSAT/LE07/C02/T1_L2': {'bands': ['SR_B1', 'SR_B2', 'SR_B3', 'SR_B4', 'SR_B5', 'SR_B7', 'ST_B6'], 'range': (7000, 30000), 'scale': 30, 'cadence': '16day', 'qa': True},
+    'LANDSAT/LC08/C02/T1_L2': {'bands': ['SR_B2', 'SR_B3', 'SR_B4', 'SR_B5', 'SR_B6', 'SR_B7', 'ST_B10'], 'range': (7000, 30000), 'scale': 30, 'cadence': '16day', 'qa': True},
+    'LANDSAT/LC09/C02/T1_L2': {'bands': ['SR_B2', 'SR_B3', 'SR_B4', 'SR_B5', 'SR_B6', 'SR_B7', 'ST_B10'], 'range': (7000, 30000), 'scale': 30, 'cadence': '16day', 'qa': True},
+    'MODIS/006/MOD16A2': {'bands': ['ET', 'PET'], 'range': (0, 500), 'scale': 500, 'cadence': '16day'},
+    'projects/climate-engine-pro/assets/mtbs_mosaics_annual': {'bands': ['Severity'], 'range': (0, 6), 'scale': 30, 'cadence': 'annual', 'integer': True, 'index': 'mtbs_mosaic_{Y}'},
+    'projects/climate-engine-pro/assets/ce-veg-dri': {'bands': ['vegdri'], 'range': (0, 255), 'scale': 1000, 'cadence': 'pentad', 'integer': True}}
+
+
+def synthetic_dates(cadence, year = 2022):
+    """
+    :return: List of datetimes for the first month of the year at the cadence of the dataset
+    """
+    start = datetime.datetime(year, 1, 1)
+    if cadence == 'annual':
+        return([datetime.datetime(year - 1, 1, 1), start])
+    if cadence == 'daily':
+        return([start + datetime.timedelta(days = d) for d in range(-5, 31)])
+    if cadence == 'pentad':
+        return([start + datetime.timedelta(days = d) for d in range(0, 31, 5)])
+    if cadence == '16day':
+        return([start + datetime.timedelta(days = d) for d in range(0, 31, 16)])
+    return([])
+
+
+def synthetic_bands(info, width, seed):
+    """
+    :return: Function generating the random bands of one synthetic image
+    """
+    def generate():
+        rng = np.random.default_rng(seed)
+        low, high = info.get('range')
+        bands = {}
+        for band in info.get('bands'):
+            values = rng.uniform(low, high, size = (width, width))
+            bands[band] = np.ma.masked_array(np.floor(values) if info.get('integer') else values)
+        if info.get('qa'):
+            bands['QA_PIXEL'] = np.ma.masked_array(rng.choice([21824, 21824, 21824, 22280], size = (width, width)))
+            bands['QA_RADSAT'] = np.ma.masked_array(np.zeros((width, width), dtype = np.int64))
+        return(bands)
+
+    return(generate)
+
+
+def make_synthetic_catalog(n_features = 1000, in_fc_path = 'synthetic/land_units', in_fc_id = 'unit_id', seed = 0, pixels_per_feature = 4):
+    """
+    :param n_features: e.g. 1000, 10000 or 100000
+    :param in_fc_path: e.g. path the synthetic feature collection is stored under
+    :param in_fc_id: e.g. ID property of the synthetic features
+    :param seed: e.g. seed of the random pixel values and feature sizes
+    :param pixels_per_feature: e.g. approximate width of each feature in pixels
+    :return: Catalog dictionary of {path: ICValue or FCValue} with every source collection used by the database and
+             a feature collection of rectangles of varying size tiled over a shared pixel grid
+    """
+    rng = np.random.default_rng(seed)
+
+    # Tile features over a square grid of 0.01 degree pixels
+    n_side = int(math.ceil(math.sqrt(n_features)))
+    width = n_side * pixels_per_feature
+    x0, y0, dx = -115.0, 44.0, 0.01
+    features = []
+    sizes = rng.integers(1, pixels_per_feature + 1, size = n_features)
+    for i in range(n_features):
+        col, row = (i % n_side) * pixels_per_feature, (i // n_side) * pixels_per_feature
+        xmin, ymax = x0 + col * dx, y0 - row * dx
+        bbox = (xmin, ymax - sizes[i] * dx, xmin + sizes[i] * dx, ymax)
+        features.append(FeatureValue(GeomValue('Polygon', bbox), {in_fc_id: str(100000 + i), 'system:index': str(i)}))
+    catalog = {in_fc_path: FCValue(features)}
+
+    for path, info in synthetic_datasets.items():
+        grid = Grid(x0, y0, dx, width, width, info.get('scale'))
+        images = []
+        for version, dt in enumerate(synthetic_dates(info.get('cadence'))):
+            if info.get('cadence') == '16day':
+                index = f'{dt.year}{dt.timetuple().tm_yday:03d}'
+            elif info.get('cadence') == 'annual':
+                index = info.get('index', '{Y}').format(Y = dt.year)
+            else:
+                index = dt.strftime('%Y%m%d')
+            props = dict(info.get('props', {}), **{'system:index': index, 'system:time_start': as_millis(dt), 'system:version': 1700000000000000 + version})
+            images.append(ImageValue(synthetic_bands(info, width, rng.integers(2 ** 32)), grid, props))
+        catalog[path] = ICValue(images)
+
+    return(catalog)
@@ -0,0 +1,158 @@
+import argparse
+import datetime
+import json
+import sys
+import eeDatabase_fakeEE as fake_ee
+fake_ee.install()
+import eeDatabase_coreMethods as eedb_cor
+import eeDatabase_collectionInfo as eedb_colinfo
+import eeDatabase_pathNames as eedb_path
+
+# Stored graph sizes that new graphs are compared against
+baseline_path = 'graph_baselines.json'
+
+# Limits applied to every graph, Earth Engine rejects request payloads over 10 MiB
+default_limits = {'bytes': 10 * 1024 ** 2, 'depth': 250}
+
+
+def make_guard_catalog(n_features = 10):
+    """
+    :param n_features: e.g. number of synthetic features per land unit, graphs do not depend on it
+    :return: Fake catalog with every source collection and a small synthetic feature collection at each land unit path
+    """
+    in_fc_paths = list(eedb_colinfo.land_unit_dict.keys())
+    catalog = fake_ee.make_synthetic_catalog(n_features = n_features, in_fc_path = in_fc_paths[0])
+    for in_fc_path in in_fc_paths[1:]:
+        catalog[in_fc_path] = catalog.get(in_fc_paths[0])
+
+    return(catalog)
+
+
+# Ways a date's export graph is built: the module-level run_image_export() and RunContext.run_image_export(), used by
+# eeDatabase_runJobs.py and eeDatabase_watchJobs.py
+graph_builders = ['module', 'context']
+
+
+def get_graph_key(land_unit_short, in_ic_name, var_name, builder = 'module'):
+    """
+    :return: Key of the graph in the baselines, e.g. 'BLM_Allotments/GridMET/pr', with '/context' added for RunContext graphs
+    """
+    key = f'{land_unit_short}/{in_ic_name}/{var_name}'
+    return(key if builder == 'module' else f'{key}/{builder}')
+
+
+def measure_graph(in_fc_path, in_ic_name, var_name, builder = 'module'):
+    """
+    :param in_fc_path: e.g. path to input feature collection, a key of land_unit_dict
+    :param in_ic_name: e.g. 'GridMET_Drought'
+    :param var_name: e.g. 'Long_Term_Drought_Blend'
+    :param builder: e.g. 'module' for the run_image_export() graph or 'context' for the RunContext.run_image_export() one
+    :return: Dictionary of node count, depth and serialized bytes of the export graph for the first synthetic date
+    """
+    in_ic_paths = eedb_colinfo.in_ic_dict.get(in_ic_name).get('in_ic_paths')
+    in_ic_res = eedb_cor.get_in_ic_res(in_ic_name).getInfo()
+    properties = eedb_cor.get_run_properties(in_fc_path, in_ic_name, var_name, in_ic_res)
+    dates = eedb_cor.get_collection_dates(in_ic_paths = in_ic_paths, start_date = datetime.datetime(2022, 1, 1), end_date = datetime.datetime(2022, 2, 1))
+
+    # Export tasks of the fake backend record the graph when started instead of submitting it
+    out_path = eedb_path.get_out_path(properties.get('land_unit_short'), in_ic_name, var_name)
+    run_image_export = eedb_cor.run_image_export
+    if builder == 'context':
+        run_image_export = eedb_cor.RunContext(in_ic_paths = in_ic_paths, out_path = out_path, properties = properties).run_image_export
+    task = run_image_export(in_ic_paths = in_ic_paths, date = dates[0], out_path = out_path, properties = eedb_cor.get_date_properties(properties, dates[0]))
+
+    return(fake_ee.graph_stats(task.value))
+
+
+def measure_graphs(in_fc_paths = None, in_ic_names = None):
+    """
+    :param in_fc_paths: e.g. keys of land_unit_dict, defaults to every land unit
+    :param in_ic_names: e.g. ['GridMET', 'Landsat'], defaults to every dataset in in_ic_dict
+    :return: Dictionary of {key from .get_graph_key(): graph stats from .measure_graph()} for every graph builder
+    """
+    fake_ee.session.catalog = make_guard_catalog()
+    measurements = {}
+    for in_fc_path in in_fc_paths or list(eedb_colinfo.land_unit_dict.keys()):
+        land_unit_short = eedb_colinfo.land_unit_dict.get(in_fc_path).get('land_unit_short')
+        for in_ic_name in in_ic_names or list(eedb_colinfo.in_ic_dict.keys()):
+            for var_name in eedb_colinfo.in_ic_dict.get(in_ic_name).get('var_names'):
+                for builder in graph_builders:
+                    measurements[get_graph_key(land_unit_short, in_ic_name, var_name, builder)] = measure_graph(in_fc_path, in_ic_name, var_name, builder)
+
+    return(measurements)
+
+
+def read_baselines(path = baseline_path):
+    """
+    :param path: e.g. 'graph_baselines.json'
+    :return: Dictionary of {'limits': {...}, 'tolerance': x, 'graphs': {key: graph stats}}, empty graphs if the file is missing
+    """
+    try:
+        with open(path) as f:
+            return(json.load(f))
+    except FileNotFoundError:
+        return({'limits': default_limits, 'tolerance': 0.1, 'graphs': {}})
+
+
+def write_baselines(measurements, path = baseline_path, limits = default_limits, tolerance = 0.1):
+    """
+    :param measurements: e.g. output of .measure_graphs()
+    :param path: e.g. 'graph_baselines.json'
+    :param limits: e.g. {'bytes': n, 'depth': n} applied to every graph
+    :param tolerance: e.g. 0.1 to allow graphs to grow 10% over their baseline
+    :return: None, writes the baselines
+    """
+    with open(path, 'w') as f:
+        json.dump({'limits': limits, 'tolerance': tolerance, 'graphs': dict(sorted(measurements.items()))}, f, indent = 2)
+
+
+def check_graphs(measurements, baselines):
+    """
+    :param measurements: e.g. output of .measure_graphs()
+    :param baselines: e.g. output of .read_baselines()
+    :return: List of failure messages for graphs over the absolute limits or more than the tolerance over their baseline
+    """
+    limits = baselines.get('limits', default_limits)
+    tolerance = baselines.get('tolerance', 0.1)
+    failures = []
+    for key, stats in measurements.items():
+        for stat in ['bytes', 'depth']:
+            if stats.get(stat) > limits.get(stat):
+                failures.append(f'{key}: {stat} {stats.get(stat)} exceeds the limit of {limits.get(stat)}')
+            baseline = baselines.get('graphs').get(key, {}).get(stat)
+            if baseline is not None and stats.get(stat) > baseline * (1 + tolerance):
+                failures.append(f'{key}: {stat} {stats.get(stat)} is more than {tolerance:.0%} over the baseline of {baseline}')
+
+    return(failures)
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'Build the export graph of every land unit, dataset and variable without submitting and check its size against baselines.')
+    parser.add_argument('--baselines', default = baseline_path, help = 'path of the JSON baselines')
+    parser.add_argument('--datasets', nargs = '+', default = None, help = 'datasets to check, defaults to all of in_ic_dict')
+    parser.add_argument('--update', action = 'store_true', help = 'write the measured graphs as the new baselines')
+    args = parser.parse_args(argv)
+
+    measurements = measure_graphs(in_ic_names = args.datasets)
+    baselines = read_baselines(args.baselines)
+
+    if args.update:
+        graphs = dict(baselines.get('graphs'), **measurements)
+        write_baselines(graphs, args.baselines, limits = baselines.get('limits', default_limits), tolerance = baselines.get('tolerance', 0.1))
+        print(f"Wrote baselines for {len(graphs)} graphs to {args.baselines}")
+        return(0)
+
+    missing = sorted(set(measurements) - set(baselines.get('graphs')))
+    if len(missing) > 0:
+        print(f"{len(missing)} graphs have no baseline, run with --update to add them: {missing}")
+
+    failures = check_graphs(measurements, baselines)
+    for failure in failures:
+        print(failure)
+    print(f"Checked {len(measurements)} graphs: {len(failures)} over their limits")
+
+    return(1 if len(failures) > 0 else 0)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
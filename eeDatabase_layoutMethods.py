@@ -0,0 +1,267 @@
+import ee
+import eeDatabase_coreMethods as eedb_cor
+
+
+def get_layout_path(out_path):
+    """
+    :param out_path: e.g. path of the database Image Collection
+    :return: Path of the table asset storing the ID to slot layout of the collection
+    """
+    return(f'{out_path}-layout')
+
+
+def get_feature_fingerprints(in_fc_path, in_fc_id):
+    """
+    :param in_fc_path: e.g. path to input feature collection
+    :param in_fc_id: e.g. field from input feature collection to use as ID
+    :return: Client-side list of (ID, fingerprint) pairs in feature collection order, where the fingerprint changes when the geometry is edited
+    """
+    in_fc = ee.FeatureCollection(in_fc_path)
+
+    # Area and perimeter to the nearest meter change with any meaningful boundary edit
+    def get_fingerprint(f):
+        geom = ee.Feature(f).geometry()
+        fingerprint = ee.Number(geom.area(1)).format('%.0f').cat(':').cat(ee.Number(geom.perimeter(1)).format('%.0f'))
+        return(ee.Feature(None, {'fc_id': f.get(in_fc_id), 'fingerprint': fingerprint}))
+    fingerprint_fc = in_fc.map(get_fingerprint)
+
+    # Pull IDs and fingerprints client-side in a single request
+    info = ee.Dictionary({'fc_id': fingerprint_fc.aggregate_array('fc_id'), 'fingerprint': fingerprint_fc.aggregate_array('fingerprint')}).getInfo()
+
+    return(list(zip(info.get('fc_id'), info.get('fingerprint'))))
+
+
+def build_layout(fingerprints):
+    """
+    :param fingerprints: e.g. output of .get_feature_fingerprints()
+    :return: Layout dictionary of {'entries': {fc_id: {'slot', 'retired', 'fingerprint'}}, 'n_slots': n}. Slots follow
+             feature collection order, matching the positions of collections exported before layouts existed.
+    """
+    entries = {}
+    for slot, (fc_id, fingerprint) in enumerate(fingerprints):
+        entries[fc_id] = {'slot': slot, 'retired': 0, 'fingerprint': fingerprint}
+
+    return({'entries': entries, 'n_slots': len(entries)})
+
+
+def update_layout(layout, fingerprints):
+    """
+    :param layout: e.g. output of .read_layout() or .build_layout()
+    :param fingerprints: e.g. output of .get_feature_fingerprints() for the refreshed feature collection
+    :return: Updated layout and delta dictionary of {'added': [fc_id], 'changed': [fc_id], 'retired': [fc_id]}
+    """
+    entries = {fc_id: dict(entry) for fc_id, entry in layout.get('entries').items()}
+    n_slots = layout.get('n_slots')
+    delta = {'added': [], 'changed': [], 'retired': []}
+
+    for fc_id, fingerprint in fingerprints:
+        entry = entries.get(fc_id)
+
+        # New features take the next free slot so no existing position moves
+        if entry is None:
+            entries[fc_id] = {'slot': n_slots, 'retired': 0, 'fingerprint': fingerprint}
+            n_slots += 1
+            delta['added'].append(fc_id)
+
+        # Edited or reinstated features keep their slot and are recomputed
+        elif entry.get('fingerprint') != fingerprint or entry.get('retired') == 1:
+            entry['fingerprint'] = fingerprint
+            entry['retired'] = 0
+            delta['changed'].append(fc_id)
+
+    # Features no longer in the collection are tombstoned, their slot is never reused
+    current_ids = set(fc_id for fc_id, _ in fingerprints)
+    for fc_id, entry in entries.items():
+        if fc_id not in current_ids and entry.get('retired') == 0:
+            entry['retired'] = 1
+            delta['retired'].append(fc_id)
+
+    return({'entries': entries, 'n_slots': n_slots}, delta)
+
+
+def read_layout(out_path):
+    """
+    :param out_path: e.g. path of the database Image Collection
+    :return: Layout dictionary stored with the collection, or None if the collection has no layout yet
+    """
+    layout_path = get_layout_path(out_path)
+    if ee.data.getInfo(layout_path) is None:
+        return(None)
+
+    # Pull the layout table client-side in a single request
+    layout_fc = ee.FeatureCollection(layout_path)
+    info = ee.Dictionary({prop: layout_fc.aggregate_array(prop) for prop in ['fc_id', 'slot', 'retired', 'fingerprint']}).getInfo()
+
+    entries = {}
+    for fc_id, slot, retired, fingerprint in zip(info.get('fc_id'), info.get('slot'), info.get('retired'), info.get('fingerprint')):
+        entries[fc_id] = {'slot': int(slot), 'retired': int(retired), 'fingerprint': fingerprint}
+
+    return({'entries': entries, 'n_slots': len(entries)})
+
+
+def export_layout(layout, out_path):
+    '''
+    :param layout: e.g. output of .update_layout()
+    :param out_path: e.g. path of the database Image Collection
+    :return: Started export task writing the layout table asset, raises ValueError for a layout without entries
+    '''
+    if len(layout.get('entries')) == 0:
+        raise ValueError(f'The layout of {out_path} has no features to export')
+
+    # Send the layout as parallel lists, which is far smaller than one client-side feature per entry
+    fc_ids = list(layout.get('entries').keys())
+    entries = [layout.get('entries').get(fc_id) for fc_id in fc_ids]
+    columns = ee.Dictionary({'fc_id': fc_ids,
+                             'slot': [entry.get('slot') for entry in entries],
+                             'retired': [entry.get('retired') for entry in entries],
+                             'fingerprint': [entry.get('fingerprint') for entry in entries]})
+
+    def to_feature(i):
+        i = ee.Number(i)
+        return(ee.Feature(None, {prop: ee.List(columns.get(prop)).get(i) for prop in ['fc_id', 'slot', 'retired', 'fingerprint']}))
+    layout_fc = ee.FeatureCollection(ee.List.sequence(0, len(fc_ids) - 1).map(to_feature))
+
+    task = ee.batch.Export.table.toAsset(
+        collection = layout_fc,
+        description = f"layout - {out_path.split('/')[-1]}",
+        assetId = get_layout_path(out_path),
+        overwrite = True)
+    task.start()
+
+    return(task)
+
+
+def export_layout_id_img(layout, out_path, properties):
+    '''
+    :param layout: e.g. output of .update_layout()
+    :param out_path: e.g. path of the database Image Collection
+    :param properties: e.g. output of eeDatabase_coreMethods.get_run_properties() with 'system:index' set to '0_id'
+    :return: Started export task replacing the ID image with one that follows the layout, raises ValueError for a layout
+             without entries
+    '''
+    if len(layout.get('entries')) == 0:
+        raise ValueError(f'The layout of {out_path} has no features to export')
+
+    # Retired IDs keep their pixel so historical values can still be attributed
+    entries = layout.get('entries')
+    fc_ids = ee.List([str(fc_id) for fc_id in entries.keys()])
+    slots = ee.List([entry.get('slot') for entry in entries.values()])
+    retired = [str(fc_id) for fc_id, entry in entries.items() if entry.get('retired') == 1]
+
+    # Function to create ID point at the slot position
+    def slot_to_point(i):
+        i = ee.Number(i)
+        geom = ee.Geometry.Point([ee.Number(slots.get(i)).multiply(0.0002), 0.0002])
+        return(ee.Feature(geom, {'id': ee.Number.parse(fc_ids.get(i))}))
+    out_fc = ee.FeatureCollection(ee.List.sequence(0, fc_ids.length().subtract(1)).map(slot_to_point))
+    out_i = out_fc.reduceToImage(properties = ['id'], reducer = ee.Reducer.mean()).rename('id')\
+        .set('tombstones', ee.List(retired).join(','))
+
+    # The ID image is never a year image, even in collections stored by year
+    return(eedb_cor.export_img(out_i = out_i, out_region = eedb_cor.equator_region(layout.get('n_slots')), out_path = out_path,
+                               properties = dict(properties, storage = 'date'), overwrite = True))
+
+
+def refresh_layout(out_path, properties):
+    '''
+    :param out_path: e.g. path of the database Image Collection
+    :param properties: e.g. output of eeDatabase_coreMethods.get_run_properties()
+    :return: Updated layout, delta of added, changed and retired IDs, and the started layout and ID image export tasks
+    '''
+    fingerprints = get_feature_fingerprints(properties.get('in_fc_path'), properties.get('in_fc_id'))
+
+    # Collections exported before layouts existed use feature collection order, so the first layout reproduces it
+    layout = read_layout(out_path)
+    if layout is None:
+        print(f"No layout stored for {out_path}, building one from the current feature collection order")
+        layout = build_layout(fingerprints)
+        delta = {'added': [], 'changed': [], 'retired': []}
+    else:
+        layout, delta = update_layout(layout, fingerprints)
+
+    print(f"{len(delta.get('added'))} added, {len(delta.get('changed'))} changed, {len(delta.get('retired'))} retired")
+
+    # A feature collection that has never held features leaves nothing to lay out
+    if len(layout.get('entries')) == 0:
+        print(f"No features in {properties.get('in_fc_path')}, the layout of {out_path} is not exported")
+        return(layout, delta, [])
+
+    tasks = [export_layout(layout, out_path),
+             export_layout_id_img(layout, out_path, dict(properties, **{'system:index': '0_id'}))]
+
+    return(layout, delta, tasks)
+
+
+def build_delta_img(in_ic_paths, date, out_path, properties, layout, delta_ids):
+    '''
+    :param in_ic_paths: e.g. ['GRIDMET/DROUGHT']
+    :param date: e.g. millis since epoch of an image already in the collection
+    :param out_path: e.g. path of the database Image Collection
+    :param properties: e.g. output of eeDatabase_coreMethods.get_date_properties()
+    :param layout: e.g. output of .update_layout()
+    :param delta_ids: e.g. the added and changed IDs from .update_layout()
+    :return: Earth Engine Image of the stored date with the delta features patched in
+    '''
+    # Reduce only the added and changed features, placing them at their slots
+    in_i = eedb_cor.preprocess_image(in_ic_paths = in_ic_paths, date = date, properties = properties)
+    ids = ee.List(delta_ids)
+    slots = ee.List([layout.get('entries').get(fc_id).get('slot') for fc_id in delta_ids])
+    def set_slot(f):
+        f = ee.Feature(f)
+        return(f.set('eq_index', slots.get(ids.indexOf(f.get(properties.get('in_fc_id'))))))
+    in_fc = ee.FeatureCollection(properties.get('in_fc_path')).filter(ee.Filter.inList(properties.get('in_fc_id'), delta_ids)).map(set_slot)
+    delta_i, delta_fc = eedb_cor.reduce_image(in_i = in_i, in_fc = in_fc, properties = properties, index_property = 'eq_index')
+
+    # Patch the delta pixels over the existing image, later images in a mosaic take precedence
+    existing_i = eedb_cor.get_stored_img(out_path, date, properties.get('in_ic_name'), storage = properties.get('storage', 'date'))
+    return(ee.ImageCollection([existing_i, delta_i.select(existing_i.bandNames())]).mosaic().copyProperties(existing_i))
+
+
+def run_delta_export(in_ic_paths, date, out_path, properties, layout, delta_ids):
+    '''
+    :param in_ic_paths: e.g. ['GRIDMET/DROUGHT']
+    :param date: e.g. millis since epoch of an image already in the collection
+    :param out_path: e.g. path of the database Image Collection
+    :param properties: e.g. output of eeDatabase_coreMethods.get_date_properties()
+    :param layout: e.g. output of .update_layout()
+    :param delta_ids: e.g. the added and changed IDs from .update_layout()
+    :return: Started export task replacing the image with the delta features patched in
+    '''
+    out_i = build_delta_img(in_ic_paths, date, out_path, properties, layout, delta_ids)
+
+    return(eedb_cor.export_img(out_i = out_i, out_region = eedb_cor.equator_region(layout.get('n_slots')), out_path = out_path,
+                               properties = properties, overwrite = True))
+
+
+def run_layout_delta(in_ic_paths, out_path, properties, layout, delta):
+    '''
+    :param in_ic_paths: e.g. ['GRIDMET/DROUGHT']
+    :param out_path: e.g. path of the database Image Collection
+    :param properties: e.g. output of eeDatabase_coreMethods.get_run_properties()
+    :param layout: e.g. output of .refresh_layout()
+    :param delta: e.g. output of .refresh_layout()
+    :return: List of started export tasks, one per date in the collection, or one per year in 'annual' storage
+    '''
+    delta_ids = delta.get('added') + delta.get('changed')
+    if len(delta_ids) == 0:
+        return([])
+
+    # Patch every date already in the collection
+    dates = sorted(eedb_cor.get_stored_dates(out_path).distinct().getInfo())
+
+    # Year images are patched once with every date they hold
+    if properties.get('storage', 'date') == 'annual':
+        tasks = []
+        for year_id, year_dates in eedb_cor.group_dates_by_year(dates).items():
+            date_imgs = {date: build_delta_img(in_ic_paths, date, out_path, eedb_cor.get_date_properties(dict(properties, layout_path = get_layout_path(out_path)), date), layout, delta_ids)
+                         for date in year_dates}
+            tasks.append(eedb_cor.export_annual_img(date_imgs = date_imgs, out_region = eedb_cor.equator_region(layout.get('n_slots')), out_path = out_path,
+                                                    properties = eedb_cor.get_date_properties(properties, year_dates[0]), stored_dates = year_dates))
+        return(tasks)
+
+    tasks = []
+    for date in dates:
+        date_properties = eedb_cor.get_date_properties(dict(properties, layout_path = get_layout_path(out_path)), date)
+        tasks.append(run_delta_export(in_ic_paths, date, out_path, date_properties, layout, delta_ids))
+
+    return(tasks)
@@ -0,0 +1,628 @@
+import argparse
+import concurrent.futures
+import csv
+import os
+import time
+import numpy as np
+import eeDatabase_collectionInfo as eedb_colinfo
+import eeDatabase_statNames as eedb_stat
+
+# Rows of the raster read by one task, peak memory per worker is about block_rows * columns * 8 bytes per array
+default_block_rows = 512
+
+# Bins between the minimum and maximum of the variable when percentiles are read from histograms
+default_n_bins = 512
+
+# Sub-pixels along each side of a dataset pixel when its coverage by a feature is measured
+default_supersample = 10
+
+
+def get_windows(n_rows, block_rows = default_block_rows):
+    """
+    :param n_rows: e.g. number of rows of the raster
+    :param block_rows: e.g. 512
+    :return: List of (first row, last row + 1) windows covering the raster
+    """
+    return([(row, min(row + block_rows, n_rows)) for row in range(0, n_rows, block_rows)])
+
+
+def read_block(value_path, zone_path, window, nodata = None):
+    """
+    :param value_path: e.g. 'rap_cover_20220101.npy', a 2D raster of values
+    :param zone_path: e.g. 'blm_allotments_zones.npy', a 2D integer raster of zone indices on the same grid, negative outside zones
+    :param window: e.g. (0, 512), rows to read
+    :param nodata: e.g. -9999, value skipped in addition to NaN
+    :return: Tuple of (zones, values) for the valid pixels of the window, read from memory-mapped files
+    """
+    # Memory mapping reads only the pages of the window from disk
+    values = np.load(value_path, mmap_mode = 'r')[window[0]:window[1]].ravel()
+    zones = np.load(zone_path, mmap_mode = 'r')[window[0]:window[1]].ravel()
+
+    valid = (zones >= 0) & np.isfinite(values)
+    if nodata is not None:
+        valid &= values != nodata
+
+    return(zones[valid].astype(np.int64), values[valid].astype(np.float64))
+
+
+def classify_values(values, in_ic_name):
+    """
+    :param values: e.g. numpy array of raw values
+    :param in_ic_name: e.g. 'GridMET_Drought', a key of bin_dict
+    :return: Numpy integer array of class indices following the bin schema, the same classes as eeDatabase_coreMethods.classify_categorical()
+    """
+    bins = eedb_colinfo.bin_dict.get(in_ic_name)
+    if 'breaks' in bins:
+        return(np.searchsorted(np.asarray(bins.get('breaks')), values, side = 'right'))
+
+    return(np.floor(values - bins.get('min')).astype(np.int64))
+
+
+def reduce_block(value_path, zone_path, window, mode = 'histogram', value_range = None, n_bins = default_n_bins, in_ic_name = None, nodata = None):
+    """
+    :param value_path: e.g. 'rap_cover_20220101.npy'
+    :param zone_path: e.g. 'blm_allotments_zones.npy'
+    :param window: e.g. (0, 512)
+    :param mode: e.g. 'histogram' for percentiles read from fixed bins, 'exact' to keep the values, or 'categorical' for class counts
+    :param value_range: e.g. (0, 100), range of the histogram bins
+    :param n_bins: e.g. 512
+    :param in_ic_name: e.g. 'USDM', selects the bin schema of categorical datasets
+    :param nodata: e.g. -9999
+    :return: Dictionary of partial statistics for the zones present in the window: 'zones', exact 'count' and 'sum', and
+             'hist' rows, 'classes' rows or 'values' grouped by zone with 'splits', depending on mode
+    """
+    zones, values = read_block(value_path, zone_path, window, nodata = nodata)
+    block_zones, zone_idx = np.unique(zones, return_inverse = True)
+    n_block = len(block_zones)
+
+    if mode == 'categorical':
+        n_classes = len(eedb_stat.get_class_names(in_ic_name))
+        classes = classify_values(values, in_ic_name)
+
+        # Classes outside the schema are dropped, as by the fixedHistogram of reduce_categorical()
+        inside = (classes >= 0) & (classes < n_classes)
+        counts = np.bincount(zone_idx[inside] * n_classes + classes[inside], minlength = n_block * n_classes).reshape(n_block, n_classes)
+        return({'zones': block_zones, 'classes': counts})
+
+    partial = {'zones': block_zones,
+               'count': np.bincount(zone_idx, minlength = n_block),
+               'sum': np.bincount(zone_idx, weights = values, minlength = n_block)}
+
+    # Values at the top of the range fall in the last bin
+    if mode == 'histogram':
+        width = max(value_range[1] - value_range[0], 1e-12) / n_bins
+        bin_idx = np.clip(((values - value_range[0]) / width).astype(np.int64), 0, n_bins - 1)
+        partial['hist'] = np.bincount(zone_idx * n_bins + bin_idx, minlength = n_block * n_bins).reshape(n_block, n_bins)
+    else:
+        order = np.argsort(zone_idx, kind = 'stable')
+        partial['values'] = values[order]
+        partial['splits'] = np.cumsum(partial.get('count'))[:-1]
+
+    return(partial)
+
+
+def get_value_range(value_path, zone_path, windows, nodata = None, max_workers = None):
+    """
+    :param value_path: e.g. 'rap_cover_20220101.npy'
+    :param zone_path: e.g. 'blm_allotments_zones.npy'
+    :param windows: e.g. output of .get_windows()
+    :param nodata: e.g. -9999
+    :param max_workers: e.g. number of threads reading blocks, defaults to that of concurrent.futures.ThreadPoolExecutor
+    :return: Tuple of (minimum, maximum) of the valid values inside zones, read in one streaming pass
+    """
+    def block_range(window):
+        zones, values = read_block(value_path, zone_path, window, nodata = nodata)
+        return((values.min(), values.max()) if len(values) > 0 else (np.inf, -np.inf))
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers = max_workers) as executor:
+        ranges = list(executor.map(block_range, windows))
+
+    return(min(r[0] for r in ranges), max(r[1] for r in ranges))
+
+
+def merge_partial(totals, partial, mode):
+    """
+    :param totals: e.g. output of .init_totals(), updated in place
+    :param partial: e.g. output of .reduce_block()
+    :param mode: e.g. 'histogram', 'exact' or 'categorical'
+    :return: None, adds the partial statistics of one block to the totals of its zones
+    """
+    zones = partial.get('zones')
+    if mode == 'categorical':
+        totals['classes'][zones] += partial.get('classes')
+        return
+
+    # Zones are unique within a block, so fancy-indexed adds do not collide
+    totals['count'][zones] += partial.get('count')
+    totals['sum'][zones] += partial.get('sum')
+    if mode == 'histogram':
+        totals['hist'][zones] += partial.get('hist')
+    else:
+        for zone, zone_values in zip(zones, np.split(partial.get('values'), partial.get('splits'))):
+            totals['values'][zone].append(zone_values)
+
+
+def init_totals(n_zones, mode, n_bins = default_n_bins, n_classes = None):
+    """
+    :param n_zones: e.g. number of zones
+    :param mode: e.g. 'histogram', 'exact' or 'categorical'
+    :param n_bins: e.g. 512
+    :param n_classes: e.g. number of classes of a categorical dataset
+    :return: Dictionary of empty per-zone totals
+    """
+    if mode == 'categorical':
+        return({'classes': np.zeros((n_zones, n_classes), dtype = np.int64)})
+
+    totals = {'count': np.zeros(n_zones, dtype = np.int64), 'sum': np.zeros(n_zones)}
+    if mode == 'histogram':
+        totals['hist'] = np.zeros((n_zones, n_bins), dtype = np.int64)
+    else:
+        totals['values'] = [[] for zone in range(n_zones)]
+
+    return(totals)
+
+
+def hist_percentiles(hist, value_range, percentiles = eedb_stat.stat_percentiles):
+    """
+    :param hist: e.g. (n_zones, n_bins) array of counts
+    :param value_range: e.g. (0, 100), range of the bins
+    :param percentiles: e.g. [5, 25, 50, 75, 95]
+    :return: Dictionary of {'p5': array, ...}, interpolated linearly within the bin holding each rank, NaN for empty zones
+    """
+    n_bins = hist.shape[1]
+    width = max(value_range[1] - value_range[0], 1e-12) / n_bins
+    cum = np.cumsum(hist, axis = 1)
+    count = cum[:, -1]
+
+    stats = {}
+    for p in percentiles:
+        rank = p / 100.0 * count
+        bin_idx = np.minimum((cum < rank[:, None]).sum(axis = 1), n_bins - 1)
+        below = np.where(bin_idx > 0, cum[np.arange(len(count)), bin_idx - 1], 0)
+        in_bin = hist[np.arange(len(count)), bin_idx]
+        frac = np.where(in_bin > 0, (rank - below) / np.maximum(in_bin, 1), 0.5)
+        stats[f'p{p}'] = np.where(count > 0, value_range[0] + (bin_idx + frac) * width, np.nan)
+
+    return(stats)
+
+
+def exact_percentiles(zone_values, percentiles = eedb_stat.stat_percentiles):
+    """
+    :param zone_values: e.g. list of per-zone lists of value arrays
+    :param percentiles: e.g. [5, 25, 50, 75, 95]
+    :return: Dictionary of {'p5': array, ...} using the nearest rank, NaN for empty zones
+    """
+    stats = {f'p{p}': np.full(len(zone_values), np.nan) for p in percentiles}
+    for zone, chunks in enumerate(zone_values):
+        if len(chunks) > 0:
+            for p, value in zip(percentiles, np.percentile(np.concatenate(chunks), percentiles, method = 'nearest')):
+                stats[f'p{p}'][zone] = value
+
+    return(stats)
+
+
+def finish_totals(totals, mode, value_range = None, in_ic_name = None):
+    """
+    :param totals: e.g. totals after every block is merged
+    :param mode: e.g. 'histogram', 'exact' or 'categorical'
+    :param value_range: e.g. (0, 100), range of the histogram bins
+    :param in_ic_name: e.g. 'USDM', names the classes of categorical datasets
+    :return: Dictionary of per-zone arrays with the statistics of the database, 'mean' and 'p5' ... 'p95' or 'c0' ... 'cN', and 'count'
+    """
+    if mode == 'categorical':
+        stats = {name: totals.get('classes')[:, i] for i, name in enumerate(eedb_stat.get_class_names(in_ic_name))}
+        stats['count'] = totals.get('classes').sum(axis = 1)
+        return(stats)
+
+    count = totals.get('count')
+    stats = {'count': count, 'mean': np.where(count > 0, totals.get('sum') / np.maximum(count, 1), np.nan)}
+    if mode == 'histogram':
+        stats.update(hist_percentiles(totals.get('hist'), value_range))
+    else:
+        stats.update(exact_percentiles(totals.get('values')))
+
+    return(stats)
+
+
+def reduce_raster_local(value_path, zone_path, n_zones, mode = 'histogram', value_range = None, n_bins = default_n_bins, in_ic_name = None,
+                        nodata = None, block_rows = default_block_rows, max_workers = None):
+    '''
+    :param value_path: e.g. 'rap_cover_20220101.npy', a 2D raster of values saved with numpy
+    :param zone_path: e.g. 'blm_allotments_zones.npy', a 2D integer raster of zone indices on the same grid, negative outside zones
+    :param n_zones: e.g. number of zones, zone indices run from 0 to n_zones - 1
+    :param mode: e.g. 'histogram' for percentiles from fixed bins, 'exact' for exact percentiles, or 'categorical' for class counts
+    :param value_range: e.g. (0, 100), range of the histogram bins, read in a first pass when None
+    :param n_bins: e.g. 512, percentiles are within one bin width of the value at their rank
+    :param in_ic_name: e.g. 'USDM', selects the bin schema of categorical datasets
+    :param nodata: e.g. -9999
+    :param block_rows: e.g. 512, rows of the raster reduced by one task
+    :param max_workers: e.g. number of processes, defaults to the number of cores
+    :return: Dictionary of per-zone arrays from .finish_totals(). Counts and sums are exact in every mode. Each process reads
+             one block at a time from the memory-mapped rasters, so peak memory follows the block size and the number of zones
+             rather than the raster size, except in 'exact' mode where the values of every zone are kept
+    '''
+    n_rows = np.load(value_path, mmap_mode = 'r').shape[0]
+    windows = get_windows(n_rows, block_rows)
+    if mode == 'histogram' and value_range is None:
+        value_range = get_value_range(value_path, zone_path, windows, nodata = nodata, max_workers = max_workers)
+
+    n_classes = len(eedb_stat.get_class_names(in_ic_name)) if mode == 'categorical' else None
+    totals = init_totals(n_zones, mode, n_bins = n_bins, n_classes = n_classes)
+
+    # Keep a bounded number of blocks in flight so finished partials are merged before more are read
+    max_workers = max_workers or os.cpu_count()
+    with concurrent.futures.ProcessPoolExecutor(max_workers = max_workers) as executor:
+        max_pending = 2 * max_workers
+        pending = set()
+        for window in windows:
+            pending.add(executor.submit(reduce_block, value_path, zone_path, window, mode, value_range, n_bins, in_ic_name, nodata))
+            if len(pending) >= max_pending:
+                done, pending = concurrent.futures.wait(pending, return_when = concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    merge_partial(totals, future.result(), mode)
+        for future in concurrent.futures.as_completed(pending):
+            merge_partial(totals, future.result(), mode)
+
+    return(finish_totals(totals, mode, value_range = value_range, in_ic_name = in_ic_name))
+
+
+def to_csr(zones, pixels, weights, n_zones, n_pixels):
+    """
+    :param zones: e.g. zone index of each entry
+    :param pixels: e.g. flat dataset pixel index of each entry, unique per zone
+    :param weights: e.g. fraction of the dataset pixel covered by the zone
+    :param n_zones: e.g. number of zones
+    :param n_pixels: e.g. rows * columns of the dataset grid
+    :return: Dictionary of a compressed sparse row matrix of zones by dataset pixels, 'indptr', 'indices', 'weights' and 'shape'
+    """
+    order = np.lexsort((pixels, zones))
+    indptr = np.concatenate([[0], np.cumsum(np.bincount(zones, minlength = n_zones))])
+
+    return({'indptr': indptr.astype(np.int64), 'indices': pixels[order].astype(np.int64), 'weights': weights[order].astype(np.float64),
+            'shape': (n_zones, n_pixels)})
+
+
+def coverage_from_zones(zone_path, n_zones, factor, block_rows = default_block_rows):
+    """
+    :param zone_path: e.g. 'blm_allotments_zones.npy', a zone raster at factor times the resolution of the dataset grid,
+                      aligned to it, negative outside zones
+    :param n_zones: e.g. number of zones
+    :param factor: e.g. 10, zone pixels per dataset pixel along each side
+    :param block_rows: e.g. 512, zone raster rows read at a time, rounded to whole dataset rows
+    :return: Output of .to_csr() with the fraction of each dataset pixel inside each zone
+    """
+    zone_rows, zone_cols = np.load(zone_path, mmap_mode = 'r').shape
+    n_cols = -(-zone_cols // factor)
+    n_pixels = -(-zone_rows // factor) * n_cols
+    rows_per_block = max(block_rows // factor, 1) * factor
+
+    # Blocks hold whole dataset rows, so no (zone, pixel) pair is split across blocks
+    zones, pixels, counts = [], [], []
+    for row, row_end in get_windows(zone_rows, rows_per_block):
+        block = np.load(zone_path, mmap_mode = 'r')[row:row_end]
+        fine_rows, fine_cols = np.nonzero(block >= 0)
+        keys = block[fine_rows, fine_cols].astype(np.int64) * n_pixels + ((fine_rows + row) // factor) * n_cols + fine_cols // factor
+        keys, key_counts = np.unique(keys, return_counts = True)
+        zones.append(keys // n_pixels)
+        pixels.append(keys % n_pixels)
+        counts.append(key_counts)
+
+    return(to_csr(np.concatenate(zones), np.concatenate(pixels), np.concatenate(counts) / factor ** 2, n_zones, n_pixels))
+
+
+def points_in_rings(x, y, rings):
+    """
+    :param x: e.g. array of point longitudes
+    :param y: e.g. array of point latitudes
+    :param rings: e.g. [[(x, y), ...], ...], exterior rings, holes and parts of multipolygons together
+    :return: Boolean array of points inside by the even-odd rule, so holes are left out
+    """
+    inside = np.zeros(len(x), dtype = bool)
+    for ring in rings:
+        ring = np.asarray(ring, dtype = np.float64)
+        for (x1, y1), (x2, y2) in zip(ring, np.roll(ring, -1, axis = 0)):
+            crosses = (y1 > y) != (y2 > y)
+            x_cross = x1 + (y - y1) * (x2 - x1) / np.where(y2 != y1, y2 - y1, 1)
+            inside ^= crosses & (x < x_cross)
+
+    return(inside)
+
+
+def coverage_from_polygons(polygons, grid, supersample = default_supersample):
+    """
+    :param polygons: e.g. list of the rings of each feature, [[[(x, y), ...], ...], ...] in the coordinates of the grid
+    :param grid: e.g. {'x0': -125.0, 'y0': 49.5, 'dx': 0.0417, 'width': 1386, 'height': 585}, upper left corner and square pixel size
+    :param supersample: e.g. 10, sub-pixels along each side of a dataset pixel whose centers are tested
+    :return: Output of .to_csr() with the fraction of each dataset pixel inside each feature. A feature too small to hold a
+             sub-pixel center is given its whole weight at the dataset pixel of its bounding box center
+    """
+    zones, pixels, weights = [], [], []
+    step = grid.get('dx') / supersample
+    for zone, rings in enumerate(polygons):
+        points = np.concatenate([np.asarray(ring, dtype = np.float64) for ring in rings])
+        xmin, ymin = points.min(axis = 0)
+        xmax, ymax = points.max(axis = 0)
+
+        # Sub-pixel centers of the dataset pixels under the bounding box
+        col0 = max(int((xmin - grid.get('x0')) / grid.get('dx')), 0)
+        col1 = min(int((xmax - grid.get('x0')) / grid.get('dx')) + 1, grid.get('width'))
+        row0 = max(int((grid.get('y0') - ymax) / grid.get('dx')), 0)
+        row1 = min(int((grid.get('y0') - ymin) / grid.get('dx')) + 1, grid.get('height'))
+        if col1 <= col0 or row1 <= row0:
+            continue
+        sub_cols = np.arange(col0 * supersample, col1 * supersample)
+        sub_rows = np.arange(row0 * supersample, row1 * supersample)
+        sub_x, sub_y = np.meshgrid(grid.get('x0') + (sub_cols + 0.5) * step, grid.get('y0') - (sub_rows + 0.5) * step)
+        inside = points_in_rings(sub_x.ravel(), sub_y.ravel(), rings)
+
+        if not inside.any():
+            col = min(max(int(((xmin + xmax) / 2 - grid.get('x0')) / grid.get('dx')), 0), grid.get('width') - 1)
+            row = min(max(int((grid.get('y0') - (ymin + ymax) / 2) / grid.get('dx')), 0), grid.get('height') - 1)
+            zones.append(np.array([zone]))
+            pixels.append(np.array([row * grid.get('width') + col]))
+            weights.append(np.array([1.0]))
+            continue
+
+        sub_pixels = (np.repeat(sub_rows // supersample, len(sub_cols)) * grid.get('width') + np.tile(sub_cols // supersample, len(sub_rows)))[inside]
+        zone_pixels, counts = np.unique(sub_pixels, return_counts = True)
+        zones.append(np.full(len(zone_pixels), zone))
+        pixels.append(zone_pixels)
+        weights.append(counts / supersample ** 2)
+
+    if len(zones) == 0:
+        return(to_csr(np.zeros(0, dtype = np.int64), np.zeros(0, dtype = np.int64), np.zeros(0), len(polygons), grid.get('width') * grid.get('height')))
+    return(to_csr(np.concatenate(zones), np.concatenate(pixels), np.concatenate(weights), len(polygons), grid.get('width') * grid.get('height')))
+
+
+def save_coverage(coverage, path):
+    """
+    :param coverage: e.g. output of .coverage_from_zones() or .coverage_from_polygons()
+    :param path: e.g. 'blm-database/BLM_Allotments-GridMET-coverage.npz', one file per feature collection and dataset grid
+    :return: Path of the file, replaced in one step so readers never see a partial matrix
+    """
+    os.makedirs(os.path.dirname(path) or '.', exist_ok = True)
+    with open(f'{path}.tmp', 'wb') as f:
+        np.savez(f, indptr = coverage.get('indptr'), indices = coverage.get('indices'), weights = coverage.get('weights'), shape = np.asarray(coverage.get('shape')))
+    os.replace(f'{path}.tmp', path)
+
+    return(path)
+
+
+def load_coverage(path):
+    """
+    :param path: e.g. 'blm-database/BLM_Allotments-GridMET-coverage.npz'
+    :return: Dictionary of the matrix written by .save_coverage()
+    """
+    with np.load(path) as f:
+        return({'indptr': f['indptr'], 'indices': f['indices'], 'weights': f['weights'], 'shape': tuple(int(n) for n in f['shape'])})
+
+
+def read_stack_block(stack_path, dates, indices, nodata = None):
+    """
+    :param stack_path: e.g. 'gridmet_pr_stack.npy', a (dates, rows, columns) or (dates, pixels) array of the dataset grid
+    :param dates: e.g. (0, 256), date positions to read
+    :param indices: e.g. 'indices' of the coverage matrix
+    :param nodata: e.g. -9999
+    :return: Tuple of (values, valid) arrays of shape (dates, entries) at the pixels of the matrix entries, invalid values as 0
+    """
+    stack = np.load(stack_path, mmap_mode = 'r')
+    values = np.asarray(stack[dates[0]:dates[1]]).reshape(dates[1] - dates[0], -1)[:, indices].astype(np.float64)
+    valid = np.isfinite(values)
+    if nodata is not None:
+        valid &= values != nodata
+
+    return(np.where(valid, values, 0.0), valid)
+
+
+def sum_rows(coverage, entries):
+    """
+    :param coverage: e.g. output of .coverage_from_zones()
+    :param entries: e.g. (dates, entries) array of weighted values in the order of the matrix entries
+    :return: (dates, zones) array of the sums over the entries of each zone, the sparse product with the matrix
+    """
+    indptr = coverage.get('indptr')
+    sums = np.zeros((entries.shape[0], len(indptr) - 1))
+    filled = np.flatnonzero(np.diff(indptr) > 0)
+    if len(filled) > 0:
+        sums[:, filled] = np.add.reduceat(entries, indptr[filled], axis = 1)
+
+    return(sums)
+
+
+def weighted_percentiles(coverage, values, valid, percentiles = eedb_stat.stat_percentiles):
+    """
+    :param coverage: e.g. output of .coverage_from_zones()
+    :param values: e.g. (dates, entries) values at the pixels of the matrix entries
+    :param valid: e.g. (dates, entries) boolean array of values that are not masked
+    :param percentiles: e.g. [5, 25, 50, 75, 95]
+    :return: Dictionary of {'p5': (dates, zones) array, ...}, the first value whose cumulative coverage weight reaches the
+             percentile of the zone weight, NaN where a zone has no valid pixels
+    """
+    indptr = coverage.get('indptr')
+    n_dates, n_zones = values.shape[0], len(indptr) - 1
+    stats = {f'p{p}': np.full((n_dates, n_zones), np.nan) for p in percentiles}
+    if len(percentiles) == 0:
+        return(stats)
+
+    # Zones are sorted by value for every date at once, invalid pixels last with no weight
+    for zone in np.flatnonzero(np.diff(indptr) > 0):
+        start, end = indptr[zone], indptr[zone + 1]
+        zone_valid = valid[:, start:end]
+        zone_weights = np.where(zone_valid, coverage.get('weights')[start:end], 0.0)
+        order = np.argsort(np.where(zone_valid, values[:, start:end], np.inf), axis = 1, kind = 'stable')
+        sorted_values = np.take_along_axis(values[:, start:end], order, axis = 1)
+        cum = np.cumsum(np.take_along_axis(zone_weights, order, axis = 1), axis = 1)
+        total = cum[:, -1]
+        for p in percentiles:
+            idx = np.minimum((cum < (p / 100.0 * total)[:, None] - 1e-12).sum(axis = 1), end - start - 1)
+            stats[f'p{p}'][:, zone] = np.where(total > 0, sorted_values[np.arange(n_dates), idx], np.nan)
+
+    return(stats)
+
+
+def reduce_stack_local(stack_path, coverage, percentiles = eedb_stat.stat_percentiles, nodata = None, date_block = None):
+    '''
+    :param stack_path: e.g. 'gridmet_pr_stack.npy', a (dates, rows, columns) array of every date on the dataset grid
+    :param coverage: e.g. output of .coverage_from_zones(), .coverage_from_polygons() or .load_coverage() for the same grid
+    :param percentiles: e.g. [5, 25, 50, 75, 95], or [] for means only
+    :param nodata: e.g. -9999
+    :param date_block: e.g. 256, dates read at a time, by default as many as fit about 256 MB of entries
+    :return: Dictionary of (dates, zones) arrays: coverage-weighted 'mean', weighted percentiles, and 'weight', the dataset
+             pixels of valid data covered by each zone. Each block of dates is one gather of the pixels of the matrix entries
+             and one sparse product, so the zone lookups are done once for the whole history
+    '''
+    n_dates = np.load(stack_path, mmap_mode = 'r').shape[0]
+    date_block = date_block or max(2 ** 25 // max(len(coverage.get('indices')), 1), 1)
+    weights = coverage.get('weights')
+
+    blocks = []
+    for dates in get_windows(n_dates, date_block):
+        values, valid = read_stack_block(stack_path, dates, coverage.get('indices'), nodata = nodata)
+        weight = sum_rows(coverage, valid * weights)
+        block = {'mean': np.where(weight > 0, sum_rows(coverage, values * weights) / np.where(weight > 0, weight, 1), np.nan), 'weight': weight}
+        block.update(weighted_percentiles(coverage, values, valid, percentiles))
+        blocks.append(block)
+
+    return({name: np.concatenate([block.get(name) for block in blocks]) for name in blocks[0]})
+
+
+def make_synthetic_stack(out_dir, n_dates = 1000, n_rows = 128, n_cols = 128, seed = 0):
+    """
+    :param out_dir: e.g. 'local-benchmark'
+    :param n_dates: e.g. 1000
+    :param n_rows: e.g. 128, rows of the coarse dataset grid
+    :param n_cols: e.g. 128
+    :param seed: e.g. 0
+    :return: Path of a (dates, rows, columns) stack written date by date with a numpy memory map, about one value in a hundred NaN
+    """
+    os.makedirs(out_dir, exist_ok = True)
+    stack_path = os.path.join(out_dir, 'stack.npy')
+    stack = np.lib.format.open_memmap(stack_path, mode = 'w+', dtype = np.float32, shape = (n_dates, n_rows, n_cols))
+    rng = np.random.default_rng(seed)
+    for date in range(n_dates):
+        values = rng.gamma(2.0, 10.0, size = (n_rows, n_cols))
+        values[rng.uniform(size = values.shape) < 0.01] = np.nan
+        stack[date] = values
+    stack.flush()
+
+    return(stack_path)
+
+
+def write_stats_local(stats, out_file, zone_ids = None):
+    """
+    :param stats: e.g. output of .reduce_raster_local()
+    :param out_file: e.g. 'blm-database/synthetic-rapcover-afg/20220101.csv'
+    :param zone_ids: e.g. land unit IDs of the zone indices, defaults to the indices
+    :return: Path of the written CSV, replaced in one step so readers never see a partial table
+    """
+    names = list(stats.keys())
+    zone_ids = zone_ids if zone_ids is not None else range(len(stats.get(names[0])))
+
+    os.makedirs(os.path.dirname(out_file) or '.', exist_ok = True)
+    with open(f'{out_file}.tmp', 'w', newline = '') as f:
+        writer = csv.writer(f)
+        writer.writerow(['zone'] + names)
+        for i, zone_id in enumerate(zone_ids):
+            writer.writerow([zone_id] + [stats.get(name)[i] for name in names])
+    os.replace(f'{out_file}.tmp', out_file)
+
+    return(out_file)
+
+
+def make_synthetic_rasters(out_dir, n_rows = 4096, n_cols = 4096, n_zones = 1000, seed = 0):
+    """
+    :param out_dir: e.g. 'local-benchmark'
+    :param n_rows: e.g. 4096
+    :param n_cols: e.g. 4096
+    :param n_zones: e.g. 1000, square zones on a grid with gaps outside any zone
+    :param seed: e.g. 0
+    :return: Tuple of (value path, zone path) of rasters written block by block with numpy memory maps
+    """
+    os.makedirs(out_dir, exist_ok = True)
+    value_path = os.path.join(out_dir, 'values.npy')
+    zone_path = os.path.join(out_dir, 'zones.npy')
+    values = np.lib.format.open_memmap(value_path, mode = 'w+', dtype = np.float32, shape = (n_rows, n_cols))
+    zones = np.lib.format.open_memmap(zone_path, mode = 'w+', dtype = np.int32, shape = (n_rows, n_cols))
+
+    # Zones tile the raster in a square grid, one column of tiles is left outside every zone
+    n_side = int(np.ceil(np.sqrt(n_zones)))
+    tile_cols = n_cols // (n_side + 1)
+    tile_rows = n_rows // n_side + 1
+    rng = np.random.default_rng(seed)
+    col_zone = np.where(np.arange(n_cols) // tile_cols < n_side, np.arange(n_cols) // tile_cols, -1)
+    for row, row_end in get_windows(n_rows):
+        row_zone = (np.arange(row, row_end) // tile_rows)[:, None] * n_side + col_zone[None, :]
+        zones[row:row_end] = np.where((col_zone[None, :] >= 0) & (row_zone < n_zones), row_zone, -1)
+        values[row:row_end] = rng.gamma(2.0, 10.0, size = (row_end - row, n_cols))
+    values.flush()
+    zones.flush()
+
+    return(value_path, zone_path)
+
+
+def reduce_stack_main(args):
+    '''
+    :param args: e.g. parsed arguments of .main() with factor set
+    :return: None, prints the seconds spent building the coverage weights and reducing every date
+    '''
+    stack_path, zone_path = args.value_path, args.zone_path
+    if stack_path is None:
+        stack_path = make_synthetic_stack('local-benchmark')
+        n_rows, n_cols = np.load(stack_path, mmap_mode = 'r').shape[1:]
+        zone_path = make_synthetic_rasters('local-benchmark', n_rows = n_rows * args.factor, n_cols = n_cols * args.factor)[1]
+    n_zones = args.n_zones or int(np.load(zone_path, mmap_mode = 'r').max()) + 1
+
+    # The weights depend only on the features and the dataset grid, so they are built once and reused for every date
+    start = time.perf_counter()
+    if args.coverage is not None and os.path.exists(args.coverage):
+        coverage = load_coverage(args.coverage)
+    else:
+        coverage = coverage_from_zones(zone_path, n_zones, args.factor, block_rows = args.block_rows)
+        if args.coverage is not None:
+            save_coverage(coverage, args.coverage)
+    print(f"Coverage of {n_zones} zones over {coverage.get('shape')[1]} pixels with {len(coverage.get('indices'))} entries in {time.perf_counter() - start:.2f} s")
+
+    start = time.perf_counter()
+    stats = reduce_stack_local(stack_path, coverage)
+    print(f"Reduced {np.load(stack_path, mmap_mode = 'r').shape} stack to {n_zones} zones in {time.perf_counter() - start:.2f} s")
+    if args.out is not None:
+        np.savez(args.out, **stats)
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'Reduce a memory-mapped raster to per-zone statistics block by block across processes.')
+    parser.add_argument('value_path', nargs = '?', default = None, help = 'numpy raster of values, a synthetic raster is written when missing')
+    parser.add_argument('zone_path', nargs = '?', default = None, help = 'numpy raster of zone indices on the same grid')
+    parser.add_argument('--n-zones', type = int, default = None, help = 'number of zones, read from the zone raster when missing')
+    parser.add_argument('--mode', default = 'histogram', choices = ['histogram', 'exact', 'categorical'], help = 'how percentiles or classes are counted')
+    parser.add_argument('--range', nargs = 2, type = float, default = None, help = 'minimum and maximum of the histogram bins')
+    parser.add_argument('--n-bins', type = int, default = default_n_bins, help = 'histogram bins')
+    parser.add_argument('--dataset', default = None, help = 'dataset whose bin schema sets the classes in categorical mode')
+    parser.add_argument('--block-rows', type = int, default = default_block_rows, help = 'raster rows per block')
+    parser.add_argument('--max-workers', type = int, default = None, help = 'processes, defaults to the number of cores')
+    parser.add_argument('--out', default = None, help = 'CSV file to write the statistics to')
+    parser.add_argument('--factor', type = int, default = None, help = 'reduce value_path as a (dates, rows, columns) stack on a grid this many times coarser than the zone raster, with coverage weights')
+    parser.add_argument('--coverage', default = None, help = '.npz file of the coverage weights, built from the zone raster and saved when missing')
+    args = parser.parse_args(argv)
+    if args.mode == 'categorical' and args.dataset not in eedb_colinfo.bin_dict:
+        parser.error(f"--mode categorical requires --dataset, one of {', '.join(eedb_colinfo.bin_dict.keys())}")
+
+    if args.factor is not None:
+        reduce_stack_main(args)
+        return
+
+    value_path, zone_path = args.value_path, args.zone_path
+    if value_path is None:
+        value_path, zone_path = make_synthetic_rasters('local-benchmark')
+    n_zones = args.n_zones or int(np.load(zone_path, mmap_mode = 'r').max()) + 1
+
+    start = time.perf_counter()
+    stats = reduce_raster_local(value_path, zone_path, n_zones, mode = args.mode, value_range = args.range, n_bins = args.n_bins,
+                                in_ic_name = args.dataset, block_rows = args.block_rows, max_workers = args.max_workers)
+    print(f"Reduced {np.load(value_path, mmap_mode = 'r').shape} pixels to {n_zones} zones in {time.perf_counter() - start:.2f} s")
+    if args.out is not None:
+        write_stats_local(stats, args.out)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+import argparse
+import ee
+import eeDatabase_coreMethods as eedb_cor
+import eeDatabase_collectionInfo as eedb_colinfo
+
+
+def get_masked_datasets():
+    """
+    :return: List of datasets in in_ic_dict that apply the ownership mask to land units with fc_mask
+    """
+    return([in_ic_name for in_ic_name, in_ic_info in eedb_colinfo.in_ic_dict.items() if in_ic_info.get('ic_mask') == True])
+
+
+def get_mask_frac_img(mask_path = eedb_colinfo.mask_path):
+    """
+    :param mask_path: e.g. path of the binary ownership mask
+    :return: Earth Engine Image of the fraction of each output pixel covered by the mask, computed from the native mask
+             pixels when exported or reprojected at a coarser resolution
+    """
+    # Pixels outside the mask count as 0 so the mean is the covered fraction
+    mask_i = ee.Image(mask_path).unmask(0).gt(0)
+
+    return(mask_i.reduceResolution(reducer = ee.Reducer.mean(), maxPixels = 65535).rename('mask_frac').toFloat())
+
+
+def build_mask_frac(in_ic_name, mask_path = eedb_colinfo.mask_path, root = eedb_colinfo.mask_frac_root):
+    '''
+    :param in_ic_name: e.g. 'MOD11_LST'
+    :param mask_path: e.g. path of the binary ownership mask
+    :param root: e.g. folder holding the mask fraction images
+    :return: Started export task writing the mask fraction on the grid of the dataset, or None if the dataset is not
+             coarser than the mask and would gain nothing from a fraction
+    '''
+    in_ic_paths = eedb_colinfo.in_ic_dict.get(in_ic_name).get('in_ic_paths')
+
+    # Read the dataset grid and both resolutions in one request
+    info = ee.Dictionary({'proj': ee.ImageCollection(in_ic_paths[0]).first().select(0).projection(),
+                          'in_ic_res': eedb_cor.get_in_ic_res(in_ic_name),
+                          'mask_res': ee.Image(mask_path).projection().nominalScale()}).getInfo()
+    if info.get('in_ic_res') < 2 * info.get('mask_res'):
+        print(f"{in_ic_name} is not coarser than the mask, skipping")
+        return(None)
+
+    mask_frac_path = eedb_cor.get_mask_frac_path(info.get('in_ic_res'), root = root)
+    mask_frac_i = get_mask_frac_img(mask_path).set({'mask_path': mask_path, 'in_ic_res': info.get('in_ic_res')})
+
+    # Export on the dataset grid so reductions never resample the mask again
+    task = ee.batch.Export.image.toAsset(
+        image = mask_frac_i,
+        description = f"mask fraction - {mask_frac_path.split('/')[-1]}",
+        assetId = mask_frac_path,
+        region = ee.Image(mask_path).geometry(),
+        crs = info.get('proj').get('crs'),
+        crsTransform = info.get('proj').get('transform'),
+        maxPixels = 1e13)
+    task.start()
+
+    return(task)
+
+
+def build_mask_fracs(in_ic_names = None, mask_path = eedb_colinfo.mask_path, root = eedb_colinfo.mask_frac_root):
+    '''
+    :param in_ic_names: e.g. ['MOD11_LST', 'MOD16_ET'], defaults to every masked dataset
+    :param mask_path: e.g. path of the binary ownership mask
+    :param root: e.g. folder holding the mask fraction images
+    :return: Dictionary of {in_ic_name: started export task or None}
+    '''
+    return({in_ic_name: build_mask_frac(in_ic_name, mask_path = mask_path, root = root) for in_ic_name in in_ic_names or get_masked_datasets()})
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'Export the fraction of each dataset pixel covered by the ownership mask, once per dataset resolution.')
+    parser.add_argument('--datasets', nargs = '+', default = None, help = 'datasets to build mask fractions for, defaults to every masked dataset')
+    parser.add_argument('--project', default = 'dri-apps', help = 'Earth Engine cloud project')
+    args = parser.parse_args(argv)
+
+    ee.Initialize(project = args.project)
+    tasks = build_mask_fracs(args.datasets)
+    print(f"Started {len([task for task in tasks.values() if task is not None])} mask fraction exports")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+import os
+import eeDatabase_collectionInfo as eedb_colinfo
+
+
+def get_land_unit_path(land_unit):
+    """
+    :param land_unit: e.g. 'BLM_Allotments' or 'projects/dri-apps/assets/blm-admin/blm-natl-grazing-allotment-polygons'
+    :return: Input Feature Collection path for the land unit, a key of land_unit_dict
+    """
+    if land_unit in eedb_colinfo.land_unit_dict:
+        return(land_unit)
+    for in_fc_path, land_unit_info in eedb_colinfo.land_unit_dict.items():
+        if land_unit_info.get('land_unit_short') == land_unit:
+            return(in_fc_path)
+    raise ValueError(f'Unknown land unit {land_unit}')
+
+
+def get_out_path(land_unit_short, in_ic_name, var_name, root = eedb_colinfo.database_root, sink = 'image'):
+    """
+    :param land_unit_short: e.g. 'BLM_Allotments'
+    :param in_ic_name: e.g. 'GridMET_Drought'
+    :param var_name: e.g. 'Long_Term_Drought_Blend'
+    :param root: e.g. folder holding the database Image Collections
+    :param sink: e.g. 'image', 'table' or 'local', table assets are written to a folder with a '-table' suffix
+    :return: Path of the database Image Collection, e.g. '.../blm-database/blmallotments-gridmetdrought-longtermdroughtblend'
+    """
+    out_path = f"{root}/{land_unit_short.replace('_', '').lower()}-{in_ic_name.replace('_', '').lower()}-{var_name.replace('_', '').lower()}"
+    if sink == 'table':
+        out_path = f'{out_path}-table'
+    return(out_path)
+
+
+def get_local_dir(out_path, properties):
+    """
+    :param out_path: e.g. path of the database Image Collection
+    :param properties: e.g. output of eeDatabase_coreMethods.get_run_properties() with 'local_dir' set
+    :return: Local directory holding the per-date tables written by the 'local' sink
+    """
+    return(os.path.join(properties.get('local_dir', 'blm-database'), out_path.split('/')[-1]))
@@ -0,0 +1,557 @@
+import argparse
+import collections
+import concurrent.futures
+import csv
+import datetime
+import functools
+import http.server
+import json
+import os
+import threading
+import time
+import urllib.parse
+import numpy as np
+import eeDatabase_collectionInfo as eedb_colinfo
+import eeDatabase_pathNames as eedb_path
+import eeDatabase_statNames as eedb_stat
+
+# Bytes of decoded collection arrays kept in memory before the least recently used collection is dropped
+default_cache_bytes = 1024 ** 3
+
+# Limits of one computePixels request, a request reads every date of a chunk for a run of equator pixels
+max_request_bands = 1024
+max_request_cols = 32768
+max_request_bytes = 32 * 2 ** 20
+
+# Pixel size in degrees of the equator layout, matching exports at a scale of 22.264 m
+equator_dx = 0.0002
+
+# Value written for masked pixels so they can be told apart in the downloaded arrays
+nodata_value = -9999
+
+# Bytes counted per feature for its entry in the ID index, in addition to the arrays
+index_entry_bytes = 160
+
+
+class SeriesTable:
+    """
+    Statistics of every feature and date of one database collection decoded into a float32 array indexed as
+    [feature, date, statistic], so the series of one feature is a contiguous slice. Dates are sorted, so a date range
+    is two binary searches, and feature IDs are looked up in a dictionary. Missing values are NaN.
+    """
+    def __init__(self, ids, dates, stats, values):
+        '''
+        :param ids: e.g. land unit IDs in the order of the first axis of values
+        :param dates: e.g. millis since epoch in the order of the second axis of values
+        :param stats: e.g. ['mean', 'p5', ...] or ['c0', 'c1', ...], in the order of the third axis of values
+        :param values: e.g. array of shape (len(ids), len(dates), len(stats))
+        '''
+        order = np.argsort(dates, kind = 'stable')
+        self.dates = np.asarray(dates, dtype = np.int64)[order]
+        self.values = np.ascontiguousarray(np.asarray(values, dtype = np.float32)[:, order, :])
+        self.ids = [str(fc_id) for fc_id in ids]
+        self.index = {fc_id: i for i, fc_id in enumerate(self.ids)}
+        self.stats = list(stats)
+        self.stat_index = {stat: i for i, stat in enumerate(self.stats)}
+
+    @property
+    def nbytes(self):
+        return(self.values.nbytes + self.dates.nbytes + index_entry_bytes * len(self.ids))
+
+    def query(self, fc_ids, start_date = None, end_date = None, stats = None):
+        '''
+        :param fc_ids: e.g. ['1234', '5678'], IDs that are not in the collection are left out
+        :param start_date: e.g. millis since epoch of the first date, or None from the first stored date
+        :param end_date: e.g. millis since epoch after the last date, exclusive as in filterDate(), or None to the last stored date
+        :param stats: e.g. ['mean', 'p50'], or None for every statistic
+        :return: Tuple of (dates in the range, {fc_id: array of shape (dates, stats)}, stats)
+        '''
+        start = 0 if start_date is None else int(np.searchsorted(self.dates, start_date, side = 'left'))
+        end = len(self.dates) if end_date is None else int(np.searchsorted(self.dates, end_date, side = 'left'))
+        stats = self.stats if stats is None else [stat for stat in stats if stat in self.stat_index]
+        columns = [self.stat_index.get(stat) for stat in stats]
+        all_stats = columns == list(range(len(self.stats)))
+
+        series = {}
+        for fc_id in fc_ids:
+            i = self.index.get(str(fc_id))
+            if i is not None:
+                series[str(fc_id)] = self.values[i, start:end] if all_stats else self.values[i, start:end][:, columns]
+
+        return(self.dates[start:end], series, stats)
+
+
+class SeriesCache:
+    """
+    Least recently used cache of SeriesTables by collection path within a memory budget. A collection is loaded once
+    even when several threads ask for it at the same time, and the least recently used tables are dropped once the
+    decoded arrays exceed the budget, keeping at least the table just used. Tables older than max_age are reloaded so
+    dates appended by later runs are served, and .invalidate() drops them as soon as a collection is known to change.
+    """
+    def __init__(self, loader, max_bytes = default_cache_bytes, max_age = None):
+        '''
+        :param loader: e.g. functools.partial(load_local, local_dir = 'blm-database'), called as loader(out_path, in_ic_name, in_fc_id)
+        :param max_bytes: e.g. 1024 ** 3
+        :param max_age: e.g. 3600, seconds a table is served before it is reloaded, or None to keep it until evicted or invalidated
+        '''
+        self.loader = loader
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.tables = collections.OrderedDict()
+        self.loaded = {}
+        self.nbytes = 0
+        self.counts = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0, 'invalidations': 0}
+        self.lock = threading.Lock()
+        self.load_locks = {}
+
+    def lookup(self, out_path):
+        '''
+        :param out_path: e.g. path of the database Image Collection
+        :return: Cached SeriesTable, or None when it is not cached or has expired, called holding the cache lock
+        '''
+        if out_path not in self.tables:
+            return(None)
+        if self.max_age is not None and time.monotonic() - self.loaded.get(out_path) > self.max_age:
+            self.nbytes -= self.tables.pop(out_path).nbytes
+            self.loaded.pop(out_path, None)
+            self.counts['expirations'] += 1
+            return(None)
+        self.tables.move_to_end(out_path)
+        self.counts['hits'] += 1
+        return(self.tables.get(out_path))
+
+    def get(self, out_path, in_ic_name, in_fc_id):
+        '''
+        :param out_path: e.g. path of the database Image Collection
+        :param in_ic_name: e.g. 'GridMET_Drought', selects the statistics
+        :param in_fc_id: e.g. 'ALLOT_ID', ID column of local tables
+        :return: SeriesTable of the collection, loaded if it is not cached
+        '''
+        with self.lock:
+            table = self.lookup(out_path)
+            if table is not None:
+                return(table)
+            load_lock = self.load_locks.setdefault(out_path, threading.Lock())
+
+        # Load outside the cache lock so lookups of cached collections are not held up by a slow load
+        with load_lock:
+            with self.lock:
+                table = self.lookup(out_path)
+                if table is not None:
+                    return(table)
+            table = self.loader(out_path, in_ic_name, in_fc_id)
+
+            with self.lock:
+                self.counts['misses'] += 1
+                if out_path in self.tables:
+                    self.nbytes -= self.tables.pop(out_path).nbytes
+                self.tables[out_path] = table
+                self.loaded[out_path] = time.monotonic()
+                self.nbytes += table.nbytes
+                while self.nbytes > self.max_bytes and len(self.tables) > 1:
+                    evicted_path, evicted = self.tables.popitem(last = False)
+                    self.loaded.pop(evicted_path, None)
+                    self.nbytes -= evicted.nbytes
+                    self.counts['evictions'] += 1
+                self.load_locks.pop(out_path, None)
+
+        return(table)
+
+    def invalidate(self, out_path = None):
+        '''
+        :param out_path: e.g. path of a collection that gained dates, or None to drop every table
+        :return: Number of tables dropped
+        '''
+        with self.lock:
+            dropped = 0
+            for path in ([out_path] if out_path is not None else list(self.tables)):
+                table = self.tables.pop(path, None)
+                self.loaded.pop(path, None)
+                if table is not None:
+                    self.nbytes -= table.nbytes
+                    dropped += 1
+            self.counts['invalidations'] += dropped
+        return(dropped)
+
+    def info(self):
+        '''
+        :return: Dictionary of cached collections, bytes used, budget and maximum age, and hit, miss, eviction, expiration
+                 and invalidation counts
+        '''
+        with self.lock:
+            return(dict(self.counts, collections = len(self.tables), bytes = self.nbytes, max_bytes = self.max_bytes, max_age = self.max_age))
+
+
+def load_local(out_path, in_ic_name, in_fc_id, local_dir = 'blm-database'):
+    """
+    :param out_path: e.g. path of the database Image Collection, whose name is the local directory
+    :param in_ic_name: e.g. 'GridMET_Drought', selects the statistics
+    :param in_fc_id: e.g. 'ALLOT_ID', ID column of the tables
+    :param local_dir: e.g. 'blm-database', as set for the 'local' sink
+    :return: SeriesTable of the per-date CSV or Parquet tables written by the 'local' sink
+    """
+    out_dir = eedb_path.get_local_dir(out_path, {'local_dir': local_dir})
+    stats = eedb_stat.get_stat_names(in_ic_name)
+
+    # Read each date as an ID list and a statistics matrix, features can differ between dates
+    dates, date_ids, date_values = [], [], []
+    for name in sorted(os.listdir(out_dir)):
+        path = os.path.join(out_dir, name)
+        if name.endswith('.parquet'):
+            import pandas
+            rows = pandas.read_parquet(path).to_dict('records')
+        elif name.endswith('.csv'):
+            with open(path, newline = '') as f:
+                rows = list(csv.DictReader(f))
+        else:
+            continue
+        if len(rows) == 0:
+            continue
+        dates.append(int(float(rows[0].get('system:time_start'))))
+        date_ids.append([str(row.get(in_fc_id)) for row in rows])
+        date_values.append(np.array([[float(row.get(stat)) if row.get(stat) not in [None, ''] else np.nan for stat in stats] for row in rows], dtype = np.float32))
+
+    ids = list(dict.fromkeys(fc_id for fc_ids in date_ids for fc_id in fc_ids))
+    index = {fc_id: i for i, fc_id in enumerate(ids)}
+    values = np.full((len(ids), len(dates), len(stats)), np.nan, dtype = np.float32)
+    for j, (fc_ids, date_value) in enumerate(zip(date_ids, date_values)):
+        values[[index.get(fc_id) for fc_id in fc_ids], j] = date_value
+
+    return(SeriesTable(ids, dates, stats, values))
+
+
+def get_equator_grid(col, width):
+    """
+    :param col: e.g. 0, first equator pixel of the request
+    :param width: e.g. 32768, number of equator pixels
+    :return: Pixel grid of computePixels() covering the equator pixels from col, one pixel per feature
+    """
+    return({'dimensions': {'width': width, 'height': 1},
+            'affineTransform': {'scaleX': equator_dx, 'shearX': 0, 'translateX': (col - 0.5) * equator_dx,
+                                'shearY': 0, 'scaleY': -equator_dx, 'translateY': 1.5 * equator_dx},
+            'crsCode': 'EPSG:4326'})
+
+
+def compute_equator_pixels(img, col, width):
+    """
+    :param img: e.g. Earth Engine Image at the equator pixels
+    :param col: e.g. 0, first equator pixel of the request
+    :param width: e.g. 32768
+    :return: Dictionary of {band: float64 array of the pixels}, with masked pixels as NaN
+    """
+    import ee
+    pixels = ee.data.computePixels({'expression': img.unmask(nodata_value, False), 'fileFormat': 'NUMPY_NDARRAY', 'grid': get_equator_grid(col, width)})
+    out = {}
+    for name in pixels.dtype.names:
+        values = pixels[name].reshape(-1).astype(np.float64)
+        out[name] = np.where(values == nodata_value, np.nan, values)
+
+    return(out)
+
+
+def load_ee(out_path, in_ic_name, in_fc_id, storage = 'date', max_workers = 8):
+    """
+    :param out_path: e.g. path of the database Image Collection
+    :param in_ic_name: e.g. 'GridMET_Drought', selects the statistics
+    :param in_fc_id: e.g. 'ALLOT_ID', not needed as the ID image holds the IDs
+    :param storage: e.g. 'date' for one image per date or 'annual' for one image per year
+    :param max_workers: e.g. number of computePixels requests made concurrently
+    :return: SeriesTable of the equator images, downloaded with computePixels in requests of many dates and equator pixels
+    """
+    # Earth Engine is only imported to read from it, so the local source and the benchmark run without it
+    import ee
+    import eeDatabase_coreMethods as eedb_cor
+    info = eedb_cor.get_info_batch({'dates': eedb_cor.get_stored_dates(out_path).distinct(),
+                                    'bounds': ee.Image(f'{out_path}/0_id').geometry().bounds().coordinates()})
+    dates = sorted(info.get('dates'))
+    # The footprint of the ID image ends within a pixel of the last feature, a column past it is read as nodata and dropped
+    width = int(max(x for x, y in info.get('bounds')[0]) / equator_dx) + 1
+    stats = eedb_stat.get_stat_names(in_ic_name)
+
+    # Each request holds every statistic of a chunk of dates for a run of pixels, within the band and size limits
+    n_dates = max(max_request_bands // len(stats), 1)
+    date_chunks = [dates[i:i + n_dates] for i in range(0, len(dates), n_dates)]
+    n_cols = max(min(max_request_cols, max_request_bytes // (8 * len(stats) * min(n_dates, max(len(dates), 1)))), 1)
+    col_chunks = [(col, min(n_cols, width - col)) for col in range(0, width, n_cols)]
+
+    def read_chunk(date_chunk, col, n):
+        band_names = [f'{stat}_{eedb_cor.get_date_id(date)}' for date in date_chunk for stat in stats]
+        img = ee.ImageCollection([eedb_cor.get_stored_img(out_path, date, in_ic_name, storage = storage) for date in date_chunk])\
+            .toBands().rename(band_names)
+        return(compute_equator_pixels(img, col, n))
+
+    id_i = ee.Image(f'{out_path}/0_id').select('id')
+    values = np.full((width, len(dates), len(stats)), np.nan, dtype = np.float32)
+    with concurrent.futures.ThreadPoolExecutor(max_workers = max_workers) as executor:
+        id_futures = [executor.submit(compute_equator_pixels, id_i, col, n) for col, n in col_chunks]
+        futures = {executor.submit(read_chunk, date_chunk, col, n): (i * n_dates, col, n)
+                   for i, date_chunk in enumerate(date_chunks) for col, n in col_chunks}
+        for future in concurrent.futures.as_completed(futures):
+            first, col, n = futures[future]
+            pixels = future.result()
+            for j, date in enumerate(dates[first:first + n_dates]):
+                for k, stat in enumerate(stats):
+                    values[col:col + n, first + j, k] = pixels.get(f'{stat}_{eedb_cor.get_date_id(date)}')
+        id_values = np.concatenate([future.result().get('id') for future in id_futures])
+
+    # Pixels outside any feature, such as retired layout slots, have no ID
+    cols = np.flatnonzero(np.isfinite(id_values))
+    return(SeriesTable([int(fc_id) for fc_id in id_values[cols]], dates, stats, values[cols]))
+
+
+def make_synthetic_table(out_path, in_ic_name, in_fc_id, n_features = 10000, n_dates = 1000, seed = 0):
+    """
+    :param out_path: e.g. path of the database Image Collection, seeds the values together with seed
+    :param in_ic_name: e.g. 'GridMET_Drought', selects the statistics
+    :param in_fc_id: e.g. 'ALLOT_ID', not used
+    :param n_features: e.g. 10000
+    :param n_dates: e.g. 1000, every 5 days from 2000-01-01
+    :param seed: e.g. 0
+    :return: SeriesTable of random statistics, with about one value in a hundred missing
+    """
+    rng = np.random.default_rng([seed, sum(out_path.encode())])
+    stats = eedb_stat.get_stat_names(in_ic_name)
+    start = int(datetime.datetime(2000, 1, 1, tzinfo = datetime.timezone.utc).timestamp() * 1000)
+    dates = start + np.arange(n_dates, dtype = np.int64) * 5 * 86400000
+    values = rng.normal(size = (n_features, n_dates, len(stats))).astype(np.float32)
+    values[rng.uniform(size = values.shape) < 0.01] = np.nan
+
+    return(SeriesTable(range(n_features), dates, stats, values))
+
+
+# Loaders by source name, each called as loader(out_path, in_ic_name, in_fc_id)
+loaders = {'local': load_local,
+           'ee': load_ee,
+           'synthetic': make_synthetic_table}
+
+
+def parse_date(date):
+    """
+    :param date: e.g. '2022-01-01', millis since epoch, or None
+    :return: Millis since epoch, or None
+    """
+    if date is None or isinstance(date, (int, float)):
+        return(date)
+    if date.isdigit():
+        return(int(date))
+    return(int(datetime.datetime.strptime(date, '%Y-%m-%d').replace(tzinfo = datetime.timezone.utc).timestamp() * 1000))
+
+
+def to_list(values):
+    """
+    :param values: e.g. float32 array
+    :return: List of floats with NaN as None, which JSON can represent
+    """
+    if not np.isnan(values).any():
+        return(values.tolist())
+    return(np.where(np.isnan(values), None, values).tolist())
+
+
+class SeriesService:
+    """
+    Answers "series of these features for these variables between two dates" from a SeriesCache. One query reads
+    any number of features and variables of a land unit, loading each collection at most once.
+    """
+    def __init__(self, cache):
+        '''
+        :param cache: e.g. SeriesCache(functools.partial(load_local, local_dir = 'blm-database'))
+        '''
+        self.cache = cache
+
+    def get_table(self, land_unit, in_ic_name, var_name):
+        '''
+        :param land_unit: e.g. 'BLM_Allotments' or its input Feature Collection path
+        :param in_ic_name: e.g. 'GridMET_Drought'
+        :param var_name: e.g. 'pdsi'
+        :return: SeriesTable of the database collection
+        '''
+        land_unit_info = eedb_colinfo.land_unit_dict.get(eedb_path.get_land_unit_path(land_unit))
+        out_path = eedb_path.get_out_path(land_unit_info.get('land_unit_short'), in_ic_name, var_name)
+        return(self.cache.get(out_path, in_ic_name, land_unit_info.get('in_fc_id')))
+
+    def invalidate(self, land_unit = None, variables = None):
+        '''
+        :param land_unit: e.g. 'BLM_Allotments', or None to drop every cached collection
+        :param variables: e.g. [('GridMET_Drought', 'pdsi')] appended to by a run, or None for every cached one
+        :return: Dictionary with the number of collections dropped
+        '''
+        if land_unit is None:
+            return({'invalidated': self.cache.invalidate()})
+        if variables is None:
+            raise ValueError('variables are required when land_unit is given')
+
+        land_unit_info = eedb_colinfo.land_unit_dict.get(eedb_path.get_land_unit_path(land_unit))
+        return({'invalidated': sum(self.cache.invalidate(eedb_path.get_out_path(land_unit_info.get('land_unit_short'), in_ic_name, var_name))
+                                   for in_ic_name, var_name in variables)})
+
+    def query(self, land_unit, features, variables, start_date = None, end_date = None, stats = None):
+        '''
+        :param land_unit: e.g. 'BLM_Allotments'
+        :param features: e.g. ['1234', '5678']
+        :param variables: e.g. [('GridMET_Drought', 'pdsi'), ('RAP_Cover', 'AFG')]
+        :param start_date: e.g. '2022-01-01' or millis since epoch, or None from the first stored date
+        :param end_date: e.g. '2023-01-01', exclusive, or None to the last stored date
+        :param stats: e.g. ['mean', 'p50'], or None for every statistic of each variable
+        :return: Dictionary of {'{in_ic_name}/{var_name}': {'dates': [...], 'stats': [...], 'series': {fc_id: {stat: [values]}}}}
+        '''
+        start_date, end_date = parse_date(start_date), parse_date(end_date)
+        out = {}
+        for in_ic_name, var_name in variables:
+            dates, series, names = self.get_table(land_unit, in_ic_name, var_name).query(features, start_date, end_date, stats)
+            out[f'{in_ic_name}/{var_name}'] = {'dates': dates.tolist(), 'stats': names,
+                                               'series': {fc_id: {name: to_list(values[:, k]) for k, name in enumerate(names)}
+                                                          for fc_id, values in series.items()}}
+
+        return(out)
+
+
+def parse_request(params):
+    """
+    :param params: e.g. JSON body of a POST, or the query string of a GET with comma separated lists and 'variables' as 'dataset/var_name'
+    :return: Keyword arguments of SeriesService.query()
+    """
+    def as_list(value):
+        return(value.split(',') if isinstance(value, str) else value)
+
+    variables = None
+    if params.get('variables') is not None:
+        variables = [variable.split('/') if isinstance(variable, str) else variable for variable in as_list(params.get('variables'))]
+    return({'land_unit': params.get('land_unit'), 'features': as_list(params.get('features')), 'variables': variables,
+            'start_date': params.get('start_date'), 'end_date': params.get('end_date'),
+            'stats': as_list(params.get('stats')) if params.get('stats') is not None else None})
+
+
+def make_handler(service):
+    """
+    :param service: e.g. SeriesService
+    :return: Request handler class answering GET and POST /series, GET /cache and POST /cache/invalidate
+    """
+    class SeriesHandler(http.server.BaseHTTPRequestHandler):
+        def send_json(self, status, body):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def answer(self, params, invalidate = False):
+            try:
+                if invalidate:
+                    request = parse_request(params)
+                    self.send_json(200, service.invalidate(request.get('land_unit'), request.get('variables')))
+                else:
+                    self.send_json(200, service.query(**parse_request(params)))
+            except (ValueError, TypeError, KeyError, AttributeError) as e:
+                self.send_json(400, {'error': str(e)})
+            except FileNotFoundError as e:
+                self.send_json(404, {'error': str(e)})
+
+        def do_GET(self):
+            url = urllib.parse.urlparse(self.path)
+            if url.path == '/cache':
+                self.send_json(200, service.cache.info())
+            elif url.path == '/series':
+                self.answer({key: values[-1] for key, values in urllib.parse.parse_qs(url.query).items()})
+            else:
+                self.send_json(404, {'error': f'Unknown path {url.path}'})
+
+        def do_POST(self):
+            url = urllib.parse.urlparse(self.path)
+            if url.path not in ['/series', '/cache/invalidate']:
+                self.send_json(404, {'error': f'Unknown path {self.path}'})
+                return
+
+            # Invalidation takes the land unit and variables in the query string or an optional JSON body
+            length = int(self.headers.get('Content-Length', 0))
+            params = json.loads(self.rfile.read(length)) if length > 0 else {key: values[-1] for key, values in urllib.parse.parse_qs(url.query).items()}
+            self.answer(params, invalidate = url.path == '/cache/invalidate')
+
+        def log_message(self, format, *args):
+            return
+
+    return(SeriesHandler)
+
+
+def serve(service, host = '127.0.0.1', port = 8765):
+    """
+    :param service: e.g. SeriesService
+    :param host: e.g. '127.0.0.1'
+    :param port: e.g. 8765
+    :return: ThreadingHTTPServer answering queries, started with serve_forever()
+    """
+    return(http.server.ThreadingHTTPServer((host, port), make_handler(service)))
+
+
+def run_benchmark(n_features = 5000, n_dates = 1000, n_collections = 4, n_queries = 2000, batch_features = 100, max_bytes = default_cache_bytes, seed = 0):
+    """
+    :param n_features: e.g. 5000 features per synthetic collection
+    :param n_dates: e.g. 1000 dates per synthetic collection
+    :param n_collections: e.g. 4, variables of GridMET queried at random
+    :param n_queries: e.g. 2000 random single-feature lookups after the collections are loaded
+    :param batch_features: e.g. 100 features read by each batched query
+    :param max_bytes: e.g. cache budget, smaller than the collections to measure evictions
+    :param seed: e.g. 0
+    :return: Dictionary of load seconds, single lookup latency percentiles in microseconds, batched query milliseconds and cache counts
+    """
+    land_unit = list(eedb_colinfo.land_unit_dict.keys())[0]
+    var_names = eedb_colinfo.in_ic_dict.get('GridMET').get('var_names')[:n_collections]
+    service = SeriesService(SeriesCache(functools.partial(make_synthetic_table, n_features = n_features, n_dates = n_dates, seed = seed), max_bytes = max_bytes))
+    rng = np.random.default_rng(seed)
+
+    start = time.perf_counter()
+    for var_name in var_names:
+        service.get_table(land_unit, 'GridMET', var_name)
+    load_s = time.perf_counter() - start
+
+    # Lookups of one feature, variable and year, as a report or FeatureView asks for them, reloading evicted collections
+    latencies = []
+    for i in range(n_queries):
+        start_date = f'{rng.integers(2000, 2013)}-01-01'
+        start = time.perf_counter()
+        service.query(land_unit, [str(rng.integers(n_features))], [('GridMET', var_names[rng.integers(len(var_names))])],
+                      start_date = start_date, end_date = f'{int(start_date[:4]) + 1}-01-01', stats = ['mean', 'p50'])
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    service.query(land_unit, [str(fc_id) for fc_id in rng.integers(n_features, size = batch_features)],
+                  [('GridMET', var_name) for var_name in var_names])
+    batch_s = time.perf_counter() - start
+
+    latencies = np.array(latencies) * 1e6
+    return(dict({'load_s': round(load_s, 3), 'p50_us': round(float(np.percentile(latencies, 50)), 1), 'p99_us': round(float(np.percentile(latencies, 99)), 1),
+                 'batch_ms': round(batch_s * 1e3, 2)}, **service.cache.info()))
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'Serve per-feature time series of database collections from an in-memory LRU cache over HTTP.')
+    parser.add_argument('--source', default = 'local', choices = list(loaders.keys()), help = 'where collections are loaded from')
+    parser.add_argument('--local-dir', default = 'blm-database', help = 'directory of the local sink tables for the local source')
+    parser.add_argument('--storage', default = 'date', choices = ['date', 'annual'], help = 'storage of the database Image Collections for the ee source')
+    parser.add_argument('--max-bytes', type = float, default = default_cache_bytes, help = 'memory budget of decoded collections in bytes')
+    parser.add_argument('--max-age', type = float, default = None, help = 'seconds a collection is served before it is reloaded, unset keeps it until evicted or invalidated')
+    parser.add_argument('--host', default = '127.0.0.1', help = 'address to listen on')
+    parser.add_argument('--port', type = int, default = 8765, help = 'port to listen on')
+    parser.add_argument('--benchmark', action = 'store_true', help = 'time cold loads, repeat lookups and batched queries on synthetic collections and exit')
+    parser.add_argument('--project', default = 'dri-apps', help = 'Earth Engine cloud project')
+    args = parser.parse_args(argv)
+
+    if args.benchmark:
+        print(json.dumps(run_benchmark(max_bytes = int(args.max_bytes))))
+        return
+
+    loader = loaders.get(args.source)
+    if args.source == 'local':
+        loader = functools.partial(load_local, local_dir = args.local_dir)
+    elif args.source == 'ee':
+        import ee
+        ee.Initialize(project = args.project)
+        loader = functools.partial(load_ee, storage = args.storage)
+
+    server = serve(SeriesService(SeriesCache(loader, max_bytes = int(args.max_bytes), max_age = args.max_age)), host = args.host, port = args.port)
+    print(f'Serving series on http://{args.host}:{args.port}/series')
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,241 @@
+import argparse
+import collections
+import concurrent.futures
+import csv
+import datetime
+import json
+import ee
+import eeDatabase_coreMethods as eedb_cor
+import eeDatabase_collectionInfo as eedb_colinfo
+import eeDatabase_coverageMethods as eedb_covm
+import eeDatabase_runJobs as eedb_run
+import eeDatabase_pathNames as eedb_path
+
+
+def list_database_assets(root = eedb_colinfo.database_root):
+    """
+    :param root: e.g. folder holding the database Image Collections
+    :return: Dictionary of {asset path: asset type} for every asset directly under the folder
+    """
+    return(eedb_cor.list_assets(root))
+
+
+def get_collection_index(root = eedb_colinfo.database_root):
+    """
+    :param root: e.g. folder holding the database Image Collections
+    :return: Dictionary of {out_path: (in_fc_path, in_ic_name, var_name)} for every land unit, dataset and variable combination
+    """
+    index = {}
+    for in_fc_path, land_unit_info in eedb_colinfo.land_unit_dict.items():
+        for in_ic_name, in_ic_info in eedb_colinfo.in_ic_dict.items():
+            for var_name in in_ic_info.get('var_names'):
+                index[eedb_path.get_out_path(land_unit_info.get('land_unit_short'), in_ic_name, var_name, root = root)] = (in_fc_path, in_ic_name, var_name)
+
+    return(index)
+
+
+def get_expected_dates(in_ic_names, start_date, end_date):
+    """
+    :param in_ic_names: e.g. ['GridMET_Drought', 'RAP_Cover']
+    :param start_date: e.g. datetime.datetime(2008, 1, 1)
+    :param end_date: e.g. datetime.datetime(2025, 1, 1)
+    :return: Dictionary of {in_ic_name: {'dates': [...], 'in_ic_res': n}}, read from Earth Engine in a single request
+    """
+    # Datasets sharing input collections (e.g. GridMET_Drought and GridMET_Drought_Cont) only need their dates listed once
+    in_ic_keys = {in_ic_name: tuple(eedb_colinfo.in_ic_dict.get(in_ic_name).get('in_ic_paths')) for in_ic_name in in_ic_names}
+    queries = {('dates', key): eedb_cor.get_date_collection(in_ic_paths = list(key), start_date = start_date, end_date = end_date).aggregate_array('system:time_start')
+               for key in set(in_ic_keys.values())}
+    queries.update({('in_ic_res', in_ic_name): eedb_cor.get_in_ic_res(in_ic_name) for in_ic_name in in_ic_names})
+
+    info = eedb_cor.get_info_batch(queries, batch_size = max(len(queries), 1))
+
+    return({in_ic_name: {'dates': info.get(('dates', in_ic_keys.get(in_ic_name))), 'in_ic_res': info.get(('in_ic_res', in_ic_name))}
+            for in_ic_name in in_ic_names})
+
+
+def get_stored_dates(out_paths, start_date, end_date, batch_size = 50, max_workers = 8):
+    """
+    :param out_paths: e.g. list of database Image Collection paths
+    :param start_date: e.g. datetime.datetime(2008, 1, 1)
+    :param end_date: e.g. datetime.datetime(2025, 1, 1)
+    :param batch_size: e.g. number of collections whose dates are read in one request
+    :param max_workers: e.g. number of batches requested concurrently
+    :return: Dictionary of {out_path: {'dates': stored dates in the range, 'storage': 'date' or 'annual'}}, keeping repeated
+             dates so duplicates can be found
+    """
+    # Year images hold dates outside their own system:time_start, so dates are read from both storages and filtered here
+    queries = {out_path: ee.List([eedb_cor.get_stored_dates(out_path), ee.ImageCollection(out_path).filter(ee.Filter.notNull(['dates'])).size()])
+               for out_path in out_paths}
+    info = eedb_cor.get_info_batch(queries, batch_size = batch_size, max_workers = max_workers)
+
+    start_millis = start_date.replace(tzinfo = datetime.timezone.utc).timestamp() * 1000
+    end_millis = end_date.replace(tzinfo = datetime.timezone.utc).timestamp() * 1000
+    return({out_path: {'dates': [date for date in dates if start_millis <= date < end_millis], 'storage': 'annual' if n_years > 0 else 'date'}
+            for out_path, (dates, n_years) in info.items()})
+
+
+def reconcile_dates(expected_dates, stored_dates):
+    """
+    :param expected_dates: e.g. dates in the source dataset from .get_expected_dates()
+    :param stored_dates: e.g. dates in the database Image Collection from .get_stored_dates()
+    :return: Dictionary of sorted 'missing', 'extra' and 'duplicate' dates
+    """
+    counts = collections.Counter(stored_dates)
+
+    return({'missing': sorted(set(expected_dates) - set(counts)),
+            'extra': sorted(set(counts) - set(expected_dates)),
+            'duplicate': sorted(date for date, n in counts.items() if n > 1)})
+
+
+def reconcile_database(start_date, end_date, root = eedb_colinfo.database_root, batch_size = 50, max_workers = 8):
+    """
+    :param start_date: e.g. datetime.datetime(2008, 1, 1)
+    :param end_date: e.g. datetime.datetime(2025, 1, 1)
+    :param root: e.g. folder holding the database Image Collections
+    :param batch_size: e.g. number of collections whose dates are read in one request
+    :param max_workers: e.g. number of batches requested concurrently
+    :return: List of report entries, one per Image Collection under the folder. Collections that do not match a land unit,
+             dataset and variable combination are reported with in_ic_name set to None.
+    """
+    assets = list_database_assets(root)
+    index = get_collection_index(root)
+
+    # Only equator Image Collections are reconciled, not the staging and climatology collections stored beside them
+    out_paths = sorted(path for path, asset_type in assets.items() if asset_type == 'IMAGE_COLLECTION' and not path.endswith(tuple(eedb_colinfo.derived_suffixes)))
+    matched = [out_path for out_path in out_paths if out_path in index]
+
+    expected = get_expected_dates(sorted({index.get(out_path)[1] for out_path in matched}), start_date, end_date)
+    stored = get_stored_dates(out_paths, start_date, end_date, batch_size = batch_size, max_workers = max_workers)
+
+    report = []
+    for out_path in out_paths:
+        if out_path not in index:
+            report.append({'out_path': out_path, 'in_fc_path': None, 'in_ic_name': None, 'var_name': None,
+                           'n_expected': None, 'n_stored': len(stored.get(out_path).get('dates')), 'missing': [], 'extra': [], 'duplicate': []})
+            continue
+
+        in_fc_path, in_ic_name, var_name = index.get(out_path)
+        entry = {'out_path': out_path, 'in_fc_path': in_fc_path, 'in_ic_name': in_ic_name, 'var_name': var_name,
+                 'in_ic_res': expected.get(in_ic_name).get('in_ic_res'),
+                 'layout_path': f'{out_path}-layout' if f'{out_path}-layout' in assets else 'None', 'storage': stored.get(out_path).get('storage'),
+                 'n_expected': len(expected.get(in_ic_name).get('dates')), 'n_stored': len(stored.get(out_path).get('dates'))}
+        entry.update(reconcile_dates(expected.get(in_ic_name).get('dates'), stored.get(out_path).get('dates')))
+        report.append(entry)
+
+    return(report)
+
+
+def write_report(report, report_path):
+    """
+    :param report: e.g. output of .reconcile_database()
+    :param report_path: e.g. 'reconcile_report.json' or 'reconcile_report.csv'
+    :return: None, writes the report with dates as YYYYMMDD IDs
+    """
+    rows = []
+    for entry in report:
+        row = dict(entry)
+        for key in ['missing', 'extra', 'duplicate']:
+            row[key] = [eedb_cor.get_date_id(date) for date in entry.get(key)]
+        rows.append(row)
+
+    if report_path.endswith('.csv'):
+        fieldnames = ['out_path', 'in_ic_name', 'var_name', 'n_expected', 'n_stored', 'missing', 'extra', 'duplicate']
+        with open(report_path, 'w', newline = '') as f:
+            writer = csv.DictWriter(f, fieldnames = fieldnames, extrasaction = 'ignore')
+            writer.writeheader()
+            for row in rows:
+                writer.writerow(dict(row, **{key: ';'.join(row.get(key)) for key in ['missing', 'extra', 'duplicate']}))
+    else:
+        with open(report_path, 'w') as f:
+            json.dump(rows, f, indent = 2)
+
+
+def enqueue_gaps(report, max_workers = 8, adaptive = False, store_path = 'tile_scale_store.json'):
+    '''
+    :param report: e.g. output of .reconcile_database()
+    :param max_workers: e.g. number of threads building graphs and submitting tasks concurrently
+    :param adaptive: e.g. True to retry memory-limit failures at escalating tileScale
+    :param store_path: e.g. local JSON file remembering the tileScale that succeeded per land unit and dataset
+    :return: Dictionary of {out_path: number of exports submitted}
+    '''
+    # Plans come from eeDatabase_runJobs.plan_job() with the report as metadata, so refusals such as a mismatched class
+    # schema apply here too, and only class schemas and export region sizes need requests
+    entries = [entry for entry in report if entry.get('in_ic_name') is not None and len(entry.get('missing')) > 0]
+    assets = eedb_run.list_database_assets()
+    queries = {}
+    for entry in entries:
+        out_path = entry.get('out_path')
+        land_unit_short = eedb_colinfo.land_unit_dict.get(entry.get('in_fc_path')).get('land_unit_short')
+        if eedb_colinfo.in_ic_dict.get(entry.get('in_ic_name')).get('var_type') == 'Categorical':
+            queries[('class_schema', out_path)] = eedb_cor.get_stored_class_schema(out_path)
+        for region_path in [entry.get('in_fc_path'), f'{out_path}-layout', eedb_covm.get_coverage_path(land_unit_short, entry.get('in_ic_name'))]:
+            if region_path == entry.get('in_fc_path') or region_path in assets:
+                queries[('sizes', region_path)] = ee.FeatureCollection(region_path).size()
+    metadata = {'assets': assets, 'class_schema': {}, 'sizes': {}}
+    for (kind, key), value in eedb_cor.get_info_batch(queries, max_workers = max_workers).items():
+        metadata[kind][key] = value
+
+    plans = []
+    for entry in entries:
+        in_ic_paths = eedb_colinfo.in_ic_dict.get(entry.get('in_ic_name')).get('in_ic_paths')
+        entry_metadata = dict(metadata, in_ic_res = {entry.get('in_ic_name'): entry.get('in_ic_res')}, dates = {tuple(in_ic_paths): entry.get('missing')},
+                              stored_dates = {})
+        sink_settings = {'storage': 'annual'} if entry.get('storage', 'date') == 'annual' else {}
+        plan = eedb_run.plan_job(entry.get('in_fc_path'), entry.get('in_ic_name'), entry.get('var_name'), None, None, sink_settings, metadata = entry_metadata)
+        if plan.get('refused') is not None:
+            print(f"Skipping: {plan.get('refused')}")
+            continue
+        plans.append(plan)
+
+    # Gaps in year images are filled one year at a time
+    submitted = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers = max_workers) as executor:
+        futures = {}
+        for plan in plans:
+            plan_futures = eedb_run.submit_plan(executor, plan, adaptive, store_path)
+            submitted[plan.get('out_path')] = len(plan_futures)
+            futures.update(plan_futures)
+
+        # Report failures to build or submit without stopping the remaining exports
+        for future in concurrent.futures.as_completed(futures):
+            out_path, date = futures[future]
+            try:
+                future.result()
+            except Exception as e:
+                submitted[out_path] -= 1
+                print(f"Failed to submit {out_path} {date}: {e}")
+
+    return(submitted)
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'Check every database Image Collection against the dates of its source dataset.')
+    parser.add_argument('--root', default = eedb_colinfo.database_root, help = 'folder holding the database Image Collections')
+    parser.add_argument('--start-date', default = '2008-01-01', help = 'first date to check, e.g. 2008-01-01')
+    parser.add_argument('--end-date', default = datetime.date.today().isoformat(), help = 'date to check up to, e.g. 2025-01-01')
+    parser.add_argument('--report', default = 'reconcile_report.json', help = 'path of the JSON or CSV report to write')
+    parser.add_argument('--batch-size', type = int, default = 50, help = 'collections whose dates are read in one request')
+    parser.add_argument('--max-workers', type = int, default = 8, help = 'concurrent requests and submissions')
+    parser.add_argument('--enqueue', action = 'store_true', help = 'submit exports for missing dates')
+    parser.add_argument('--adaptive', action = 'store_true', help = 'retry memory-limit failures at escalating tileScale when enqueueing')
+    parser.add_argument('--project', default = 'dri-apps', help = 'Earth Engine cloud project')
+    args = parser.parse_args(argv)
+
+    ee.Initialize(project = args.project)
+    report = reconcile_database(datetime.datetime.fromisoformat(args.start_date), datetime.datetime.fromisoformat(args.end_date),
+                                root = args.root, batch_size = args.batch_size, max_workers = args.max_workers)
+    write_report(report, args.report)
+
+    print(f"Checked {len(report)} collections: {sum(len(entry.get('missing')) for entry in report)} missing, "
+          f"{sum(len(entry.get('extra')) for entry in report)} extra and {sum(len(entry.get('duplicate')) for entry in report)} duplicate dates")
+    unmatched = [entry.get('out_path') for entry in report if entry.get('in_ic_name') is None]
+    if len(unmatched) > 0:
+        print(f"{len(unmatched)} collections do not match a land unit, dataset and variable: {unmatched}")
+
+    if args.enqueue:
+        submitted = enqueue_gaps(report, max_workers = args.max_workers, adaptive = args.adaptive)
+        print(f"Submitted {sum(submitted.values())} exports across {len(submitted)} collections")
+
+
+if __name__ == '__main__':
+    main()
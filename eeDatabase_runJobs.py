@@ -0,0 +1,436 @@
+import argparse
+import concurrent.futures
+import datetime
+import json
+import ee
+import eeDatabase_coreMethods as eedb_cor
+import eeDatabase_collectionInfo as eedb_colinfo
+import eeDatabase_coverageMethods as eedb_covm
+import eeDatabase_sharedMethods as eedb_shared
+import eeDatabase_shardMethods as eedb_shard
+import eeDatabase_taskMethods as eedb_task
+import eeDatabase_pathNames as eedb_path
+
+
+# Job spec settings selecting where and how reduced values are written, see eeDatabase_coreMethods.export_img(), and how
+# percentiles are computed, see eeDatabase_coreMethods.get_percentile_settings()
+sink_keys = ['sink', 'local_dir', 'local_format', 'storage', 'percentile_mode', 'percentile_bins', 'percentile_scale_factor']
+
+# Job spec settings splitting the features of each land unit into 'shards' exported separately and merged, see
+# eeDatabase_shardMethods.plan_shards(), which are kept out of the stored properties
+shard_keys = ['shards', 'shard_by']
+
+
+def get_sink_settings(job_spec, job):
+    """
+    :param job_spec: e.g. {'sink': 'table', 'jobs': [...]}
+    :param job: e.g. {'land_units': 'all', 'sink': 'local'}, an entry of job_spec['jobs']
+    :return: Sink and shard settings for the job, where settings on the job override those of the spec
+    """
+    return({key: job.get(key, job_spec.get(key)) for key in sink_keys + shard_keys if job.get(key, job_spec.get(key)) is not None})
+
+
+def expand_jobs(job_spec):
+    """
+    :param job_spec: e.g. {'jobs': [{'land_units': ['BLM_Allotments'], 'datasets': 'all'}]}
+    :return: List of (in_fc_path, in_ic_name, var_name, sink_settings) combinations, in order and without duplicates
+    """
+    combinations = []
+    for job in job_spec.get('jobs'):
+        sink_settings = get_sink_settings(job_spec, job)
+
+        # 'all' or a missing key selects every land unit, dataset or variable
+        land_units = job.get('land_units', 'all')
+        if land_units == 'all':
+            land_units = list(eedb_colinfo.land_unit_dict.keys())
+        datasets = job.get('datasets', 'all')
+        if datasets == 'all':
+            datasets = list(eedb_colinfo.in_ic_dict.keys())
+
+        for land_unit in land_units:
+            for in_ic_name in datasets:
+                var_names = job.get('var_names', 'all')
+                if var_names == 'all':
+                    var_names = eedb_colinfo.in_ic_dict.get(in_ic_name).get('var_names')
+                for var_name in var_names:
+                    combination = (eedb_path.get_land_unit_path(land_unit), in_ic_name, var_name, sink_settings)
+                    if combination not in combinations:
+                        combinations.append(combination)
+
+    return(combinations)
+
+
+def discover_jobs(combinations, start_date, end_date, batch_size = 100, max_workers = 8):
+    """
+    :param combinations: e.g. output of .expand_jobs()
+    :param start_date: e.g. datetime.datetime(2008, 1, 1)
+    :param end_date: e.g. datetime.datetime(2025, 1, 1)
+    :param batch_size: e.g. number of metadata queries resolved in one request
+    :param max_workers: e.g. number of batches requested concurrently
+    :return: Dictionary of metadata for .plan_job(): existing 'assets' under the database and mask fraction folders,
+             'in_ic_res' per dataset, 'dates' per input collection, 'stored_dates' per existing database and staging Image Collection,
+             'class_schema' per existing categorical one, 'staged_shards' per shard staging collection, 'sizes' of the
+             Feature Collections that set export regions and the descriptions of 'active_tasks' when staging collections exist
+    """
+    # Listing the folders replaces an existence check per collection, layout, coverage index and mask fraction
+    assets = list_database_assets()
+
+    # Queue every metadata query, then resolve them together in a few requests
+    queries = get_output_queries(combinations, assets)
+    for in_fc_path, in_ic_name, var_name, sink_settings in combinations:
+        in_ic_paths = eedb_colinfo.in_ic_dict.get(in_ic_name).get('in_ic_paths')
+        queries[('in_ic_res', in_ic_name)] = eedb_cor.get_in_ic_res(in_ic_name)
+        queries[('dates', tuple(in_ic_paths))] = eedb_cor.get_date_collection(in_ic_paths = in_ic_paths, start_date = start_date, end_date = end_date)\
+            .aggregate_array('system:time_start')
+
+    info = eedb_cor.get_info_batch(queries, batch_size = batch_size, max_workers = max_workers)
+
+    metadata = {'assets': assets, 'in_ic_res': {}, 'dates': {}, 'stored_dates': {}, 'class_schema': {}, 'staged_shards': {}, 'sizes': {}}
+    for (kind, key), value in info.items():
+        metadata[kind][key] = value
+
+    # Staging exports still running are not staged again, see eeDatabase_shardMethods.plan_shards()
+    metadata['active_tasks'] = eedb_cor.list_active_tasks() if any(kind == 'staged_shards' or (kind == 'stored_dates' and key.endswith('-shared')) for kind, key in queries) else set()
+
+    return(metadata)
+
+
+def get_output_queries(combinations, assets):
+    """
+    :param combinations: e.g. output of .expand_jobs()
+    :param assets: e.g. output of .list_database_assets()
+    :return: Dictionary of {(kind, path): Earth Engine value} reading the 'stored_dates', 'staged_shards', 'class_schema'
+             and region 'sizes' of the outputs of each combination, for eeDatabase_coreMethods.get_info_batch()
+    """
+    queries = {}
+    for in_fc_path, in_ic_name, var_name, sink_settings in combinations:
+        queries[('sizes', in_fc_path)] = ee.FeatureCollection(in_fc_path).size()
+
+        out_path = eedb_path.get_out_path(eedb_colinfo.land_unit_dict.get(in_fc_path).get('land_unit_short'), in_ic_name, var_name)
+        if sink_settings.get('sink', 'image') == 'image' and out_path in assets:
+            queries[('stored_dates', out_path)] = eedb_cor.get_stored_dates(out_path).distinct()
+        if sink_settings.get('sink', 'image') == 'image' and eedb_shard.get_shard_path(out_path) in assets:
+            queries[('staged_shards', eedb_shard.get_shard_path(out_path))] = eedb_shard.get_staged_shards(eedb_shard.get_shard_path(out_path))
+        if sink_settings.get('sink', 'image') == 'image' and eedb_shared.get_shared_path(out_path) in assets:
+            queries[('stored_dates', eedb_shared.get_shared_path(out_path))] = eedb_cor.get_stored_dates(eedb_shared.get_shared_path(out_path)).distinct()
+        if sink_settings.get('sink', 'image') == 'image' and out_path in assets and eedb_colinfo.in_ic_dict.get(in_ic_name).get('var_type') == 'Categorical':
+            queries[('class_schema', out_path)] = eedb_cor.get_stored_class_schema(out_path)
+        if sink_settings.get('sink', 'image') == 'image' and f'{out_path}-layout' in assets:
+            queries[('sizes', f'{out_path}-layout')] = ee.FeatureCollection(f'{out_path}-layout').size()
+        coverage_path = eedb_covm.get_coverage_path(eedb_colinfo.land_unit_dict.get(in_fc_path).get('land_unit_short'), in_ic_name)
+        if coverage_path in assets:
+            queries[('sizes', coverage_path)] = ee.FeatureCollection(coverage_path).size()
+
+    return(queries)
+
+
+def list_database_assets():
+    """
+    :return: Dictionary of {asset path: asset type} under the database, mask fraction and coverage index folders
+    """
+    return(dict(eedb_cor.list_assets(eedb_colinfo.database_root), **eedb_cor.list_assets(eedb_colinfo.mask_frac_root),
+                **eedb_cor.list_assets(eedb_covm.coverage_root)))
+
+
+def plan_job(in_fc_path, in_ic_name, var_name, start_date, end_date, sink_settings = {}, metadata = None):
+    """
+    :param in_fc_path: e.g. path to input feature collection
+    :param in_ic_name: e.g. 'GridMET_Drought'
+    :param var_name: e.g. 'Long_Term_Drought_Blend'
+    :param start_date: e.g. datetime.datetime(2008, 1, 1)
+    :param end_date: e.g. datetime.datetime(2025, 1, 1)
+    :param sink_settings: e.g. {'sink': 'local', 'local_dir': 'blm-database', 'local_format': 'parquet'} or {'storage': 'annual'}
+    :param metadata: e.g. output of .discover_jobs() covering this combination, or None to discover it for this job alone
+    :return: Dictionary with the output path, run properties, whether the collection exists, the dates missing from it and,
+             for equator images, the dates already stored or None when metadata did not read them, the reason appending
+             was 'refused', or None, and the 'shard_settings' of the job
+    """
+    if metadata is None:
+        metadata = discover_jobs([(in_fc_path, in_ic_name, var_name, sink_settings)], start_date, end_date)
+
+    in_ic_paths = eedb_colinfo.in_ic_dict.get(in_ic_name).get('in_ic_paths')
+    in_ic_res = metadata.get('in_ic_res').get(in_ic_name)
+    properties = set_mask_frac_path(dict(eedb_cor.get_run_properties(in_fc_path, in_ic_name, var_name, in_ic_res), **sink_settings), assets = metadata.get('assets'))
+    shard_settings = {key: properties.pop(key) for key in shard_keys if key in properties}
+    sink = properties.get('sink', 'image')
+    out_path = eedb_path.get_out_path(properties.get('land_unit_short'), in_ic_name, var_name, sink = sink)
+    all_dates = metadata.get('dates').get(tuple(in_ic_paths))
+
+    # Datasets with a fixed footprint reduce only the features their coverage index marks as covered
+    properties = set_coverage_path(properties, out_path, assets = metadata.get('assets'))
+
+    # Table sinks store one table per date, named by the same ID as the equator images
+    if sink != 'image':
+        stored_ids = eedb_cor.get_stored_ids(out_path, properties)
+        exists = stored_ids is not None
+        miss_dates = sorted(set(date for date in all_dates if exists and eedb_cor.get_date_id(date) not in stored_ids))
+        return({'in_ic_paths': in_ic_paths, 'out_path': out_path, 'properties': properties, 'exists': exists, 'shard_settings': shard_settings,
+                'miss_dates': miss_dates, 'context': get_run_context(in_ic_paths, out_path, properties, miss_dates, metadata.get('sizes'))})
+
+    # Collections with a stored layout place features at their stable slots
+    if f'{out_path}-layout' in metadata.get('assets'):
+        properties['layout_path'] = f'{out_path}-layout'
+
+    # Compare dates in the dataset against dates already in the database Image Collection
+    exists = out_path in metadata.get('assets')
+    coll_dates = metadata.get('stored_dates').get(out_path)
+
+    # Collections holding the classes of an earlier bin schema are not appended to
+    refused = None
+    if exists and 'class_schema' in properties:
+        stored_schemas = metadata.get('class_schema', {})
+        stored_schema = stored_schemas.get(out_path) if out_path in stored_schemas else eedb_cor.get_stored_class_schema(out_path).getInfo()
+        try:
+            eedb_cor.check_class_schema(out_path, properties, stored_schema)
+        except ValueError as e:
+            refused = str(e)
+
+    miss_dates = sorted(set(all_dates) - set(coll_dates or [])) if exists and refused is None else []
+    return({'in_ic_paths': in_ic_paths, 'out_path': out_path, 'properties': properties, 'exists': exists, 'refused': refused,
+            'shard_settings': shard_settings, 'miss_dates': miss_dates, 'stored_dates': coll_dates, 'context': get_run_context(in_ic_paths, out_path, properties, miss_dates, metadata.get('sizes'))})
+
+
+def set_mask_frac_path(properties, assets = None):
+    """
+    :param properties: e.g. output of eeDatabase_coreMethods.get_run_properties()
+    :param assets: e.g. existing assets from eeDatabase_coreMethods.list_assets() of the mask fraction folder, or None to check the asset
+    :return: Properties with the mask fraction on the dataset grid and threshold set when the land unit is masked and the
+             fraction has been built by eeDatabase_maskMethods.py, otherwise the binary mask is applied as before
+    """
+    if properties.get('mask_path') == 'None':
+        return(properties)
+
+    mask_frac_path = eedb_cor.get_mask_frac_path(properties.get('in_ic_res'))
+    if (mask_frac_path in assets) if assets is not None else (ee.data.getInfo(mask_frac_path) is not None):
+        properties['mask_frac_path'] = mask_frac_path
+        properties['mask_threshold'] = eedb_colinfo.mask_frac_threshold
+
+    return(properties)
+
+
+def set_coverage_path(properties, out_path, assets):
+    """
+    :param properties: e.g. output of eeDatabase_coreMethods.get_run_properties()
+    :param out_path: e.g. path of the database Image Collection
+    :param assets: e.g. output of .list_database_assets()
+    :return: Properties with coverage_path set when the dataset has a fixed footprint and its coverage index has been built
+             by eeDatabase_coverageMethods.py. Equator images of collections with a layout keep their slots and are reduced
+             over every feature, since coverage positions follow the feature list rather than the layout.
+    """
+    if not eedb_colinfo.in_ic_dict.get(properties.get('in_ic_name')).get('coverage_index'):
+        return(properties)
+    if properties.get('sink', 'image') == 'image' and f'{out_path}-layout' in assets:
+        return(properties)
+
+    coverage_path = eedb_covm.get_coverage_path(properties.get('land_unit_short'), properties.get('in_ic_name'))
+    if coverage_path in assets:
+        properties['coverage_path'] = coverage_path
+
+    return(properties)
+
+
+def get_region_path(properties):
+    """
+    :param properties: e.g. output of eeDatabase_coreMethods.get_run_properties()
+    :return: Path of the Feature Collection whose size sets the equator export region, as chosen by eeDatabase_coreMethods.RunContext
+    """
+    if properties.get('coverage_path', 'None') != 'None':
+        return(properties.get('coverage_path'))
+    if properties.get('layout_path', 'None') != 'None' and properties.get('sink', 'image') == 'image':
+        return(properties.get('layout_path'))
+    return(properties.get('in_fc_path'))
+
+
+def get_run_context(in_ic_paths, out_path, properties, miss_dates, sizes = None):
+    """
+    :param in_ic_paths: e.g. ['GRIDMET/DROUGHT']
+    :param out_path: e.g. path of the database Image Collection
+    :param properties: e.g. output of eeDatabase_coreMethods.get_run_properties()
+    :param miss_dates: e.g. dates that will be exported
+    :param sizes: e.g. {path: number of features} already read, such as the 'sizes' of .discover_jobs()
+    :return: eeDatabase_coreMethods.RunContext shared by every date exported for the plan, or None if nothing will be exported
+    """
+    if len(miss_dates) == 0:
+        return(None)
+    return(eedb_cor.RunContext(in_ic_paths = in_ic_paths, out_path = out_path, properties = properties,
+                               region_size = (sizes or {}).get(get_region_path(properties))))
+
+
+def submit_date(plan, date, adaptive = False, store_path = 'tile_scale_store.json'):
+    '''
+    :param plan: e.g. output of .plan_job()
+    :param date: e.g. millis since epoch for initial image that output represents
+    :param adaptive: e.g. True to retry memory-limit failures at escalating tileScale, which blocks until the task finishes
+    :param store_path: e.g. local JSON file remembering the tileScale that succeeded per land unit and dataset
+    :return: Started export task, or the final task status when adaptive
+    '''
+    properties = eedb_cor.get_date_properties(plan.get('properties'), date)
+
+    # Build each date's graph from the invariants resolved once for the plan
+    submit = plan.get('context').run_image_export if plan.get('context') is not None else eedb_cor.run_image_export
+    if adaptive:
+        return(eedb_task.run_image_export_adaptive(in_ic_paths = plan.get('in_ic_paths'), date = date, out_path = plan.get('out_path'),
+                                                   properties = properties, store_path = store_path, submit = submit))
+    return(submit(in_ic_paths = plan.get('in_ic_paths'), date = date, out_path = plan.get('out_path'), properties = properties))
+
+
+def submit_year(plan, dates, adaptive = False, store_path = 'tile_scale_store.json'):
+    '''
+    :param plan: e.g. output of .plan_job() with 'storage' set to 'annual' in its properties
+    :param dates: e.g. missing dates of one year
+    :param adaptive: e.g. True to retry memory-limit failures at escalating tileScale, which blocks until the task finishes
+    :param store_path: e.g. local JSON file remembering the tileScale that succeeded per land unit and dataset
+    :return: Started export task rewriting the year image with the dates added, or the final task status when adaptive
+    '''
+    # Dates already stored in the year are taken from the plan when it has them, otherwise the year image is read
+    stored_dates = None
+    if plan.get('stored_dates') is not None:
+        year_id = eedb_cor.get_year_id(dates[0])
+        stored_dates = [date for date in plan.get('stored_dates') if eedb_cor.get_year_id(date) == year_id]
+    def submit(in_ic_paths, date, out_path, properties):
+        return(plan.get('context').run_year_export(in_ic_paths = in_ic_paths, dates = dates, out_path = out_path, properties = properties, stored_dates = stored_dates))
+
+    if adaptive:
+        return(eedb_task.run_image_export_adaptive(in_ic_paths = plan.get('in_ic_paths'), date = dates[0], out_path = plan.get('out_path'),
+                                                   properties = plan.get('properties'), store_path = store_path, submit = submit))
+    return(submit(in_ic_paths = plan.get('in_ic_paths'), date = dates[0], out_path = plan.get('out_path'), properties = plan.get('properties')))
+
+
+def submit_plan(executor, plan, adaptive = False, store_path = 'tile_scale_store.json'):
+    '''
+    :param executor: e.g. concurrent.futures.ThreadPoolExecutor building graphs and submitting tasks
+    :param plan: e.g. output of .plan_job() for an existing collection
+    :param adaptive: e.g. True to retry memory-limit failures at escalating tileScale
+    :param store_path: e.g. local JSON file remembering the tileScale that succeeded per land unit and dataset
+    :return: Dictionary of {future: (out_path, date)} with one export per missing date, or one per year in 'annual' storage
+             so that dates of the same year are never written by concurrent tasks
+    '''
+    out_path = plan.get('out_path')
+    if plan.get('properties').get('storage', 'date') == 'annual' and plan.get('properties').get('sink', 'image') == 'image':
+        return({executor.submit(submit_year, plan, dates, adaptive, store_path): (out_path, year_id)
+                for year_id, dates in eedb_cor.group_dates_by_year(plan.get('miss_dates')).items()})
+
+    return({executor.submit(submit_date, plan, date, adaptive, store_path): (out_path, date) for date in plan.get('miss_dates')})
+
+
+def submit_staged_plans(executor, shard_plans, shared_plans, metadata, adaptive = False, store_path = 'tile_scale_store.json', dry_run = False):
+    '''
+    :param executor: e.g. concurrent.futures.ThreadPoolExecutor building graphs and submitting tasks
+    :param shard_plans: e.g. output of eeDatabase_shardMethods.plan_shards()
+    :param shared_plans: e.g. output of eeDatabase_sharedMethods.pair_variant_plans()
+    :param metadata: e.g. output of .discover_jobs()
+    :param adaptive: e.g. True to retry memory-limit failures of the staging exports at escalating tileScale
+    :param store_path: e.g. local JSON file remembering the tileScale that succeeded per land unit and dataset
+    :param dry_run: e.g. True to report the planned exports without submitting anything
+    :return: Tuple of ({path: number of exports submitted}, {future: (path, date)}) for the staged, merged, split and
+             deleted dates of the sharded collections and of the staging collection of each pair
+    '''
+    futures = {}
+    submitted = {}
+    for shard_plan in shard_plans:
+        out_path = shard_plan.get('out_path')
+        print(f"Staging {len(shard_plan.get('miss_dates'))} dates of {out_path} in {shard_plan.get('shards')} shards, "
+              f"merging {len(shard_plan.get('merge_dates'))} staged dates and deleting {len(shard_plan.get('clean_ids'))} merged shards")
+        submitted[out_path] = len(shard_plan.get('miss_dates')) + len(shard_plan.get('merge_dates')) + len(set(i.rsplit('_s', 1)[0] for i in shard_plan.get('clean_ids')))
+        if not dry_run:
+            futures.update(eedb_shard.submit_shard_plan(executor, shard_plan))
+    for shared_plan in shared_plans:
+        shared_path = eedb_shared.get_shared_path(shared_plan.get('out_path'))
+        n_split = len(set(date for dates in shared_plan.get('split_dates').values() for date in dates))
+        print(f"Sharing {len(shared_plan.get('miss_dates'))} dates between {' and '.join(shared_plan.get('out_paths').values())}, "
+              f"splitting {n_split} staged dates and deleting {len(shared_plan.get('clean_dates'))} split ones")
+        submitted[shared_path] = len(shared_plan.get('miss_dates')) + n_split + len(shared_plan.get('clean_dates'))
+        if not dry_run:
+            if shared_path not in metadata.get('assets'):
+                eedb_shared.initialize_shared_collection(shared_plan.get('out_path'))
+            futures.update(eedb_shared.submit_shared_plan(executor, shared_plan, adaptive, store_path))
+
+    return(submitted, futures)
+
+
+def run_jobs(job_spec, max_workers = 8, dry_run = False):
+    '''
+    :param job_spec: e.g. {'start_date': '2008-01-01', 'end_date': '2025-01-01', 'sink': 'image', 'jobs': [{'land_units': 'all', 'datasets': ['GridMET']}]},
+                     with 'shared_variants' set to True to reduce categorical and continuous variants of a source together and
+                     'shards' set, e.g. to 16, to export the features of each land unit in that many parts. Shared dates and
+                     shards are staged by one run and copied or merged into the collections by the next.
+    :param max_workers: e.g. number of threads building graphs and submitting tasks concurrently
+    :param dry_run: e.g. True to report the planned exports without submitting anything
+    :return: Dictionary of {out_path: number of exports submitted}, counting years for collections in 'annual' storage,
+             staged, split and deleted shared dates under the staging collection of each pair and staged, merged and deleted
+             dates of sharded collections
+    '''
+    start_date = datetime.datetime.fromisoformat(job_spec.get('start_date', '2008-01-01'))
+    end_date = datetime.datetime.fromisoformat(job_spec.get('end_date', datetime.date.today().isoformat()))
+    adaptive = job_spec.get('adaptive', False)
+    store_path = job_spec.get('tile_scale_store', 'tile_scale_store.json')
+    combinations = expand_jobs(job_spec)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers = max_workers) as executor:
+
+        # Discover dates and existing outputs for every combination in a few batched requests, then plan each one
+        metadata = discover_jobs(combinations, start_date, end_date, max_workers = max_workers)
+        plans = list(executor.map(lambda c: plan_job(*c[:3], start_date, end_date, c[3], metadata = metadata), combinations))
+
+        # Categorical and continuous variants of a source are reduced once for the dates both are missing
+        shared_plans = []
+        if job_spec.get('shared_variants', False):
+            shared_plans, plans = eedb_shared.pair_variant_plans(plans, metadata.get('stored_dates'), metadata.get('active_tasks'))
+
+        # Large land units are staged in shards and merged by the next run
+        shard_plans, plans = eedb_shard.plan_shards(plans, metadata)
+
+        # Initialize missing collections, then queue exports for missing dates of existing ones
+        submitted, futures = submit_staged_plans(executor, shard_plans, shared_plans, metadata, adaptive, store_path, dry_run)
+        for plan in plans:
+            out_path = plan.get('out_path')
+            if not plan.get('exists'):
+                print(f"Initializing {out_path}")
+                submitted[out_path] = 1
+                if not dry_run:
+                    futures[executor.submit(eedb_cor.initialize_collection, out_path, dict(plan.get('properties'), **{'system:index': '0_id'}))] = (out_path, '0_id')
+                continue
+            if plan.get('refused') is not None:
+                print(f"Skipping: {plan.get('refused')}")
+                submitted[out_path] = 0
+                continue
+
+            if out_path in submitted:
+                continue
+            print(f"Appending {len(plan.get('miss_dates'))} dates to {out_path}")
+            submitted[out_path] = len(plan.get('miss_dates'))
+            if not dry_run:
+                plan_futures = submit_plan(executor, plan, adaptive, store_path)
+                submitted[out_path] = len(plan_futures)
+                futures.update(plan_futures)
+
+        # Report failures to build or submit without stopping the remaining jobs
+        for future in concurrent.futures.as_completed(futures):
+            out_path, date = futures[future]
+            try:
+                future.result()
+            except Exception as e:
+                submitted[out_path] -= 1
+                print(f"Failed to submit {out_path} {date}: {e}")
+
+    return(submitted)
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'Run database exports for many land unit, dataset and variable combinations in parallel.')
+    parser.add_argument('job_spec', help = 'path to a JSON job spec')
+    parser.add_argument('--project', default = 'dri-apps', help = 'Earth Engine cloud project')
+    parser.add_argument('--max-workers', type = int, default = None, help = 'threads building graphs and submitting tasks, overrides max_workers in the job spec')
+    parser.add_argument('--dry-run', action = 'store_true', help = 'report planned exports without submitting')
+    args = parser.parse_args(argv)
+
+    with open(args.job_spec) as f:
+        job_spec = json.load(f)
+
+    ee.Initialize(project = args.project)
+    submitted = run_jobs(job_spec, max_workers = args.max_workers or job_spec.get('max_workers', 8), dry_run = args.dry_run)
+    print(f"Submitted {sum(submitted.values())} exports across {len(submitted)} collections")
+
+
+if __name__ == '__main__':
+    main()
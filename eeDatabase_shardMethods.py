@@ -0,0 +1,290 @@
+import os
+import ee
+import eeDatabase_coreMethods as eedb_cor
+
+
+def quadtree_partition(xs, ys, n_shards):
+    """
+    :param xs: e.g. list of feature centroid longitudes
+    :param ys: e.g. list of feature centroid latitudes
+    :param n_shards: e.g. 16
+    :return: List of shards, each a list of positions into xs/ys. Splitting stops once there are at least n_shards.
+    """
+    leaves = [list(range(len(xs)))]
+    final = []
+
+    # Repeatedly split the most populous cell into quadrants around the centre of its points
+    while leaves and len(leaves) + len(final) < n_shards:
+        leaves.sort(key = len)
+        leaf = leaves.pop()
+        x_mid = (min(xs[i] for i in leaf) + max(xs[i] for i in leaf)) / 2
+        y_mid = (min(ys[i] for i in leaf) + max(ys[i] for i in leaf)) / 2
+        quads = [[], [], [], []]
+        for i in leaf:
+            quads[(xs[i] > x_mid) + 2 * (ys[i] > y_mid)].append(i)
+        children = [q for q in quads if q]
+
+        # Cells whose points all share a location cannot be split further
+        if len(children) == 1:
+            final.append(leaf)
+        else:
+            leaves.extend(children)
+
+    return([sorted(leaf) for leaf in leaves + final])
+
+
+def property_partition(values, n_shards):
+    """
+    :param values: e.g. list of state abbreviations for each feature
+    :param n_shards: e.g. 8
+    :return: List of shards, each a list of positions into values. Features sharing a value always share a shard.
+    """
+    groups = {}
+    for i, value in enumerate(values):
+        groups.setdefault(value, []).append(i)
+
+    # Greedily place the largest groups into the least loaded shard to balance shard sizes
+    shards = [[] for _ in range(min(n_shards, len(groups)))]
+    for group in sorted(groups.values(), key = len, reverse = True):
+        min(shards, key = len).extend(group)
+
+    return([sorted(shard) for shard in shards])
+
+
+def prepare_shards(in_fc_path, n_shards, shard_by = 'quadtree'):
+    """
+    :param in_fc_path: e.g. path to input feature collection
+    :param n_shards: e.g. 16
+    :param shard_by: e.g. 'quadtree' to split on feature centroids or a property name such as 'ADMIN_ST'
+    :return: Dictionary with the indexed Feature Collection, the equator positions in each shard, and the number of features
+    """
+    # Store the equator position of each feature so shards can be merged back into one layout
+    in_fc = eedb_cor.add_equator_index(ee.FeatureCollection(in_fc_path))
+
+    if shard_by == 'quadtree':
+
+        # Pull feature centroids client-side in a single request
+        def get_centroid(f):
+            coords = ee.Feature(f).geometry().centroid(100).coordinates()
+            return(ee.Feature(None, {'x': coords.get(0), 'y': coords.get(1)}))
+        centroids = in_fc.map(get_centroid)
+        coords = ee.Dictionary({'x': centroids.aggregate_array('x'), 'y': centroids.aggregate_array('y')}).getInfo()
+        shards = quadtree_partition(coords['x'], coords['y'], n_shards)
+        n_features = len(coords['x'])
+
+    else:
+
+        # Group features by property value, e.g. state
+        values = in_fc.aggregate_array(shard_by).getInfo()
+        shards = property_partition(values, n_shards)
+        n_features = len(values)
+
+    return({'in_fc': in_fc, 'shards': shards, 'n_features': n_features})
+
+
+def get_shard_path(out_path):
+    """
+    :param out_path: e.g. path of the database Image Collection
+    :return: Path of the staging Image Collection holding per-shard images
+    """
+    return(f'{out_path}-shards')
+
+
+def can_shard(properties):
+    """
+    :param properties: e.g. run properties of the database Image Collection
+    :return: True when the collection holds per-date equator images placing every feature of the land unit in list order,
+             the order .prepare_shards() indexes them in
+    """
+    if properties.get('sink', 'image') != 'image' or properties.get('storage', 'date') != 'date':
+        return(False)
+    return(properties.get('layout_path', 'None') == 'None' and properties.get('coverage_path', 'None') == 'None')
+
+
+def initialize_shard_collection(out_path):
+    '''
+    :param out_path: e.g. path of the database Image Collection
+    :return: Path of the staging Image Collection holding per-shard images
+    '''
+    shard_path = get_shard_path(out_path)
+    if ee.data.getInfo(shard_path) is None:
+        os.system(f"earthengine create collection {shard_path}")
+    return(shard_path)
+
+
+def run_shard_exports(in_ic_paths, date, out_path, properties, shard_info, overwrite = False, skip_ids = {}):
+    '''
+    :param in_ic_paths: e.g. ['GRIDMET/DROUGHT']
+    :param date: e.g. millis since epoch for initial image that output represents
+    :param out_path: e.g. path of the database Image Collection
+    :param properties: e.g. {'land-unit': land_unit, 'in-fc-path': in_fc_path, "in-fc-id": in_fc_id, "in-ic-paths": in_ic_path, "var-type": var_type, "var-name": var_name}
+    :param shard_info: e.g. output of .prepare_shards()
+    :param overwrite: e.g. True so shards of a date staged by an earlier run with another number of shards are replaced
+    :param skip_ids: e.g. {'20220101_s000': 16, '20220101_s001': None}, shards staged by an earlier run with their shard
+                     count, or None while their export is still running, which are not staged again
+    :return: List of started export tasks, one per shard not yet staged
+    '''
+    shard_path = get_shard_path(out_path)
+    n_shards = len(shard_info.get('shards'))
+
+    # Shards staged under another number of shards cover other features, so only matching or running ones are kept
+    shards = [(shard, indices) for shard, indices in enumerate(shard_info.get('shards'))
+              if skip_ids.get(get_shard_id(properties.get('system:index'), shard), 0) not in [None, n_shards]]
+    if len(shards) == 0:
+        return([])
+
+    # Preprocess once, each shard reduces the same image over its own features
+    in_i = eedb_cor.preprocess_image(in_ic_paths = in_ic_paths, date = date, properties = properties)
+
+    tasks = []
+    for shard, indices in shards:
+
+        # Filter to features in the shard, which keep their equator position from the full collection
+        shard_fc = shard_info.get('in_fc').filter(ee.Filter.inList('eq_index', indices))
+        out_i, out_fc = eedb_cor.reduce_image(in_i = in_i, in_fc = shard_fc, properties = properties, index_property = 'eq_index')
+
+        # Export each shard as an independent task to the staging collection, which always holds one image per date
+        shard_properties = dict(properties, shard = shard, n_shards = n_shards, storage = 'date')
+        shard_properties['system:index'] = get_shard_id(properties.get('system:index'), shard)
+        tasks.append(eedb_cor.export_img(out_i = out_i, out_region = out_fc.geometry().buffer(20), out_path = shard_path, properties = shard_properties,
+                                         overwrite = overwrite))
+
+    return(tasks)
+
+
+def merge_shards(in_ic_paths, date, out_path, properties, n_features):
+    '''
+    :param in_ic_paths: e.g. ['GRIDMET/DROUGHT']
+    :param date: e.g. millis since epoch for initial image that output represents
+    :param out_path: e.g. path of the database Image Collection
+    :param properties: e.g. {'land-unit': land_unit, 'in-fc-path': in_fc_path, "in-fc-id": in_fc_id, "in-ic-paths": in_ic_path, "var-type": var_type, "var-name": var_name}
+    :param n_features: e.g. number of features in the full collection
+    :return: Started export task writing the merged image to the database Image Collection
+    '''
+    # Shards occupy disjoint equator positions, so a mosaic recovers the full image
+    shard_ic = ee.ImageCollection(get_shard_path(out_path)).filter(ee.Filter.eq('system:time_start', date))
+    out_i = shard_ic.mosaic()\
+        .set('source_fingerprint', eedb_cor.get_source_fingerprint(in_ic_paths = in_ic_paths, date = date, in_fc_path = properties.get('in_fc_path')))
+
+    return(eedb_cor.export_img(out_i = out_i, out_region = eedb_cor.equator_region(n_features), out_path = out_path, properties = properties))
+
+
+def get_shard_id(date_id, shard):
+    """
+    :param date_id: e.g. '20220101', the ID of the merged image
+    :param shard: e.g. 3
+    :return: ID of the shard image in the staging collection, e.g. '20220101_s003'
+    """
+    return(f'{date_id}_s{shard:03d}')
+
+
+def get_staged_shards(shard_path):
+    """
+    :param shard_path: e.g. output of .get_shard_path()
+    :return: Earth Engine List of the IDs and shard counts of the staged shard images, as [[IDs], [n_shards]]
+    """
+    shard_ic = ee.ImageCollection(shard_path).filter(ee.Filter.notNull(['n_shards']))
+    return(ee.List([shard_ic.aggregate_array('system:index'), shard_ic.aggregate_array('n_shards')]))
+
+
+def group_staged_shards(staged_shards):
+    """
+    :param staged_shards: e.g. client-side value of .get_staged_shards()
+    :return: Dictionary of {date_id: {'ids': [shard image IDs], 'complete': True when every shard of the date is staged}}
+    """
+    shard_ids, shard_counts = staged_shards if staged_shards is not None else ([], [])
+    groups = {}
+    for shard_id, n_shards in zip(shard_ids, shard_counts):
+        group = groups.setdefault(shard_id.rsplit('_s', 1)[0], {'ids': [], 'n_shards': n_shards})
+        group['ids'].append(shard_id)
+
+    return({date_id: {'ids': sorted(group.get('ids')), 'complete': len(set(group.get('ids'))) == group.get('n_shards')} for date_id, group in groups.items()})
+
+
+def get_active_shards(properties, active_tasks):
+    """
+    :param properties: e.g. run properties of the database Image Collection
+    :param active_tasks: e.g. output of eeDatabase_coreMethods.list_active_tasks()
+    :return: List of the IDs of shard images whose staging export is still waiting or running
+    """
+    prefix = eedb_cor.get_export_description(dict(properties, **{'system:index': ''}))
+    return(sorted(description[len(prefix):] for description in active_tasks or []
+                  if description.startswith(prefix) and '_s' in description[len(prefix):]))
+
+
+def plan_shards(plans, metadata):
+    """
+    :param plans: e.g. outputs of eeDatabase_runJobs.plan_job(), sharded when their 'shard_settings' set 'shards'
+    :param metadata: e.g. output of eeDatabase_runJobs.discover_jobs(), with the 'staged_shards' of each staging collection
+                     and the 'active_tasks' still running
+    :return: Tuple of (shard plans, plans). Each shard plan holds the 'miss_dates' to stage, the 'skip_ids' of their shards
+             already staged or still being staged, the fully staged 'merge_dates' still missing from the collection and the
+             staged 'clean_ids' of dates the collection already holds. These dates are removed from the plans, which export
+             nothing else for a sharded collection.
+    """
+    plans = [dict(plan) for plan in plans]
+    shard_plans = []
+    for plan in plans:
+        shard_settings = plan.get('shard_settings') or {}
+        if not plan.get('exists') or plan.get('refused') is not None or shard_settings.get('shards') is None:
+            continue
+        if not can_shard(plan.get('properties')):
+            print(f"Exporting {plan.get('out_path')} without shards, only per-date images without a layout or coverage index are sharded")
+            continue
+
+        # Dates whose shards are all staged are merged, the rest stage only the shards neither staged nor still running
+        staged_shards = metadata.get('staged_shards', {}).get(get_shard_path(plan.get('out_path')))
+        staged = group_staged_shards(staged_shards)
+        merge_dates = [date for date in plan.get('miss_dates') if staged.get(eedb_cor.get_date_id(date), {}).get('complete')]
+        miss_dates = sorted(set(plan.get('miss_dates')) - set(merge_dates))
+        miss_ids = set(eedb_cor.get_date_id(date) for date in miss_dates)
+        skip_ids = {shard_id: n_shards for shard_id, n_shards in zip(*(staged_shards or ([], []))) if shard_id.rsplit('_s', 1)[0] in miss_ids}
+        skip_ids.update({shard_id: None for shard_id in get_active_shards(plan.get('properties'), metadata.get('active_tasks'))
+                         if shard_id.rsplit('_s', 1)[0] in miss_ids})
+        stored_ids = set(eedb_cor.get_date_id(date) for date in plan.get('stored_dates') or [])
+        clean_ids = sorted(shard_id for date_id, group in staged.items() if date_id in stored_ids for shard_id in group.get('ids'))
+        shard_plans.append({'in_ic_paths': plan.get('in_ic_paths'), 'out_path': plan.get('out_path'), 'properties': plan.get('properties'),
+                            'shards': shard_settings.get('shards'), 'shard_by': shard_settings.get('shard_by', 'quadtree'),
+                            'n_features': metadata.get('sizes').get(plan.get('properties').get('in_fc_path')),
+                            'miss_dates': miss_dates, 'skip_ids': skip_ids, 'merge_dates': merge_dates, 'clean_ids': clean_ids})
+        plan['miss_dates'] = []
+
+    return(shard_plans, plans)
+
+
+def delete_shards(out_path, shard_ids):
+    '''
+    :param out_path: e.g. path of the database Image Collection
+    :param shard_ids: e.g. ['20220101_s000', '20220101_s001'], staged shards of dates the collection holds
+    :return: None, the shard images are deleted
+    '''
+    for shard_id in shard_ids:
+        ee.data.deleteAsset(f'{get_shard_path(out_path)}/{shard_id}')
+    return(None)
+
+
+def submit_shard_plan(executor, shard_plan):
+    '''
+    :param executor: e.g. concurrent.futures.ThreadPoolExecutor building graphs and submitting tasks
+    :param shard_plan: e.g. an entry of .plan_shards()
+    :return: Dictionary of {future: (out_path, date)} with the shard exports of each missing date, one merge per fully staged
+             date and one deletion of the staged shards per date the collection holds. Merges and deletions happen in the
+             run after the shards finish, so no worker waits on a task.
+    '''
+    out_path = shard_plan.get('out_path')
+    futures = {}
+    if len(shard_plan.get('miss_dates')) > 0:
+        initialize_shard_collection(out_path)
+        shard_info = prepare_shards(shard_plan.get('properties').get('in_fc_path'), shard_plan.get('shards'), shard_by = shard_plan.get('shard_by'))
+        futures.update({executor.submit(run_shard_exports, shard_plan.get('in_ic_paths'), date, out_path, eedb_cor.get_date_properties(shard_plan.get('properties'), date),
+                                        shard_info, True, shard_plan.get('skip_ids')): (out_path, date) for date in shard_plan.get('miss_dates')})
+    futures.update({executor.submit(merge_shards, shard_plan.get('in_ic_paths'), date, out_path, eedb_cor.get_date_properties(shard_plan.get('properties'), date),
+                                    shard_plan.get('n_features')): (out_path, date) for date in shard_plan.get('merge_dates')})
+
+    # Shards of a date are deleted together once the merged image is stored
+    clean_ids = {}
+    for shard_id in shard_plan.get('clean_ids'):
+        clean_ids.setdefault(shard_id.rsplit('_s', 1)[0], []).append(shard_id)
+    futures.update({executor.submit(delete_shards, out_path, shard_ids): (out_path, date_id) for date_id, shard_ids in clean_ids.items()})
+
+    return(futures)
@@ -0,0 +1,195 @@
+import os
+import ee
+import eeDatabase_coreMethods as eedb_cor
+import eeDatabase_collectionInfo as eedb_colinfo
+import eeDatabase_statNames as eedb_stat
+import eeDatabase_taskMethods as eedb_task
+
+
+def get_variant_name(in_ic_name):
+    """
+    :param in_ic_name: e.g. 'GridMET_Drought'
+    :return: Dataset reading the same source and variables with the other var_type, e.g. 'GridMET_Drought_Cont', or None
+    """
+    in_ic_info = eedb_colinfo.in_ic_dict.get(in_ic_name)
+    for variant_name, variant_info in eedb_colinfo.in_ic_dict.items():
+        if variant_name != in_ic_name and variant_info.get('var_type') != in_ic_info.get('var_type')\
+                and all(variant_info.get(key) == in_ic_info.get(key) for key in ['in_ic_paths', 'var_names', 'ic_mask']):
+            return(variant_name)
+
+    return(None)
+
+
+def get_shared_path(out_path):
+    """
+    :param out_path: e.g. path of the database Image Collection of the categorical variant
+    :return: Path of the staging Image Collection holding one image per date with the bands of both variants
+    """
+    return(f'{out_path}-shared')
+
+
+def initialize_shared_collection(out_path):
+    '''
+    :param out_path: e.g. path of the database Image Collection of the categorical variant
+    :return: Path of the staging Image Collection, created if it does not exist
+    '''
+    shared_path = get_shared_path(out_path)
+    if ee.data.getInfo(shared_path) is None:
+        os.system(f"earthengine create collection {shared_path}")
+    return(shared_path)
+
+
+def can_share(properties, variant_properties):
+    """
+    :param properties: e.g. run properties of the categorical collection
+    :param variant_properties: e.g. run properties of the continuous collection
+    :return: True when both collections are per-date equator images reducing the same features under the same mask at the native scale
+    """
+    for props in [properties, variant_properties]:
+        if props.get('sink', 'image') != 'image' or props.get('storage', 'date') != 'date' or props.get('layout_path', 'None') != 'None':
+            return(False)
+
+    # Class counts need native pixels, so percentiles read at a coarser scale are computed on their own
+    if eedb_cor.get_percentile_settings(variant_properties).get('percentile_mode') == 'scale':
+        return(False)
+
+    return(all(properties.get(key, 'None') == variant_properties.get(key, 'None') for key in ['coverage_path', 'mask_path', 'mask_frac_path', 'mask_threshold']))
+
+
+def pair_variant_plans(plans, stored_dates = {}, active_tasks = None):
+    """
+    :param plans: e.g. outputs of eeDatabase_runJobs.plan_job()
+    :param stored_dates: e.g. {path: dates} read by eeDatabase_runJobs.discover_jobs(), including the dates staged in each
+                         staging collection
+    :param active_tasks: e.g. output of eeDatabase_coreMethods.list_active_tasks(), whose dates are left to the running exports
+    :return: Tuple of (shared plans, plans). Each shared plan holds the 'out_paths' and 'properties' of both variants by
+             dataset name, the 'miss_dates' missing from both that are neither staged nor being staged, the staged
+             'split_dates' still missing from each variant and the staged 'clean_dates' both variants already hold. These
+             dates and the dates still being staged are removed from the plans of the two collections.
+    """
+    plans = [dict(plan) for plan in plans]
+    by_key = {(plan.get('properties').get('in_fc_path'), plan.get('properties').get('in_ic_name'), plan.get('properties').get('var_name')): plan
+              for plan in plans if plan.get('exists')}
+
+    shared_plans = []
+    for (in_fc_path, in_ic_name, var_name), plan in by_key.items():
+        if plan.get('properties').get('var_type') != 'Categorical' or get_variant_name(in_ic_name) is None:
+            continue
+        variant_name = get_variant_name(in_ic_name)
+        variant_plan = by_key.get((in_fc_path, variant_name, var_name))
+        if variant_plan is None or not can_share(plan.get('properties'), variant_plan.get('properties')):
+            continue
+
+        # Dates staged by an earlier run are copied into the variants missing them, and deleted once both hold them
+        staged_dates = set(stored_dates.get(get_shared_path(plan.get('out_path'))) or [])
+        split_dates = {name: sorted(staged_dates & set(p.get('miss_dates'))) for name, p in [(in_ic_name, plan), (variant_name, variant_plan)]}
+        clean_dates = sorted(staged_dates & set(plan.get('stored_dates') or []) & set(variant_plan.get('stored_dates') or []))
+
+        # Staging exports share the description of the categorical export of the date, so a running one is not repeated
+        staging_dates = set(date for date in plan.get('miss_dates') if date not in staged_dates
+                            and eedb_cor.get_export_description(eedb_cor.get_date_properties(plan.get('properties'), date)) in (active_tasks or []))
+        staged_dates = staged_dates | staging_dates
+        shared_dates = sorted((set(plan.get('miss_dates')) & set(variant_plan.get('miss_dates'))) - staged_dates)
+        if len(shared_dates) + sum(len(dates) for dates in split_dates.values()) + len(clean_dates) > 0:
+            shared_plans.append({'in_ic_paths': plan.get('in_ic_paths'), 'out_path': plan.get('out_path'),
+                                 'out_paths': {in_ic_name: plan.get('out_path'), variant_name: variant_plan.get('out_path')},
+                                 'properties': {in_ic_name: plan.get('properties'), variant_name: variant_plan.get('properties')},
+                                 'miss_dates': shared_dates, 'split_dates': split_dates, 'clean_dates': clean_dates,
+                                 'context': plan.get('context') or variant_plan.get('context')})
+
+        # Dates only one variant is missing are still exported on their own
+        for p in [plan, variant_plan]:
+            p['miss_dates'] = sorted(set(p.get('miss_dates')) - set(shared_dates) - staged_dates)
+
+    return(shared_plans, plans)
+
+
+def stage_shared(shared_plan, date, properties, overwrite = True):
+    '''
+    :param shared_plan: e.g. an entry of .pair_variant_plans()
+    :param date: e.g. millis since epoch for initial image that output represents
+    :param properties: e.g. output of eeDatabase_coreMethods.get_date_properties() for the categorical collection
+    :param overwrite: e.g. True so a date staged by an earlier run that failed to split is staged again
+    :return: Started export task writing the image with the bands of both variants to the staging collection
+    '''
+    variant_properties = [props for props in shared_plan.get('properties').values() if props.get('var_type') == 'Continuous'][0]
+    out_i = shared_plan.get('context').build_shared_img(date, properties, eedb_cor.get_percentile_settings(variant_properties))
+
+    return(eedb_cor.export_img(out_i = out_i, out_region = shared_plan.get('context').out_region, out_path = get_shared_path(shared_plan.get('out_path')),
+                               properties = dict(properties, storage = 'date'), overwrite = overwrite))
+
+
+def split_shared(shared_plan, date, in_ic_names = None):
+    '''
+    :param shared_plan: e.g. an entry of .pair_variant_plans()
+    :param date: e.g. millis since epoch of a date already staged
+    :param in_ic_names: e.g. ['GridMET_Drought_Cont'], the variants missing the date, or None for both
+    :return: List of started export tasks copying the bands of each variant from the staged image into its collection
+    '''
+    staged_i = ee.Image(f"{get_shared_path(shared_plan.get('out_path'))}/{eedb_cor.get_date_id(date)}")
+
+    tasks = []
+    for in_ic_name, out_path in shared_plan.get('out_paths').items():
+        if in_ic_names is not None and in_ic_name not in in_ic_names:
+            continue
+        out_i = staged_i.select(eedb_stat.get_stat_names(in_ic_name)).set('source_fingerprint', staged_i.get('source_fingerprint'))
+        tasks.append(eedb_cor.export_img(out_i = out_i, out_region = shared_plan.get('context').out_region, out_path = out_path,
+                                         properties = eedb_cor.get_date_properties(shared_plan.get('properties').get(in_ic_name), date)))
+
+    return(tasks)
+
+
+def delete_shared(shared_plan, date):
+    '''
+    :param shared_plan: e.g. an entry of .pair_variant_plans()
+    :param date: e.g. millis since epoch of a staged date both variants already hold
+    :return: None, the staged image is deleted
+    '''
+    ee.data.deleteAsset(f"{get_shared_path(shared_plan.get('out_path'))}/{eedb_cor.get_date_id(date)}")
+    return(None)
+
+
+def submit_stage(shared_plan, date, adaptive = False, store_path = 'tile_scale_store.json', poll_interval = 30):
+    '''
+    :param shared_plan: e.g. an entry of .pair_variant_plans()
+    :param date: e.g. millis since epoch for initial image that output represents
+    :param adaptive: e.g. True to retry memory-limit failures of the staging export at escalating tileScale, which blocks until the task finishes
+    :param store_path: e.g. local JSON file remembering the tileScale that succeeded per land unit and dataset
+    :param poll_interval: e.g. seconds between status requests when adaptive
+    :return: Started staging task, or the final status of the staging task when adaptive. The variants are copied from
+             the staged image by a later run, see .pair_variant_plans().
+    '''
+    in_ic_name = [name for name, props in shared_plan.get('properties').items() if props.get('var_type') == 'Categorical'][0]
+    properties = eedb_cor.get_date_properties(shared_plan.get('properties').get(in_ic_name), date)
+    if not adaptive:
+        return(stage_shared(shared_plan, date, properties))
+
+    submit = lambda in_ic_paths, date, out_path, properties: stage_shared(shared_plan, date, properties)
+    status = eedb_task.run_image_export_adaptive(in_ic_paths = shared_plan.get('in_ic_paths'), date = date, out_path = shared_plan.get('out_path'),
+                                                 properties = properties, store_path = store_path, poll_interval = poll_interval, submit = submit)
+    if status.get('state') != 'COMPLETED':
+        raise RuntimeError(f"Staging task {status.get('id')} ended as {status.get('state')}: {status.get('error_message')}")
+
+    return(status)
+
+
+def submit_shared_plan(executor, shared_plan, adaptive = False, store_path = 'tile_scale_store.json'):
+    '''
+    :param executor: e.g. concurrent.futures.ThreadPoolExecutor building graphs and submitting tasks
+    :param shared_plan: e.g. an entry of .pair_variant_plans()
+    :param adaptive: e.g. True to retry memory-limit failures of the staging exports at escalating tileScale
+    :param store_path: e.g. local JSON file remembering the tileScale that succeeded per land unit and dataset
+    :return: Dictionary of {future: (staging path, date)} with one staged reduction per missing date, one copy into the
+             variants missing each staged date and one deletion per staged date both variants hold
+    '''
+    shared_path = get_shared_path(shared_plan.get('out_path'))
+    futures = {executor.submit(submit_stage, shared_plan, date, adaptive, store_path): (shared_path, date) for date in shared_plan.get('miss_dates')}
+
+    split_names = {}
+    for in_ic_name, dates in shared_plan.get('split_dates').items():
+        for date in dates:
+            split_names.setdefault(date, []).append(in_ic_name)
+    futures.update({executor.submit(split_shared, shared_plan, date, in_ic_names): (shared_path, date) for date, in_ic_names in sorted(split_names.items())})
+    futures.update({executor.submit(delete_shared, shared_plan, date): (shared_path, date) for date in shared_plan.get('clean_dates')})
+
+    return(futures)
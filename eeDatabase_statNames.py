@@ -0,0 +1,25 @@
+import eeDatabase_collectionInfo as eedb_colinfo
+
+# Percentiles stored for continuous variables alongside the mean
+stat_percentiles = [5, 25, 50, 75, 95]
+
+
+def get_class_names(in_ic_name):
+    """
+    :param in_ic_name: e.g. 'USDM', a key of bin_dict
+    :return: List of class property and band names of the dataset, e.g. ['c0', 'c1', 'c2', 'c3', 'c4', 'c5']
+    """
+    bins = eedb_colinfo.bin_dict.get(in_ic_name)
+    n_classes = len(bins.get('breaks')) + 1 if 'breaks' in bins else bins.get('n_classes')
+
+    return([f'c{i}' for i in range(n_classes)])
+
+
+def get_stat_names(in_ic_name):
+    """
+    :param in_ic_name: e.g. 'GridMET_Drought'
+    :return: List of statistic band names of the equator images of the dataset, e.g. ['mean', 'p5', ...] or ['c0', 'c1', ...]
+    """
+    if eedb_colinfo.in_ic_dict.get(in_ic_name).get('var_type') == 'Categorical':
+        return(get_class_names(in_ic_name))
+    return(['mean'] + [f'p{q}' for q in stat_percentiles])
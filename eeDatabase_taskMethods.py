@@ -0,0 +1,116 @@
+import json
+import os
+import re
+import time
+import eeDatabase_coreMethods as eedb_cor
+
+# Escalation ladder of tileScale values to try when a reduction runs out of memory
+tile_scales = [1, 2, 4, 8, 16]
+
+# Earth Engine error messages that indicate a task should be resubmitted at a larger tileScale
+memory_error_pattern = re.compile(r'memory limit exceeded|out of memory', re.IGNORECASE)
+
+
+def is_memory_error(error_message):
+    """
+    :param error_message: e.g. 'User memory limit exceeded.'
+    :return: True if the task failed because it ran out of memory
+    """
+    if error_message is None:
+        return(False)
+    return(memory_error_pattern.search(error_message) is not None)
+
+
+def read_tile_scale_store(store_path):
+    """
+    :param store_path: e.g. 'tile_scale_store.json'
+    :return: Dictionary of {land_unit_short: {in_ic_name: tile_scale}} that previously succeeded
+    """
+    if not os.path.exists(store_path):
+        return({})
+    with open(store_path) as f:
+        return(json.load(f))
+
+
+def write_tile_scale(store_path, land_unit_short, in_ic_name, tile_scale):
+    """
+    :param store_path: e.g. 'tile_scale_store.json'
+    :param land_unit_short: e.g. 'BLM_StateOffices'
+    :param in_ic_name: e.g. 'RAP_Cover'
+    :param tile_scale: e.g. 4
+    :output: Updated local tile scale store
+    """
+    store = read_tile_scale_store(store_path)
+    store.setdefault(land_unit_short, {})[in_ic_name] = tile_scale
+
+    # Write to a temporary file first so an interrupted run cannot corrupt the store
+    tmp_path = f'{store_path}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(store, f, indent = 2, sort_keys = True)
+    os.replace(tmp_path, store_path)
+
+
+def get_tile_scale(store_path, land_unit_short, in_ic_name, default = 1):
+    """
+    :param store_path: e.g. 'tile_scale_store.json'
+    :param land_unit_short: e.g. 'BLM_StateOffices'
+    :param in_ic_name: e.g. 'RAP_Cover'
+    :param default: e.g. tile_scale from the notebook or job spec
+    :return: tileScale to start the next export at
+    """
+    store = read_tile_scale_store(store_path)
+    return(max(default, store.get(land_unit_short, {}).get(in_ic_name, default)))
+
+
+def wait_for_task(task, poll_interval = 30):
+    """
+    :param task: e.g. task returned by .run_image_export()
+    :param poll_interval: e.g. seconds between status requests
+    :return: Final task status dictionary with 'state' and, if failed, 'error_message'
+    """
+    while True:
+        status = task.status()
+        if status.get('state') in ['COMPLETED', 'FAILED', 'CANCELLED']:
+            return(status)
+        time.sleep(poll_interval)
+
+
+def run_image_export_adaptive(in_ic_paths, date, out_path, properties, store_path = 'tile_scale_store.json', poll_interval = 30, submit = eedb_cor.run_image_export):
+    '''
+    :param in_ic_paths: e.g. ['GRIDMET/DROUGHT']
+    :param date: e.g. millis since epoch for initial image that output represents
+    :param out_path: e.g. path for exported GEE asset
+    :param properties: e.g. {'land-unit': land_unit, 'in-fc-path': in_fc_path, "in-fc-id": in_fc_id, "in-ic-paths": in_ic_path, "var-type": var_type, "var-name": var_name}
+    :param store_path: e.g. local JSON file remembering the tileScale that succeeded per land unit and dataset
+    :param poll_interval: e.g. seconds between status requests
+    :param submit: e.g. .run_image_export() or a fake task backend with the same signature
+    :return: Final task status dictionary, with 'tile_scale' set to the last tileScale submitted
+    '''
+    land_unit_short = properties.get('land_unit_short')
+    in_ic_name = properties.get('in_ic_name')
+
+    # Start at the tileScale that last succeeded for this land unit and dataset
+    start_scale = get_tile_scale(store_path, land_unit_short, in_ic_name, default = properties.get('tile_scale', 1))
+    scales = [s for s in tile_scales if s >= start_scale] or [start_scale]
+
+    for tile_scale in scales:
+
+        # Submit the export at the current tileScale and block until it finishes
+        run_properties = dict(properties, tile_scale = tile_scale)
+        task = submit(in_ic_paths = in_ic_paths, date = date, out_path = out_path, properties = run_properties)
+        status = wait_for_task(task, poll_interval = poll_interval)
+        status['tile_scale'] = tile_scale
+
+        # Remember the tileScale that worked so later runs start there
+        if status.get('state') == 'COMPLETED':
+            if tile_scale != start_scale:
+                write_tile_scale(store_path, land_unit_short, in_ic_name, tile_scale)
+            return(status)
+
+        # Only memory failures are retried, anything else is returned to the caller
+        if not is_memory_error(status.get('error_message')):
+            return(status)
+
+        print(f"Memory limit exceeded for {out_path} {date} at tileScale {tile_scale}, retrying")
+
+    return(status)
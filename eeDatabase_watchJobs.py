@@ -0,0 +1,307 @@
+import argparse
+import concurrent.futures
+import datetime
+import json
+import os
+import time
+import ee
+import eeDatabase_coreMethods as eedb_cor
+import eeDatabase_collectionInfo as eedb_colinfo
+import eeDatabase_runJobs as eedb_run
+import eeDatabase_sharedMethods as eedb_shared
+import eeDatabase_shardMethods as eedb_shard
+import eeDatabase_pathNames as eedb_path
+
+# Local JSON file holding the newest source date handled for each source collection
+state_path = 'watch_state.json'
+
+
+def get_source_key(in_ic_paths):
+    """
+    :param in_ic_paths: e.g. ['GRIDMET/DROUGHT']
+    :return: Key of the source collections in the watch state, e.g. 'GRIDMET/DROUGHT'
+    """
+    return(','.join(in_ic_paths))
+
+
+def read_state(path = state_path):
+    """
+    :param path: e.g. 'watch_state.json'
+    :return: Dictionary of {'marks': {source key: millis of the newest source date handled}}, empty marks if the file is missing
+    """
+    try:
+        with open(path) as f:
+            return(json.load(f))
+    except FileNotFoundError:
+        return({'marks': {}})
+
+
+def write_state(state, path = state_path):
+    """
+    :param state: e.g. output of .read_state() with marks advanced
+    :param path: e.g. 'watch_state.json'
+    :return: None, replaces the file in one step so an interrupted write never loses the marks
+    """
+    with open(f'{path}.tmp', 'w') as f:
+        json.dump(state, f, indent = 2, sort_keys = True)
+    os.replace(f'{path}.tmp', path)
+
+
+def get_sources(combinations):
+    """
+    :param combinations: e.g. output of eeDatabase_runJobs.expand_jobs()
+    :return: Dictionary of {source key: in_ic_paths} for every source collection the jobs read
+    """
+    sources = {}
+    for in_fc_path, in_ic_name, var_name, sink_settings in combinations:
+        in_ic_paths = eedb_colinfo.in_ic_dict.get(in_ic_name).get('in_ic_paths')
+        sources[get_source_key(in_ic_paths)] = in_ic_paths
+
+    return(sources)
+
+
+def get_image_out_paths(combinations, assets):
+    """
+    :param combinations: e.g. output of eeDatabase_runJobs.expand_jobs()
+    :param assets: e.g. existing assets from eeDatabase_coreMethods.list_assets() of the database folder
+    :return: Dictionary of {source key: [paths of the existing database Image Collections reading the source]}
+    """
+    out_paths = {}
+    for in_fc_path, in_ic_name, var_name, sink_settings in combinations:
+        out_path = eedb_path.get_out_path(eedb_colinfo.land_unit_dict.get(in_fc_path).get('land_unit_short'), in_ic_name, var_name)
+        key = get_source_key(eedb_colinfo.in_ic_dict.get(in_ic_name).get('in_ic_paths'))
+        if sink_settings.get('sink', 'image') == 'image' and out_path in assets:
+            out_paths.setdefault(key, []).append(out_path)
+
+    return(out_paths)
+
+
+def seed_marks(sources, out_paths, now, batch_size = 100, max_workers = 8):
+    """
+    :param sources: e.g. {source key: in_ic_paths} of sources without a mark
+    :param out_paths: e.g. output of .get_image_out_paths()
+    :param now: e.g. datetime.datetime(2025, 6, 1), dates after it are not considered
+    :param batch_size: e.g. number of metadata queries resolved in one request
+    :param max_workers: e.g. number of batches requested concurrently
+    :return: Tuple of ({source key: mark}, {out_path: stored dates}). The mark is the oldest of the newest dates stored by the
+             collections reading the source, so each catches up from its own last date, or the newest source date when no
+             collection exists yet and eeDatabase_runJobs.py is left to backfill them
+    """
+    queries = {}
+    for key, in_ic_paths in sources.items():
+        for out_path in out_paths.get(key, []):
+            queries[('stored_dates', out_path)] = eedb_cor.get_stored_dates(out_path).distinct()
+        if len(out_paths.get(key, [])) == 0:
+            queries[('latest', key)] = eedb_cor.get_date_collection(in_ic_paths = in_ic_paths, start_date = datetime.datetime(1970, 1, 1), end_date = now)\
+                .aggregate_max('system:time_start')
+    info = eedb_cor.get_info_batch(queries, batch_size = batch_size, max_workers = max_workers)
+
+    stored_dates = {out_path: dates for (kind, out_path), dates in info.items() if kind == 'stored_dates'}
+    marks = {}
+    for key in sources:
+        if len(out_paths.get(key, [])) == 0:
+            marks[key] = info.get(('latest', key)) or 0
+        else:
+            marks[key] = min(max(stored_dates.get(out_path), default = 0) for out_path in out_paths.get(key))
+
+    return(marks, stored_dates)
+
+
+def get_failed_marks(plans, futures, failed):
+    """
+    :param plans: e.g. {out_path: plan submitted}
+    :param futures: e.g. {future: (path, date)} from eeDatabase_runJobs.submit_plan() and .submit_staged_plans()
+    :param failed: e.g. futures that raised when building or submitting
+    :return: Dictionary of {source key: oldest date not submitted}, where a failed year counts from its first missing date.
+             Failed deletions of shards already merged are retried by the next poll regardless of the mark.
+    """
+    in_ic_paths = {out_path: plan.get('in_ic_paths') for out_path, plan in plans.items()}
+    in_ic_paths.update({eedb_shared.get_shared_path(out_path): plan.get('in_ic_paths') for out_path, plan in plans.items()})
+
+    failed_dates = {}
+    for future in failed:
+        out_path, date = futures[future]
+        plan = plans.get(out_path, {})
+        if isinstance(date, str) and plan.get('properties', {}).get('storage', 'date') != 'annual':
+            continue
+        dates = eedb_cor.group_dates_by_year(plan.get('miss_dates')).get(date) if isinstance(date, str) else [date]
+        key = get_source_key(in_ic_paths.get(out_path))
+        failed_dates[key] = min([failed_dates.get(key, dates[0])] + dates)
+
+    return(failed_dates)
+
+
+def get_staged_marks(plans, new_dates, shard_plans, shared_plans):
+    """
+    :param plans: e.g. {out_path: plan} returned by eeDatabase_sharedMethods.pair_variant_plans() and eeDatabase_shardMethods.plan_shards()
+    :param new_dates: e.g. {out_path: dates missing from the collection} before the plans were paired and sharded
+    :param shard_plans: e.g. output of eeDatabase_shardMethods.plan_shards()
+    :param shared_plans: e.g. output of eeDatabase_sharedMethods.pair_variant_plans()
+    :return: Dictionary of {source key: oldest date staged or still being staged rather than written to its collection}
+    """
+    written = {out_path: set(plan.get('miss_dates')) for out_path, plan in plans.items()}
+    for shard_plan in shard_plans:
+        written[shard_plan.get('out_path')].update(shard_plan.get('merge_dates'))
+    for shared_plan in shared_plans:
+        for in_ic_name, dates in shared_plan.get('split_dates').items():
+            written[shared_plan.get('out_paths').get(in_ic_name)].update(dates)
+
+    staged_dates = {}
+    for out_path, dates in new_dates.items():
+        staged = set(dates) - written.get(out_path)
+        if len(staged) > 0:
+            key = get_source_key(plans.get(out_path).get('in_ic_paths'))
+            staged_dates[key] = min([staged_dates.get(key, min(staged))] + list(staged))
+
+    return(staged_dates)
+
+
+def poll_once(job_spec, state, max_workers = 8, dry_run = False):
+    '''
+    :param job_spec: e.g. {'sink': 'image', 'jobs': [{'land_units': 'all', 'datasets': ['GridMET_Drought']}]}, as read by eeDatabase_runJobs.py
+    :param state: e.g. output of .read_state(), marks are advanced in place unless dry_run
+    :param max_workers: e.g. number of threads building graphs and submitting tasks concurrently
+    :param dry_run: e.g. True to report the new dates without submitting or advancing marks
+    :return: Dictionary of {out_path: number of exports submitted}, counting years for collections in 'annual' storage,
+             with the 'shards' and 'shared_variants' settings of the job spec staging dates as eeDatabase_runJobs.run_jobs()
+             does. Marks stay before staged dates until a later poll merges or splits them.
+    '''
+    now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo = None)
+    adaptive = job_spec.get('adaptive', False)
+    store_path = job_spec.get('tile_scale_store', 'tile_scale_store.json')
+    combinations = eedb_run.expand_jobs(job_spec)
+    sources = get_sources(combinations)
+
+    assets = eedb_run.list_database_assets()
+    out_paths = get_image_out_paths(combinations, assets)
+
+    # Sources seen for the first time start from what the database already holds
+    marks = dict(state.get('marks'))
+    seeds, stored_dates = {}, {}
+    if any(key not in marks for key in sources):
+        seeds, stored_dates = seed_marks({key: in_ic_paths for key, in_ic_paths in sources.items() if key not in marks}, out_paths, now, max_workers = max_workers)
+        marks.update(seeds)
+
+    # Only images newer than each mark are read, with the resolution of every dataset and the dates, staged shards and
+    # region sizes of the outputs, in one batched request
+    queries = {query: value for query, value in eedb_run.get_output_queries(combinations, assets).items() if query[1] not in stored_dates}
+    for in_fc_path, in_ic_name, var_name, sink_settings in combinations:
+        queries[('in_ic_res', in_ic_name)] = eedb_cor.get_in_ic_res(in_ic_name)
+    for key, in_ic_paths in sources.items():
+        queries[('dates', tuple(in_ic_paths))] = eedb_cor.get_date_collection(in_ic_paths = in_ic_paths, start_date = marks.get(key) + 1, end_date = now)\
+            .aggregate_array('system:time_start')
+    metadata = {'assets': assets, 'in_ic_res': {}, 'dates': {}, 'stored_dates': dict(stored_dates), 'class_schema': {}, 'staged_shards': {}, 'sizes': {}}
+    for (kind, key), value in eedb_cor.get_info_batch(queries, max_workers = max_workers).items():
+        metadata[kind][key] = sorted(set(value)) if kind == 'dates' else value
+    metadata['active_tasks'] = eedb_cor.list_active_tasks() if len(metadata.get('staged_shards')) > 0 or any(path.endswith('-shared') for path in metadata.get('stored_dates')) else set()
+
+    # Plan collections reading sources with new dates or holding staged images to clean up, collections that do not exist
+    # yet are left to eeDatabase_runJobs.py
+    staged_keys = set(key for key, paths in out_paths.items() for out_path in paths
+                      if len((metadata.get('staged_shards').get(eedb_shard.get_shard_path(out_path)) or [[]])[0]) > 0
+                      or len(metadata.get('stored_dates').get(eedb_shared.get_shared_path(out_path)) or []) > 0)
+    plans = {}
+    for in_fc_path, in_ic_name, var_name, sink_settings in combinations:
+        in_ic_paths = eedb_colinfo.in_ic_dict.get(in_ic_name).get('in_ic_paths')
+        if len(metadata.get('dates').get(tuple(in_ic_paths))) == 0 and get_source_key(in_ic_paths) not in staged_keys:
+            continue
+        plan = eedb_run.plan_job(in_fc_path, in_ic_name, var_name, None, None, sink_settings, metadata = metadata)
+        if not plan.get('exists'):
+            print(f"Skipping {plan.get('out_path')}, initialize it with eeDatabase_runJobs.py")
+            continue
+        if plan.get('refused') is not None:
+            print(f"Skipping: {plan.get('refused')}")
+            continue
+        plans[plan.get('out_path')] = plan
+
+    # Variants and shards are staged as by eeDatabase_runJobs.run_jobs()
+    shared_plans = []
+    new_dates = {out_path: plan.get('miss_dates') for out_path, plan in plans.items()}
+    if job_spec.get('shared_variants', False):
+        shared_plans, plan_list = eedb_shared.pair_variant_plans(list(plans.values()), metadata.get('stored_dates'), metadata.get('active_tasks'))
+        plans = {plan.get('out_path'): plan for plan in plan_list}
+    shard_plans, plan_list = eedb_shard.plan_shards(list(plans.values()), metadata)
+    plans = {plan.get('out_path'): plan for plan in plan_list}
+
+    failed = []
+    with concurrent.futures.ThreadPoolExecutor(max_workers = max_workers) as executor:
+        submitted, futures = eedb_run.submit_staged_plans(executor, shard_plans, shared_plans, metadata, adaptive, store_path, dry_run)
+        for out_path, plan in plans.items():
+            if out_path in submitted:
+                continue
+            print(f"Appending {len(plan.get('miss_dates'))} new dates to {out_path}")
+            submitted[out_path] = len(plan.get('miss_dates'))
+            if not dry_run:
+                plan_futures = eedb_run.submit_plan(executor, plan, adaptive, store_path)
+                submitted[out_path] = len(plan_futures)
+                futures.update(plan_futures)
+
+        # Report failures to build or submit without stopping the remaining exports
+        for future in concurrent.futures.as_completed(futures):
+            out_path, date = futures[future]
+            try:
+                future.result()
+            except Exception as e:
+                submitted[out_path] -= 1
+                failed.append(future)
+                print(f"Failed to submit {out_path} {date}: {e}")
+
+    if dry_run:
+        return(submitted)
+
+    # Advance each mark past the newest date, but stop short of the oldest date that failed so the next poll retries it,
+    # or that was only staged so the next poll merges or splits it
+    failed_marks = get_failed_marks(plans, futures, failed)
+    for key, date in get_staged_marks(plans, new_dates, shard_plans, shared_plans).items():
+        failed_marks[key] = min(failed_marks.get(key, date), date)
+    for key, in_ic_paths in sources.items():
+        new_dates = metadata.get('dates').get(tuple(in_ic_paths))
+        marks[key] = max([marks.get(key)] + new_dates)
+        if key in failed_marks:
+            marks[key] = max(state.get('marks').get(key, seeds.get(key)), failed_marks.get(key) - 1)
+    state['marks'] = marks
+
+    return(submitted)
+
+
+def watch(job_spec, path = state_path, interval = None, max_workers = 8, dry_run = False):
+    '''
+    :param job_spec: e.g. contents of a JSON job spec for eeDatabase_runJobs.py, with optional 'poll_interval' in seconds
+    :param path: e.g. 'watch_state.json'
+    :param interval: e.g. 3600 to poll every hour, 0 to poll once for cron, or None to use 'poll_interval' of the job spec
+    :param max_workers: e.g. number of threads building graphs and submitting tasks concurrently
+    :param dry_run: e.g. True to report the new dates without submitting or advancing marks
+    :return: Dictionary of {out_path: number of exports submitted} by the last poll
+    '''
+    interval = job_spec.get('poll_interval', 0) if interval is None else interval
+    while True:
+        state = read_state(path)
+        submitted = poll_once(job_spec, state, max_workers = max_workers, dry_run = dry_run)
+        if not dry_run:
+            write_state(state, path)
+        print(f"{datetime.datetime.now().isoformat(timespec = 'seconds')}: submitted {sum(submitted.values())} exports across {len(submitted)} collections")
+
+        if interval <= 0:
+            return(submitted)
+        time.sleep(interval)
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'Export source dates newer than the last date handled as they land, once for cron or in a polling loop.')
+    parser.add_argument('job_spec', help = 'path to a JSON job spec')
+    parser.add_argument('--state', default = state_path, help = 'path of the JSON file holding the newest date handled per source')
+    parser.add_argument('--interval', type = float, default = None, help = 'seconds between polls, 0 to poll once, overrides poll_interval in the job spec')
+    parser.add_argument('--max-workers', type = int, default = None, help = 'threads building graphs and submitting tasks, overrides max_workers in the job spec')
+    parser.add_argument('--dry-run', action = 'store_true', help = 'report new dates without submitting or advancing marks')
+    parser.add_argument('--project', default = 'dri-apps', help = 'Earth Engine cloud project')
+    args = parser.parse_args(argv)
+
+    with open(args.job_spec) as f:
+        job_spec = json.load(f)
+
+    ee.Initialize(project = args.project)
+    watch(job_spec, path = args.state, interval = args.interval, max_workers = args.max_workers or job_spec.get('max_workers', 8), dry_run = args.dry_run)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+import asyncio
+import datetime
+import pytest
+import eeDatabase_fakeEE as fake_ee
+fake_ee.install()
+import eeDatabase_fakeBackend as eedb_fake
+import eeDatabase_asyncMethods as eedb_async
+
+start_date = datetime.datetime(2022, 1, 1, tzinfo = datetime.timezone.utc)
+end_date = datetime.datetime(2023, 1, 1, tzinfo = datetime.timezone.utc)
+dates = [int(datetime.datetime(2022, 1, d, tzinfo = datetime.timezone.utc).timestamp() * 1000) for d in range(1, 6)]
+
+
+class FailingServer(eedb_fake.FakeEEServer):
+    """
+    Fake server whose stored date reads of one collection raise, as a dropped request would
+    """
+    def get_stored_dates(self, out_path):
+        if out_path == 'db/broken':
+            raise RuntimeError('Earth Engine request failed')
+        return(super().get_stored_dates(out_path))
+
+
+def run_with_client(server, coroutine_fn, max_concurrency = 16):
+    """
+    :param server: e.g. eeDatabase_fakeBackend.FakeEEServer()
+    :param coroutine_fn: e.g. lambda client: client.asset_exists('db/a')
+    :param max_concurrency: e.g. 4
+    :return: Result of the coroutine run against an AsyncEEClient over the server
+    """
+    async def run():
+        client = eedb_async.AsyncEEClient(backend = server, max_concurrency = max_concurrency)
+        try:
+            return(await coroutine_fn(client))
+        finally:
+            client.close()
+    return(asyncio.run(run()))
+
+
+def test_concurrency_is_bounded():
+    server = eedb_fake.FakeEEServer(latency = 0.02)
+    paths = [f'db/{i}' for i in range(20)]
+    results = run_with_client(server, lambda client: asyncio.gather(*[client.asset_exists(path) for path in paths]), max_concurrency = 4)
+
+    assert results == [False] * 20
+    assert server.calls == 20
+    assert server.max_in_flight == 4
+
+
+def test_get_missing_dates():
+    server = eedb_fake.FakeEEServer(latency = 0, collection_dates = {('GRIDMET/DROUGHT',): dates},
+                                    stored_dates = {'db/partial': dates[:2], 'db/full': dates})
+    jobs = [(['GRIDMET/DROUGHT'], 'db/partial'), (['GRIDMET/DROUGHT'], 'db/full'), (['GRIDMET/DROUGHT'], 'db/missing')]
+    missing = run_with_client(server, lambda client: eedb_async.get_missing_dates(client, jobs, start_date, end_date))
+
+    assert missing == {'db/partial': dates[2:], 'db/full': [], 'db/missing': None}
+
+    # The shared dataset is read once, then every collection is checked and the two existing ones are read
+    assert server.calls == 1 + 3 + 2
+
+
+def test_errors_propagate():
+    server = FailingServer(latency = 0, collection_dates = {('GRIDMET/DROUGHT',): dates}, stored_dates = {'db/ok': dates, 'db/broken': dates})
+    jobs = [(['GRIDMET/DROUGHT'], 'db/ok'), (['GRIDMET/DROUGHT'], 'db/broken')]
+
+    with pytest.raises(RuntimeError, match = 'request failed'):
+        run_with_client(server, lambda client: eedb_async.get_missing_dates(client, jobs, start_date, end_date))
+
+
+def test_wait_for_tasks():
+    server = eedb_fake.FakeEEServer(latency = 0, task_states = {'A': ['RUNNING', 'RUNNING', 'COMPLETED'], 'B': ['FAILED']})
+    statuses = run_with_client(server, lambda client: client.wait_for_tasks(['A', 'B'], poll_interval = 0))
+
+    assert [status.get('state') for status in statuses] == ['COMPLETED', 'FAILED']
+    assert server.calls == 4
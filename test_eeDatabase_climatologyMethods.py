@@ -0,0 +1,66 @@
+import datetime
+import eeDatabase_fakeEE as fake_ee
+fake_ee.install()
+import eeDatabase_climatologyMethods as eedb_clim
+
+
+def get_millis(year, day_of_year):
+    return(int((datetime.datetime(year, 1, 1) + datetime.timedelta(days = day_of_year - 1)).timestamp() * 1000))
+
+
+# Two years of dates in the first two 8 day windows
+dates = [get_millis(year, day) for year in [2021, 2022] for day in [1, 9]]
+
+
+def get_window(window_dates, n_days = 8):
+    return({'n_dates': len(window_dates), 'last_date': max(window_dates), 'window_days': n_days})
+
+
+def test_window_id():
+    assert eedb_clim.get_window_id(get_millis(2022, 1), 8) == 'w000'
+    assert eedb_clim.get_window_id(get_millis(2022, 8), 8) == 'w000'
+    assert eedb_clim.get_window_id(get_millis(2022, 9), 8) == 'w001'
+    assert eedb_clim.get_window_id(get_millis(2022, 365), 16) == 'w022'
+
+
+def test_missing_windows_are_stale():
+    stale = eedb_clim.get_stale_windows(dates, {}, 8)
+
+    assert stale == {'w000': [dates[0], dates[2]], 'w001': [dates[1], dates[3]]}
+
+
+def test_built_windows_are_not_stale():
+    windows = {'w000': get_window([dates[0], dates[2]]), 'w001': get_window([dates[1], dates[3]])}
+
+    assert eedb_clim.get_stale_windows(dates, windows, 8) == {}
+
+
+def test_windows_gaining_dates_are_stale():
+    windows = {'w000': get_window([dates[0], dates[2]]), 'w001': get_window([dates[1]])}
+    stale = eedb_clim.get_stale_windows(dates, windows, 8)
+
+    # Appending one date rebuilds only its window
+    assert stale == {'w001': [dates[1], dates[3]]}
+
+
+def test_windows_with_a_replaced_date_are_stale():
+    replaced = dates[:3] + [get_millis(2022, 10)]
+    windows = {'w000': get_window([dates[0], dates[2]]), 'w001': get_window([dates[1], dates[3]])}
+
+    assert list(eedb_clim.get_stale_windows(replaced, windows, 8)) == ['w001']
+
+
+def test_windows_of_another_length_are_stale():
+    windows = {'w000': get_window([dates[0], dates[2]], 16), 'w001': get_window([dates[1], dates[3]], 16)}
+
+    assert sorted(eedb_clim.get_stale_windows(dates, windows, 8)) == ['w000', 'w001']
+
+
+def test_update_climatology_dry_run():
+    id_img = fake_ee.ImageValue({}, None, {'system:index': '0_id'})
+    date_imgs = [fake_ee.ImageValue({}, None, {'system:index': str(i), 'system:time_start': date}) for i, date in enumerate(dates)]
+    window_img = fake_ee.ImageValue({}, None, dict(get_window([dates[0], dates[2]]), **{'system:index': 'w000'}))
+    fake_ee.session.catalog = {'db/lst': fake_ee.ICValue([id_img] + date_imgs),
+                               eedb_clim.get_clim_path('db/lst'): fake_ee.ICValue([window_img])}
+
+    assert eedb_clim.update_climatology('db/lst', 'MOD11_LST', dry_run = True) == {'w001': None}
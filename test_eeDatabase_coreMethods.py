@@ -0,0 +1,153 @@
+import datetime
+import numpy as np
+import pytest
+import eeDatabase_fakeEE as fake_ee
+fake_ee.install()
+import ee
+import eeDatabase_coreMethods as eedb_cor
+import eeDatabase_collectionInfo as eedb_colinfo
+import eeDatabase_pathNames as eedb_path
+import eeDatabase_runJobs as eedb_run
+import eeDatabase_statNames as eedb_stat
+
+in_fc_path = 'projects/dri-apps/assets/blm-admin/blm-natl-grazing-allotment-polygons'
+dates = [int(datetime.datetime(2022, 1, d, tzinfo = datetime.timezone.utc).timestamp() * 1000) for d in [1, 6, 11]]
+
+
+def test_histogram_to_classes():
+    classes = eedb_stat.get_class_names('USDM')
+    histogram = [[-1, 3], [0, 0], [1, 2], [2, 0], [3, 0], [4, 1]]
+    fake_ee.session.catalog = {'rr': fake_ee.FCValue([fake_ee.FeatureValue(None, {'eq_index': 0, 'histogram': histogram, 'mean': 1.5}),
+                                                      fake_ee.FeatureValue(None, {'eq_index': 1, 'histogram': None})])}
+    class_fc = fake_ee.evaluate(eedb_cor.histogram_to_classes(ee.FeatureCollection('rr'), classes, keep_properties = ['eq_index']))
+
+    assert [f.props for f in class_fc.features] == [dict(zip(classes, [3, 0, 2, 0, 0, 1]), eq_index = 0),
+                                                    dict(zip(classes, [0] * 6), eq_index = 1)]
+
+
+def test_classify_categorical_counts_breaks():
+    values = np.ma.masked_array([[-4.5, -3.5, -1.5, 0.0, 2.5, 4.5]])
+    fake_ee.session.catalog = {'img': fake_ee.ImageValue({'b1': values}, fake_ee.Grid(0, 0, 1, 6, 1, 1))}
+    classes_i = fake_ee.evaluate(eedb_cor.classify_categorical(ee.Image('img'), 'GridMET_Drought'))
+
+    assert np.ma.asarray(next(iter(classes_i.bands.values()))).tolist() == [[0, 1, 3, 4, 5, 7]]
+
+
+def test_check_class_schema():
+    properties = {'in_ic_name': 'USDM', 'class_schema': 2}
+
+    assert eedb_cor.check_class_schema('db/a', properties, 2) is None
+    assert eedb_cor.check_class_schema('db/a', {'in_ic_name': 'GridMET'}, None) is None
+    with pytest.raises(ValueError, match = 'holds class schema 1'):
+        eedb_cor.check_class_schema('db/a', properties, None)
+
+
+def test_plan_job_refuses_other_schemas():
+    in_ic_paths = eedb_colinfo.in_ic_dict.get('USDM').get('in_ic_paths')
+    out_path = eedb_path.get_out_path('BLM_Allotments', 'USDM', 'drought')
+    metadata = {'assets': {out_path: 'IMAGE_COLLECTION'}, 'in_ic_res': {'USDM': 500}, 'dates': {tuple(in_ic_paths): dates},
+                'stored_dates': {out_path: dates[:1]}, 'class_schema': {out_path: None}, 'sizes': {in_fc_path: 10}}
+    refused = eedb_run.plan_job(in_fc_path, 'USDM', 'drought', None, None, {}, metadata = metadata)
+
+    assert 'holds class schema 1' in refused.get('refused')
+    assert refused.get('miss_dates') == []
+
+    metadata['class_schema'] = {out_path: eedb_cor.get_class_schema('USDM')}
+    plan = eedb_run.plan_job(in_fc_path, 'USDM', 'drought', None, None, {}, metadata = metadata)
+
+    assert plan.get('refused') is None
+    assert plan.get('miss_dates') == dates[1:]
+
+
+def get_local_millis(year, month, day):
+    return(int(datetime.datetime(year, month, day).timestamp() * 1000))
+
+
+def get_stat_img(names, value, props = None):
+    return(fake_ee.ImageValue({name: np.ma.masked_array([[value + i]]) for i, name in enumerate(names)}, fake_ee.Grid(0, 0, 1, 1, 1, 1), props))
+
+
+def test_group_dates_by_year():
+    dec_31, jan_1, jan_9 = get_local_millis(2021, 12, 31), get_local_millis(2022, 1, 1), get_local_millis(2022, 1, 9)
+
+    assert eedb_cor.group_dates_by_year([jan_9, dec_31, jan_1]) == {'2021': [dec_31], '2022': [jan_1, jan_9]}
+    assert eedb_cor.group_dates_by_year([]) == {}
+
+
+def test_year_properties():
+    jan_1, jan_9 = get_local_millis(2022, 1, 1), get_local_millis(2022, 1, 9)
+    properties = eedb_cor.get_year_properties({'in_ic_name': 'MOD11_LST', 'system:index': '20220109'}, [jan_9, jan_1])
+
+    assert properties.get('system:index') == '2022'
+    assert properties.get('dates') == [jan_1, jan_9]
+    assert properties.get('system:time_start') == int(datetime.datetime(2022, 1, 1, tzinfo = datetime.timezone.utc).timestamp() * 1000)
+
+
+def test_annual_bands_are_suffixed_by_date():
+    names = eedb_stat.get_stat_names('MOD11_LST')
+    jan_1, jan_9, jan_17 = get_local_millis(2022, 1, 1), get_local_millis(2022, 1, 9), get_local_millis(2022, 1, 17)
+    stored_i = get_stat_img([f'{name}_20220109' for name in names], 10, {'dates': [jan_9], 'source_fingerprints': ['b']})
+    fake_ee.session.catalog = {'db/lst/2022': stored_i, 'jan_1': get_stat_img(names, 0, {'source_fingerprint': 'a'}),
+                               'jan_17': get_stat_img(names, 20, {'source_fingerprint': 'c'})}
+
+    # New dates are placed around the kept date in date order
+    year_i = fake_ee.evaluate(eedb_cor.build_annual_img({jan_1: ee.Image('jan_1'), jan_17: ee.Image('jan_17')}, 'db/lst', 'MOD11_LST', stored_dates = [jan_9]))
+
+    assert list(year_i.bands) == [f'{name}_{date_id}' for date_id in ['20220101', '20220109', '20220117'] for name in names]
+    assert year_i.props.get('source_fingerprints') == ['a', 'b', 'c']
+
+    # Reading a date back from its year image restores the plain band names
+    fake_ee.session.catalog['db/lst/2022'] = year_i.copy(props = dict(year_i.props, dates = [jan_1, jan_9, jan_17]))
+    date_i = fake_ee.evaluate(eedb_cor.get_stored_img('db/lst', jan_9, 'MOD11_LST', storage = 'annual'))
+
+    assert list(date_i.bands) == names
+    assert [float(date_i.bands.get(name)[0, 0]) for name in names] == [10.0 + i for i in range(len(names))]
+    assert (date_i.props.get('system:index'), date_i.props.get('source_fingerprint')) == ('20220109', 'b')
+
+
+def reduce_histogram_percentiles(values, percentile_settings):
+    """
+    :param values: e.g. pixel values along one row, reduced over one feature covering them and one off the grid
+    :param percentile_settings: e.g. output of .get_percentile_settings() in 'histogram' mode
+    :return: List of the properties of both features after .buckets_to_percentiles()
+    """
+    grid = fake_ee.Grid(0.0, 1.0, 1.0, len(values), 1, 1)
+    fake_ee.session.catalog = {'img': fake_ee.ImageValue({'b1': np.ma.masked_array([values])}, grid),
+                               'fc': fake_ee.FCValue([fake_ee.FeatureValue(fake_ee.GeomValue('Polygon', (0.0, 0.0, len(values), 1.0))),
+                                                      fake_ee.FeatureValue(fake_ee.GeomValue('Polygon', (-5.0, -5.0, -4.0, -4.0)))])}
+    img_rr = eedb_cor.get_continuous_input(ee.Image('img'), percentile_settings)\
+        .reduceRegions(collection = ee.FeatureCollection('fc'), reducer = eedb_cor.get_continuous_reducer(percentile_settings), scale = 1)
+
+    return([f.props for f in fake_ee.evaluate(eedb_cor.buckets_to_percentiles(img_rr, percentile_settings)).features])
+
+
+def test_percentile_settings():
+    properties = {'var_type': 'Continuous', 'var_name': 'AFG'}
+
+    assert eedb_cor.get_percentile_settings(properties) == {}
+    assert eedb_cor.get_percentile_settings(dict(properties, percentile_mode = 'approx', percentile_bins = 200)) ==\
+        {'percentile_mode': 'histogram', 'percentile_bins': 200, 'percentile_range': [0, 100], 'percentile_error': 0.5}
+    assert eedb_cor.get_percentile_settings(dict(properties, var_name = 'precip', percentile_mode = 'approx')).get('percentile_mode') == 'scale'
+    with pytest.raises(ValueError, match = 'no \'range\''):
+        eedb_cor.get_percentile_settings(dict(properties, var_name = 'precip', percentile_mode = 'histogram'))
+
+
+def test_buckets_to_percentiles_are_within_the_error():
+    percentile_settings = eedb_cor.get_percentile_settings({'var_type': 'Continuous', 'var_name': 'AFG', 'percentile_mode': 'histogram', 'percentile_bins': 50})
+    values = np.random.default_rng(0).uniform(0, 100, size = 37)
+    props, empty = reduce_histogram_percentiles(values, percentile_settings)
+
+    for p in eedb_stat.stat_percentiles:
+        assert abs(props.get(f'p{p}') - np.percentile(values, p, method = 'nearest')) <= percentile_settings.get('percentile_error')
+        assert empty.get(f'p{p}') is None
+    assert props.get('mean') == pytest.approx(values.mean())
+
+
+def test_buckets_to_percentiles_outside_the_range():
+    percentile_settings = eedb_cor.get_percentile_settings({'var_type': 'Continuous', 'var_name': 'AFG', 'percentile_mode': 'histogram', 'percentile_bins': 50})
+    props, _ = reduce_histogram_percentiles(np.array([-20.0] * 5 + [50.0] * 10 + [400.0] * 5), percentile_settings)
+
+    # Values outside the range are counted in the first or last bucket
+    assert props.get('p5') == 1.0
+    assert props.get('p50') == 51.0
+    assert props.get('p95') == 99.0
@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+import eeDatabase_fakeEE as fake_ee
+fake_ee.install()
+import eeDatabase_coverageMethods as eedb_covm
+import eeDatabase_runJobs as eedb_run
+
+in_fc_path = 'synthetic/land_units'
+usdm_path = 'projects/climate-engine/usdm/weekly'
+
+# Grid of 4 x 2 pixels of 0.01 degrees whose right half has no data
+grid = fake_ee.Grid(0.0, 0.02, 0.01, 4, 2, 500)
+footprint = np.ma.masked_array(np.ones((2, 4)), mask = [[0, 0, 1, 1], [0, 0, 1, 1]])
+
+
+def get_feature(unit_id, bbox):
+    return(fake_ee.FeatureValue(fake_ee.GeomValue('Polygon', bbox), {'unit_id': unit_id}))
+
+
+@pytest.fixture
+def coverage_fc():
+    """
+    :return: Dictionary of {unit_id: covered} read from the coverage index built over features on and off the footprint
+    """
+    features = [get_feature('inside', (0.0, 0.0, 0.02, 0.02)),
+                get_feature('outside', (0.02, 0.0, 0.04, 0.02)),
+                get_feature('small_inside', (0.012, 0.012, 0.014, 0.014)),
+                get_feature('small_outside', (0.032, 0.012, 0.034, 0.014)),
+                get_feature('off_grid', (1.0, 1.0, 1.002, 1.002))]
+    fake_ee.session.catalog = {in_fc_path: fake_ee.FCValue(features),
+                               usdm_path: fake_ee.ICValue([fake_ee.ImageValue({'drought': footprint}, grid, {'region': 'conus'}),
+                                                           fake_ee.ImageValue({'drought': np.ma.ones((2, 4))}, grid, {'region': 'alaska'})])}
+    fake_ee.session.tasks = []
+    task = eedb_covm.build_coverage_index(in_fc_path, 'unit_id', 'USDM', 'coverage/usdm')
+    task.execute()
+
+    return(fake_ee.session.catalog.get('coverage/usdm'))
+
+
+def test_features_are_flagged_by_the_footprint(coverage_fc):
+    covered = {f.props.get('unit_id'): f.props.get('covered') for f in coverage_fc.features}
+
+    assert covered == {'inside': 1, 'outside': 0, 'small_inside': 1, 'small_outside': 0, 'off_grid': 0}
+
+
+def test_small_features_keep_their_polygon(coverage_fc):
+    geoms = {f.props.get('unit_id'): f.geom for f in coverage_fc.features}
+
+    assert geoms.get('small_inside').type == 'Polygon'
+    assert geoms.get('small_inside').bbox == (0.012, 0.012, 0.014, 0.014)
+
+
+def test_equator_positions_follow_the_feature_list(coverage_fc):
+    positions = {f.props.get('unit_id'): f.props.get('eq_index') for f in coverage_fc.features}
+
+    assert positions == {'inside': 0, 'outside': 1, 'small_inside': 2, 'small_outside': 3, 'off_grid': 4}
+
+
+def test_datasets_without_a_fixed_footprint_are_refused():
+    with pytest.raises(ValueError, match = 'fixed footprint'):
+        eedb_covm.build_coverage_index(in_fc_path, 'unit_id', 'Landsat', 'coverage/landsat')
+
+
+def test_coverage_path_is_set_once_the_index_exists():
+    properties = {'land_unit_short': 'BLM_Allotments', 'in_ic_name': 'USDM'}
+    coverage_path = eedb_covm.get_coverage_path('BLM_Allotments', 'USDM')
+
+    assert eedb_run.set_coverage_path(dict(properties), 'db/a', assets = {}).get('coverage_path') is None
+    assert eedb_run.set_coverage_path(dict(properties), 'db/a', assets = {coverage_path: 'TABLE'}).get('coverage_path') == coverage_path
+
+    # Collections with a layout reduce every feature
+    assert eedb_run.set_coverage_path(dict(properties), 'db/a', assets = {coverage_path: 'TABLE', 'db/a-layout': 'TABLE'}).get('coverage_path') is None
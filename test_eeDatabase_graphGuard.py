@@ -0,0 +1,27 @@
+import os
+import eeDatabase_graphGuard as eedb_guard
+
+baseline_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), eedb_guard.baseline_path)
+
+
+def test_graphs_within_baselines():
+    measurements = eedb_guard.measure_graphs()
+    baselines = eedb_guard.read_baselines(baseline_path)
+
+    assert sorted(set(measurements) - set(baselines.get('graphs'))) == []
+    assert eedb_guard.check_graphs(measurements, baselines) == []
+
+
+def test_every_builder_is_measured():
+    measurements = eedb_guard.measure_graphs(in_ic_names = ['GridMET_Drought'])
+    keys = [eedb_guard.get_graph_key('BLM_Allotments', 'GridMET_Drought', 'Long_Term_Drought_Blend', builder) for builder in eedb_guard.graph_builders]
+
+    assert keys == ['BLM_Allotments/GridMET_Drought/Long_Term_Drought_Blend', 'BLM_Allotments/GridMET_Drought/Long_Term_Drought_Blend/context']
+    assert all(measurements.get(key).get('nodes') > 0 for key in keys)
+
+
+def test_growth_over_tolerance_fails():
+    baselines = {'limits': eedb_guard.default_limits, 'tolerance': 0.1, 'graphs': {'a': {'nodes': 10, 'depth': 10, 'bytes': 1000}}}
+
+    assert eedb_guard.check_graphs({'a': {'nodes': 10, 'depth': 10, 'bytes': 1100}}, baselines) == []
+    assert len(eedb_guard.check_graphs({'a': {'nodes': 12, 'depth': 12, 'bytes': 1200}}, baselines)) == 2
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+import eeDatabase_fakeEE as fake_ee
+fake_ee.install()
+import eeDatabase_layoutMethods as eedb_layout
+
+properties = {'land_unit_short': 'BLM_Allotments', 'in_ic_name': 'GridMET', 'var_name': 'Precipitation', 'system:index': '0_id'}
+
+
+def test_build_layout_follows_collection_order():
+    layout = eedb_layout.build_layout([(11, 'a'), (12, 'b'), (13, 'c')])
+
+    assert layout.get('n_slots') == 3
+    assert [layout.get('entries').get(fc_id).get('slot') for fc_id in [11, 12, 13]] == [0, 1, 2]
+
+
+def test_update_layout_slots_and_tombstones():
+    layout = eedb_layout.build_layout([(11, 'a'), (12, 'b'), (13, 'c')])
+    updated, delta = eedb_layout.update_layout(layout, [(11, 'a'), (13, 'edited'), (14, 'd')])
+
+    assert delta == {'added': [14], 'changed': [13], 'retired': [12]}
+    entries = updated.get('entries')
+    assert [entries.get(fc_id).get('slot') for fc_id in [11, 12, 13, 14]] == [0, 1, 2, 3]
+    assert [entries.get(fc_id).get('retired') for fc_id in [11, 12, 13, 14]] == [0, 1, 0, 0]
+    assert entries.get(13).get('fingerprint') == 'edited'
+    assert updated.get('n_slots') == 4
+
+    # The layout passed in is left as it was
+    assert layout.get('entries').get(12).get('retired') == 0
+    assert layout.get('n_slots') == 3
+
+
+def test_retired_slots_are_never_reused():
+    layout, _ = eedb_layout.update_layout(eedb_layout.build_layout([(11, 'a'), (12, 'b')]), [(11, 'a')])
+    layout, delta = eedb_layout.update_layout(layout, [(11, 'a'), (15, 'e')])
+
+    assert delta == {'added': [15], 'changed': [], 'retired': []}
+    assert layout.get('entries').get(15).get('slot') == 2
+    assert layout.get('entries').get(12).get('retired') == 1
+
+
+def test_reinstated_features_keep_their_slot():
+    layout, _ = eedb_layout.update_layout(eedb_layout.build_layout([(11, 'a'), (12, 'b')]), [(11, 'a')])
+    layout, delta = eedb_layout.update_layout(layout, [(11, 'a'), (12, 'b')])
+
+    assert delta == {'added': [], 'changed': [12], 'retired': []}
+    assert layout.get('entries').get(12) == {'slot': 1, 'retired': 0, 'fingerprint': 'b'}
+
+
+def test_unchanged_features_have_an_empty_delta():
+    layout = eedb_layout.build_layout([(11, 'a'), (12, 'b')])
+    updated, delta = eedb_layout.update_layout(layout, [(11, 'a'), (12, 'b')])
+
+    assert delta == {'added': [], 'changed': [], 'retired': []}
+    assert updated == layout
+
+
+def test_id_image_is_exported_per_date_in_annual_collections():
+    layout, _ = eedb_layout.update_layout(eedb_layout.build_layout([(11, 'a'), (12, 'b')]), [(11, 'a'), (13, 'c')])
+    task = eedb_layout.export_layout_id_img(layout, 'db/annual', dict(properties, storage = 'annual'))
+    id_i = task.execute()
+
+    assert task.asset_id == 'db/annual/0_id'
+    assert id_i.props.get('storage') == 'date'
+    assert id_i.props.get('tombstones') == '12'
+    assert np.ma.filled(np.ma.asarray(id_i.bands.get('id')), 0).tolist() == [[11, 12, 13]]
+
+
+def test_empty_layouts_are_not_exported():
+    layout = eedb_layout.build_layout([])
+
+    with pytest.raises(ValueError, match = 'no features'):
+        eedb_layout.export_layout(layout, 'db/empty')
+    with pytest.raises(ValueError, match = 'no features'):
+        eedb_layout.export_layout_id_img(layout, 'db/empty', properties)
@@ -0,0 +1,137 @@
+import numpy as np
+import pytest
+import eeDatabase_localMethods as eedb_local
+
+n_zones = 5
+
+
+@pytest.fixture
+def rasters(tmp_path):
+    """
+    :return: Tuple of (value_path, zone_path, values, zones) of a small raster with NaN, nodata and pixels outside zones
+    """
+    rng = np.random.default_rng(0)
+    values = rng.uniform(-3.0, 3.0, size = (37, 23))
+    values[rng.uniform(size = values.shape) < 0.05] = np.nan
+    values[rng.uniform(size = values.shape) < 0.05] = -9999
+    zones = rng.integers(-1, n_zones - 1, size = values.shape)
+    np.save(tmp_path / 'values.npy', values)
+    np.save(tmp_path / 'zones.npy', zones)
+
+    return(str(tmp_path / 'values.npy'), str(tmp_path / 'zones.npy'), values, zones)
+
+
+def reduce_whole(value_path, zone_path, mode, **kwargs):
+    """
+    :return: Statistics of the raster reduced as a single block, the reference the merged blocks must match
+    """
+    return(eedb_local.reduce_raster_local(value_path, zone_path, n_zones, mode = mode, nodata = -9999, block_rows = 1000, max_workers = 1, **kwargs))
+
+
+@pytest.mark.parametrize('mode, kwargs', [('exact', {}), ('histogram', {'value_range': (-3.0, 3.0), 'n_bins': 64}),
+                                          ('categorical', {'in_ic_name': 'GridMET_Drought'})])
+def test_merged_blocks_match_one_block(rasters, mode, kwargs):
+    value_path, zone_path, values, zones = rasters
+    whole = reduce_whole(value_path, zone_path, mode, **kwargs)
+    merged = eedb_local.reduce_raster_local(value_path, zone_path, n_zones, mode = mode, nodata = -9999, block_rows = 4, max_workers = 2, **kwargs)
+
+    assert sorted(merged) == sorted(whole)
+    for name in whole:
+        np.testing.assert_allclose(merged.get(name), whole.get(name), rtol = 1e-12, equal_nan = True)
+
+
+def test_exact_mode_matches_numpy(rasters):
+    value_path, zone_path, values, zones = rasters
+    stats = eedb_local.reduce_raster_local(value_path, zone_path, n_zones, mode = 'exact', nodata = -9999, block_rows = 5, max_workers = 1)
+
+    for zone in range(n_zones - 1):
+        zone_values = values[(zones == zone) & np.isfinite(values) & (values != -9999)]
+        assert stats.get('count')[zone] == len(zone_values)
+        assert stats.get('mean')[zone] == pytest.approx(zone_values.mean())
+        assert stats.get('p50')[zone] == np.percentile(zone_values, 50, method = 'nearest')
+
+    # The last zone holds no pixels
+    assert stats.get('count')[n_zones - 1] == 0
+    assert np.isnan(stats.get('mean')[n_zones - 1])
+
+
+def test_histogram_percentiles_are_within_a_bin(rasters):
+    value_path, zone_path, values, zones = rasters
+    stats = reduce_whole(value_path, zone_path, 'histogram', value_range = (-3.0, 3.0), n_bins = 600)
+
+    # Each percentile is interpolated within the bin holding the value at its rank
+    for zone in range(n_zones - 1):
+        zone_values = np.sort(values[(zones == zone) & np.isfinite(values) & (values != -9999)])
+        for p in [5, 25, 50, 75, 95]:
+            rank_value = zone_values[max(int(np.ceil(p / 100.0 * len(zone_values))), 1) - 1]
+            assert abs(stats.get(f'p{p}')[zone] - rank_value) <= 6.0 / 600 + 1e-9
+
+
+def test_classify_values_matches_the_bin_schema():
+    classes = eedb_local.classify_values(np.array([-4.5, -4.0, -1.5, 0.0, 2.0, 4.5]), 'GridMET_Drought')
+
+    assert classes.tolist() == [0, 1, 3, 4, 5, 7]
+    assert eedb_local.classify_values(np.array([-1.0, 0.0, 4.0]), 'USDM').tolist() == [0, 1, 5]
+
+
+@pytest.fixture
+def stack(tmp_path):
+    """
+    :return: Tuple of (stack_path, coverage) of 7 dates on a 4 x 4 grid and 3 zones drawn on a 10 times finer raster
+    """
+    rng = np.random.default_rng(1)
+    values = rng.uniform(0.0, 10.0, size = (7, 4, 4))
+    values[rng.uniform(size = values.shape) < 0.1] = np.nan
+    fine_zones = np.full((40, 40), -1)
+    fine_zones[:15, :25] = 0
+    fine_zones[15:40, 5:40] = 1
+    fine_zones[2, 38] = 2
+    np.save(tmp_path / 'stack.npy', values)
+    np.save(tmp_path / 'zones.npy', fine_zones)
+
+    return(str(tmp_path / 'stack.npy'), eedb_local.coverage_from_zones(str(tmp_path / 'zones.npy'), 3, 10, block_rows = 7))
+
+
+def test_coverage_from_zones_weights(stack):
+    stack_path, coverage = stack
+    zones = np.repeat(np.arange(3), np.diff(coverage.get('indptr')))
+    weights = {(zone, pixel): weight for zone, pixel, weight in zip(zones, coverage.get('indices'), coverage.get('weights'))}
+
+    assert coverage.get('shape') == (3, 16)
+    assert weights.get((0, 0)) == 1.0
+    assert weights.get((0, 6)) == pytest.approx(0.25)
+    assert weights.get((2, 3)) == pytest.approx(0.01)
+    assert sum(weight for (zone, pixel), weight in weights.items() if zone == 1) == pytest.approx(25 * 35 / 100)
+
+
+def test_date_blocks_match_one_block(stack):
+    stack_path, coverage = stack
+    whole = eedb_local.reduce_stack_local(stack_path, coverage, date_block = 100)
+    merged = eedb_local.reduce_stack_local(stack_path, coverage, date_block = 2)
+
+    assert sorted(merged) == sorted(whole)
+    for name in whole:
+        np.testing.assert_allclose(merged.get(name), whole.get(name), rtol = 1e-12, equal_nan = True)
+
+
+def test_weighted_means_match_numpy(stack):
+    stack_path, coverage = stack
+    values = np.load(stack_path).reshape(7, -1)
+    stats = eedb_local.reduce_stack_local(stack_path, coverage, percentiles = [])
+
+    for zone in range(3):
+        start, end = coverage.get('indptr')[zone], coverage.get('indptr')[zone + 1]
+        zone_values = values[:, coverage.get('indices')[start:end]]
+        weights = np.where(np.isfinite(zone_values), coverage.get('weights')[start:end], 0.0)
+        np.testing.assert_allclose(stats.get('mean')[:, zone], np.nansum(zone_values * weights, axis = 1) / weights.sum(axis = 1))
+        np.testing.assert_allclose(stats.get('weight')[:, zone], weights.sum(axis = 1))
+
+
+def test_small_polygons_keep_their_pixel():
+    grid = {'x0': 0.0, 'y0': 4.0, 'dx': 1.0, 'width': 4, 'height': 4}
+    square = [[(0.0, 4.0), (2.0, 4.0), (2.0, 2.0), (0.0, 2.0)]]
+    small = [[(3.41, 0.41), (3.42, 0.41), (3.42, 0.42), (3.41, 0.42)]]
+    coverage = eedb_local.coverage_from_polygons([square, small], grid)
+
+    assert coverage.get('indices').tolist() == [0, 1, 4, 5, 15]
+    assert coverage.get('weights').tolist() == [1.0] * 5
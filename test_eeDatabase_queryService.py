@@ -0,0 +1,117 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+import numpy as np
+import pytest
+import eeDatabase_pathNames as eedb_path
+import eeDatabase_queryService as eedb_query
+
+
+class CountingLoader:
+    """
+    Loader of small synthetic tables counting the loads of each collection
+    """
+    def __init__(self, delay = 0):
+        self.delay = delay
+        self.loads = {}
+
+    def __call__(self, out_path, in_ic_name, in_fc_id):
+        time.sleep(self.delay)
+        self.loads[out_path] = self.loads.get(out_path, 0) + 1
+        return(eedb_query.make_synthetic_table(out_path, in_ic_name, in_fc_id, n_features = 20, n_dates = 10))
+
+
+table_bytes = eedb_query.make_synthetic_table('db/a', 'GridMET', None, n_features = 20, n_dates = 10).nbytes
+
+
+def test_service_imports_no_earth_engine():
+    # Other tests install the fake client, so the import is checked in a fresh interpreter
+    script = "import sys, eeDatabase_queryService; assert 'ee' not in sys.modules and 'eeDatabase_coreMethods' not in sys.modules"
+    subprocess.run([sys.executable, '-c', script], cwd = os.path.dirname(os.path.abspath(__file__)), check = True)
+
+
+def test_table_query():
+    table = eedb_query.SeriesTable(['1', '2'], [30, 10, 20], ['mean', 'p50'], np.arange(12).reshape(2, 3, 2))
+    dates, series, stats = table.query(['2', '3'], start_date = 15, end_date = 30, stats = ['p50', 'p99'])
+
+    assert dates.tolist() == [20]
+    assert stats == ['p50']
+    assert {fc_id: values.tolist() for fc_id, values in series.items()} == {'2': [[11.0]]}
+
+
+def test_least_recently_used_tables_are_evicted():
+    loader = CountingLoader()
+    cache = eedb_query.SeriesCache(loader, max_bytes = int(2.5 * table_bytes))
+    for out_path in ['db/a', 'db/b', 'db/a', 'db/c']:
+        cache.get(out_path, 'GridMET', None)
+
+    assert list(cache.tables) == ['db/a', 'db/c']
+    assert cache.info() == dict(hits = 1, misses = 3, evictions = 1, expirations = 0, invalidations = 0, collections = 2,
+                                bytes = 2 * table_bytes, max_bytes = int(2.5 * table_bytes), max_age = None)
+
+
+def test_the_table_just_used_is_kept_over_the_budget():
+    cache = eedb_query.SeriesCache(CountingLoader(), max_bytes = table_bytes // 2)
+    cache.get('db/a', 'GridMET', None)
+    cache.get('db/b', 'GridMET', None)
+
+    assert list(cache.tables) == ['db/b']
+    assert cache.info().get('evictions') == 1
+
+
+def test_tables_expire_after_max_age(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr(eedb_query.time, 'monotonic', lambda: clock[0])
+    loader = CountingLoader()
+    cache = eedb_query.SeriesCache(loader, max_age = 10)
+
+    cache.get('db/a', 'GridMET', None)
+    clock[0] = 5.0
+    cache.get('db/a', 'GridMET', None)
+    clock[0] = 11.0
+    cache.get('db/a', 'GridMET', None)
+
+    assert loader.loads == {'db/a': 2}
+    assert (cache.info().get('hits'), cache.info().get('expirations')) == (1, 1)
+    assert cache.info().get('bytes') == table_bytes
+
+
+def test_invalidated_tables_are_reloaded():
+    loader = CountingLoader()
+    cache = eedb_query.SeriesCache(loader)
+    cache.get('db/a', 'GridMET', None)
+    cache.get('db/b', 'GridMET', None)
+
+    assert cache.invalidate('db/a') == 1
+    assert cache.invalidate('db/missing') == 0
+    cache.get('db/a', 'GridMET', None)
+    assert loader.loads == {'db/a': 2, 'db/b': 1}
+
+    assert cache.invalidate() == 2
+    assert cache.info().get('invalidations') == 3
+    assert (cache.info().get('collections'), cache.info().get('bytes')) == (0, 0)
+
+
+def test_service_invalidates_the_collections_of_a_land_unit():
+    service = eedb_query.SeriesService(eedb_query.SeriesCache(CountingLoader()))
+    service.query('BLM_Allotments', ['1'], [('GridMET', 'precip'), ('GridMET', 'tmmx')])
+
+    assert service.invalidate('BLM_Allotments', [('GridMET', 'precip')]) == {'invalidated': 1}
+    assert list(service.cache.tables) == [eedb_path.get_out_path('BLM_Allotments', 'GridMET', 'tmmx')]
+    with pytest.raises(ValueError, match = 'variables are required'):
+        service.invalidate('BLM_Allotments')
+
+
+def test_concurrent_requests_load_once():
+    loader = CountingLoader(delay = 0.05)
+    cache = eedb_query.SeriesCache(loader)
+    threads = [threading.Thread(target = cache.get, args = ('db/a', 'GridMET', None)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert loader.loads == {'db/a': 1}
+    assert cache.info().get('misses') == 1
@@ -0,0 +1,69 @@
+import datetime
+import pytest
+import eeDatabase_fakeEE as fake_ee
+fake_ee.install()
+import eeDatabase_benchmark as bm
+import eeDatabase_collectionInfo as eedb_colinfo
+import eeDatabase_pathNames as eedb_path
+import eeDatabase_reconcileDatabase as eedb_rec
+
+root = 'test/blm-database'
+start_date = datetime.datetime(2022, 1, 1)
+end_date = datetime.datetime(2022, 1, 20)
+
+
+def get_millis(day):
+    return(int(datetime.datetime(2022, 1, day, tzinfo = datetime.timezone.utc).timestamp() * 1000))
+
+
+def get_date_img(day):
+    return(fake_ee.ImageValue({}, None, {'system:index': f'202201{day:02d}', 'system:time_start': get_millis(day)}))
+
+
+@pytest.fixture
+def report(monkeypatch):
+    """
+    :return: Report of a database holding a per-date collection with gaps, an extra date and a duplicate, a year image
+             collection, a staging collection and a collection matching no land unit
+    """
+    monkeypatch.setitem(eedb_colinfo.land_unit_dict, bm.synthetic_fc_path, bm.synthetic_land_unit)
+    fake_ee.session.catalog = bm.make_benchmark_catalog(4)
+    date_path = eedb_path.get_out_path('Synthetic', 'GridMET_Drought', 'Long_Term_Drought_Blend', root = root)
+    annual_path = eedb_path.get_out_path('Synthetic', 'GridMET_Drought', 'Short_Term_Drought_Blend', root = root)
+    id_img = fake_ee.ImageValue({}, None, {'system:index': '0_id'})
+    fake_ee.session.catalog.update({
+        date_path: fake_ee.ICValue([id_img, get_date_img(1), get_date_img(1), get_date_img(11), get_date_img(12)]),
+        annual_path: fake_ee.ICValue([id_img, fake_ee.ImageValue({}, None, {'system:index': '2022', 'dates': [get_millis(day) for day in [1, 6, 11, 16]]})]),
+        f'{date_path}-shards': fake_ee.ICValue([get_date_img(6)]),
+        f'{root}/unknown': fake_ee.ICValue([get_date_img(1)])})
+
+    return({entry.get('out_path'): entry for entry in eedb_rec.reconcile_database(start_date, end_date, root = root)})
+
+
+def test_reconcile_dates():
+    assert eedb_rec.reconcile_dates([1, 2, 3], [3, 1, 1, 4]) == {'missing': [2], 'extra': [4], 'duplicate': [1]}
+    assert eedb_rec.reconcile_dates([1, 2], []) == {'missing': [1, 2], 'extra': [], 'duplicate': []}
+
+
+def test_missing_extra_and_duplicate_dates(report):
+    entry = report.get(eedb_path.get_out_path('Synthetic', 'GridMET_Drought', 'Long_Term_Drought_Blend', root = root))
+
+    assert entry.get('in_ic_name') == 'GridMET_Drought'
+    assert entry.get('storage') == 'date'
+    assert (entry.get('n_expected'), entry.get('n_stored')) == (4, 4)
+    assert entry.get('missing') == [get_millis(6), get_millis(16)]
+    assert entry.get('extra') == [get_millis(12)]
+    assert entry.get('duplicate') == [get_millis(1)]
+
+
+def test_year_images_are_read_from_their_dates(report):
+    entry = report.get(eedb_path.get_out_path('Synthetic', 'GridMET_Drought', 'Short_Term_Drought_Blend', root = root))
+
+    assert entry.get('storage') == 'annual'
+    assert (entry.get('missing'), entry.get('extra'), entry.get('duplicate')) == ([], [], [])
+
+
+def test_unmatched_and_staging_collections(report):
+    assert report.get(f'{root}/unknown').get('in_ic_name') is None
+    assert report.get(f'{root}/unknown').get('n_stored') == 1
+    assert not any(out_path.endswith('-shards') for out_path in report)
@@ -0,0 +1,84 @@
+import datetime
+import eeDatabase_fakeEE as fake_ee
+fake_ee.install()
+import eeDatabase_coreMethods as eedb_cor
+import eeDatabase_shardMethods as eedb_shard
+
+dates = [int(datetime.datetime(2022, 1, d).timestamp() * 1000) for d in range(1, 4)]
+date_ids = [eedb_cor.get_date_id(date) for date in dates]
+properties = {'land_unit_short': 'BLM_Allotments', 'in_ic_name': 'GridMET', 'var_name': 'Precipitation', 'in_fc_path': 'fc'}
+
+
+def get_plan(**kwargs):
+    """
+    :param kwargs: e.g. stored_dates = dates[:1], keys replacing those of the plan
+    :return: Plan of a sharded collection, as eeDatabase_runJobs.plan_job() returns it
+    """
+    return(dict({'in_ic_paths': ['IDAHO_EPSCOR/GRIDMET'], 'out_path': 'db/a', 'properties': properties, 'exists': True, 'refused': None,
+                 'shard_settings': {'shards': 2}, 'miss_dates': dates, 'stored_dates': []}, **kwargs))
+
+
+def test_quadtree_partition_covers_every_feature():
+    xs = [0, 1, 0, 1, 10, 11, 10, 11]
+    ys = [0, 0, 1, 1, 10, 10, 11, 11]
+    shards = eedb_shard.quadtree_partition(xs, ys, 4)
+
+    assert len(shards) >= 4
+    assert sorted(i for shard in shards for i in shard) == list(range(8))
+
+
+def test_quadtree_partition_stops_on_shared_locations():
+    shards = eedb_shard.quadtree_partition([5] * 6, [5] * 6, 4)
+
+    assert shards == [[0, 1, 2, 3, 4, 5]]
+
+
+def test_property_partition_keeps_groups_together():
+    values = ['ID', 'ID', 'ID', 'NV', 'NV', 'OR', 'UT']
+    shards = eedb_shard.property_partition(values, 3)
+
+    assert len(shards) == 3
+    assert sorted(i for shard in shards for i in shard) == list(range(7))
+    assert all(sum(value in [values[i] for i in shard] for shard in shards) == 1 for value in set(values))
+    assert [0, 1, 2] in shards
+    assert len(eedb_shard.property_partition(['ID', 'NV'], 8)) == 2
+
+
+def test_group_staged_shards():
+    staged = eedb_shard.group_staged_shards([['20220101_s001', '20220101_s000', '20220102_s000'], [2, 2, 2]])
+
+    assert staged == {'20220101': {'ids': ['20220101_s000', '20220101_s001'], 'complete': True},
+                      '20220102': {'ids': ['20220102_s000'], 'complete': False}}
+    assert eedb_shard.group_staged_shards(None) == {}
+
+
+def test_plan_shards_merges_complete_dates_and_skips_staged_shards():
+    staged_shards = [[eedb_shard.get_shard_id(date_ids[0], 0), eedb_shard.get_shard_id(date_ids[0], 1), eedb_shard.get_shard_id(date_ids[1], 1)], [2, 2, 2]]
+    active_tasks = {eedb_cor.get_export_description(dict(properties, **{'system:index': eedb_shard.get_shard_id(date_ids[2], 0)}))}
+    metadata = {'staged_shards': {'db/a-shards': staged_shards}, 'active_tasks': active_tasks, 'sizes': {'fc': 10}}
+    shard_plans, plans = eedb_shard.plan_shards([get_plan()], metadata)
+
+    assert plans[0].get('miss_dates') == []
+    shard_plan = shard_plans[0]
+    assert shard_plan.get('merge_dates') == dates[:1]
+    assert shard_plan.get('miss_dates') == dates[1:]
+    assert shard_plan.get('skip_ids') == {eedb_shard.get_shard_id(date_ids[1], 1): 2, eedb_shard.get_shard_id(date_ids[2], 0): None}
+    assert shard_plan.get('clean_ids') == []
+    assert shard_plan.get('n_features') == 10
+
+
+def test_plan_shards_cleans_stored_dates():
+    staged_shards = [[eedb_shard.get_shard_id(date_ids[0], 0), eedb_shard.get_shard_id(date_ids[0], 1)], [2, 2]]
+    metadata = {'staged_shards': {'db/a-shards': staged_shards}, 'sizes': {'fc': 10}}
+    shard_plans, _ = eedb_shard.plan_shards([get_plan(miss_dates = dates[1:], stored_dates = dates[:1])], metadata)
+
+    assert shard_plans[0].get('merge_dates') == []
+    assert shard_plans[0].get('clean_ids') == staged_shards[0]
+
+
+def test_plan_shards_leaves_unshardable_plans():
+    plans = [get_plan(properties = dict(properties, storage = 'annual')), get_plan(shard_settings = {}), get_plan(exists = False)]
+    shard_plans, out_plans = eedb_shard.plan_shards(plans, {'sizes': {'fc': 10}})
+
+    assert shard_plans == []
+    assert [plan.get('miss_dates') for plan in out_plans] == [dates] * 3
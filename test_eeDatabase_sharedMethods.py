@@ -0,0 +1,72 @@
+import datetime
+import eeDatabase_fakeEE as fake_ee
+fake_ee.install()
+import eeDatabase_coreMethods as eedb_cor
+import eeDatabase_sharedMethods as eedb_shared
+
+in_fc_path = 'projects/dri-apps/assets/blm-admin/blm-natl-grazing-allotment-polygons'
+var_name = 'Long_Term_Drought_Blend'
+d1, d2, d3, d4, d5 = [int(datetime.datetime(2022, 1, d).timestamp() * 1000) for d in [1, 6, 11, 16, 21]]
+
+
+def get_plan(in_ic_name, miss_dates, stored_dates = [], **properties):
+    """
+    :param in_ic_name: e.g. 'GridMET_Drought' or 'GridMET_Drought_Cont'
+    :param miss_dates: e.g. [d1, d2]
+    :param stored_dates: e.g. [d3]
+    :param properties: e.g. storage = 'annual', run properties replaced in the plan
+    :return: Plan of an existing collection, as eeDatabase_runJobs.plan_job() returns it
+    """
+    return({'in_ic_paths': ['GRIDMET/DROUGHT'], 'out_path': f'db/{in_ic_name.lower()}', 'exists': True, 'context': None,
+            'properties': dict(eedb_cor.get_run_properties(in_fc_path, in_ic_name, var_name, 4000), **properties),
+            'miss_dates': miss_dates, 'stored_dates': stored_dates})
+
+
+def test_dates_missing_from_both_variants_are_shared():
+    shared_plans, plans = eedb_shared.pair_variant_plans([get_plan('GridMET_Drought', [d1, d2, d3]), get_plan('GridMET_Drought_Cont', [d1, d2, d3, d4])])
+
+    assert len(shared_plans) == 1
+    assert shared_plans[0].get('out_paths') == {'GridMET_Drought': 'db/gridmet_drought', 'GridMET_Drought_Cont': 'db/gridmet_drought_cont'}
+    assert shared_plans[0].get('miss_dates') == [d1, d2, d3]
+    assert shared_plans[0].get('split_dates') == {'GridMET_Drought': [], 'GridMET_Drought_Cont': []}
+
+    # Dates only one variant is missing are left to its own plan
+    assert [plan.get('miss_dates') for plan in plans] == [[], [d4]]
+
+
+def test_staged_dates_are_split_and_cleaned():
+    plans = [get_plan('GridMET_Drought', [d1, d3], stored_dates = [d2, d5]), get_plan('GridMET_Drought_Cont', [d1, d2, d3], stored_dates = [d5])]
+    shared_plans, plans = eedb_shared.pair_variant_plans(plans, stored_dates = {'db/gridmet_drought-shared': [d1, d2, d5]})
+
+    assert shared_plans[0].get('miss_dates') == [d3]
+    assert shared_plans[0].get('split_dates') == {'GridMET_Drought': [d1], 'GridMET_Drought_Cont': [d1, d2]}
+    assert shared_plans[0].get('clean_dates') == [d5]
+    assert [plan.get('miss_dates') for plan in plans] == [[], []]
+
+
+def test_dates_being_staged_are_left_to_their_export():
+    plan = get_plan('GridMET_Drought', [d3, d4])
+    active_tasks = {eedb_cor.get_export_description(eedb_cor.get_date_properties(plan.get('properties'), d3))}
+    shared_plans, plans = eedb_shared.pair_variant_plans([plan, get_plan('GridMET_Drought_Cont', [d3, d4])], active_tasks = active_tasks)
+
+    assert shared_plans[0].get('miss_dates') == [d4]
+    assert shared_plans[0].get('split_dates') == {'GridMET_Drought': [], 'GridMET_Drought_Cont': []}
+    assert [plan.get('miss_dates') for plan in plans] == [[], []]
+
+
+def test_running_dates_are_removed_without_a_shared_plan():
+    plan = get_plan('GridMET_Drought', [d3])
+    active_tasks = {eedb_cor.get_export_description(eedb_cor.get_date_properties(plan.get('properties'), d3))}
+    shared_plans, plans = eedb_shared.pair_variant_plans([plan, get_plan('GridMET_Drought_Cont', [d3])], active_tasks = active_tasks)
+
+    assert shared_plans == []
+    assert [plan.get('miss_dates') for plan in plans] == [[], []]
+
+
+def test_unshareable_plans_are_left_alone():
+    for properties in [{'storage': 'annual'}, {'layout_path': 'db/gridmet_drought-layout'}, {'mask_threshold': 0.5}]:
+        plans = [get_plan('GridMET_Drought', [d1, d2], **properties), get_plan('GridMET_Drought_Cont', [d1, d2])]
+        shared_plans, out_plans = eedb_shared.pair_variant_plans(plans)
+
+        assert shared_plans == []
+        assert [plan.get('miss_dates') for plan in out_plans] == [[d1, d2], [d1, d2]]
@@ -0,0 +1,49 @@
+import eeDatabase_fakeEE as fake_ee
+fake_ee.install()
+import eeDatabase_fakeBackend as eedb_fake
+import eeDatabase_taskMethods as eedb_task
+
+properties = {'land_unit_short': 'BLM_StateOffices', 'in_ic_name': 'RAP_Cover', 'tile_scale': 1}
+
+
+def run_adaptive(backend, store_path):
+    """
+    :param backend: e.g. eeDatabase_fakeBackend.FakeTaskBackend
+    :param store_path: e.g. path of the tile scale store in a temporary directory
+    :return: Final task status of one adaptive export submitted to the backend
+    """
+    return(eedb_task.run_image_export_adaptive(in_ic_paths = ['RAP/COVER'], date = 1640995200000, out_path = 'blm-database/out', properties = properties,
+                                               store_path = str(store_path), poll_interval = 0, submit = backend))
+
+
+def test_memory_failures_escalate_tile_scale(tmp_path):
+    backend = eedb_fake.FakeTaskBackend(required_tile_scales = {('BLM_StateOffices', 'RAP_Cover'): 4}, polls_until_done = 2)
+    status = run_adaptive(backend, tmp_path / 'store.json')
+
+    assert status.get('state') == 'COMPLETED'
+    assert status.get('tile_scale') == 4
+    assert [s.get('properties').get('tile_scale') for s in backend.submissions] == [1, 2, 4]
+
+
+def test_gives_up_after_last_tile_scale(tmp_path):
+    backend = eedb_fake.FakeTaskBackend(default_tile_scale = eedb_task.tile_scales[-1] * 2)
+    status = run_adaptive(backend, tmp_path / 'store.json')
+
+    assert status.get('state') == 'FAILED'
+    assert eedb_task.is_memory_error(status.get('error_message'))
+    assert status.get('tile_scale') == eedb_task.tile_scales[-1]
+    assert [s.get('properties').get('tile_scale') for s in backend.submissions] == eedb_task.tile_scales
+    assert not (tmp_path / 'store.json').exists()
+
+
+def test_store_persists_succeeding_tile_scale(tmp_path):
+    store_path = tmp_path / 'store.json'
+    run_adaptive(eedb_fake.FakeTaskBackend(required_tile_scales = {('BLM_StateOffices', 'RAP_Cover'): 8}), store_path)
+    assert eedb_task.read_tile_scale_store(str(store_path)) == {'BLM_StateOffices': {'RAP_Cover': 8}}
+
+    # A later run starts at the stored tileScale instead of failing its way up again
+    backend = eedb_fake.FakeTaskBackend(required_tile_scales = {('BLM_StateOffices', 'RAP_Cover'): 8})
+    status = run_adaptive(backend, store_path)
+    assert status.get('state') == 'COMPLETED'
+    assert [s.get('properties').get('tile_scale') for s in backend.submissions] == [8]
+    assert eedb_task.get_tile_scale(str(store_path), 'BLM_StateOffices', 'RAP_Cover') == 8